@@ -2,76 +2,317 @@
 Download the Phi-2 4-bit GGUF model for TinyLLM-Auto
 """
 
+import argparse
+import hashlib
+import json
 import os
-import requests
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import List, Optional, Tuple
+
+import requests
 from tqdm import tqdm
 
 
-def download_file(url: str, destination: str):
+PHI2_URL = "https://huggingface.co/TheBloke/phi-2-GGUF/resolve/main/phi-2.Q4_K_M.gguf"
+PHI2_DESTINATION = "models/phi-2-4bit.gguf"
+
+# Large reads keep the per-chunk Python overhead negligible next to network I/O
+CHUNK_SIZE = 4 * 1024 * 1024
+HASH_BLOCK_SIZE = 8 * 1024 * 1024
+TIMEOUT_S = 30
+
+# Hugging Face publishes the SHA-256 of LFS files as the X-Linked-Etag of the
+# resolve redirect
+_SHA256_PATTERN = re.compile(r'^"?([0-9a-f]{64})"?$')
+
+
+def sha256_file(path: str, offset_limit: Optional[int] = None) -> "hashlib._Hash":
+    """
+    SHA-256 of a file (or its first offset_limit bytes), read in large blocks
+
+    Returns:
+        hashlib object, so callers can keep updating it
+    """
+    digest = hashlib.sha256()
+    remaining = offset_limit
+    with open(path, 'rb') as f:
+        while remaining is None or remaining > 0:
+            size = HASH_BLOCK_SIZE if remaining is None else min(HASH_BLOCK_SIZE, remaining)
+            block = f.read(size)
+            if not block:
+                break
+            digest.update(block)
+            if remaining is not None:
+                remaining -= len(block)
+    return digest
+
+
+def _probe(session: requests.Session, url: str) -> Tuple[Optional[int], bool, Optional[str]]:
+    """Remote size, whether the server honours Range requests, and the published SHA-256"""
+    response = session.head(url, allow_redirects=True, timeout=TIMEOUT_S)
+    response.raise_for_status()
+    size = response.headers.get('content-length')
+    accepts_ranges = response.headers.get('accept-ranges', '').lower() == 'bytes'
+
+    published = None
+    for hop in response.history + [response]:
+        match = _SHA256_PATTERN.match(hop.headers.get('x-linked-etag', '').lower())
+        if match:
+            published = match.group(1)
+    return (int(size) if size else None), accepts_ranges, published
+
+
+def _progress_bar(destination: str, total: Optional[int], initial: int, show: bool):
+    return tqdm(
+        desc=os.path.basename(destination),
+        total=total,
+        initial=initial,
+        unit='iB',
+        unit_scale=True,
+        unit_divisor=1024,
+        disable=not show,
+    )
+
+
+def _download_sequential(
+    session: requests.Session,
+    url: str,
+    part_path: str,
+    total: Optional[int],
+    chunk_size: int,
+    show_progress: bool
+) -> str:
+    """
+    Stream into part_path, resuming from its current size
+
+    Returns:
+        Hex SHA-256 of the complete file, computed while writing
+    """
+    offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    if total is not None and offset > total:
+        offset = 0
+    if total is not None and offset == total:
+        # Finished earlier but not yet renamed into place (an unfinished
+        # segmented download is handled by download_file, via its sidecar)
+        return sha256_file(part_path).hexdigest()
+
+    headers = {'Range': f'bytes={offset}-'} if offset else {}
+    with session.get(url, headers=headers, stream=True, timeout=TIMEOUT_S) as response:
+        response.raise_for_status()
+        if offset and response.status_code != 206:
+            # Server ignored the Range header: start over
+            offset = 0
+
+        digest = sha256_file(part_path, offset) if offset else hashlib.sha256()
+        with open(part_path, 'r+b' if offset else 'wb') as f, \
+                _progress_bar(part_path, total, offset, show_progress) as progress_bar:
+            f.seek(offset)
+            f.truncate()
+            for data in response.iter_content(chunk_size=chunk_size):
+                f.write(data)
+                digest.update(data)
+                progress_bar.update(len(data))
+            f.flush()
+            os.fsync(f.fileno())
+
+    return digest.hexdigest()
+
+
+def _split(total: int, segments: int) -> List[List[int]]:
+    """[start, end_inclusive, bytes_done] for each segment"""
+    size = -(-total // segments)
+    return [
+        [start, min(start + size, total) - 1, 0]
+        for start in range(0, total, size)
+    ]
+
+
+def _download_segmented(
+    session: requests.Session,
+    url: str,
+    part_path: str,
+    total: int,
+    segments: int,
+    chunk_size: int,
+    show_progress: bool
+) -> str:
+    """
+    Fetch byte ranges in parallel into a preallocated part_path
+
+    Per-segment progress is kept in a sidecar file so an interrupted
+    download resumes each segment where it stopped.
+
+    Returns:
+        Hex SHA-256 of the complete file (hashed after assembly, since
+        segments arrive out of order)
     """
-    Download a file with progress bar
-    
+    state_path = part_path + ".segments"
+    plan = None
+    if os.path.exists(part_path) and os.path.exists(state_path):
+        with open(state_path) as f:
+            saved = json.load(f)
+        if saved.get('total') == total and os.path.getsize(part_path) == total:
+            plan = saved['segments']
+    if plan is None:
+        plan = _split(total, segments)
+        with open(part_path, 'wb') as f:
+            f.truncate(total)
+
+    lock = threading.Lock()
+
+    def save_state():
+        with open(state_path + ".tmp", 'w') as f:
+            json.dump({'total': total, 'segments': plan}, f)
+        os.replace(state_path + ".tmp", state_path)
+
+    done = sum(segment[2] for segment in plan)
+    with _progress_bar(part_path, total, done, show_progress) as progress_bar:
+
+        def fetch(segment):
+            start, end, already = segment
+            if start + already > end:
+                return
+            headers = {'Range': f'bytes={start + already}-{end}'}
+            fd = os.open(part_path, os.O_WRONLY)
+            try:
+                with session.get(url, headers=headers, stream=True, timeout=TIMEOUT_S) as response:
+                    response.raise_for_status()
+                    if response.status_code != 206:
+                        raise RuntimeError(f"Server ignored range request for {url}")
+                    position = start + already
+                    for data in response.iter_content(chunk_size=chunk_size):
+                        os.pwrite(fd, data, position)
+                        position += len(data)
+                        with lock:
+                            segment[2] = position - start
+                            save_state()
+                            progress_bar.update(len(data))
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+        with ThreadPoolExecutor(max_workers=len(plan)) as pool:
+            for future in [pool.submit(fetch, segment) for segment in plan]:
+                future.result()
+
+    if any(start + written <= end for start, end, written in plan):
+        raise RuntimeError(f"Download of {url} ended early; rerun to resume")
+    os.remove(state_path)
+    return sha256_file(part_path).hexdigest()
+
+
+def download_file(
+    url: str,
+    destination: str,
+    sha256: Optional[str] = None,
+    segments: int = 1,
+    chunk_size: int = CHUNK_SIZE,
+    show_progress: bool = True,
+    session: Optional[requests.Session] = None
+) -> str:
+    """
+    Download a file with resume, checksum verification and atomic rename
+
+    Data goes to "<destination>.part" and is renamed into place only once
+    complete (and verified), so an interrupted download is resumed with an
+    HTTP Range request instead of being mistaken for a finished file.
+
     Args:
         url: URL to download from
         destination: Local path to save file
+        sha256: Expected hex SHA-256 (default: the one the server publishes
+            as X-Linked-Etag, as Hugging Face does for LFS files)
+        segments: Parallel ranged connections (used when the server
+            reports its size and accepts ranges)
+        chunk_size: Bytes per read
+        show_progress: Show a progress bar
+        session: requests.Session to reuse (connection pooling, auth)
+
+    Returns:
+        Hex SHA-256 of the downloaded file
     """
     # Create directory if it doesn't exist
-    os.makedirs(os.path.dirname(destination), exist_ok=True)
-    
+    os.makedirs(os.path.dirname(destination) or ".", exist_ok=True)
+
     # Check if file already exists
     if os.path.exists(destination):
-        print(f"✓ File already exists: {destination}")
-        return
-    
-    print(f"Downloading model to {destination}...")
-    
-    response = requests.get(url, stream=True)
-    total_size = int(response.headers.get('content-length', 0))
-    
-    with open(destination, 'wb') as file, tqdm(
-        desc=os.path.basename(destination),
-        total=total_size,
-        unit='iB',
-        unit_scale=True,
-        unit_divisor=1024,
-    ) as progress_bar:
-        for data in response.iter_content(chunk_size=1024):
-            size = file.write(data)
-            progress_bar.update(size)
-    
-    print(f"✓ Download complete: {destination}")
+        if sha256 is None:
+            print(f"✓ File already exists: {destination}")
+            return sha256_file(destination).hexdigest()
+        actual = sha256_file(destination).hexdigest()
+        if actual == sha256.lower():
+            print(f"✓ File already exists and is verified: {destination}")
+            return actual
+        print(f"⚠️  Checksum mismatch for existing {destination}, downloading again")
+        os.remove(destination)
 
+    part_path = destination + ".part"
+    state_path = part_path + ".segments"
+    session = session or requests.Session()
+    total, accepts_ranges, published = _probe(session, url)
+    if sha256 is None and published is not None:
+        print(f"Verifying against the SHA-256 published by the server: {published}")
+        sha256 = published
 
-def download_phi2_model():
+    segmented = segments > 1 and accepts_ranges and bool(total)
+    if os.path.exists(state_path):
+        # The part is preallocated and zero-filled, not a partial prefix
+        if accepts_ranges and total:
+            segmented = True
+        else:
+            print("⚠️  Cannot resume the segmented download from this server, starting over")
+            os.remove(state_path)
+            if os.path.exists(part_path):
+                os.remove(part_path)
+
+    resuming = os.path.exists(part_path)
+    print(f"{'Resuming' if resuming else 'Downloading'} {url} to {destination}...")
+
+    if segmented:
+        actual = _download_segmented(
+            session, url, part_path, total, segments, chunk_size, show_progress
+        )
+    else:
+        actual = _download_sequential(session, url, part_path, total, chunk_size, show_progress)
+
+    if total is not None and os.path.getsize(part_path) != total:
+        raise RuntimeError(
+            f"Incomplete download: {os.path.getsize(part_path)} of {total} bytes; rerun to resume"
+        )
+    if sha256 is not None and actual != sha256.lower():
+        os.remove(part_path)
+        raise ValueError(f"SHA-256 mismatch for {url}: expected {sha256}, got {actual}")
+
+    os.replace(part_path, destination)
+    print(f"✓ Download complete: {destination} (sha256 {actual})")
+    return actual
+
+
+def download_phi2_model(
+    destination: str = PHI2_DESTINATION,
+    url: str = PHI2_URL,
+    sha256: Optional[str] = None,
+    segments: int = 4
+):
     """Download Phi-2 4-bit GGUF model"""
-    
-    # Model URLs (using Hugging Face)
-    # Note: You'll need to replace this with the actual model URL
-    # The actual Phi-2 GGUF models can be found on Hugging Face
-    
-    models_dir = Path("models")
-    models_dir.mkdir(exist_ok=True)
-    
+
+    Path(destination).parent.mkdir(parents=True, exist_ok=True)
+
     print("="*60)
     print("TinyLLM-Auto Model Downloader")
     print("="*60)
     print()
-    
+
     # Phi-2 4-bit GGUF model
     print("📥 Downloading Phi-2 4-bit GGUF model (~1.6GB)...")
+    print(f"Source: {url}")
     print()
-    print("⚠️  Manual Download Required:")
-    print("Due to model licensing and hosting constraints, please manually download:")
+    download_file(url, destination, sha256=sha256, segments=segments)
     print()
-    print("1. Visit: https://huggingface.co/TheBloke/phi-2-GGUF")
-    print("2. Download: phi-2.Q4_K_M.gguf (~1.6GB)")
-    print("3. Place in: models/phi-2-4bit.gguf")
-    print()
-    print("Alternative (automated download from HuggingFace):")
-    print("Run: huggingface-cli download TheBloke/phi-2-GGUF phi-2.Q4_K_M.gguf --local-dir models/")
-    print()
-    
+
     # Optionally download Whisper model
     print("="*60)
     print("📥 Downloading Whisper Tiny model for STT...")
@@ -79,18 +320,28 @@ def download_phi2_model():
     print("Whisper models are downloaded automatically on first use.")
     print("Tiny model (~39MB) will be downloaded when you first run the voice interface.")
     print()
-    
+
     print("="*60)
     print("✓ Setup Instructions:")
     print("="*60)
     print()
-    print("1. Download the Phi-2 model as instructed above")
-    print("2. Install dependencies: pip install -r requirements.txt")
-    print("3. Run the demo: python src/demo.py")
+    print("1. Install dependencies: pip install -r requirements.txt")
+    print("2. Run the demo: python src/demo.py")
     print()
-    
+
     return True
 
 
+def main():
+    parser = argparse.ArgumentParser(description="TinyLLM-Auto: download the Phi-2 GGUF model")
+    parser.add_argument("--url", default=PHI2_URL, help="Model URL")
+    parser.add_argument("--output", default=PHI2_DESTINATION, help="Destination path")
+    parser.add_argument("--sha256", default=None, help="Expected SHA-256 of the file (default: the one Hugging Face publishes)")
+    parser.add_argument("--segments", type=int, default=4, help="Parallel ranged connections")
+    args = parser.parse_args()
+
+    download_phi2_model(args.output, args.url, args.sha256, args.segments)
+
+
 if __name__ == "__main__":
-    download_phi2_model()
+    main()
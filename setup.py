@@ -2,7 +2,7 @@
 Setup script for TinyLLM-Auto
 """
 
-from setuptools import setup, find_packages
+from setuptools import setup
 from pathlib import Path
 
 # Read the README file
@@ -18,8 +18,10 @@ setup(
     long_description=long_description,
     long_description_content_type="text/markdown",
     url="https://github.com/sreekar-gajula/tinyllm-auto",
-    packages=find_packages(where="src"),
-    package_dir={"": "src"},
+    # src/ is installed as one package, so modules with generic names
+    # (audio, memory, batch, ...) don't land at the top level of site-packages
+    packages=["tinyllm_auto"],
+    package_dir={"tinyllm_auto": "src"},
     classifiers=[
         "Development Status :: 3 - Alpha",
         "Intended Audience :: Developers",
@@ -33,7 +35,7 @@ setup(
     ],
     python_requires=">=3.8",
     install_requires=[
-        "llama-cpp-python>=0.2.0",
+        "llama-cpp-python>=0.2.79",
         "numpy>=1.24.0",
         "requests>=2.31.0",
         "tqdm>=4.66.0",
@@ -57,7 +59,7 @@ setup(
     },
     entry_points={
         "console_scripts": [
-            "tinyllm-auto=demo:main",
+            "tinyllm-auto=tinyllm_auto.demo:main",
         ],
     },
 )
@@ -2,8 +2,35 @@
 TinyLLM-Auto: Edge LLM for In-Vehicle Deployment
 """
 
+import importlib
+
 from .assistant import VehicleAssistant, VehicleContext
-from .voice_interface import VoiceAssistant
+from .structured import DTCAnswer
 
 __version__ = "0.1.0"
-__all__ = ["VehicleAssistant", "VehicleContext", "VoiceAssistant"]
+__all__ = ["VehicleAssistant", "VehicleContext", "VoiceAssistant", "DTCAnswer", "QueryRouter", "MemoryGovernor", "FleetRegistry", "RequestScheduler", "RequestCoalescer", "ThermalGovernor"]
+
+# Subsystems with heavy or optional dependencies are imported on first
+# attribute access so text-only users don't pay for them at import time
+_LAZY_ATTRS = {
+    "VoiceAssistant": ".voice_interface",
+    "QueryRouter": ".router",
+    "MemoryGovernor": ".memory",
+    "FleetRegistry": ".fleet",
+    "RequestScheduler": ".scheduler",
+    "RequestCoalescer": ".coalescing",
+    "ThermalGovernor": ".thermal",
+}
+
+
+def __getattr__(name):
+    module_name = _LAZY_ATTRS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRS))
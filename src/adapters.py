@@ -0,0 +1,171 @@
+"""
+TinyLLM-Auto: LoRA Adapters
+Brand fine-tunes as LoRA adapters over one shared base model
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+# Adapter name for the base model with no adapter applied
+BASE_ADAPTER = "base"
+
+
+class AdapterManager:
+    """
+    Named LoRA adapters (e.g. one per OEM brand) applied on top of the
+    loaded base model.
+
+    Adapters are loaded on first use and kept in an LRU cache of
+    max_loaded handles; switching to a cached adapter only re-points the
+    context at it, with no reload of the base weights. A request uses its
+    explicit adapter, else the session's, else the adapter registered
+    under the vehicle's make, else the base model.
+    """
+
+    def __init__(
+        self,
+        adapters: Dict[str, str],
+        max_loaded: int = 4,
+        scale: float = 1.0,
+        verbose: bool = False
+    ):
+        """
+        Initialize the manager
+
+        Args:
+            adapters: Adapter name (e.g. "toyota") -> LoRA GGUF path
+            max_loaded: Adapters kept loaded at once
+            scale: LoRA scale applied to every adapter
+            verbose: Print loads, switches and evictions
+        """
+        self.paths: Dict[str, str] = {}
+        for name, path in adapters.items():
+            self.register(name, path)
+        self.max_loaded = max_loaded
+        self.scale = scale
+        self.verbose = verbose
+
+        self.backend = None
+        self.active = BASE_ADAPTER
+        self._loaded: "OrderedDict[str, Any]" = OrderedDict()
+
+        self.switches = 0
+        self.hits = 0
+        self.loads = 0
+        self.evictions = 0
+        self._switch_total_s = 0.0
+        self.max_switch_s = 0.0
+        self._load_total_s = 0.0
+
+    def register(self, name: str, path: str):
+        """Add (or repoint) a named adapter"""
+        name = name.lower()
+        if name == BASE_ADAPTER:
+            raise ValueError(f"'{BASE_ADAPTER}' is reserved for the base model")
+        self.paths[name] = path
+
+    def resolve(self, adapter: Optional[str] = None, vehicle_context=None) -> str:
+        """
+        Pick the adapter for a request
+
+        Args:
+            adapter: Explicit adapter name (or BASE_ADAPTER)
+            vehicle_context: Vehicle whose make selects an adapter when
+                none is given
+
+        Returns:
+            A registered adapter name, or BASE_ADAPTER
+        """
+        if adapter is not None:
+            name = adapter.lower()
+            if name != BASE_ADAPTER and name not in self.paths:
+                raise ValueError(f"Unknown adapter '{adapter}'. Available: {', '.join(sorted(self.paths))}")
+            return name
+        if vehicle_context is not None and vehicle_context.make.lower() in self.paths:
+            return vehicle_context.make.lower()
+        return BASE_ADAPTER
+
+    def activate(self, backend, name: str) -> float:
+        """
+        Apply an adapter to the backend's model (caller holds the model lock)
+
+        Args:
+            backend: Loaded backend
+            name: Resolved adapter name
+
+        Returns:
+            Switch time in seconds (0.0 if it was already active)
+        """
+        if backend is not self.backend:
+            # A new model: handles of the old one are gone with it
+            self.release()
+            self.backend = backend
+        if name == self.active:
+            return 0.0
+
+        start_time = time.perf_counter()
+        handle = None if name == BASE_ADAPTER else self._handle(name)
+        backend.set_adapter(handle, self.scale)
+        self.active = name
+        self._evict()
+        elapsed = time.perf_counter() - start_time
+
+        self.switches += 1
+        self._switch_total_s += elapsed
+        self.max_switch_s = max(self.max_switch_s, elapsed)
+        if self.verbose:
+            print(f"Switched to adapter '{name}' in {elapsed * 1000:.1f} ms")
+        return elapsed
+
+    def _handle(self, name: str) -> Any:
+        handle = self._loaded.get(name)
+        if handle is not None:
+            self._loaded.move_to_end(name)
+            self.hits += 1
+            return handle
+
+        start_time = time.perf_counter()
+        handle = self.backend.load_adapter(self.paths[name])
+        self._load_total_s += time.perf_counter() - start_time
+        self._loaded[name] = handle
+        self.loads += 1
+        return handle
+
+    def _evict(self):
+        """Free least recently used adapters beyond max_loaded (never the active one)"""
+        while len(self._loaded) > self.max_loaded:
+            name, handle = next(iter(self._loaded.items()))
+            if name == self.active:
+                break
+            del self._loaded[name]
+            self.backend.free_adapter(handle)
+            self.evictions += 1
+            if self.verbose:
+                print(f"Evicted adapter '{name}'")
+
+    def release(self):
+        """Detach and free every adapter (before the model is closed or replaced)"""
+        backend = self.backend
+        if backend is not None and backend.loaded:
+            if self.active != BASE_ADAPTER:
+                backend.set_adapter(None, self.scale)
+            for handle in self._loaded.values():
+                backend.free_adapter(handle)
+        self._loaded.clear()
+        self.active = BASE_ADAPTER
+        self.backend = None
+
+    def metrics(self) -> Dict:
+        """Cache and switch-latency counters"""
+        return {
+            'active': self.active,
+            'loaded': list(self._loaded),
+            'switches': self.switches,
+            'cache_hits': self.hits,
+            'loads': self.loads,
+            'evictions': self.evictions,
+            'mean_switch_s': self._switch_total_s / self.switches if self.switches else 0.0,
+            'max_switch_s': self.max_switch_s,
+            'mean_load_s': self._load_total_s / self.loads if self.loads else 0.0,
+        }
@@ -0,0 +1,390 @@
+"""
+TinyLLM-Auto: Predictive Maintenance Analytics
+Rolling statistics, trends and anomaly scores over telemetry with NumPy
+"""
+
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+@dataclass(frozen=True)
+class SignalSpec:
+    """Normal operating range and trend sensitivity of one telemetry signal"""
+    name: str
+    label: str
+    unit: str
+    low: Optional[float] = None
+    high: Optional[float] = None
+    # Report a trend if it crosses low/high within this many hours (None = no trends)
+    trend_horizon_h: Optional[float] = None
+    # Noise floor for anomaly scores, so flat signals do not divide by ~0
+    min_std: float = 0.1
+
+
+DEFAULT_SIGNALS = (
+    # Coolant climbs steeply during every warm-up, so only its level is judged
+    SignalSpec("coolant_temp_c", "coolant temperature", "°C", high=110, min_std=1.0),
+    SignalSpec("oil_temp_c", "oil temperature", "°C", high=140, min_std=1.0),
+    SignalSpec("battery_v", "battery voltage", "V", low=12.0, high=15.0, trend_horizon_h=8, min_std=0.05),
+    SignalSpec("short_fuel_trim_pct", "short-term fuel trim", "%", low=-15, high=15, min_std=1.0),
+    SignalSpec("long_fuel_trim_pct", "long-term fuel trim", "%", low=-10, high=10, trend_horizon_h=8, min_std=0.5),
+)
+
+ANOMALY_THRESHOLD = 4.0
+MIN_SAMPLES = 20
+
+SEVERITY = {"out_of_range": 0, "trend": 1, "anomaly": 2}
+
+
+@dataclass
+class SignalStats:
+    """Window statistics of one signal"""
+    name: str
+    count: int
+    last: float
+    mean: float
+    std: float
+    slope_per_hour: float
+    anomaly: float
+
+
+@dataclass
+class Finding:
+    """One thing worth telling the driver about"""
+    signal: str
+    kind: str
+    message: str
+
+
+class RollingWindow:
+    """
+    Last `size` samples with running sums for mean, variance and the
+    least-squares slope. Each sample updates the sums in O(1); they are
+    re-summed from the window once per `size` samples to cancel drift.
+    """
+
+    def __init__(self, size: int = 120):
+        self.size = size
+        self._times = np.zeros(size, dtype=np.float64)
+        self._values = np.zeros(size, dtype=np.float64)
+        self._next = 0
+        self.count = 0
+        self._since_resync = 0
+        # Times are kept relative to t0 for precision
+        self._t0: Optional[float] = None
+        self._st = self._sv = self._stt = self._svv = self._stv = 0.0
+
+    def __len__(self) -> int:
+        return self.count
+
+    def append(self, timestamp: float, value: float):
+        if self._t0 is None:
+            self._t0 = timestamp
+        t = timestamp - self._t0
+        if self.count == self.size:
+            old_t = self._times[self._next]
+            old_v = self._values[self._next]
+            self._st -= old_t
+            self._sv -= old_v
+            self._stt -= old_t * old_t
+            self._svv -= old_v * old_v
+            self._stv -= old_t * old_v
+        else:
+            self.count += 1
+        self._times[self._next] = t
+        self._values[self._next] = value
+        self._st += t
+        self._sv += value
+        self._stt += t * t
+        self._svv += value * value
+        self._stv += t * value
+        self._next = (self._next + 1) % self.size
+
+        self._since_resync += 1
+        if self._since_resync >= self.size:
+            self._resync()
+
+    def _resync(self):
+        """Re-sum the window, rebased on its oldest sample"""
+        n = self.count
+        times = self._times[:n] if n < self.size else self._times
+        shift = times.min()
+        times -= shift
+        self._t0 += shift
+        values = self._values[:n] if n < self.size else self._values
+        self._st = float(times.sum())
+        self._sv = float(values.sum())
+        self._stt = float(times @ times)
+        self._svv = float(values @ values)
+        self._stv = float(times @ values)
+        self._since_resync = 0
+
+    @property
+    def last(self) -> float:
+        return float(self._values[self._next - 1])
+
+    @property
+    def mean(self) -> float:
+        return self._sv / self.count if self.count else 0.0
+
+    @property
+    def std(self) -> float:
+        if not self.count:
+            return 0.0
+        mean = self.mean
+        return max(self._svv / self.count - mean * mean, 0.0) ** 0.5
+
+    @property
+    def slope_per_hour(self) -> float:
+        """Least-squares trend of the window in units per hour"""
+        n = self.count
+        denominator = n * self._stt - self._st * self._st
+        if n < 2 or denominator <= 0:
+            return 0.0
+        return (n * self._stv - self._st * self._sv) / denominator * 3600
+
+
+class TelemetryAnalyzer:
+    """
+    Incremental per-signal analytics for one vehicle.
+
+    Feed samples with update() (TelemetryIngestor does this when given
+    the analyzer); summary() returns a one-line findings block for the
+    prompt, e.g. assistant.analytics = analyzer.
+    """
+
+    def __init__(self, window: int = 120, signals=DEFAULT_SIGNALS, anomaly_threshold: float = ANOMALY_THRESHOLD):
+        """
+        Initialize the analyzer
+
+        Args:
+            window: Samples per rolling window
+            signals: SignalSpecs to analyze (other signals are ignored)
+            anomaly_threshold: Score (standard deviations) that counts as an anomaly
+        """
+        self.window = window
+        self.specs: Dict[str, SignalSpec] = {spec.name: spec for spec in signals}
+        self.anomaly_threshold = anomaly_threshold
+        self._windows: Dict[str, RollingWindow] = {}
+        self._anomaly: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def update(self, name: str, timestamp: float, value: float):
+        """Add one sample (scored against the window before it is added)"""
+        spec = self.specs.get(name)
+        if spec is None:
+            return
+        with self._lock:
+            window = self._windows.get(name)
+            if window is None:
+                window = self._windows[name] = RollingWindow(self.window)
+            if window.count >= MIN_SAMPLES:
+                self._anomaly[name] = abs(value - window.mean) / max(window.std, spec.min_std)
+            window.append(timestamp, value)
+
+    def stats(self, name: str) -> Optional[SignalStats]:
+        """Current window statistics of a signal (None before its first sample)"""
+        with self._lock:
+            window = self._windows.get(name)
+            if window is None:
+                return None
+            return SignalStats(
+                name=name,
+                count=window.count,
+                last=window.last,
+                mean=window.mean,
+                std=window.std,
+                slope_per_hour=window.slope_per_hour,
+                anomaly=self._anomaly.get(name, 0.0),
+            )
+
+    def findings(self) -> List[Finding]:
+        """Out-of-range levels, trends toward a limit and anomalies, most severe first"""
+        findings = []
+        for name, spec in self.specs.items():
+            stats = self.stats(name)
+            if stats is None:
+                continue
+            finding = _judge(spec, stats, self.anomaly_threshold)
+            if finding is not None:
+                findings.append(finding)
+        return sorted(findings, key=lambda f: SEVERITY[f.kind])
+
+    def summary(self, limit: int = 3) -> str:
+        """Compact findings block for the LLM prompt ("" if nothing stands out)"""
+        findings = self.findings()[:limit]
+        if not findings:
+            return ""
+        return "Telemetry findings: " + "; ".join(f.message for f in findings)
+
+
+def _fmt(spec: SignalSpec, value: float) -> str:
+    decimals = 2 if spec.unit == "V" else 0
+    return f"{value:.{decimals}f}{'' if spec.unit == '%' else ' '}{spec.unit}"
+
+
+def _judge(spec: SignalSpec, stats: SignalStats, anomaly_threshold: float) -> Optional[Finding]:
+    """The most severe finding for one signal"""
+    # Levels are judged on the window mean so single noisy samples do not trip them
+    level = stats.mean if stats.count >= MIN_SAMPLES else stats.last
+    if spec.high is not None and level > spec.high:
+        return Finding(spec.name, "out_of_range", f"{spec.label} high at {_fmt(spec, level)} (limit {_fmt(spec, spec.high)})")
+    if spec.low is not None and level < spec.low:
+        return Finding(spec.name, "out_of_range", f"{spec.label} low at {_fmt(spec, level)} (limit {_fmt(spec, spec.low)})")
+
+    if spec.trend_horizon_h is not None and stats.count >= MIN_SAMPLES:
+        hours = _hours_to_limit(spec, level, stats.slope_per_hour)
+        if hours is not None and hours <= spec.trend_horizon_h:
+            direction = "up" if stats.slope_per_hour > 0 else "down"
+            return Finding(
+                spec.name, "trend",
+                f"{spec.label} trending {direction} {_fmt(spec, abs(stats.slope_per_hour))}/h "
+                f"at {_fmt(spec, level)}, reaches limit in ~{hours:.1f} h"
+            )
+
+    if stats.anomaly >= anomaly_threshold:
+        return Finding(
+            spec.name, "anomaly",
+            f"unusual {spec.label} reading {_fmt(spec, stats.last)} (typical {_fmt(spec, stats.mean)})"
+        )
+    return None
+
+
+def _hours_to_limit(spec: SignalSpec, level: float, slope_per_hour: float) -> Optional[float]:
+    if slope_per_hour > 0 and spec.high is not None:
+        return (spec.high - level) / slope_per_hour
+    if slope_per_hour < 0 and spec.low is not None:
+        return (spec.low - level) / slope_per_hour
+    return None
+
+
+# Fleet-wide batch analytics: one row per vehicle (e.g. FleetRegistry rows),
+# one column per sample. Missing samples should be forward-filled first.
+
+def _window_sums(x: np.ndarray, window: int) -> np.ndarray:
+    """Sum of every length-`window` run along the last axis (cumsum difference)"""
+    csum = np.cumsum(x, axis=-1)
+    csum = np.concatenate((np.zeros(x.shape[:-1] + (1,)), csum), axis=-1)
+    return csum[..., window:] - csum[..., :-window]
+
+
+def rolling_mean_std(values: np.ndarray, window: int):
+    """
+    Rolling mean and (population) standard deviation
+
+    Args:
+        values: Samples, shape (..., n)
+        window: Samples per window
+
+    Returns:
+        (mean, std), each of shape (..., n - window + 1)
+    """
+    values = np.asarray(values, dtype=np.float64)
+    # Centering each row keeps the cumulative sums well conditioned
+    offset = values.mean(axis=-1, keepdims=True)
+    centered = values - offset
+    mean = _window_sums(centered, window) / window
+    var = _window_sums(centered * centered, window) / window - mean * mean
+    return mean + offset, np.sqrt(np.maximum(var, 0.0))
+
+
+def rolling_slope(times: np.ndarray, values: np.ndarray, window: int) -> np.ndarray:
+    """
+    Rolling least-squares trend in units per hour
+
+    Args:
+        times: Sample times in seconds, shape (n,) or like values
+        values: Samples, shape (..., n)
+        window: Samples per window
+
+    Returns:
+        Slopes of shape (..., n - window + 1)
+    """
+    values = np.asarray(values, dtype=np.float64)
+    times = np.broadcast_to(np.asarray(times, dtype=np.float64), values.shape)
+    t = times - times.mean(axis=-1, keepdims=True)
+    v = values - values.mean(axis=-1, keepdims=True)
+    st = _window_sums(t, window)
+    sv = _window_sums(v, window)
+    denominator = window * _window_sums(t * t, window) - st * st
+    numerator = window * _window_sums(t * v, window) - st * sv
+    with np.errstate(divide="ignore", invalid="ignore"):
+        slope = np.where(denominator > 0, numerator / denominator, 0.0)
+    return slope * 3600
+
+
+def analyze_fleet(
+    series: Dict[str, np.ndarray],
+    times: np.ndarray,
+    window: int = 120,
+    signals=DEFAULT_SIGNALS,
+    anomaly_threshold: float = ANOMALY_THRESHOLD
+) -> Dict[str, Dict[str, np.ndarray]]:
+    """
+    Batch analytics for many vehicles at once
+
+    Applies the same rules as TelemetryAnalyzer to every row: levels on
+    the last window's mean, trends on its slope, and the largest anomaly
+    score of any sample against the window before it.
+
+    Args:
+        series: Signal name -> samples of shape (vehicles, n), n >= window
+        times: Sample times in seconds, shape (n,) or (vehicles, n)
+        window: Samples per rolling window
+        signals: SignalSpecs to analyze
+        anomaly_threshold: Score that counts as an anomaly
+
+    Returns:
+        Signal name -> {'mean', 'std', 'slope_per_hour', 'max_anomaly',
+        'out_of_range', 'trend', 'anomaly'} arrays of shape (vehicles,)
+    """
+    results = {}
+    for spec in signals:
+        if spec.name not in series:
+            continue
+        values = np.asarray(series[spec.name], dtype=np.float64)
+        mean, std = rolling_mean_std(values, window)
+        slope = rolling_slope(times, values, window)[..., -1]
+
+        # Sample i + window scored against window [i, i + window)
+        scores = np.abs(values[..., window:] - mean[..., :-1]) / np.maximum(std[..., :-1], spec.min_std)
+        max_anomaly = scores.max(axis=-1) if scores.shape[-1] else np.zeros(values.shape[:-1])
+
+        level = mean[..., -1]
+        out_of_range = np.zeros(level.shape, dtype=bool)
+        if spec.high is not None:
+            out_of_range |= level > spec.high
+        if spec.low is not None:
+            out_of_range |= level < spec.low
+
+        trend = np.zeros(level.shape, dtype=bool)
+        if spec.trend_horizon_h is not None:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                if spec.high is not None:
+                    trend |= (slope > 0) & ((spec.high - level) / slope <= spec.trend_horizon_h)
+                if spec.low is not None:
+                    trend |= (slope < 0) & ((spec.low - level) / slope <= spec.trend_horizon_h)
+            trend &= ~out_of_range
+
+        results[spec.name] = {
+            'mean': level,
+            'std': std[..., -1],
+            'slope_per_hour': slope,
+            'max_anomaly': max_anomaly,
+            'out_of_range': out_of_range,
+            'trend': trend,
+            'anomaly': max_anomaly >= anomaly_threshold,
+        }
+    return results
+
+
+def flagged_rows(results: Dict[str, Dict[str, np.ndarray]]) -> np.ndarray:
+    """Row indices with any finding in analyze_fleet() results"""
+    flags = None
+    for signal in results.values():
+        row_flags = signal['out_of_range'] | signal['trend'] | signal['anomaly']
+        flags = row_flags if flags is None else flags | row_flags
+    return np.array([], dtype=np.intp) if flags is None else np.flatnonzero(flags)
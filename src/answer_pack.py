@@ -0,0 +1,409 @@
+"""
+TinyLLM-Auto: Answer Packs
+Precomputed answers for predictable questions, served from a memory map
+"""
+
+import argparse
+import hashlib
+import json
+import mmap
+import re
+import time
+import zlib
+from array import array
+from bisect import bisect_left
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+
+try:
+    from .intents import DTC_DESCRIPTIONS
+except ImportError:  # src/ on sys.path (tests, demo.py)
+    from intents import DTC_DESCRIPTIONS
+
+
+_MAGIC = b"TLAPAK01"
+_ALIGN = 64
+PACK_VERSION = 1
+
+# Question templates compiled for every code in the DTC table
+DTC_QUESTION_TEMPLATES = [
+    "What causes {code}?",
+    "Is it safe to drive with {code}?",
+    "How do I fix {code}?",
+    "How serious is {code}?",
+]
+
+FEATURE_QUESTIONS = [
+    "How do I connect my phone via Bluetooth?",
+    "How do I pair my phone?",
+    "How do I use adaptive cruise control?",
+    "How do I turn on lane keeping assist?",
+    "How do I reset the tire pressure light?",
+    "How do I reset the oil life indicator?",
+    "How do I set the clock?",
+    "How do I open the fuel door?",
+    "How do I use Apple CarPlay?",
+    "How do I use Android Auto?",
+    "What does the TPMS light mean?",
+    "What does the check engine light mean?",
+    "Why is my check engine light flashing?",
+    "What does the battery warning light mean?",
+    "What does the oil pressure warning light mean?",
+]
+
+_PUNCTUATION = re.compile(r"[^\w\s']+")
+
+
+def normalize_question(text: str) -> str:
+    """Case- and punctuation-insensitive form used as the pack key"""
+    return " ".join(_PUNCTUATION.sub(" ", text.lower()).split())
+
+
+def question_hash(normalized: str) -> int:
+    """64-bit key hash of a normalized question"""
+    return int.from_bytes(hashlib.blake2b(normalized.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def default_catalog() -> List[str]:
+    """DTC follow-up questions for every known code plus common feature how-tos"""
+    questions = [
+        template.format(code=code)
+        for code in DTC_DESCRIPTIONS
+        for template in DTC_QUESTION_TEMPLATES
+    ]
+    return questions + FEATURE_QUESTIONS
+
+
+def read_catalog(path: str) -> List[str]:
+    """Read a question catalog (one question per line, # comments)"""
+    with open(path) as f:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith("#")]
+
+
+def _vehicle_key(vehicle) -> Optional[Dict]:
+    if vehicle is None:
+        return None
+    return {'make': vehicle.make, 'model': vehicle.model, 'year': vehicle.year}
+
+
+@dataclass
+class PackReport:
+    """Summary of an answer pack build"""
+    entries: int = 0
+    skipped: int = 0
+    raw_bytes: int = 0
+    packed_bytes: int = 0
+    elapsed_s: float = 0.0
+
+    @property
+    def compression_ratio(self) -> float:
+        return self.raw_bytes / self.packed_bytes if self.packed_bytes else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.entries} answers ({self.skipped} skipped) in {self.elapsed_s:.1f}s, "
+            f"{self.packed_bytes:,} bytes packed ({self.compression_ratio:.1f}x compression)"
+        )
+
+
+def write_answer_pack(
+    output_path: str,
+    answers: Dict[str, str],
+    vehicle=None,
+    metadata: Optional[Dict] = None,
+    compression_level: int = 9
+) -> PackReport:
+    """
+    Write question -> answer pairs as an answer pack
+
+    Layout: magic, header length, JSON header, then three columns aligned
+    to 64 bytes (sorted uint64 question hashes, uint64 entry offsets,
+    uint32 entry lengths) and the zlib-compressed entries. Each entry holds
+    the normalized question (checked on lookup) and the answer, compressed
+    on its own so a lookup decompresses only that answer.
+
+    Args:
+        output_path: Pack file to write
+        answers: Question -> answer text
+        vehicle: Vehicle context the answers were generated for
+        metadata: Extra header fields (model, build settings)
+        compression_level: zlib level (0-9)
+
+    Returns:
+        PackReport with sizes
+    """
+    report = PackReport()
+    entries = {}
+    for question, answer in answers.items():
+        normalized = normalize_question(question)
+        if not normalized or normalized in entries:
+            report.skipped += 1
+            continue
+        raw = f"{normalized}\0{answer}".encode("utf-8")
+        entries[normalized] = zlib.compress(raw, compression_level)
+        report.raw_bytes += len(raw)
+
+    keyed = sorted((question_hash(normalized), blob) for normalized, blob in entries.items())
+    hashes = array("Q", (key for key, _ in keyed))
+    offsets = array("Q")
+    lengths = array("I")
+    position = 0
+    for _, blob in keyed:
+        offsets.append(position)
+        lengths.append(len(blob))
+        position += len(blob)
+
+    columns = [hashes, offsets, lengths]
+    column_offsets = []
+    column_end = 0
+    for column in columns:
+        column_end = -(-column_end // _ALIGN) * _ALIGN
+        column_offsets.append(column_end)
+        column_end += len(column) * column.itemsize
+    blob_offset = -(-column_end // _ALIGN) * _ALIGN
+
+    header = json.dumps({
+        'version': PACK_VERSION,
+        'entries': len(keyed),
+        'vehicle': _vehicle_key(vehicle),
+        'columns': column_offsets,
+        'blobs': blob_offset,
+        'created': time.time(),
+        **(metadata or {}),
+    }).encode("utf-8")
+    data_start = -(-(len(_MAGIC) + 8 + len(header)) // _ALIGN) * _ALIGN
+
+    with open(output_path, "wb") as f:
+        f.write(_MAGIC)
+        f.write(len(header).to_bytes(8, "little"))
+        f.write(header)
+        for column, offset in zip(columns, column_offsets):
+            f.seek(data_start + offset)
+            f.write(column.tobytes())
+        f.seek(data_start + blob_offset)
+        for _, blob in keyed:
+            f.write(blob)
+        f.truncate(data_start + blob_offset + position)
+
+    report.entries = len(keyed)
+    report.packed_bytes = data_start + blob_offset + position
+    return report
+
+
+def build_answer_pack(
+    assistant,
+    questions: Iterable[str],
+    output_path: str,
+    vehicle_context=None,
+    max_tokens: int = 256,
+    temperature: float = 0.0,
+    compression_level: int = 9,
+    verbose: bool = False
+) -> PackReport:
+    """
+    Answer a question catalog with the model and write an answer pack
+
+    Answers use stateless prompts for one vehicle without its mileage, so
+    they are valid for any conversation with that make/model/year.
+    Service timing questions are skipped because their answers depend on
+    the current mileage.
+
+    Args:
+        assistant: VehicleAssistant used to generate the answers
+        questions: Question catalog
+        output_path: Pack file to write
+        vehicle_context: Vehicle to answer for (None = assistant.vehicle_context)
+        max_tokens: Maximum tokens per answer
+        temperature: Sampling temperature (0.0 for reproducible packs)
+        compression_level: zlib level (0-9)
+        verbose: Print progress
+
+    Returns:
+        PackReport with entry count, sizes and build time
+    """
+    vehicle_context = vehicle_context or assistant.vehicle_context
+    # Answers are served at any mileage, so the prompt must not state one
+    prompt_vehicle = None
+    if vehicle_context is not None:
+        prompt_vehicle = type(vehicle_context)(
+            vehicle_context.make, vehicle_context.model, vehicle_context.year, None
+        )
+    start_time = time.time()
+    answers = {}
+    seen = set()
+    skipped = 0
+    for question in questions:
+        normalized = normalize_question(question)
+        if normalized in seen or (
+            assistant.maintenance and assistant.maintenance.is_schedule_question(question)
+        ):
+            skipped += 1
+            continue
+        seen.add(normalized)
+        answers[question] = assistant.answer_once(
+            question,
+            vehicle_context=prompt_vehicle,
+            max_tokens=max_tokens,
+            temperature=temperature
+        )
+        if verbose:
+            print(f"[{len(answers)}] {question}")
+
+    report = write_answer_pack(
+        output_path,
+        answers,
+        vehicle=vehicle_context,
+        metadata={
+            'model': assistant.model_path,
+            'max_tokens': max_tokens,
+            'temperature': temperature,
+        },
+        compression_level=compression_level
+    )
+    report.skipped += skipped
+    report.elapsed_s = time.time() - start_time
+    return report
+
+
+class AnswerPack:
+    """
+    Read-only answer pack lookup over a memory map.
+    Opening maps the file without reading it; a lookup hashes the
+    question, binary-searches the hash column and decompresses one entry.
+    """
+
+    def __init__(self, path: str):
+        """
+        Open an answer pack
+
+        Args:
+            path: Pack file written by build_answer_pack / write_answer_pack
+        """
+        self.path = path
+        with open(path, "rb") as f:
+            if f.read(len(_MAGIC)) != _MAGIC:
+                raise ValueError(f"Not an answer pack file: {path}")
+            header_len = int.from_bytes(f.read(8), "little")
+            self.header = json.loads(f.read(header_len).decode("utf-8"))
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self.header['version'] != PACK_VERSION:
+            raise ValueError(f"Unsupported answer pack version {self.header['version']}: {path}")
+        data_start = -(-(len(_MAGIC) + 8 + header_len) // _ALIGN) * _ALIGN
+        n = self.header['entries']
+        view = memoryview(self._mmap)
+        hash_at, offset_at, length_at = (data_start + offset for offset in self.header['columns'])
+        self._hashes = view[hash_at:hash_at + 8 * n].cast("Q")
+        self._offsets = view[offset_at:offset_at + 8 * n].cast("Q")
+        self._lengths = view[length_at:length_at + 4 * n].cast("I")
+        self._blobs = data_start + self.header['blobs']
+        view.release()
+
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return self.header['entries']
+
+    def __contains__(self, question: str) -> bool:
+        return self._find(normalize_question(question)) is not None
+
+    @property
+    def vehicle(self) -> Optional[Dict]:
+        """make/model/year the answers were generated for"""
+        return self.header['vehicle']
+
+    def matches(self, vehicle_context) -> bool:
+        """True if the pack's answers were generated for this vehicle"""
+        vehicle = self.vehicle
+        if vehicle is None or vehicle_context is None:
+            return vehicle is None and vehicle_context is None
+        return (
+            vehicle['make'].lower() == vehicle_context.make.lower()
+            and vehicle['model'].lower() == vehicle_context.model.lower()
+            and vehicle['year'] == vehicle_context.year
+        )
+
+    def _find(self, normalized: str) -> Optional[str]:
+        key = question_hash(normalized)
+        i = bisect_left(self._hashes, key)
+        # Hash collisions are resolved by the stored question
+        while i < len(self._hashes) and self._hashes[i] == key:
+            start = self._blobs + self._offsets[i]
+            raw = zlib.decompress(self._mmap[start:start + self._lengths[i]]).decode("utf-8")
+            question, answer = raw.split("\0", 1)
+            if question == normalized:
+                return answer
+            i += 1
+        return None
+
+    def lookup(self, question: str) -> Optional[str]:
+        """
+        Find the precomputed answer to a question
+
+        Args:
+            question: User's question (matched case- and punctuation-insensitively)
+
+        Returns:
+            Answer text, or None if the question is not in the pack
+        """
+        answer = self._find(normalize_question(question))
+        if answer is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return answer
+
+    def report(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+    def close(self):
+        """Release the memory map"""
+        if self._mmap is not None:
+            for view in (self._hashes, self._offsets, self._lengths):
+                view.release()
+            self._mmap.close()
+            self._mmap = None
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="TinyLLM-Auto: compile an offline answer pack for one vehicle"
+    )
+    parser.add_argument("output", help="Answer pack file to write")
+    parser.add_argument("--model", default="models/phi-2-4bit.gguf", help="Path to GGUF model file")
+    parser.add_argument("--make", required=True, help="Vehicle make (e.g. Toyota)")
+    parser.add_argument("--vehicle-model", required=True, help="Vehicle model (e.g. Camry)")
+    parser.add_argument("--year", type=int, required=True, help="Model year")
+    parser.add_argument("--catalog", help="Question catalog file (default: built-in DTC and feature questions)")
+    parser.add_argument("--max-tokens", type=int, default=256, help="Maximum tokens per answer")
+    parser.add_argument("--verbose", action="store_true", help="Print per-question progress")
+    args = parser.parse_args()
+
+    try:
+        from .assistant import VehicleAssistant
+    except ImportError:  # src/ on sys.path (tests, demo.py)
+        from assistant import VehicleAssistant
+
+    assistant = VehicleAssistant(model_path=args.model, context_size=2048)
+    assistant.set_vehicle_context(args.make, args.vehicle_model, args.year, None)
+    questions = read_catalog(args.catalog) if args.catalog else default_catalog()
+
+    report = build_answer_pack(
+        assistant,
+        questions,
+        args.output,
+        max_tokens=args.max_tokens,
+        verbose=args.verbose
+    )
+    print(f"✓ {report}")
+
+
+if __name__ == "__main__":
+    main()
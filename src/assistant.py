@@ -3,11 +3,53 @@ TinyLLM-Auto: Vehicle Assistant
 Main class for automotive conversational AI
 """
 
+import gc
 import json
-from typing import Dict, List, Optional
-from dataclasses import dataclass
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+from dataclasses import asdict, dataclass
 import time
 
+try:
+    from .adapters import AdapterManager
+    from .answer_pack import AnswerPack
+    from .backends import BaseBackend, create_backend
+    from .cancellation import CANCELLED, DEADLINE, Answer, CancellationToken, trim_to_sentence
+    from .gguf import preflight as gguf_preflight
+    from .intents import DTC_LOOKUP, MILEAGE, REPEAT, RESET, IntentMatcher
+    from .maintenance import MaintenanceEngine
+    from .replay import RecordingBackend, ReplayBackend
+    from .summarizer import HistorySummarizer
+    from .tracing import Tracer
+    from .structured import DTCAnswer, build_dtc_grammar, find_dtc, structured_max_tokens
+except ImportError:  # src/ on sys.path (tests, demo.py)
+    from adapters import AdapterManager
+    from answer_pack import AnswerPack
+    from backends import BaseBackend, create_backend
+    from cancellation import CANCELLED, DEADLINE, Answer, CancellationToken, trim_to_sentence
+    from gguf import preflight as gguf_preflight
+    from intents import DTC_LOOKUP, MILEAGE, REPEAT, RESET, IntentMatcher
+    from maintenance import MaintenanceEngine
+    from replay import RecordingBackend, ReplayBackend
+    from summarizer import HistorySummarizer
+    from tracing import Tracer
+    from structured import DTCAnswer, build_dtc_grammar, find_dtc, structured_max_tokens
+
+
+# Generation stops at the next user turn or a run of blank lines
+STOP_SEQUENCES = ["User:", "\n\n\n"]
+
+# Asked of a newly loaded model before it replaces the serving one
+SMOKE_TEST_QUESTION = "What does the check engine light mean?"
+
+# Returned in cached-only mode when no precomputed answer matches
+CACHE_MISS_RESPONSE = (
+    "I don't have an offline answer for that. "
+    "Try rephrasing, or ask again when the full assistant is available."
+)
+
 
 @dataclass
 class VehicleContext:
@@ -15,17 +57,60 @@ class VehicleContext:
     make: str
     model: str
     year: int
-    mileage: int
+    mileage: Optional[int]
     vin: Optional[str] = None
     
     def to_prompt(self) -> str:
-        """Convert vehicle context to prompt string"""
-        return f"""Vehicle Information:
+        """Convert vehicle context to prompt string (mileage None = not stated)"""
+        prompt = f"""Vehicle Information:
 - Make: {self.make}
 - Model: {self.model}
 - Year: {self.year}
-- Current Mileage: {self.mileage:,} miles
 """
+        if self.mileage is not None:
+            prompt += f"- Current Mileage: {self.mileage:,} miles\n"
+        return prompt
+    
+    def to_dict(self) -> Dict:
+        """Convert vehicle context to a JSON-serializable dict"""
+        return asdict(self)
+
+
+class SlottedVehicleContext:
+    """
+    Memory-compact VehicleContext with __slots__ (no per-instance __dict__).
+    Used when many contexts are materialized, e.g. from a FleetRegistry.
+    """
+    __slots__ = ("make", "model", "year", "mileage", "vin")
+    
+    def __init__(
+        self,
+        make: str,
+        model: str,
+        year: int,
+        mileage: int,
+        vin: Optional[str] = None
+    ):
+        self.make = make
+        self.model = model
+        self.year = year
+        self.mileage = mileage
+        self.vin = vin
+    
+    to_prompt = VehicleContext.to_prompt
+    
+    def to_dict(self) -> Dict:
+        """Convert vehicle context to a JSON-serializable dict"""
+        return {name: getattr(self, name) for name in self.__slots__}
+    
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, (SlottedVehicleContext, VehicleContext)):
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+    
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"SlottedVehicleContext({fields})"
 
 
 class VehicleAssistant:
@@ -37,9 +122,19 @@ class VehicleAssistant:
     def __init__(
         self,
         model_path: str,
-        context_size: int = 4096,
+        context_size: int = 2048,
         n_threads: Optional[int] = None,
-        verbose: bool = False
+        verbose: bool = False,
+        backend: Union[str, BaseBackend] = "llama_cpp",
+        memory_governor=None,
+        fallback_model_paths: Optional[List[str]] = None,
+        record_trace: Optional[str] = None,
+        replay_trace: Optional[str] = None,
+        replay_realtime: bool = False,
+        preflight: bool = True,
+        tracer: Optional[Tracer] = None,
+        answer_pack: Optional[Union[str, AnswerPack]] = None,
+        cached_only: bool = False
     ):
         """
         Initialize the Vehicle Assistant
@@ -49,14 +144,62 @@ class VehicleAssistant:
             context_size: Maximum context window size
             n_threads: Number of CPU threads (None = auto-detect)
             verbose: Enable detailed logging
+            backend: Inference backend name ("llama_cpp", "onnx", "stub")
+                or a backend instance
+            memory_governor: Optional MemoryGovernor that picks load settings
+            fallback_model_paths: Smaller variants to use if model_path
+                does not fit the governor's budget
+            record_trace: Record every model call to this trace file
+            replay_trace: Replay calls from this trace file instead of
+                loading the model (no GGUF or llama-cpp-python needed)
+            replay_realtime: Reproduce recorded timings when replaying
+            preflight: Check the GGUF header (format, trained context, RAM)
+                before loading, so unsuitable models fail in milliseconds
+            tracer: Tracer for per-request timelines (None = tracing off)
+            answer_pack: Precomputed answer pack (path or AnswerPack) served
+                before the model for matching questions
+            cached_only: Never load the model; answer only from commands,
+                the maintenance schedule and the answer pack
         """
         self.model_path = model_path
         self.context_size = context_size
+        self.n_threads = n_threads
         self.verbose = verbose
+        self.backend = backend
+        self.memory_governor = memory_governor
+        self.fallback_model_paths = fallback_model_paths or []
+        self.load_plan = None
+        self.record_trace = record_trace
+        self.replay_trace = replay_trace
+        self.replay_realtime = replay_realtime
+        self.preflight = preflight
+        self.model_info = None
+        self.tracer = tracer if tracer is not None else Tracer(sample_rate=0.0)
+        self.answer_pack = AnswerPack(answer_pack) if isinstance(answer_pack, str) else answer_pack
+        self.cached_only = cached_only
+        
+        # User-visible latency of generated answers (see latency_report)
+        self.latency_stats = {
+            'requests': 0,
+            'ttft_s': 0.0,
+            'max_ttft_s': 0.0,
+            'deadline_requests': 0,
+            'deadline_misses': 0,
+            'cancelled': 0,
+        }
         
         # Initialize conversation history
         self.conversation_history: List[Dict[str, str]] = []
         self.vehicle_context: Optional[VehicleContext] = None
+        # Service records for self.vehicle_context (see set_vehicle_context)
+        self.service_history: Dict[str, int] = {}
+        
+        # Raw turns kept in the prompt; older turns are folded into the
+        # running summary when history summarization is enabled
+        self.history_window = 5
+        self.conversation_summary = ""
+        self._summarized_turns = 0
+        self.summarizer: Optional[HistorySummarizer] = None
         
         # System prompt for automotive assistant
         self.system_prompt = """You are an intelligent automotive assistant integrated into a vehicle's infotainment system. Your role is to help drivers understand their vehicle, diagnose issues, and use features effectively.
@@ -78,46 +221,266 @@ When answering about diagnostic codes (e.g., P0420), always include:
 5. Recommended next steps
 """
         
-        # Lazy load the LLM (only when first needed)
-        self._llm = None
+        # Lazy load the LLM backend (only when first needed)
+        self._llm: Optional[BaseBackend] = None
+        # Serializes model access between requests and background work
+        self._llm_lock = threading.RLock()
+        # Runs reload_model() calls one at a time, in call order
+        self._reloader: Optional[ThreadPoolExecutor] = None
+        
+        # Deterministic maintenance schedule (set to None to always use the LLM)
+        self.maintenance: Optional[MaintenanceEngine] = MaintenanceEngine()
+        # Deterministic command fast path (set to None to always use the LLM)
+        self.intents: Optional[IntentMatcher] = IntentMatcher()
+        # Telemetry findings added to the prompt (an analytics.TelemetryAnalyzer)
+        self.analytics = None
+        # LoRA adapters over the base model (see enable_adapters); self.adapter
+        # is this session's choice, None = by vehicle make
+        self.adapters: Optional[AdapterManager] = None
+        self.adapter: Optional[str] = None
+        # Runtime limits (set_compute, or a thermal.ThermalGovernor on hot devices)
+        self.n_batch: Optional[int] = None
+        self.max_tokens_limit: Optional[int] = None
         
         if self.verbose:
             print(f"VehicleAssistant initialized with model: {model_path}")
     
+    def _create_backend(
+        self,
+        model_path: Optional[str] = None,
+        fallback_model_paths: Optional[List[str]] = None,
+        resident_mb: float = 0.0
+    ) -> BaseBackend:
+        """
+        Build the configured backend (without loading it), by default for self.model_path
+        
+        resident_mb is memory that stays in use while it loads (the current
+        model, during a reload); the memory governor plans around it.
+        """
+        if self.replay_trace is not None:
+            return ReplayBackend(self.replay_trace, realtime=self.replay_realtime)
+        
+        if not isinstance(self.backend, str):
+            return self.backend
+        
+        if model_path is None:
+            model_path = self.model_path
+            fallback_model_paths = self.fallback_model_paths
+        requested_path = model_path
+        options = {'n_ctx': self.context_size, 'n_threads': self.n_threads, 'verbose': self.verbose}
+        if self.preflight and self.backend == "llama_cpp":
+            # The governor does its own budget fit, possibly with a smaller context
+            self.model_info = gguf_preflight(
+                requested_path,
+                self.context_size,
+                check_memory=self.memory_governor is None
+            )
+            if self.verbose:
+                print(self.model_info.summary())
+        if self.memory_governor is not None and self.backend == "llama_cpp":
+            plan_kwargs = {}
+            if self.model_info is not None and self.model_info.kv_elements_per_token:
+                plan_kwargs['kv_elements_per_token'] = self.model_info.kv_elements_per_token
+            self.load_plan = self.memory_governor.plan_llm(
+                [requested_path] + (fallback_model_paths or []),
+                self.context_size,
+                exclude="llm",
+                resident_mb=resident_mb,
+                **plan_kwargs
+            )
+            model_path = self.load_plan.model_path
+            options.update(self.load_plan.llama_kwargs())
+        return create_backend(self.backend, model_path, **options)
+    
     def _load_llm(self):
-        """Lazy load the LLM model"""
-        if self._llm is None:
-            try:
-                from llama_cpp import Llama
-                
+        """Lazy load the LLM backend"""
+        with self._llm_lock:
+            if self._llm is None:
                 if self.verbose:
                     print("Loading LLM model...")
                     start_time = time.time()
                 
-                self._llm = Llama(
-                    model_path=self.model_path,
-                    n_ctx=self.context_size,
-                    n_threads=self.n_threads if hasattr(self, 'n_threads') else None,
-                    verbose=self.verbose
-                )
+                backend = self._create_backend()
+                if self.record_trace is not None:
+                    backend = RecordingBackend(backend, self.record_trace)
+                backend.load()
+                if self.n_batch is not None:
+                    backend.set_compute(n_batch=self.n_batch)
+                self._llm = backend
                 
                 if self.verbose:
                     load_time = time.time() - start_time
-                    print(f"Model loaded in {load_time:.2f} seconds")
-                    
-            except ImportError:
-                raise ImportError(
-                    "llama-cpp-python is required. Install with: "
-                    "pip install llama-cpp-python"
-                )
+                    print(f"Model loaded in {load_time:.2f} seconds ({backend.name} backend)")
+    
+    def reload_model(
+        self,
+        model: Union[str, BaseBackend],
+        fallback_model_paths: Optional[List[str]] = None,
+        smoke_test_question: str = SMOKE_TEST_QUESTION,
+        smoke_test_tokens: int = 16
+    ) -> Future:
+        """
+        Replace the model without downtime
+        
+        The new model is loaded and smoke-tested in a background thread
+        while the current one keeps serving, so both are resident for a
+        while. It is then swapped in under the model lock, i.e. after the
+        in-flight generation finishes and before the next one starts, and
+        the old weights are freed. If loading or the smoke test fails, the
+        new model is discarded and the current one keeps serving. With a
+        memory governor the new model is planned with the current one
+        still counted, so a reload that cannot fit fails with MemoryError.
+        
+        Args:
+            model: New GGUF path (built like the current backend), or a
+                backend instance
+            fallback_model_paths: Smaller variants of the new model for
+                the memory governor
+            smoke_test_question: Question the new model must answer
+                (non-empty) before it is swapped in
+            smoke_test_tokens: Token budget of the smoke test
+            
+        Returns:
+            Future resolving to a report dict (load_s, smoke_test_s,
+            swap_wait_s, total_s); it raises the failure if rolled back
+        """
+        if self.replay_trace is not None:
+            raise ValueError("reload_model() is not available when replaying a trace")
+        if isinstance(model, str) and not isinstance(self.backend, str):
+            raise ValueError("This assistant was given a backend instance; reload it with a backend instance")
+        
+        if self._reloader is None:
+            self._reloader = ThreadPoolExecutor(max_workers=1, thread_name_prefix="model-reload")
+        return self._reloader.submit(self._reload, model, fallback_model_paths, smoke_test_question, smoke_test_tokens)
+    
+    def _reload(
+        self,
+        model: Union[str, BaseBackend],
+        fallback_model_paths: Optional[List[str]],
+        smoke_test_question: str,
+        smoke_test_tokens: int
+    ) -> Dict:
+        start_time = time.perf_counter()
+        saved = (self.model_info, self.load_plan)
+        backend = None
+        # Both models are resident until the swap; no plan = nothing budgeted
+        resident_mb = self.load_plan.estimated_mb if self._llm is not None and self.load_plan is not None else 0.0
+        
+        # Load and smoke-test the new model while the current one serves
+        try:
+            if isinstance(model, str):
+                backend = self._create_backend(model, fallback_model_paths, resident_mb)
+            else:
+                backend = model
+            if self.verbose:
+                print(f"Loading replacement model in the background: {model if isinstance(model, str) else backend.name}")
+            backend.load()
+            if self.n_batch is not None:
+                backend.set_compute(n_batch=self.n_batch)
+            load_s = time.perf_counter() - start_time
+            
+            smoke_start = time.perf_counter()
+            prompt = self._build_prompt(smoke_test_question, history=[])
+            completion = backend.complete(prompt, smoke_test_tokens, 0.0, stop=STOP_SEQUENCES)
+            if not completion.text.strip():
+                raise RuntimeError("Smoke test failed: the new model returned an empty answer")
+            smoke_test_s = time.perf_counter() - smoke_start
+        except Exception:
+            self.model_info, self.load_plan = saved
+            if backend is not None and backend is not self._llm and backend.loaded:
+                backend.close()
+            if self.verbose:
+                print("Model reload failed; keeping the current model")
+            raise
+        
+        if self.record_trace is not None:
+            backend = RecordingBackend(backend, self.record_trace)
+        
+        # Request boundary: every generation holds the model lock until it ends
+        wait_start = time.perf_counter()
+        with self._llm_lock:
+            swap_wait_s = time.perf_counter() - wait_start
+            if self.adapters is not None:
+                self.adapters.release()
+            old = self._llm
+            self._llm = backend
+            if isinstance(model, str):
+                self.model_path = model
+                self.fallback_model_paths = fallback_model_paths or []
+            else:
+                self.backend = model
+        
+        if old is not None and old is not backend:
+            old.close()
+            gc.collect()
+        
+        report = {
+            'model': model if isinstance(model, str) else backend.name,
+            'load_s': load_s,
+            'smoke_test_s': smoke_test_s,
+            'swap_wait_s': swap_wait_s,
+            'total_s': time.perf_counter() - start_time,
+        }
+        if self.verbose:
+            print(f"Model swapped in after {report['total_s']:.2f}s (waited {swap_wait_s:.2f}s for in-flight requests)")
+        return report
+    
+    def unload(self):
+        """
+        Release the model weights and KV cache
+        
+        Conversation history and vehicle context are kept; the model is
+        reloaded on the next ask() (quickly, since mmap'd weights stay in
+        the page cache). Waits for the in-flight generation or model swap.
+        """
+        with self._llm_lock:
+            if self._llm is not None:
+                if self.adapters is not None:
+                    self.adapters.release()
+                self._llm.close()
+                self._llm = None
+                gc.collect()
+                
+                if self.verbose:
+                    print("LLM unloaded")
+    
+    def set_compute(self, n_threads: Optional[int] = None, n_batch: Optional[int] = None):
+        """
+        Change CPU threads and prompt batch size without reloading the model
+        
+        Applied between requests (waits for the in-flight generation) and
+        kept for later loads.
+        
+        Args:
+            n_threads: Decode/prefill threads (None = unchanged)
+            n_batch: Prompt tokens evaluated per batch (None = unchanged)
+        """
+        with self._llm_lock:
+            if n_threads is not None:
+                self.n_threads = n_threads
+            if n_batch is not None:
+                self.n_batch = n_batch
+            if self._llm is not None:
+                self._llm.set_compute(n_threads, n_batch)
+    
+    def _token_budget(self, max_tokens: int) -> int:
+        """Requested max_tokens capped by max_tokens_limit (used by every generation path)"""
+        if self.max_tokens_limit is not None:
+            return min(max_tokens, self.max_tokens_limit)
+        return max_tokens
+    
+    def backend_metrics(self) -> Dict[str, float]:
+        """Throughput and latency counters of the loaded backend"""
+        return self._llm.metrics() if self._llm is not None else {}
     
     def set_vehicle_context(
         self,
         make: str,
         model: str,
         year: int,
-        mileage: int,
-        vin: Optional[str] = None
+        mileage: Optional[int],
+        vin: Optional[str] = None,
+        service_history: Optional[Dict[str, int]] = None
     ):
         """
         Set the vehicle context for personalized responses
@@ -126,8 +489,11 @@ When answering about diagnostic codes (e.g., P0420), always include:
             make: Vehicle manufacturer (e.g., "Toyota")
             model: Vehicle model (e.g., "Camry")
             year: Model year
-            mileage: Current mileage in miles
+            mileage: Current mileage in miles (None = not known)
             vin: Vehicle Identification Number (optional)
+            service_history: Mileage each maintenance item was last done
+                (e.g. {"oil change": 12000}); items without a record are
+                assumed to have been done on schedule
         """
         self.vehicle_context = VehicleContext(
             make=make,
@@ -136,30 +502,64 @@ When answering about diagnostic codes (e.g., P0420), always include:
             mileage=mileage,
             vin=vin
         )
+        self.service_history = dict(service_history or {})
         
         if self.verbose:
             print(f"Vehicle context set: {year} {make} {model}")
     
-    def _build_prompt(self, user_message: str) -> str:
+    def _build_prompt(
+        self,
+        user_message: str,
+        vehicle_context: Optional[VehicleContext] = None,
+        history: Optional[List[Dict[str, str]]] = None
+    ) -> str:
         """
         Build the full prompt including system prompt, vehicle context, and history
         
         Args:
             user_message: The user's current question
+            vehicle_context: Context to use instead of self.vehicle_context
+            history: Turns to use instead of self.conversation_history
+                ([] for a stateless prompt)
             
         Returns:
             Complete prompt string
         """
+        if vehicle_context is None:
+            vehicle_context = self.vehicle_context
+        if history is None:
+            history = self.conversation_history
+        
         prompt_parts = [self.system_prompt]
         
         # Add vehicle context if available
-        if self.vehicle_context:
-            prompt_parts.append(self.vehicle_context.to_prompt())
+        if vehicle_context:
+            prompt_parts.append(vehicle_context.to_prompt())
+            
+            # Ground maintenance questions in the computed schedule
+            if (
+                self.maintenance
+                and vehicle_context.mileage is not None
+                and self.maintenance.is_maintenance_question(user_message)
+            ):
+                prompt_parts.append(
+                    self.maintenance.summary(vehicle_context, self._service_history(vehicle_context))
+                )
+        
+        # Ground answers in what the vehicle's sensors currently show
+        if self.analytics is not None:
+            findings = self.analytics.summary()
+            if findings:
+                prompt_parts.append(findings)
+        
+        # Older turns are represented by the running summary
+        if self.conversation_summary and history is self.conversation_history:
+            prompt_parts.append(f"Summary of earlier conversation: {self.conversation_summary}")
         
         # Add conversation history (last 5 turns for context window management)
-        if self.conversation_history:
+        if history:
             prompt_parts.append("Previous conversation:")
-            for turn in self.conversation_history[-5:]:
+            for turn in history[-self.history_window:]:
                 prompt_parts.append(f"User: {turn['user']}")
                 prompt_parts.append(f"Assistant: {turn['assistant']}")
         
@@ -174,8 +574,12 @@ When answering about diagnostic codes (e.g., P0420), always include:
         question: str,
         max_tokens: int = 256,
         temperature: float = 0.7,
-        stream: bool = False
-    ) -> str:
+        stream: bool = False,
+        structured: bool = False,
+        timeout_s: Optional[float] = None,
+        cancel_token: Optional[CancellationToken] = None,
+        adapter: Optional[str] = None
+    ) -> Union[Answer, DTCAnswer, Iterator[str]]:
         """
         Ask the assistant a question
         
@@ -183,16 +587,154 @@ When answering about diagnostic codes (e.g., P0420), always include:
             question: User's question
             max_tokens: Maximum tokens to generate
             temperature: Sampling temperature (0.0-1.0)
-            stream: Whether to stream the response
+            stream: Return an iterator of text pieces as they are decoded
+            structured: Return a DTCAnswer for diagnostic code questions
+            timeout_s: Time budget for the answer; generation stops at the
+                first token boundary past it
+            cancel_token: Token whose cancel() stops generation at the next
+                token boundary
+            adapter: LoRA adapter for this request (None = self.adapter,
+                else by vehicle make; see enable_adapters)
             
         Returns:
-            Assistant's response as a string
+            Assistant's response as an Answer (a str with .partial and
+            .stop_reason; partial answers end at a sentence boundary), a
+            DTCAnswer when structured=True and the question mentions a
+            diagnostic code, or an iterator of text pieces when stream=True
         """
+        budget = CancellationToken(timeout_s=timeout_s, parent=cancel_token)
+        with self.tracer.trace("ask", question_chars=len(question)):
+            # Commands (reset, repeat, mileage, known codes) skip the LLM entirely
+            with self.tracer.span("command_match"):
+                command_response = self.answer_command(question, structured)
+            if command_response is not None:
+                return iter([command_response]) if stream else Answer(command_response)
+            
+            response = self._answer(question, max_tokens, temperature, stream, structured, budget, adapter)
+            if isinstance(response, str) and not isinstance(response, Answer):
+                response = Answer(response)
+            return response
+    
+    def _answer(
+        self,
+        question: str,
+        max_tokens: int = 256,
+        temperature: float = 0.7,
+        stream: bool = False,
+        structured: bool = False,
+        cancel_token: Optional[CancellationToken] = None,
+        adapter: Optional[str] = None
+    ) -> Union[str, DTCAnswer, Iterator[str]]:
+        """ask() after the command fast path: schedule table, answer pack, then the LLM"""
+        direct_answer = self.answer_offline(question, structured)
+        if direct_answer is not None:
+            return iter([direct_answer]) if stream else direct_answer
+        
+        return self._answer_llm(question, max_tokens, temperature, stream, structured, cancel_token, adapter)
+    
+    def answer_offline(self, question: str, structured: bool = False) -> Optional[str]:
+        """
+        Answer from the maintenance schedule or the answer pack, without the model
+        
+        Args:
+            question: User's question
+            structured: Caller wants a DTCAnswer (code questions skip the pack)
+            
+        Returns:
+            Response text (recorded in the history), or None if the
+            question needs the LLM
+        """
+        # Schedule questions are answered from the rule table without the LLM
+        with self.tracer.span("schedule_lookup"):
+            direct_answer = self._answer_from_schedule(question)
+        if direct_answer is None:
+            with self.tracer.span("answer_pack"):
+                direct_answer = self._answer_from_pack(question, structured)
+        if direct_answer is not None:
+            self.conversation_history.append({
+                'user': question,
+                'assistant': direct_answer
+            })
+        return direct_answer
+    
+    def _answer_from_pack(self, question: str, structured: bool = False) -> Optional[str]:
+        """Precomputed answer for this vehicle, else None"""
+        pack = self.answer_pack
+        if pack is None or not pack.matches(self.vehicle_context):
+            return None
+        if structured and find_dtc(question):
+            return None
+        
+        answer = pack.lookup(question)
+        if answer is not None and self.verbose:
+            print(f"Answered from answer pack: {answer}")
+        return answer
+    
+    def _answer_llm(
+        self,
+        question: str,
+        max_tokens: int = 256,
+        temperature: float = 0.7,
+        stream: bool = False,
+        structured: bool = False,
+        cancel_token: Optional[CancellationToken] = None,
+        adapter: Optional[str] = None
+    ) -> Union[str, DTCAnswer, Iterator[str]]:
+        """Answer with the model (or the cache-miss message in cached-only mode)"""
+        max_tokens = self._token_budget(max_tokens)
+        if self.cached_only:
+            if self.verbose:
+                print("No offline answer (cached-only mode)")
+            return iter([CACHE_MISS_RESPONSE]) if stream else CACHE_MISS_RESPONSE
+        
+        if stream and not (structured and find_dtc(question)):
+            return self._ask_stream(question, max_tokens, temperature, cancel_token, adapter)
+        
+        with self._request_scope():
+            return self._ask_llm(question, max_tokens, temperature, structured, cancel_token, adapter)
+    
+    @contextmanager
+    def _request_scope(self):
+        """Preempt background summarization and hold the model for a request"""
+        if self.summarizer is not None:
+            self.summarizer.request_started()
+        try:
+            with self.tracer.span("wait_for_model"):
+                self._llm_lock.acquire()
+            try:
+                yield
+            finally:
+                self._llm_lock.release()
+        finally:
+            if self.summarizer is not None:
+                self.summarizer.request_finished()
+    
+    def _ask_llm(
+        self,
+        question: str,
+        max_tokens: int,
+        temperature: float,
+        structured: bool,
+        cancel_token: Optional[CancellationToken] = None,
+        adapter: Optional[str] = None
+    ) -> Union[Answer, DTCAnswer]:
+        """Answer a question with the model and record the turn"""
         # Lazy load LLM if not already loaded
-        self._load_llm()
+        with self.tracer.span("load_model"):
+            self._load_llm()
+        self._use_adapter(adapter)
+        
+        if structured:
+            code = find_dtc(question)
+            if code:
+                answer = self._ask_structured(question, code, max_tokens, temperature, cancel_token)
+                if answer is not None:
+                    return answer
+                # Cut short or not parseable: answer in free text instead
         
         # Build the full prompt
-        prompt = self._build_prompt(question)
+        with self.tracer.span("build_prompt"):
+            prompt = self._build_prompt(question)
         
         if self.verbose:
             print(f"\n{'='*60}")
@@ -201,29 +743,19 @@ When answering about diagnostic codes (e.g., P0420), always include:
             start_time = time.time()
         
         # Generate response
-        response = self._llm(
-            prompt,
-            max_tokens=max_tokens,
-            temperature=temperature,
-            stop=["User:", "\n\n\n"],
-            echo=False
-        )
+        response_text, tokens_generated = self._generate(prompt, max_tokens, temperature, cancel_token)
         
-        # Extract the text
-        response_text = response['choices'][0]['text'].strip()
-        
-        # Update conversation history
-        self.conversation_history.append({
-            'user': question,
-            'assistant': response_text
-        })
+        # Update conversation history (answers cut to nothing are not a turn)
+        if response_text or not response_text.partial:
+            self._record_turn(question, response_text, response_text.partial)
         
         if self.verbose:
             inference_time = time.time() - start_time
-            tokens_generated = response['usage']['completion_tokens']
             tokens_per_sec = tokens_generated / inference_time
             
             print(f"Assistant: {response_text}")
+            if response_text.partial:
+                print(f"(partial answer: {response_text.stop_reason})")
             print(f"\nMetrics:")
             print(f"  Inference time: {inference_time:.2f}s")
             print(f"  Tokens generated: {tokens_generated}")
@@ -232,9 +764,400 @@ When answering about diagnostic codes (e.g., P0420), always include:
         
         return response_text
     
+    def _ask_stream(
+        self,
+        question: str,
+        max_tokens: int,
+        temperature: float,
+        cancel_token: Optional[CancellationToken] = None,
+        adapter: Optional[str] = None
+    ) -> Iterator[str]:
+        """
+        Stream an answer; the turn is recorded once the stream ends
+        
+        A cancelled or timed-out stream simply ends; text already yielded
+        cannot be trimmed, so the turn records it as is, flagged partial.
+        """
+        # Runs when the caller starts iterating, so it gets its own trace
+        with self.tracer.trace("ask_stream", question_chars=len(question)), self._request_scope():
+            with self.tracer.span("load_model"):
+                self._load_llm()
+            self._use_adapter(adapter)
+            with self.tracer.span("build_prompt"):
+                prompt = self._build_prompt(question)
+            pieces = []
+            ttft_s = None
+            stop_reason = cancel_token.stop_reason() if cancel_token is not None else None
+            if stop_reason is None:
+                stream = self._llm.stream(prompt, max_tokens, temperature, stop=STOP_SEQUENCES)
+                traced = self.tracer.traced_stream(stream)
+                try:
+                    for piece in traced:
+                        if ttft_s is None and cancel_token is not None:
+                            ttft_s = time.monotonic() - cancel_token.started_at
+                        # Leading whitespace is stripped like the non-streamed answer
+                        if not pieces:
+                            piece = piece.lstrip()
+                            if not piece:
+                                continue
+                        pieces.append(piece)
+                        yield piece
+                        if cancel_token is not None:
+                            stop_reason = cancel_token.stop_reason()
+                            if stop_reason is not None:
+                                break
+                finally:
+                    traced.close()
+                    stream.close()
+            
+            if cancel_token is not None:
+                self._record_latency(cancel_token, ttft_s, stop_reason)
+            if pieces:
+                self._record_turn(question, "".join(pieces).strip(), stop_reason is not None)
+    
+    def answer_command(self, question: str, structured: bool = False) -> Optional[str]:
+        """
+        Handle a high-frequency command without the LLM
+        
+        Args:
+            question: User's utterance
+            structured: Caller wants a DTCAnswer (code lookups go to the LLM)
+            
+        Returns:
+            Response text, or None if the utterance needs the LLM
+        """
+        if self.intents is None:
+            return None
+        
+        match = self.intents.match(question)
+        response = self._handle_intent(match, question, structured) if match else None
+        self.intents.record(match.intent if response is not None else None)
+        
+        if response is not None and self.verbose:
+            print(f"Handled as {match.intent} command: {response}")
+        return response
+    
+    def _handle_intent(self, match, question: str, structured: bool) -> Optional[str]:
+        if match.intent == RESET:
+            self.reset_conversation()
+            return "Conversation cleared."
+        
+        if match.intent == REPEAT:
+            if not self.conversation_history:
+                return "I haven't said anything yet."
+            return self.conversation_history[-1]['assistant']
+        
+        if match.intent == MILEAGE:
+            context = self.vehicle_context
+            # No recorded mileage: let the LLM answer
+            if context is None or context.mileage is None:
+                return None
+            return f"Your {context.year} {context.make} {context.model} has {context.mileage:,} miles."
+        
+        if match.intent == DTC_LOOKUP and not structured:
+            code = match.slots['code']
+            response = (
+                f"{code}: {self.intents.dtc_descriptions[code]}. "
+                f"Ask me about likely causes or whether it's safe to drive."
+            )
+            # Recorded so follow-up questions have the code in context
+            self.conversation_history.append({'user': question, 'assistant': response})
+            return response
+        return None
+    
+    def _answer_from_schedule(
+        self,
+        question: str,
+        vehicle_context: Optional[VehicleContext] = None
+    ) -> Optional[str]:
+        """Answer from the maintenance engine if it is confident, else None"""
+        vehicle_context = vehicle_context or self.vehicle_context
+        if self.maintenance is None or vehicle_context is None or vehicle_context.mileage is None:
+            return None
+        
+        answer = self.maintenance.answer(question, vehicle_context, self._service_history(vehicle_context))
+        if answer is not None and self.verbose:
+            print(f"Answered from maintenance schedule: {answer}")
+        return answer
+    
+    def _service_history(self, vehicle_context) -> Optional[Dict[str, int]]:
+        """Service records, which belong to self.vehicle_context only"""
+        return self.service_history if vehicle_context is self.vehicle_context else None
+    
+    def _generate(
+        self,
+        prompt: str,
+        max_tokens: int,
+        temperature: float,
+        cancel_token: Optional[CancellationToken] = None
+    ) -> Tuple[Answer, int]:
+        """
+        Run a free-text completion
+        
+        The cancellation token is checked before prefill and between
+        decoded tokens; a stopped answer is trimmed to its last complete
+        sentence and flagged partial.
+        
+        Returns:
+            Tuple of (response_text, completion_tokens)
+        """
+        pieces = []
+        ttft_s = None
+        with self._llm_lock, self.tracer.span("generate", max_tokens=max_tokens):
+            stop_reason = cancel_token.stop_reason() if cancel_token is not None else None
+            if stop_reason is None:
+                stream = self._llm.stream(prompt, max_tokens, temperature, stop=STOP_SEQUENCES)
+                traced = self.tracer.traced_stream(stream)
+                try:
+                    for piece in traced:
+                        pieces.append(piece)
+                        if cancel_token is None:
+                            continue
+                        if ttft_s is None:
+                            ttft_s = time.monotonic() - cancel_token.started_at
+                        stop_reason = cancel_token.stop_reason()
+                        if stop_reason is not None:
+                            break
+                finally:
+                    traced.close()
+                    stream.close()
+            if cancel_token is not None:
+                self._record_latency(cancel_token, ttft_s, stop_reason)
+        
+        text = "".join(pieces).strip()
+        if stop_reason is None:
+            return Answer(text, completion_tokens=len(pieces)), len(pieces)
+        answer = Answer(trim_to_sentence(text), partial=True, stop_reason=stop_reason, completion_tokens=len(pieces))
+        return answer, len(pieces)
+    
+    def _record_turn(self, question: str, response: str, partial: bool = False):
+        """Append a turn to the history, flagging answers that were cut short"""
+        turn = {'user': question, 'assistant': str(response)}
+        if partial:
+            turn['partial'] = True
+        self.conversation_history.append(turn)
+    
+    def _record_latency(
+        self,
+        cancel_token: CancellationToken,
+        ttft_s: Optional[float],
+        stop_reason: Optional[str]
+    ):
+        stats = self.latency_stats
+        stats['requests'] += 1
+        if ttft_s is not None:
+            stats['ttft_s'] += ttft_s
+            stats['max_ttft_s'] = max(stats['max_ttft_s'], ttft_s)
+        if cancel_token.has_deadline:
+            stats['deadline_requests'] += 1
+        if stop_reason == DEADLINE:
+            stats['deadline_misses'] += 1
+        elif stop_reason == CANCELLED:
+            stats['cancelled'] += 1
+        
+        if stop_reason is not None and self.verbose:
+            print(f"Generation stopped early ({stop_reason})")
+    
+    def latency_report(self) -> Dict[str, float]:
+        """
+        Time to first token and deadline statistics of generated answers
+        
+        TTFT is measured from the ask() call, so it includes waiting for
+        the model, loading it and prefill.
+        """
+        stats = self.latency_stats
+        requests = stats['requests']
+        deadline_requests = stats['deadline_requests']
+        return {
+            'requests': requests,
+            'mean_ttft_s': stats['ttft_s'] / requests if requests else 0.0,
+            'max_ttft_s': stats['max_ttft_s'],
+            'deadline_requests': deadline_requests,
+            'deadline_misses': stats['deadline_misses'],
+            'deadline_miss_rate': stats['deadline_misses'] / deadline_requests if deadline_requests else 0.0,
+            'cancelled': stats['cancelled'],
+        }
+    
+    def answer_once(
+        self,
+        question: str,
+        vehicle_context: Optional[VehicleContext] = None,
+        max_tokens: int = 256,
+        temperature: float = 0.7,
+        adapter: Optional[str] = None
+    ) -> Answer:
+        """
+        Answer a question with a stateless prompt
+        
+        Conversation history is neither used nor updated, so answers do not
+        depend on call order (used for batch jobs and answer packs).
+        
+        Args:
+            question: User's question
+            vehicle_context: Vehicle to answer for (None = self.vehicle_context)
+            max_tokens: Maximum tokens to generate
+            temperature: Sampling temperature (0.0-1.0)
+            adapter: LoRA adapter (None = by the vehicle's make)
+            
+        Returns:
+            Assistant's response (an Answer string with completion_tokens;
+            0 for schedule answers, which skip the model)
+        """
+        direct_answer = self._answer_from_schedule(question, vehicle_context)
+        if direct_answer is not None:
+            return Answer(direct_answer)
+        
+        max_tokens = self._token_budget(max_tokens)
+        with self._request_scope():
+            self._load_llm()
+            self._use_adapter(adapter, vehicle_context)
+            prompt = self._build_prompt(question, vehicle_context=vehicle_context, history=[])
+            return self._generate(prompt, max_tokens, temperature)[0]
+    
+    def _ask_structured(
+        self,
+        question: str,
+        code: str,
+        max_tokens: int,
+        temperature: float,
+        cancel_token: Optional[CancellationToken] = None
+    ) -> Optional[DTCAnswer]:
+        """
+        Answer a diagnostic code question with grammar-constrained JSON
+        
+        Generation ends as soon as the JSON object is closed, and every
+        free-text field is capped, so no free-form parsing is needed.
+        
+        Args:
+            question: User's question
+            code: Diagnostic code found in the question
+            max_tokens: Token budget; bounds the grammar's worst case
+            temperature: Sampling temperature
+            cancel_token: Checked before prefill and between tokens
+            
+        Returns:
+            Parsed DTCAnswer, or None if generation was stopped or the
+            JSON was not closed (the caller answers in free text)
+        """
+        if cancel_token is not None and cancel_token.stop_reason() is not None:
+            return None
+        
+        with self.tracer.span("build_prompt"):
+            prompt = self._build_prompt(question)
+        
+        if self.verbose:
+            print(f"Structured DTC answer for {code}")
+            start_time = time.time()
+        
+        pieces = []
+        with self.tracer.span("generate", structured=True):
+            stream = self._llm.stream(
+                prompt,
+                self._token_budget(structured_max_tokens(max_tokens)),
+                temperature,
+                grammar=build_dtc_grammar()
+            )
+            traced = self.tracer.traced_stream(stream)
+            try:
+                for piece in traced:
+                    pieces.append(piece)
+                    if cancel_token is not None and cancel_token.stop_reason() is not None:
+                        return None
+            finally:
+                traced.close()
+                stream.close()
+        
+        try:
+            answer = DTCAnswer.from_json(code, "".join(pieces))
+        except ValueError as e:
+            if self.verbose:
+                print(f"Structured answer incomplete ({e}); answering in free text")
+            return None
+        
+        self.conversation_history.append({
+            'user': question,
+            'assistant': answer.to_text()
+        })
+        
+        if self.verbose:
+            inference_time = time.time() - start_time
+            tokens_generated = len(pieces)
+            print(f"Assistant: {answer.to_text()}")
+            print(f"  Inference time: {inference_time:.2f}s ({tokens_generated} tokens)")
+        
+        return answer
+    
+    def enable_adapters(
+        self,
+        adapters: Dict[str, str],
+        max_loaded: int = 4,
+        scale: float = 1.0
+    ):
+        """
+        Serve brand fine-tunes as LoRA adapters over the shared base model
+        
+        The base weights are loaded once; each request switches to its
+        adapter (ask(adapter=...), else self.adapter, else the one named
+        after the vehicle's make) without reloading them.
+        
+        Args:
+            adapters: Adapter name (e.g. "toyota") -> LoRA GGUF path
+            max_loaded: Adapters kept loaded at once (least recently used
+                are freed first)
+            scale: LoRA scale
+        """
+        with self._llm_lock:
+            if self.adapters is not None:
+                self.adapters.release()
+            self.adapters = AdapterManager(adapters, max_loaded=max_loaded, scale=scale, verbose=self.verbose)
+    
+    def _adapter_name(self, adapter: Optional[str] = None, vehicle_context: Optional[VehicleContext] = None) -> Optional[str]:
+        """Adapter a request would use (None when adapters are not enabled)"""
+        if self.adapters is None:
+            return None
+        return self.adapters.resolve(adapter or self.adapter, vehicle_context or self.vehicle_context)
+    
+    def _use_adapter(self, adapter: Optional[str] = None, vehicle_context: Optional[VehicleContext] = None):
+        """Switch the loaded model to the request's adapter (caller holds _llm_lock)"""
+        name = self._adapter_name(adapter, vehicle_context)
+        if name is not None:
+            with self.tracer.span("adapter", adapter=name):
+                self.adapters.activate(self._llm, name)
+    
+    def enable_history_summarization(
+        self,
+        idle_delay_s: float = 2.0,
+        max_summary_words: int = 80
+    ):
+        """
+        Fold turns that age out of the prompt window into a running summary
+        
+        Summarization runs in a background thread only while no request is
+        in flight, and is preempted at the next token when one arrives.
+        
+        Args:
+            idle_delay_s: Quiet time after a request before summarizing
+            max_summary_words: Bound on the summary length
+        """
+        if self.summarizer is None:
+            self.summarizer = HistorySummarizer(
+                self,
+                idle_delay_s=idle_delay_s,
+                max_summary_words=max_summary_words
+            )
+        self.summarizer.start()
+    
+    def disable_history_summarization(self):
+        """Stop the background summarizer (the current summary is kept)"""
+        if self.summarizer is not None:
+            self.summarizer.stop()
+            self.summarizer = None
+    
     def reset_conversation(self):
         """Clear conversation history"""
         self.conversation_history = []
+        self.conversation_summary = ""
+        self._summarized_turns = 0
         if self.verbose:
             print("Conversation history cleared")
     
@@ -250,8 +1173,11 @@ When answering about diagnostic codes (e.g., P0420), always include:
             filepath: Path to save the conversation
         """
         conversation_data = {
-            'vehicle_context': self.vehicle_context.__dict__ if self.vehicle_context else None,
-            'conversation': self.conversation_history
+            'vehicle_context': self.vehicle_context.to_dict() if self.vehicle_context else None,
+            'service_history': self.service_history,
+            'conversation': self.conversation_history,
+            'summary': self.conversation_summary,
+            'summarized_turns': self._summarized_turns
         }
         
         with open(filepath, 'w') as f:
@@ -274,9 +1200,12 @@ When answering about diagnostic codes (e.g., P0420), always include:
         if conversation_data['vehicle_context']:
             ctx = conversation_data['vehicle_context']
             self.vehicle_context = VehicleContext(**ctx)
+        self.service_history = conversation_data.get('service_history', {})
         
         # Restore conversation history
         self.conversation_history = conversation_data['conversation']
+        self.conversation_summary = conversation_data.get('summary', "")
+        self._summarized_turns = conversation_data.get('summarized_turns', 0)
         
         if self.verbose:
             print(f"Conversation loaded from {filepath}")
@@ -288,7 +1217,7 @@ if __name__ == "__main__":
     # Initialize assistant
     assistant = VehicleAssistant(
         model_path="models/phi-2-4bit.gguf",
-        context_size=4096,
+        context_size=2048,
         verbose=True
     )
     
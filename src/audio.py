@@ -0,0 +1,237 @@
+"""
+TinyLLM-Auto: Audio Preprocessing
+NumPy cleanup of voice input before Whisper (trim, resample, gate)
+"""
+
+import wave
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import numpy as np
+
+# Whisper's native input format
+TARGET_SAMPLE_RATE = 16000
+
+_PCM_DTYPES = {1: np.uint8, 2: np.int16, 4: np.int32}
+
+
+@dataclass
+class PreprocessResult:
+    """Cleaned audio and what preprocessing removed"""
+    audio: np.ndarray
+    sample_rate: int
+    original_s: float
+    trimmed_s: float
+    gated_s: float = 0.0
+
+    @property
+    def duration_s(self) -> float:
+        return len(self.audio) / self.sample_rate
+
+    @property
+    def is_silent(self) -> bool:
+        return len(self.audio) == 0
+
+
+def load_wav(path: str) -> Tuple[np.ndarray, int]:
+    """
+    Read a PCM WAV file as float32 samples in [-1, 1]
+
+    Other formats are read with soundfile when it is installed.
+
+    Returns:
+        Tuple of (samples with shape (n,) or (n, channels), sample_rate)
+    """
+    try:
+        with wave.open(path, 'rb') as wf:
+            width = wf.getsampwidth()
+            channels = wf.getnchannels()
+            sample_rate = wf.getframerate()
+            frames = wf.readframes(wf.getnframes())
+    except wave.Error:
+        try:
+            import soundfile as sf
+        except ImportError:
+            raise ImportError(
+                "soundfile is required for non-PCM audio. Install with: "
+                "pip install soundfile"
+            )
+        audio, sample_rate = sf.read(path, dtype='float32')
+        return audio, sample_rate
+
+    if width not in _PCM_DTYPES:
+        raise ValueError(f"Unsupported WAV sample width: {width} bytes")
+    audio = np.frombuffer(frames, dtype=_PCM_DTYPES[width]).astype(np.float32)
+    if width == 1:
+        # 8-bit WAV is unsigned
+        audio = (audio - 128.0) / 128.0
+    else:
+        audio /= float(2 ** (8 * width - 1))
+    if channels > 1:
+        audio = audio.reshape(-1, channels)
+    return audio, sample_rate
+
+
+def to_mono(audio: np.ndarray) -> np.ndarray:
+    return audio.mean(axis=1, dtype=np.float32) if audio.ndim == 2 else audio
+
+
+def remove_dc(audio: np.ndarray) -> np.ndarray:
+    return audio - np.float32(audio.mean(dtype=np.float64)) if len(audio) else audio
+
+
+def normalize(audio: np.ndarray, peak: float = 0.95) -> np.ndarray:
+    current = np.abs(audio).max() if len(audio) else 0.0
+    return audio * (peak / current) if current > 0 else audio
+
+
+def frame_rms_db(audio: np.ndarray, frame_len: int) -> np.ndarray:
+    """Per-frame RMS level in dBFS (last partial frame zero-padded)"""
+    n_frames = -(-len(audio) // frame_len)
+    padded = np.zeros(n_frames * frame_len, dtype=np.float32)
+    padded[:len(audio)] = audio
+    frames = padded.reshape(n_frames, frame_len)
+    rms = np.sqrt(np.einsum('ij,ij->i', frames, frames) / frame_len)
+    return 20 * np.log10(np.maximum(rms, 1e-10))
+
+
+def trim_silence(
+    audio: np.ndarray,
+    sample_rate: int,
+    threshold_db: float = -40.0,
+    frame_ms: float = 20.0,
+    pad_ms: float = 150.0
+) -> Tuple[np.ndarray, int]:
+    """
+    Remove leading and trailing frames quieter than threshold_db
+
+    Args:
+        audio: Mono samples
+        sample_rate: Sample rate of audio
+        threshold_db: Frame RMS (dBFS) below which a frame is silence
+        frame_ms: Analysis frame length
+        pad_ms: Audio kept on each side of the speech
+
+    Returns:
+        Tuple of (trimmed audio, number of samples removed)
+    """
+    if len(audio) == 0:
+        return audio, 0
+    frame_len = max(1, int(sample_rate * frame_ms / 1000))
+    voiced = np.flatnonzero(frame_rms_db(audio, frame_len) >= threshold_db)
+    if len(voiced) == 0:
+        return audio[:0], len(audio)
+
+    pad = int(sample_rate * pad_ms / 1000)
+    start = max(0, voiced[0] * frame_len - pad)
+    end = min(len(audio), (voiced[-1] + 1) * frame_len + pad)
+    return audio[start:end], len(audio) - (end - start)
+
+
+def _lowpass(audio: np.ndarray, cutoff: float, taps: int = 63) -> np.ndarray:
+    """Windowed-sinc FIR low-pass; cutoff is a fraction of the sample rate"""
+    n = np.arange(taps) - (taps - 1) / 2
+    kernel = np.sinc(2 * cutoff * n) * np.hamming(taps)
+    kernel /= kernel.sum()
+    return np.convolve(audio, kernel.astype(np.float32), mode='same')
+
+
+def resample(audio: np.ndarray, orig_sr: int, target_sr: int = TARGET_SAMPLE_RATE) -> np.ndarray:
+    """Resample by linear interpolation, low-passing first when downsampling"""
+    if orig_sr == target_sr or len(audio) == 0:
+        return audio.astype(np.float32, copy=False)
+    if target_sr < orig_sr:
+        audio = _lowpass(audio, 0.5 * target_sr / orig_sr)
+    n_out = int(round(len(audio) * target_sr / orig_sr))
+    positions = np.arange(n_out) * (orig_sr / target_sr)
+    return np.interp(positions, np.arange(len(audio)), audio).astype(np.float32)
+
+
+def noise_gate(
+    audio: np.ndarray,
+    sample_rate: int,
+    threshold_db: float = -50.0,
+    frame_ms: float = 20.0
+) -> Tuple[np.ndarray, int]:
+    """
+    Silence frames below threshold_db (steady cabin noise between words)
+
+    Returns:
+        Tuple of (gated audio, number of samples silenced)
+    """
+    if len(audio) == 0:
+        return audio, 0
+    frame_len = max(1, int(sample_rate * frame_ms / 1000))
+    quiet = frame_rms_db(audio, frame_len) < threshold_db
+    mask = np.repeat(~quiet, frame_len)[:len(audio)]
+    return audio * mask, int(len(audio) - np.count_nonzero(mask))
+
+
+class AudioPreprocessor:
+    """
+    Voice input cleanup before speech-to-text.
+    Audio stays in NumPy arrays from file read to the Whisper call.
+    """
+
+    def __init__(
+        self,
+        target_sample_rate: int = TARGET_SAMPLE_RATE,
+        trim_threshold_db: float = -40.0,
+        pad_ms: float = 150.0,
+        noise_gate_db: Optional[float] = None,
+        normalize_peak: float = 0.95
+    ):
+        """
+        Initialize the preprocessor
+
+        Args:
+            target_sample_rate: Output sample rate (16 kHz for Whisper)
+            trim_threshold_db: Input level (dBFS) treated as silence
+            pad_ms: Audio kept around detected speech
+            noise_gate_db: Gate frames below this level (None = no gate)
+            normalize_peak: Peak amplitude after normalization
+        """
+        self.target_sample_rate = target_sample_rate
+        self.trim_threshold_db = trim_threshold_db
+        self.pad_ms = pad_ms
+        self.noise_gate_db = noise_gate_db
+        self.normalize_peak = normalize_peak
+
+    def process(self, audio: np.ndarray, sample_rate: int) -> PreprocessResult:
+        """
+        Clean a buffer of samples
+
+        Args:
+            audio: Samples with shape (n,) or (n, channels)
+            sample_rate: Sample rate of audio
+
+        Returns:
+            PreprocessResult with 16 kHz mono float32 audio
+        """
+        audio = to_mono(np.asarray(audio, dtype=np.float32))
+        original_s = len(audio) / sample_rate
+
+        # Trim on the raw level (normalizing first would amplify a noise-only
+        # recording into "speech"), and before resampling so the filter only
+        # runs on what Whisper will hear
+        audio, removed = trim_silence(
+            remove_dc(audio), sample_rate, self.trim_threshold_db, pad_ms=self.pad_ms
+        )
+        audio = resample(normalize(audio, self.normalize_peak), sample_rate, self.target_sample_rate)
+
+        gated = 0
+        if self.noise_gate_db is not None:
+            audio, gated = noise_gate(audio, self.target_sample_rate, self.noise_gate_db)
+
+        return PreprocessResult(
+            audio=audio,
+            sample_rate=self.target_sample_rate,
+            original_s=original_s,
+            trimmed_s=removed / sample_rate,
+            gated_s=gated / self.target_sample_rate,
+        )
+
+    def process_file(self, path: str) -> PreprocessResult:
+        """Load and clean an audio file"""
+        audio, sample_rate = load_wav(path)
+        return self.process(audio, sample_rate)
@@ -0,0 +1,567 @@
+"""
+TinyLLM-Auto: Inference Backends
+Pluggable inference engines behind one streaming interface
+"""
+
+import hashlib
+import re
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional, Protocol, Tuple, Union
+
+
+@dataclass
+class Completion:
+    """Result of a non-streamed completion"""
+    text: str
+    completion_tokens: int
+    finish_reason: str
+    ttft_s: float
+    elapsed_s: float
+
+
+class InferenceBackend(Protocol):
+    """Interface VehicleAssistant uses to talk to an inference engine"""
+
+    name: str
+
+    def load(self) -> None:
+        """Load weights (idempotent)"""
+
+    def close(self) -> None:
+        """Release weights and caches"""
+
+    def tokenize(self, text: str) -> List[int]:
+        """Token ids for text"""
+
+    def prefill(self, prompt: str) -> int:
+        """Evaluate a prompt into the KV cache; returns prompt token count"""
+
+    def stream(
+        self,
+        prompt: str,
+        max_tokens: int,
+        temperature: float,
+        stop: Optional[List[str]] = None,
+        grammar: Optional[str] = None
+    ) -> Iterator[str]:
+        """Yield decoded text, one token at a time"""
+
+    def complete(
+        self,
+        prompt: str,
+        max_tokens: int,
+        temperature: float,
+        stop: Optional[List[str]] = None,
+        grammar: Optional[str] = None
+    ) -> Completion:
+        """Run a full completion"""
+
+    def save_state(self) -> Any:
+        """Snapshot of the engine's KV state"""
+
+    def load_state(self, state: Any) -> None:
+        """Restore a snapshot from save_state()"""
+
+    def metrics(self) -> Dict[str, float]:
+        """Throughput and latency counters"""
+
+
+def _partial_stop_length(text: str, stop: List[str]) -> int:
+    """Length of the longest suffix of text that is a proper prefix of a stop sequence"""
+    longest = 0
+    for sequence in stop:
+        for size in range(min(len(sequence) - 1, len(text)), longest, -1):
+            if text.endswith(sequence[:size]):
+                longest = size
+                break
+    return longest
+
+
+def truncate_at_stop(pieces: Iterator[str], stop: Optional[List[str]]) -> Iterator[str]:
+    """
+    Apply stop sequences to a token stream for engines without native support
+
+    Pieces that could be the start of a stop sequence are held back until
+    they are known not to be one, so stop text is never emitted. Token
+    boundaries are otherwise preserved.
+    """
+    if not stop:
+        yield from pieces
+        return
+
+    pending: List[str] = []
+    for piece in pieces:
+        pending.append(piece)
+        text = "".join(pending)
+        cut = min((text.find(s) for s in stop if s in text), default=-1)
+        if cut >= 0:
+            if text[:cut]:
+                yield text[:cut]
+            return
+
+        safe = len(text) - _partial_stop_length(text, stop)
+        while pending and len(pending[0]) <= safe:
+            safe -= len(pending[0])
+            yield pending.pop(0)
+    yield from pending
+
+
+class BaseBackend:
+    """
+    Shared bookkeeping for backends: completion on top of streaming,
+    and throughput/latency metrics.
+    """
+
+    name = "base"
+
+    def __init__(self):
+        self._loaded = False
+        self._load_s = 0.0
+        self._requests = 0
+        self._prompt_tokens = 0
+        self._completion_tokens = 0
+        self._ttft_total = 0.0
+        self._decode_time = 0.0
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def load(self) -> None:
+        if self._loaded:
+            return
+        start_time = time.perf_counter()
+        self._load()
+        self._load_s = time.perf_counter() - start_time
+        self._loaded = True
+
+    def close(self) -> None:
+        self._close()
+        self._loaded = False
+
+    def _load(self) -> None:
+        pass
+
+    def _close(self) -> None:
+        pass
+
+    def _stream_tokens(self, prompt, max_tokens, temperature, stop, grammar) -> Iterator[str]:
+        raise NotImplementedError
+
+    def prefill(self, prompt: str) -> int:
+        return len(self.tokenize(prompt))
+
+    def save_state(self) -> Any:
+        raise NotImplementedError(f"{self.name} backend does not support state snapshots")
+
+    def load_state(self, state: Any) -> None:
+        raise NotImplementedError(f"{self.name} backend does not support state snapshots")
+
+    def set_compute(self, n_threads: Optional[int] = None, n_batch: Optional[int] = None) -> None:
+        """Change CPU threads and prompt batch size at runtime (ignored if unsupported)"""
+        pass
+
+    def load_adapter(self, path: str) -> Any:
+        """Load a LoRA adapter for the loaded model and return its handle"""
+        raise NotImplementedError(f"{self.name} backend does not support LoRA adapters")
+
+    def set_adapter(self, adapter: Any, scale: float = 1.0) -> None:
+        """Apply a loaded adapter to generation (None = base model only)"""
+        raise NotImplementedError(f"{self.name} backend does not support LoRA adapters")
+
+    def free_adapter(self, adapter: Any) -> None:
+        raise NotImplementedError(f"{self.name} backend does not support LoRA adapters")
+
+    def stream(
+        self,
+        prompt: str,
+        max_tokens: int,
+        temperature: float,
+        stop: Optional[List[str]] = None,
+        grammar: Optional[str] = None
+    ) -> Iterator[str]:
+        self.load()
+        self._requests += 1
+        self._prompt_tokens += len(self.tokenize(prompt))
+
+        start_time = time.perf_counter()
+        first_token_time = None
+        try:
+            for piece in self._stream_tokens(prompt, max_tokens, temperature, stop, grammar):
+                if first_token_time is None:
+                    first_token_time = time.perf_counter()
+                    self._ttft_total += first_token_time - start_time
+                self._completion_tokens += 1
+                yield piece
+        finally:
+            if first_token_time is not None:
+                self._decode_time += time.perf_counter() - first_token_time
+
+    def complete(
+        self,
+        prompt: str,
+        max_tokens: int,
+        temperature: float,
+        stop: Optional[List[str]] = None,
+        grammar: Optional[str] = None
+    ) -> Completion:
+        start_time = time.perf_counter()
+        ttft = 0.0
+        pieces = []
+        for piece in self.stream(prompt, max_tokens, temperature, stop, grammar):
+            if not pieces:
+                ttft = time.perf_counter() - start_time
+            pieces.append(piece)
+        return Completion(
+            text="".join(pieces),
+            completion_tokens=len(pieces),
+            finish_reason="length" if len(pieces) >= max_tokens else "stop",
+            ttft_s=ttft,
+            elapsed_s=time.perf_counter() - start_time,
+        )
+
+    def metrics(self) -> Dict[str, float]:
+        decode_tokens = max(self._completion_tokens - self._requests, 0)
+        return {
+            'backend': self.name,
+            'load_s': self._load_s,
+            'requests': self._requests,
+            'prompt_tokens': self._prompt_tokens,
+            'completion_tokens': self._completion_tokens,
+            'mean_ttft_s': self._ttft_total / self._requests if self._requests else 0.0,
+            'decode_tokens_per_s': decode_tokens / self._decode_time if self._decode_time else 0.0,
+        }
+
+
+# llama.cpp has renamed its LoRA functions; newest first: (init, set, clear, free)
+LORA_APIS = (
+    ("llama_adapter_lora_init", "llama_set_adapter_lora", "llama_clear_adapter_lora", "llama_adapter_lora_free"),
+    ("llama_lora_adapter_init", "llama_lora_adapter_set", "llama_lora_adapter_clear", "llama_lora_adapter_free"),
+)
+
+
+class LlamaCppBackend(BaseBackend):
+    """llama.cpp through llama-cpp-python (GGUF models)"""
+
+    name = "llama_cpp"
+
+    def __init__(
+        self,
+        model_path: str,
+        n_ctx: int = 2048,
+        n_threads: Optional[int] = None,
+        verbose: bool = False,
+        **llama_kwargs
+    ):
+        """
+        Initialize the backend
+
+        Args:
+            model_path: Path to the GGUF model file
+            n_ctx: Context window size
+            n_threads: Number of CPU threads (None = auto-detect)
+            verbose: Enable llama.cpp logging
+            **llama_kwargs: Extra llama_cpp.Llama arguments (use_mmap, type_k, ...)
+        """
+        super().__init__()
+        self.model_path = model_path
+        self.n_ctx = n_ctx
+        self.n_threads = n_threads
+        self.verbose = verbose
+        self.llama_kwargs = llama_kwargs
+        self.llm = None
+        self._grammars: Dict[str, Any] = {}
+
+    def _load(self):
+        try:
+            from llama_cpp import Llama
+        except ImportError:
+            raise ImportError(
+                "llama-cpp-python is required. Install with: "
+                "pip install llama-cpp-python"
+            )
+        self.llm = Llama(
+            model_path=self.model_path,
+            n_ctx=self.n_ctx,
+            n_threads=self.n_threads,
+            verbose=self.verbose,
+            **self.llama_kwargs
+        )
+
+    def _close(self):
+        if self.llm is not None:
+            close = getattr(self.llm, "close", None)
+            if close is not None:
+                close()
+            self.llm = None
+        self._grammars.clear()
+
+    def _grammar(self, source: str):
+        """Compile a GBNF grammar once per source string"""
+        grammar = self._grammars.get(source)
+        if grammar is None:
+            from llama_cpp import LlamaGrammar
+
+            grammar = LlamaGrammar.from_string(source, verbose=self.verbose)
+            self._grammars[source] = grammar
+        return grammar
+
+    def tokenize(self, text: str) -> List[int]:
+        self.load()
+        return self.llm.tokenize(text.encode("utf-8"))
+
+    def prefill(self, prompt: str) -> int:
+        tokens = self.tokenize(prompt)
+        self.llm.reset()
+        self.llm.eval(tokens)
+        return len(tokens)
+
+    def _stream_tokens(self, prompt, max_tokens, temperature, stop, grammar):
+        kwargs = {}
+        if grammar is not None:
+            kwargs['grammar'] = self._grammar(grammar)
+        for chunk in self.llm(
+            prompt,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            stop=stop or [],
+            echo=False,
+            stream=True,
+            **kwargs
+        ):
+            text = chunk['choices'][0]['text']
+            if text:
+                yield text
+
+    def save_state(self) -> Any:
+        return self.llm.save_state()
+
+    def load_state(self, state: Any) -> None:
+        self.llm.load_state(state)
+
+    def set_compute(self, n_threads: Optional[int] = None, n_batch: Optional[int] = None) -> None:
+        if n_threads is not None:
+            self.n_threads = n_threads
+        if self.llm is None:
+            return
+        if n_threads is not None:
+            import llama_cpp
+
+            set_n_threads = getattr(llama_cpp, "llama_set_n_threads", None)
+            if set_n_threads is not None:
+                set_n_threads(self.llm._ctx.ctx, n_threads, n_threads)
+            self.llm.n_threads = n_threads
+            self.llm.n_threads_batch = n_threads
+        if n_batch is not None:
+            # Prompt tokens are evaluated n_batch at a time, up to the context's limit
+            self.llm.n_batch = min(n_batch, self.llm.context_params.n_batch)
+
+    def _lora_api(self) -> Tuple[Callable, ...]:
+        """(init, set, clear, free) from whichever LoRA API this llama-cpp-python exposes"""
+        import llama_cpp
+
+        for names in LORA_APIS:
+            if all(hasattr(llama_cpp, name) for name in names):
+                return tuple(getattr(llama_cpp, name) for name in names)
+        raise NotImplementedError(
+            "This llama-cpp-python build has no LoRA adapter API. Upgrade with: "
+            "pip install --upgrade llama-cpp-python"
+        )
+
+    def load_adapter(self, path: str) -> Any:
+        self.load()
+        init = self._lora_api()[0]
+        adapter = init(self.llm._model.model, path.encode("utf-8"))
+        if not adapter:
+            raise RuntimeError(f"Failed to load LoRA adapter: {path}")
+        return adapter
+
+    def set_adapter(self, adapter: Any, scale: float = 1.0) -> None:
+        _, set_adapter, clear_adapters, _ = self._lora_api()
+        ctx = self.llm._ctx.ctx
+        clear_adapters(ctx)
+        if adapter is not None and set_adapter(ctx, adapter, scale) != 0:
+            raise RuntimeError("Failed to apply LoRA adapter")
+        # Cached KV entries were computed with the previous weights
+        self.llm.reset()
+
+    def free_adapter(self, adapter: Any) -> None:
+        self._lora_api()[3](adapter)
+
+
+class OnnxGenAIBackend(BaseBackend):
+    """ONNX Runtime GenAI (CPU) for models exported with onnxruntime-genai, e.g. Phi-2"""
+
+    name = "onnx"
+
+    def __init__(self, model_path: str, n_ctx: int = 2048, **kwargs):
+        """
+        Initialize the backend
+
+        Args:
+            model_path: Directory with the exported ONNX model and genai_config.json
+            n_ctx: Context window size (prompt + generated tokens)
+        """
+        super().__init__()
+        self.model_path = model_path
+        self.n_ctx = n_ctx
+        self._og = None
+        self._model = None
+        self._tokenizer = None
+
+    def _load(self):
+        try:
+            import onnxruntime_genai as og
+        except ImportError:
+            raise ImportError(
+                "onnxruntime-genai is required for the onnx backend. Install with: "
+                "pip install onnxruntime-genai"
+            )
+        self._og = og
+        self._model = og.Model(self.model_path)
+        self._tokenizer = og.Tokenizer(self._model)
+
+    def _close(self):
+        self._model = None
+        self._tokenizer = None
+
+    def tokenize(self, text: str) -> List[int]:
+        self.load()
+        return list(self._tokenizer.encode(text))
+
+    def _stream_tokens(self, prompt, max_tokens, temperature, stop, grammar):
+        if grammar is not None:
+            raise ValueError("The onnx backend does not support grammar-constrained decoding")
+
+        def pieces():
+            tokens = self._tokenizer.encode(prompt)
+            params = self._og.GeneratorParams(self._model)
+            params.set_search_options(
+                max_length=min(len(tokens) + max_tokens, self.n_ctx),
+                temperature=max(temperature, 1e-5),
+                do_sample=temperature > 0
+            )
+            generator = self._og.Generator(self._model, params)
+            generator.append_tokens(tokens)
+            decoder = self._tokenizer.create_stream()
+            while not generator.is_done():
+                generator.generate_next_token()
+                yield decoder.decode(generator.get_next_tokens()[0])
+
+        yield from truncate_at_stop(pieces(), stop)
+
+
+class StubBackend(BaseBackend):
+    """
+    Deterministic backend for tests and CI.
+    Output depends only on the prompt (or on a supplied responder).
+    """
+
+    name = "stub"
+
+    def __init__(
+        self,
+        responder: Optional[Union[str, Callable[[str], str]]] = None,
+        token_delay_s: float = 0.0,
+        **kwargs
+    ):
+        """
+        Initialize the backend
+
+        Args:
+            responder: Fixed response text, or a function of the prompt
+            token_delay_s: Simulated per-token decode time
+        """
+        super().__init__()
+        self.responder = responder
+        self.token_delay_s = token_delay_s
+        self.calls: List[Dict] = []
+        self._state: List[str] = []
+        # Adapters are just their paths; responses are not affected
+        self.adapter: Optional[str] = None
+        self.adapter_loads: List[str] = []
+        self.adapters_freed: List[str] = []
+        self.n_threads: Optional[int] = None
+        self.n_batch: Optional[int] = None
+
+    def _response(self, prompt: str) -> str:
+        if callable(self.responder):
+            return self.responder(prompt)
+        if self.responder is not None:
+            return self.responder
+        digest = hashlib.sha1(prompt.encode("utf-8")).hexdigest()[:8]
+        return f" Stub response {digest}."
+
+    def tokenize(self, text: str) -> List[int]:
+        return [int(hashlib.sha1(word.encode("utf-8")).hexdigest()[:6], 16) for word in text.split()]
+
+    def prefill(self, prompt: str) -> int:
+        self._state = [prompt]
+        return len(self.tokenize(prompt))
+
+    def _stream_tokens(self, prompt, max_tokens, temperature, stop, grammar):
+        self.calls.append({
+            'prompt': prompt,
+            'max_tokens': max_tokens,
+            'temperature': temperature,
+            'stop': stop,
+            'grammar': grammar,
+            'adapter': self.adapter,
+        })
+        self._state = [prompt]
+
+        def pieces():
+            for i, piece in enumerate(re.findall(r"\s*\S+|\s+$", self._response(prompt))):
+                if i >= max_tokens:
+                    return
+                if self.token_delay_s:
+                    time.sleep(self.token_delay_s)
+                yield piece
+
+        yield from truncate_at_stop(pieces(), stop)
+
+    def save_state(self) -> Any:
+        return list(self._state)
+
+    def load_state(self, state: Any) -> None:
+        self._state = list(state)
+
+    def set_compute(self, n_threads: Optional[int] = None, n_batch: Optional[int] = None) -> None:
+        if n_threads is not None:
+            self.n_threads = n_threads
+        if n_batch is not None:
+            self.n_batch = n_batch
+
+    def load_adapter(self, path: str) -> Any:
+        self.adapter_loads.append(path)
+        return path
+
+    def set_adapter(self, adapter: Any, scale: float = 1.0) -> None:
+        self.adapter = adapter
+
+    def free_adapter(self, adapter: Any) -> None:
+        self.adapters_freed.append(adapter)
+
+
+BACKENDS = {
+    LlamaCppBackend.name: LlamaCppBackend,
+    OnnxGenAIBackend.name: OnnxGenAIBackend,
+    StubBackend.name: StubBackend,
+}
+
+
+def create_backend(name: str, model_path: str, **kwargs) -> BaseBackend:
+    """
+    Instantiate a backend by name
+
+    Args:
+        name: One of BACKENDS ("llama_cpp", "onnx", "stub")
+        model_path: Model file or directory
+        **kwargs: Backend-specific options (n_ctx, n_threads, ...)
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown backend '{name}'. Available: {', '.join(BACKENDS)}")
+    if name == StubBackend.name:
+        return StubBackend(**{k: v for k, v in kwargs.items() if k in ("responder", "token_delay_s")})
+    return BACKENDS[name](model_path, **kwargs)
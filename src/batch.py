@@ -0,0 +1,284 @@
+"""
+TinyLLM-Auto: Batch Jobs
+Answers JSONL files of (vehicle context, question) records offline
+"""
+
+import argparse
+import json
+import os
+import time
+from dataclasses import dataclass
+from multiprocessing import Pool
+from typing import Dict, Iterable, Iterator, Optional, Set
+
+try:
+    from .assistant import VehicleAssistant, VehicleContext
+except ImportError:  # src/ on sys.path (tests, demo.py)
+    from assistant import VehicleAssistant, VehicleContext
+
+
+# Per-process assistant used by pool workers
+_worker_assistant: Optional[VehicleAssistant] = None
+
+
+@dataclass
+class BatchReport:
+    """Throughput summary of a batch job"""
+    records: int = 0
+    skipped: int = 0
+    failed: int = 0
+    completion_tokens: int = 0
+    elapsed_s: float = 0.0
+
+    @property
+    def records_per_s(self) -> float:
+        return self.records / self.elapsed_s if self.elapsed_s else 0.0
+
+    @property
+    def tokens_per_s(self) -> float:
+        return self.completion_tokens / self.elapsed_s if self.elapsed_s else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.records} records ({self.skipped} resumed, {self.failed} failed) "
+            f"in {self.elapsed_s:.1f}s: {self.records_per_s:.2f} records/s, "
+            f"{self.tokens_per_s:.1f} tokens/s"
+        )
+
+
+def _answer_record(
+    assistant: VehicleAssistant,
+    record: Dict,
+    max_tokens: int,
+    temperature: float
+) -> Dict:
+    """Answer one record with a stateless prompt"""
+    vehicle = record.get('vehicle')
+    context = VehicleContext(**vehicle) if vehicle else None
+    result = {'id': record['id'], 'question': record['question']}
+
+    start_time = time.time()
+    try:
+        answer = assistant.answer_once(
+            record['question'],
+            vehicle_context=context,
+            max_tokens=record.get('max_tokens', max_tokens),
+            temperature=temperature
+        )
+        result.update(answer=str(answer), completion_tokens=answer.completion_tokens)
+    except Exception as e:
+        result.update(error=str(e), completion_tokens=0)
+    result['latency_s'] = round(time.time() - start_time, 3)
+    return result
+
+
+def _init_worker(model_path: str, context_size: int, n_threads: Optional[int]):
+    """Load one model per worker process (mmap'd weights are shared via the page cache)"""
+    global _worker_assistant
+    _worker_assistant = VehicleAssistant(
+        model_path=model_path,
+        context_size=context_size,
+        n_threads=n_threads
+    )
+    _worker_assistant._load_llm()
+
+
+def _worker_answer(args) -> Dict:
+    record, max_tokens, temperature = args
+    return _answer_record(_worker_assistant, record, max_tokens, temperature)
+
+
+def ask_many(
+    records: Iterable[Dict],
+    model_path: Optional[str] = None,
+    assistant: Optional[VehicleAssistant] = None,
+    workers: int = 1,
+    context_size: int = 2048,
+    max_tokens: int = 256,
+    temperature: float = 0.7
+) -> Iterator[Dict]:
+    """
+    Answer many independent questions, yielding results as they complete
+
+    Each record is {'id', 'question', 'vehicle': {make, model, year, mileage}}
+    and is answered with a stateless prompt, so results do not depend on order.
+    With workers > 1, records run in a process pool with one model per
+    worker and the CPU cores split between them; results may arrive out of order.
+
+    Args:
+        records: Input records
+        model_path: GGUF model for pool workers (or for a new inline assistant)
+        assistant: Existing assistant to use when workers == 1
+        workers: Number of worker processes
+        context_size: Context window per worker (prompts are stateless, so small)
+        max_tokens: Default maximum tokens per answer
+        temperature: Sampling temperature
+
+    Yields:
+        Result dicts with id, question, answer (or error), completion_tokens, latency_s
+    """
+    if workers <= 1:
+        if assistant is None:
+            assistant = VehicleAssistant(model_path=model_path, context_size=context_size)
+        assistant._load_llm()
+        for record in records:
+            yield _answer_record(assistant, record, max_tokens, temperature)
+        return
+
+    if model_path is None:
+        raise ValueError("model_path is required when workers > 1")
+
+    n_threads = max(1, (os.cpu_count() or workers) // workers)
+    with Pool(
+        processes=workers,
+        initializer=_init_worker,
+        initargs=(model_path, context_size, n_threads)
+    ) as pool:
+        tasks = ((record, max_tokens, temperature) for record in records)
+        for result in pool.imap_unordered(_worker_answer, tasks):
+            yield result
+
+
+def read_records(input_path: str) -> Iterator[Dict]:
+    """Read JSONL records, using the line number as id when none is given"""
+    with open(input_path) as f:
+        for line_number, line in enumerate(f):
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            record.setdefault('id', line_number)
+            yield record
+
+
+def completed_ids(output_path: str) -> Set:
+    """Ids already answered in an output file (the job's checkpoint)"""
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path) as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+            except json.JSONDecodeError:
+                # Last line of an interrupted run may be partial
+                continue
+            if 'error' not in result:
+                done.add(result['id'])
+    return done
+
+
+def _drop_unfinished(output_path: str):
+    """
+    Rewrite the output with only successful results before resuming
+
+    Failed records are retried, so their old error lines would otherwise
+    end up next to the new result; an incomplete trailing line left by an
+    interrupted run is dropped too.
+    """
+    kept = []
+    with open(output_path) as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if 'error' not in result:
+                kept.append(line if line.endswith("\n") else line + "\n")
+    with open(output_path + ".tmp", 'w') as f:
+        f.writelines(kept)
+    os.replace(output_path + ".tmp", output_path)
+
+
+def run_batch_job(
+    input_path: str,
+    output_path: str,
+    model_path: Optional[str] = None,
+    assistant: Optional[VehicleAssistant] = None,
+    workers: int = 1,
+    resume: bool = True,
+    verbose: bool = False,
+    **kwargs
+) -> BatchReport:
+    """
+    Answer a JSONL file of records, streaming results to an output JSONL
+
+    The output file doubles as the checkpoint: with resume=True, records
+    whose id already has a successful result are skipped and failed ones
+    are retried (their error lines are removed first).
+
+    Args:
+        input_path: JSONL of {'id', 'question', 'vehicle'} records
+        output_path: JSONL results file (appended to when resuming)
+        model_path: GGUF model path
+        assistant: Existing assistant to use when workers == 1
+        workers: Number of worker processes
+        resume: Skip records already answered in output_path
+        verbose: Print progress
+        **kwargs: Passed through to ask_many
+
+    Returns:
+        BatchReport with throughput statistics
+    """
+    report = BatchReport()
+    done = completed_ids(output_path) if resume else set()
+    if resume and os.path.exists(output_path):
+        _drop_unfinished(output_path)
+
+    def pending():
+        for record in read_records(input_path):
+            if record['id'] in done:
+                report.skipped += 1
+                continue
+            yield record
+
+    start_time = time.time()
+    with open(output_path, 'a' if resume else 'w') as out:
+        for result in ask_many(pending(), model_path=model_path, assistant=assistant,
+                               workers=workers, **kwargs):
+            out.write(json.dumps(result) + "\n")
+            out.flush()
+
+            report.records += 1
+            report.completion_tokens += result['completion_tokens']
+            if 'error' in result:
+                report.failed += 1
+
+            if verbose:
+                print(f"[{report.records}] {result['id']}: {result['latency_s']:.2f}s")
+
+    report.elapsed_s = time.time() - start_time
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="TinyLLM-Auto: answer a JSONL file of vehicle questions"
+    )
+    parser.add_argument("input", help="Input JSONL of {id, question, vehicle} records")
+    parser.add_argument("output", help="Output JSONL of results")
+    parser.add_argument("--model", default="models/phi-2-4bit.gguf", help="Path to GGUF model file")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes")
+    parser.add_argument("--context-size", type=int, default=2048, help="Context window per worker")
+    parser.add_argument("--max-tokens", type=int, default=256, help="Maximum tokens per answer")
+    parser.add_argument("--temperature", type=float, default=0.7, help="Sampling temperature")
+    parser.add_argument("--no-resume", action="store_true", help="Overwrite output instead of resuming")
+    parser.add_argument("--verbose", action="store_true", help="Print per-record progress")
+    args = parser.parse_args()
+
+    report = run_batch_job(
+        args.input,
+        args.output,
+        model_path=args.model,
+        workers=args.workers,
+        resume=not args.no_resume,
+        verbose=args.verbose,
+        context_size=args.context_size,
+        max_tokens=args.max_tokens,
+        temperature=args.temperature
+    )
+    print(f"✓ {report}")
+
+
+if __name__ == "__main__":
+    main()
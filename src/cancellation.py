@@ -0,0 +1,115 @@
+"""
+TinyLLM-Auto: Deadlines and Cancellation
+Tokens checked between decoded tokens, and answers flagged when cut short
+"""
+
+import re
+import threading
+import time
+from typing import Optional
+
+COMPLETE = "complete"
+DEADLINE = "deadline"
+CANCELLED = "cancelled"
+
+# Sentence end: terminal punctuation, optional closing quote/bracket, then whitespace or end
+_SENTENCE_END = re.compile(r"[.!?][\"')\]]*(?=\s|$)")
+_LIST_MARKER = re.compile(r"\s*\d+$")
+
+
+class CancellationToken:
+    """
+    Stop signal for a request: explicit cancel() and/or a deadline.
+    Generation polls stop_reason() between tokens, so a request stops
+    within one token of being cancelled or running out of time.
+    """
+
+    def __init__(
+        self,
+        timeout_s: Optional[float] = None,
+        deadline: Optional[float] = None,
+        parent: Optional["CancellationToken"] = None
+    ):
+        """
+        Initialize the token
+
+        Args:
+            timeout_s: Time budget from now in seconds
+            deadline: Absolute time.monotonic() deadline (overrides timeout_s)
+            parent: Token whose cancellation or deadline also stops this one
+        """
+        self.started_at = time.monotonic()
+        if deadline is None and timeout_s is not None:
+            deadline = self.started_at + timeout_s
+        self.deadline = deadline
+        self.parent = parent
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        """Stop the request at the next token boundary"""
+        self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set() or (self.parent is not None and self.parent.cancelled)
+
+    @property
+    def has_deadline(self) -> bool:
+        return self.deadline is not None or (self.parent is not None and self.parent.has_deadline)
+
+    def remaining_s(self) -> Optional[float]:
+        """Seconds until the nearest deadline (None if there is none)"""
+        remaining = None if self.deadline is None else self.deadline - time.monotonic()
+        if self.parent is not None:
+            parent_remaining = self.parent.remaining_s()
+            if parent_remaining is not None:
+                remaining = parent_remaining if remaining is None else min(remaining, parent_remaining)
+        return remaining
+
+    def stop_reason(self) -> Optional[str]:
+        """CANCELLED, DEADLINE, or None if the request may continue"""
+        if self.cancelled:
+            return CANCELLED
+        remaining = self.remaining_s()
+        if remaining is not None and remaining <= 0:
+            return DEADLINE
+        return None
+
+
+class Answer(str):
+    """
+    Answer text that records whether generation was cut short (and how
+    many tokens it took). Compares and prints like a plain string.
+    """
+
+    def __new__(cls, text: str, partial: bool = False, stop_reason: str = COMPLETE, completion_tokens: int = 0):
+        answer = super().__new__(cls, text)
+        answer.partial = partial
+        answer.stop_reason = stop_reason
+        answer.completion_tokens = completion_tokens
+        return answer
+
+    def __repr__(self) -> str:
+        flag = f", partial, {self.stop_reason}" if self.partial else ""
+        return f"Answer({str.__repr__(self)}{flag})"
+
+
+def trim_to_sentence(text: str) -> str:
+    """
+    Cut text after its last complete sentence
+
+    Numbered-list markers ("1.") do not count as sentence ends. Text with
+    no complete sentence is returned unchanged.
+
+    Args:
+        text: Partial answer
+
+    Returns:
+        Text ending at a sentence boundary
+    """
+    for match in reversed(list(_SENTENCE_END.finditer(text))):
+        line_start = text.rfind("\n", 0, match.start()) + 1
+        if _LIST_MARKER.fullmatch(text[line_start:match.start()]):
+            continue
+        return text[:match.end()]
+    return text.rstrip()
@@ -0,0 +1,295 @@
+"""
+TinyLLM-Auto: Request Coalescing
+Single-flight generation shared by identical in-flight requests
+"""
+
+import threading
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+try:
+    from .assistant import CACHE_MISS_RESPONSE, STOP_SEQUENCES, VehicleContext
+    from .cancellation import CANCELLED, Answer, CancellationToken, trim_to_sentence
+except ImportError:  # src/ on sys.path (tests, demo.py)
+    from assistant import CACHE_MISS_RESPONSE, STOP_SEQUENCES, VehicleContext
+    from cancellation import CANCELLED, Answer, CancellationToken, trim_to_sentence
+
+
+class Flight:
+    """
+    One generation and the requests attached to it.
+
+    Pieces are appended as they are decoded; every subscriber reads them
+    with its own cursor, so a request that attaches late first catches up
+    on what was already generated and then follows live.
+    """
+
+    def __init__(self, key: Tuple, prompt: str, max_tokens: int, temperature: float, adapter: Optional[str] = None):
+        self.key = key
+        self.prompt = prompt
+        self.adapter = adapter
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+        self.pieces: List[str] = []
+        self.subscribers = 0
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.stop_reason: Optional[str] = None
+        # Cancelled once every subscriber has detached
+        self.cancel_token = CancellationToken()
+        self.cond = threading.Condition()
+
+
+class RequestCoalescer:
+    """
+    Single-flight coalescing in front of a VehicleAssistant.
+
+    Requests are context-independent: the prompt is built from the vehicle
+    and the question only (no conversation history, nothing recorded), so
+    two requests with the same vehicle, question, generation settings and
+    LoRA adapter need the same generation. While one is generating,
+    identical requests attach to it and receive the same streamed pieces
+    instead of starting their own. Finished generations are not cached; the next identical
+    request after completion starts a new one.
+
+    Commands (reset, repeat, ...) act on the assistant's conversation and
+    are passed to assistant.ask() unchanged.
+    """
+
+    def __init__(self, assistant, verbose: bool = False):
+        """
+        Initialize the coalescer
+
+        Args:
+            assistant: VehicleAssistant that runs the generations
+            verbose: Print when requests are coalesced
+        """
+        self.assistant = assistant
+        self.verbose = verbose
+        self._flights: Dict[Tuple, Flight] = {}
+        self._lock = threading.Lock()
+
+        self.requests = 0
+        self.commands = 0
+        self.offline = 0
+        self.flights = 0
+        self.coalesced = 0
+        self.detached = 0
+        self.tokens_generated = 0
+        self.tokens_delivered = 0
+        self.max_subscribers = 0
+
+    def ask(
+        self,
+        question: str,
+        vehicle_context: Optional[VehicleContext] = None,
+        max_tokens: int = 256,
+        temperature: float = 0.7,
+        stream: bool = False,
+        timeout_s: Optional[float] = None,
+        cancel_token: Optional[CancellationToken] = None
+    ) -> Union[Answer, Iterator[str]]:
+        """
+        Answer a question, sharing the generation with identical requests
+
+        Args:
+            question: User's question
+            vehicle_context: Vehicle to answer for (None = assistant.vehicle_context)
+            max_tokens: Maximum tokens to generate
+            temperature: Sampling temperature (0.0-1.0)
+            stream: Return an iterator of text pieces as they are decoded
+            timeout_s: Time budget for this request; it detaches from the
+                shared generation (which continues for the others) once spent
+            cancel_token: Token whose cancel() detaches this request
+
+        Returns:
+            Answer (partial answers end at a sentence boundary), or an
+            iterator of text pieces when stream=True
+        """
+        assistant = self.assistant
+        if assistant.intents is not None and assistant.intents.match(question) is not None:
+            with self._lock:
+                self.commands += 1
+            return assistant.ask(question, max_tokens, temperature, stream, timeout_s=timeout_s, cancel_token=cancel_token)
+
+        with self._lock:
+            self.requests += 1
+        if vehicle_context is None:
+            vehicle_context = assistant.vehicle_context
+
+        direct_answer = self._answer_offline(question, vehicle_context)
+        if direct_answer is not None:
+            with self._lock:
+                self.offline += 1
+            return iter([direct_answer]) if stream else Answer(direct_answer)
+
+        budget = CancellationToken(timeout_s=timeout_s, parent=cancel_token)
+        prompt = assistant._build_prompt(question, vehicle_context=vehicle_context, history=[])
+        adapter = assistant._adapter_name(vehicle_context=vehicle_context)
+        max_tokens = assistant._token_budget(max_tokens)
+        if stream:
+            return self._stream(prompt, max_tokens, temperature, adapter, budget)
+
+        flight = self._attach(prompt, max_tokens, temperature, adapter)
+        collected = list(self._follow(flight, budget))
+        text = "".join(collected).strip()
+        stop_reason = budget.stop_reason() if not self._finished(flight, len(collected)) else flight.stop_reason
+        if stop_reason is None:
+            return Answer(text)
+        return Answer(trim_to_sentence(text), partial=True, stop_reason=stop_reason)
+
+    def _answer_offline(self, question: str, vehicle_context: Optional[VehicleContext]) -> Optional[str]:
+        """Schedule table, then the answer pack; the cache-miss message in cached-only mode"""
+        assistant = self.assistant
+        direct_answer = assistant._answer_from_schedule(question, vehicle_context)
+        if direct_answer is not None:
+            return direct_answer
+        pack = assistant.answer_pack
+        if pack is not None and pack.matches(vehicle_context):
+            direct_answer = pack.lookup(question)
+            if direct_answer is not None:
+                return direct_answer
+        return CACHE_MISS_RESPONSE if assistant.cached_only else None
+
+    def _attach(self, prompt: str, max_tokens: int, temperature: float, adapter: Optional[str] = None) -> Flight:
+        """Join the in-flight generation for this prompt, or start one"""
+        key = (prompt, max_tokens, temperature, adapter)
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None and not flight.cancel_token.cancelled:
+                with flight.cond:
+                    flight.subscribers += 1
+                    subscribers = flight.subscribers
+                self.coalesced += 1
+                self.max_subscribers = max(self.max_subscribers, subscribers)
+                if self.verbose:
+                    print(f"Coalesced request ({subscribers} waiting on one generation)")
+                return flight
+
+            flight = Flight(key, prompt, max_tokens, temperature, adapter)
+            flight.subscribers = 1
+            self._flights[key] = flight
+            self.flights += 1
+            self.max_subscribers = max(self.max_subscribers, 1)
+
+        threading.Thread(target=self._generate, args=(flight,), name="coalesced-generation", daemon=True).start()
+        return flight
+
+    def _generate(self, flight: Flight):
+        """Run one shared generation, publishing each piece to the subscribers"""
+        assistant = self.assistant
+        try:
+            with assistant._request_scope():
+                assistant._load_llm()
+                assistant._use_adapter(flight.adapter)
+                stream = assistant._llm.stream(
+                    flight.prompt, flight.max_tokens, flight.temperature, stop=STOP_SEQUENCES
+                )
+                try:
+                    for piece in stream:
+                        # Leading whitespace is stripped like the non-streamed answer
+                        if not flight.pieces:
+                            piece = piece.lstrip()
+                            if not piece:
+                                continue
+                        with flight.cond:
+                            flight.pieces.append(piece)
+                            flight.cond.notify_all()
+                        with self._lock:
+                            self.tokens_generated += 1
+                        if flight.cancel_token.cancelled:
+                            flight.stop_reason = CANCELLED
+                            break
+                finally:
+                    stream.close()
+        except BaseException as e:
+            flight.error = e
+        finally:
+            # New identical requests start a fresh generation from here on
+            with self._lock:
+                if self._flights.get(flight.key) is flight:
+                    del self._flights[flight.key]
+            with flight.cond:
+                flight.done = True
+                flight.cond.notify_all()
+
+    def _stream(
+        self,
+        prompt: str,
+        max_tokens: int,
+        temperature: float,
+        adapter: Optional[str],
+        budget: CancellationToken
+    ) -> Iterator[str]:
+        """
+        Streamed pieces for one request. Nothing runs until the first next(),
+        so a stream that is never iterated never subscribes; close() (or
+        garbage collection) of a started one detaches it.
+        """
+        flight = self._attach(prompt, max_tokens, temperature, adapter)
+        yield from self._follow(flight, budget)
+
+    def _follow(self, flight: Flight, budget: CancellationToken) -> Iterator[str]:
+        """Pieces of a shared generation for one subscriber"""
+        position = 0
+        try:
+            while True:
+                with flight.cond:
+                    while position >= len(flight.pieces) and not flight.done:
+                        if budget.stop_reason() is not None:
+                            return
+                        remaining = budget.remaining_s()
+                        # Cancellation has no wakeup, so waits are bounded
+                        flight.cond.wait(0.05 if remaining is None else min(max(remaining, 0.0), 0.05))
+                    if position >= len(flight.pieces):
+                        if flight.error is not None:
+                            raise flight.error
+                        return
+                    piece = flight.pieces[position]
+                position += 1
+                with self._lock:
+                    self.tokens_delivered += 1
+                yield piece
+                if budget.stop_reason() is not None:
+                    return
+        finally:
+            self._detach(flight, position)
+
+    def _detach(self, flight: Flight, position: int):
+        with self._lock, flight.cond:
+            flight.subscribers -= 1
+            if not flight.done or position < len(flight.pieces):
+                self.detached += 1
+            # Nobody is listening any more: stop generating
+            if flight.subscribers == 0 and not flight.done:
+                flight.cancel_token.cancel()
+
+    @staticmethod
+    def _finished(flight: Flight, position: int) -> bool:
+        with flight.cond:
+            return flight.done and position >= len(flight.pieces)
+
+    def metrics(self) -> Dict:
+        """
+        How much generation work coalescing saved
+
+        Commands are counted separately and are not in 'requests', so
+        dedup_rate is the share of coalescable questions that attached
+        to an existing generation.
+        """
+        with self._lock:
+            generated = self.tokens_generated
+            delivered = self.tokens_delivered
+            return {
+                'requests': self.requests,
+                'commands': self.commands,
+                'offline': self.offline,
+                'flights': self.flights,
+                'coalesced': self.coalesced,
+                'in_flight': len(self._flights),
+                'detached': self.detached,
+                'max_subscribers': self.max_subscribers,
+                'tokens_generated': generated,
+                'tokens_delivered': delivered,
+                'tokens_saved': max(delivered - generated, 0),
+                'dedup_rate': self.coalesced / self.requests if self.requests else 0.0,
+            }
@@ -5,7 +5,6 @@ Simple CLI interface for testing the automotive assistant
 
 import argparse
 from pathlib import Path
-from assistant import VehicleAssistant
 
 
 def main():
@@ -50,6 +49,14 @@ def main():
     
     args = parser.parse_args()
     
+    # Imported after argument parsing so --help stays fast
+    try:
+        from .assistant import VehicleAssistant
+        from .gguf import GGUFError, PreflightError, preflight
+    except ImportError:  # src/ on sys.path (python src/demo.py)
+        from assistant import VehicleAssistant
+        from gguf import GGUFError, PreflightError, preflight
+    
     # Check if model exists
     if not Path(args.model).exists():
         print("❌ Error: Model file not found!")
@@ -58,6 +65,14 @@ def main():
         print("   python scripts/download_model.py")
         return
     
+    # Check format, trained context and RAM before spending seconds loading
+    try:
+        model_info = preflight(args.model, context_size=2048)
+    except (GGUFError, PreflightError) as e:
+        print(f"❌ Error: {e}")
+        return
+    print(f"✓ {model_info.summary()}")
+    
     print("="*60)
     print("🚗 TinyLLM-Auto: In-Vehicle AI Assistant")
     print("="*60)
@@ -67,7 +82,7 @@ def main():
     print("Loading model...")
     assistant = VehicleAssistant(
         model_path=args.model,
-        context_size=4096,
+        context_size=2048,
         verbose=args.verbose
     )
     
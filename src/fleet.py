@@ -0,0 +1,279 @@
+"""
+TinyLLM-Auto: Fleet Registry
+Columnar, array-backed storage for many VehicleContexts
+"""
+
+import json
+import mmap
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+
+try:
+    from .assistant import SlottedVehicleContext
+except ImportError:  # src/ on sys.path (tests, demo.py)
+    from assistant import SlottedVehicleContext
+
+
+_MAGIC = b"TLAFLT01"
+_ALIGN = 64
+VIN_LENGTH = 17
+
+_COLUMN_DTYPES = {
+    'year': np.int16,
+    'mileage': np.int32,
+    'make': np.uint16,
+    'model': np.uint32,
+    'vin': f"S{VIN_LENGTH}",
+}
+
+
+class StringTable:
+    """Interned strings: each distinct value is stored once and referenced by code"""
+
+    def __init__(self, values: Optional[List[str]] = None):
+        self.values: List[str] = []
+        self._codes: Dict[str, int] = {}
+        for value in values or []:
+            self.intern(value)
+
+    def intern(self, value: str) -> int:
+        code = self._codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self.values.append(value)
+            self._codes[value] = code
+        return code
+
+    def code(self, value: str) -> Optional[int]:
+        return self._codes.get(value)
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+
+class FleetView:
+    """
+    Selection of vehicles in a registry.
+    Holds row indices only; contexts and prompts are built on demand.
+    """
+
+    def __init__(self, registry: "FleetRegistry", rows: np.ndarray):
+        self.registry = registry
+        self.rows = rows
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __getitem__(self, i: int) -> SlottedVehicleContext:
+        return self.registry.context(int(self.rows[i]))
+
+    def __iter__(self) -> Iterator[SlottedVehicleContext]:
+        for row in self.rows:
+            yield self.registry.context(int(row))
+
+    @property
+    def year(self) -> np.ndarray:
+        return self.registry.year[self.rows]
+
+    @property
+    def mileage(self) -> np.ndarray:
+        return self.registry.mileage[self.rows]
+
+    def to_prompts(self) -> Iterator[str]:
+        """Yield VehicleContext prompt text for each selected vehicle"""
+        for context in self:
+            yield context.to_prompt()
+
+
+class FleetRegistry:
+    """
+    Array-backed fleet of vehicles with NumPy columns and interned strings.
+    Supports vectorized filters and a memory-mapped binary columnar format.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        """
+        Initialize an empty registry
+
+        Args:
+            capacity: Initial number of rows to allocate
+        """
+        self._size = 0
+        self._columns = {
+            name: np.zeros(capacity, dtype=dtype) for name, dtype in _COLUMN_DTYPES.items()
+        }
+        self.makes = StringTable()
+        self.models = StringTable()
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def year(self) -> np.ndarray:
+        return self._columns['year'][:self._size]
+
+    @property
+    def mileage(self) -> np.ndarray:
+        return self._columns['mileage'][:self._size]
+
+    def _reserve(self, n: int):
+        """Grow columns (amortized doubling); copies read-only mmap'd columns"""
+        capacity = len(self._columns['year'])
+        writable = all(column.flags.writeable for column in self._columns.values())
+        if self._size + n <= capacity and writable:
+            return
+        new_capacity = max(self._size + n, capacity * 2, 16)
+        for name, column in self._columns.items():
+            grown = np.zeros(new_capacity, dtype=column.dtype)
+            grown[:self._size] = column[:self._size]
+            self._columns[name] = grown
+
+    def add(
+        self,
+        make: str,
+        model: str,
+        year: int,
+        mileage: int,
+        vin: Optional[str] = None
+    ) -> int:
+        """
+        Add a vehicle
+
+        Returns:
+            Row index of the new vehicle
+        """
+        self._reserve(1)
+        row = self._size
+        self._columns['make'][row] = self.makes.intern(make)
+        self._columns['model'][row] = self.models.intern(model)
+        self._columns['year'][row] = year
+        self._columns['mileage'][row] = mileage
+        self._columns['vin'][row] = (vin or "").encode("ascii")
+        self._size += 1
+        return row
+
+    def extend(self, contexts: Iterable) -> None:
+        """Add VehicleContext-like objects (make, model, year, mileage, vin)"""
+        for context in contexts:
+            self.add(context.make, context.model, context.year, context.mileage, context.vin)
+
+    def update_mileage(self, rows: np.ndarray, mileage: np.ndarray):
+        """Vectorized mileage update for the given rows"""
+        self._reserve(0)
+        self._columns['mileage'][rows] = mileage
+
+    def context(self, row: int) -> SlottedVehicleContext:
+        """Materialize one row as a vehicle context"""
+        vin = self._columns['vin'][row].decode("ascii")
+        return SlottedVehicleContext(
+            make=self.makes.values[self._columns['make'][row]],
+            model=self.models.values[self._columns['model'][row]],
+            year=int(self._columns['year'][row]),
+            mileage=int(self._columns['mileage'][row]),
+            vin=vin or None,
+        )
+
+    def select(
+        self,
+        make: Optional[str] = None,
+        model: Optional[str] = None,
+        min_year: Optional[int] = None,
+        max_year: Optional[int] = None,
+        min_mileage: Optional[int] = None,
+        max_mileage: Optional[int] = None
+    ) -> FleetView:
+        """
+        Vectorized filter, e.g. select(model="Camry", min_year=2019, min_mileage=60000)
+
+        Returns:
+            FleetView over the matching rows
+        """
+        n = self._size
+        mask = np.ones(n, dtype=bool)
+
+        for table, column, value in (
+            (self.makes, 'make', make),
+            (self.models, 'model', model),
+        ):
+            if value is None:
+                continue
+            code = table.code(value)
+            if code is None:
+                return FleetView(self, np.empty(0, dtype=np.intp))
+            mask &= self._columns[column][:n] == code
+
+        if min_year is not None:
+            mask &= self.year >= min_year
+        if max_year is not None:
+            mask &= self.year <= max_year
+        if min_mileage is not None:
+            mask &= self.mileage >= min_mileage
+        if max_mileage is not None:
+            mask &= self.mileage <= max_mileage
+
+        return FleetView(self, np.flatnonzero(mask))
+
+    def all(self) -> FleetView:
+        return FleetView(self, np.arange(self._size))
+
+    def save(self, path: str):
+        """
+        Write the registry in a binary columnar format
+
+        Layout: magic, header length, JSON header (string tables and column
+        offsets), then each column's raw bytes aligned to 64 bytes.
+        """
+        n = self._size
+        offsets = {}
+        position = 0
+        for name, column in self._columns.items():
+            position = -(-position // _ALIGN) * _ALIGN
+            offsets[name] = position
+            position += n * column.dtype.itemsize
+
+        header = json.dumps({
+            'rows': n,
+            'makes': self.makes.values,
+            'models': self.models.values,
+            'columns': {name: [str(column.dtype), offsets[name]] for name, column in self._columns.items()},
+        }).encode("utf-8")
+        data_start = -(-(len(_MAGIC) + 8 + len(header)) // _ALIGN) * _ALIGN
+
+        with open(path, "wb") as f:
+            f.write(_MAGIC)
+            f.write(len(header).to_bytes(8, "little"))
+            f.write(header)
+            for name, column in self._columns.items():
+                f.seek(data_start + offsets[name])
+                f.write(column[:n].tobytes())
+            f.truncate(data_start + position)
+
+    @classmethod
+    def load(cls, path: str) -> "FleetRegistry":
+        """
+        Load a registry written by save()
+
+        Columns are read-only views over a memory map, so loading does not
+        copy the data; they are copied only if the registry is modified.
+        """
+        with open(path, "rb") as f:
+            if f.read(len(_MAGIC)) != _MAGIC:
+                raise ValueError(f"Not a fleet registry file: {path}")
+            header_len = int.from_bytes(f.read(8), "little")
+            header = json.loads(f.read(header_len).decode("utf-8"))
+            data_start = -(-(len(_MAGIC) + 8 + header_len) // _ALIGN) * _ALIGN
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if header['rows'] else None
+
+        registry = cls(capacity=0)
+        registry.makes = StringTable(header['makes'])
+        registry.models = StringTable(header['models'])
+        registry._size = n = header['rows']
+        for name, (dtype, offset) in header['columns'].items():
+            if n:
+                registry._columns[name] = np.frombuffer(
+                    buffer, dtype=dtype, count=n, offset=data_start + offset
+                )
+            else:
+                registry._columns[name] = np.zeros(0, dtype=dtype)
+        return registry
@@ -0,0 +1,360 @@
+"""
+TinyLLM-Auto: GGUF Preflight
+Reads GGUF metadata through mmap and checks a model fits before loading it
+"""
+
+import mmap
+import os
+import struct
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+MB = 1024 * 1024
+
+GGUF_MAGIC = b"GGUF"
+DEFAULT_ALIGNMENT = 32
+
+# GGML tensor types: id -> (name, elements per block, bytes per block)
+GGML_TYPES = {
+    0: ("F32", 1, 4),
+    1: ("F16", 1, 2),
+    2: ("Q4_0", 32, 18),
+    3: ("Q4_1", 32, 20),
+    6: ("Q5_0", 32, 22),
+    7: ("Q5_1", 32, 24),
+    8: ("Q8_0", 32, 34),
+    9: ("Q8_1", 32, 36),
+    10: ("Q2_K", 256, 84),
+    11: ("Q3_K", 256, 110),
+    12: ("Q4_K", 256, 144),
+    13: ("Q5_K", 256, 176),
+    14: ("Q6_K", 256, 210),
+    15: ("Q8_K", 256, 292),
+    16: ("IQ2_XXS", 256, 66),
+    17: ("IQ2_XS", 256, 74),
+    18: ("IQ3_XXS", 256, 98),
+    19: ("IQ1_S", 256, 50),
+    20: ("IQ4_NL", 32, 18),
+    21: ("IQ3_S", 256, 110),
+    22: ("IQ2_S", 256, 82),
+    23: ("IQ4_XS", 256, 136),
+    24: ("I8", 1, 1),
+    25: ("I16", 1, 2),
+    26: ("I32", 1, 4),
+    27: ("I64", 1, 8),
+    28: ("F64", 1, 8),
+    29: ("IQ1_M", 256, 56),
+    30: ("BF16", 1, 2),
+}
+
+# Metadata value types: id -> struct format (None = variable length)
+_VALUE_FORMATS = {
+    0: "<B", 1: "<b", 2: "<H", 3: "<h", 4: "<I", 5: "<i",
+    6: "<f", 7: "<?", 8: None, 9: None, 10: "<Q", 11: "<q", 12: "<d",
+}
+_STRING, _ARRAY = 8, 9
+
+# Arrays longer than this (tokenizer vocab, merges) are skipped, not materialized
+MAX_ARRAY_VALUES = 64
+
+
+class GGUFError(ValueError):
+    """File is not a readable GGUF model"""
+
+
+class PreflightError(RuntimeError):
+    """Model would fail or misbehave if loaded with the requested settings"""
+
+
+@dataclass
+class TensorInfo:
+    """Shape and type of one tensor (data is not read)"""
+    name: str
+    shape: Tuple[int, ...]
+    ggml_type: int
+    offset: int
+
+    @property
+    def type_name(self) -> str:
+        return GGML_TYPES.get(self.ggml_type, (f"type{self.ggml_type}",))[0]
+
+    @property
+    def n_elements(self) -> int:
+        count = 1
+        for dim in self.shape:
+            count *= dim
+        return count
+
+    @property
+    def nbytes(self) -> int:
+        if self.ggml_type not in GGML_TYPES:
+            raise GGUFError(f"Unknown GGML type {self.ggml_type} for tensor {self.name}")
+        _, block_size, type_size = GGML_TYPES[self.ggml_type]
+        return self.n_elements // block_size * type_size
+
+
+@dataclass
+class MemoryEstimate:
+    """Expected RAM for weights plus KV cache"""
+    weights_mb: float
+    kv_mb: float
+    context_size: int
+
+    @property
+    def total_mb(self) -> float:
+        return self.weights_mb + self.kv_mb
+
+
+@dataclass
+class GGUFInfo:
+    """Header of a GGUF file: metadata and tensor table"""
+    path: str
+    version: int
+    metadata: Dict[str, Any]
+    tensors: List[TensorInfo] = field(default_factory=list)
+
+    def _arch_value(self, key: str, default=None):
+        return self.metadata.get(f"{self.architecture}.{key}", default)
+
+    @property
+    def architecture(self) -> str:
+        return self.metadata.get("general.architecture", "unknown")
+
+    @property
+    def context_length(self) -> Optional[int]:
+        """Context size the model was trained with"""
+        return self._arch_value("context_length")
+
+    @property
+    def block_count(self) -> int:
+        return self._arch_value("block_count", 0)
+
+    @property
+    def embedding_length(self) -> int:
+        return self._arch_value("embedding_length", 0)
+
+    @property
+    def head_count(self) -> int:
+        return self._arch_value("attention.head_count", 0)
+
+    @property
+    def head_count_kv(self) -> int:
+        return self._arch_value("attention.head_count_kv", self.head_count)
+
+    @property
+    def kv_elements_per_token(self) -> int:
+        """K+V elements cached per token across all layers"""
+        if not self.head_count:
+            return 0
+        head_dim_k = self._arch_value("attention.key_length", self.embedding_length // self.head_count)
+        head_dim_v = self._arch_value("attention.value_length", head_dim_k)
+        return self.block_count * self.head_count_kv * (head_dim_k + head_dim_v)
+
+    @property
+    def quant_types(self) -> Dict[str, int]:
+        """Tensor count per GGML type"""
+        return dict(Counter(tensor.type_name for tensor in self.tensors))
+
+    @property
+    def weights_bytes(self) -> int:
+        return sum(tensor.nbytes for tensor in self.tensors)
+
+    def estimate_memory(self, context_size: int, kv_type: int = 1) -> MemoryEstimate:
+        """
+        Estimate weights + KV cache RAM for a context size
+
+        Args:
+            context_size: Context window to allocate
+            kv_type: GGML type of the K/V cache (1 = F16, 8 = Q8_0, ...)
+        """
+        _, block_size, type_size = GGML_TYPES[kv_type]
+        kv_bytes = context_size * self.kv_elements_per_token * type_size / block_size
+        return MemoryEstimate(self.weights_bytes / MB, kv_bytes / MB, context_size)
+
+    def summary(self) -> str:
+        quants = ", ".join(f"{name} x{count}" for name, count in sorted(self.quant_types.items()))
+        return (
+            f"{os.path.basename(self.path)}: {self.architecture}, "
+            f"{self.block_count} layers, trained context {self.context_length}, "
+            f"{self.weights_bytes / MB:.0f} MB weights ({quants})"
+        )
+
+
+class _Reader:
+    """Little-endian cursor over the mapped header"""
+
+    def __init__(self, buffer):
+        self.buffer = buffer
+        self.pos = 0
+
+    def unpack(self, fmt: str):
+        value, = struct.unpack_from(fmt, self.buffer, self.pos)
+        self.pos += struct.calcsize(fmt)
+        return value
+
+    def string(self) -> str:
+        length = self.unpack("<Q")
+        if self.pos + length > len(self.buffer):
+            raise GGUFError("Truncated GGUF header")
+        value = bytes(self.buffer[self.pos:self.pos + length]).decode("utf-8", errors="replace")
+        self.pos += length
+        return value
+
+    def skip(self, value_type: int):
+        """Advance past one value without decoding it"""
+        if value_type == _STRING:
+            length = self.unpack("<Q")
+            if self.pos + length > len(self.buffer):
+                raise GGUFError("Truncated GGUF header")
+            self.pos += length
+        elif value_type == _ARRAY:
+            item_type = self.unpack("<I")
+            count = self.unpack("<Q")
+            item_format = _VALUE_FORMATS.get(item_type)
+            if item_format is not None:
+                self.pos += count * struct.calcsize(item_format)
+            else:
+                for _ in range(count):
+                    self.skip(item_type)
+        elif value_type in _VALUE_FORMATS:
+            self.pos += struct.calcsize(_VALUE_FORMATS[value_type])
+        else:
+            raise GGUFError(f"Unknown metadata value type {value_type}")
+
+    def value(self, value_type: int):
+        if value_type == _STRING:
+            return self.string()
+        if value_type == _ARRAY:
+            item_type = self.unpack("<I")
+            count = self.unpack("<Q")
+            item_format = _VALUE_FORMATS.get(item_type)
+            if count > MAX_ARRAY_VALUES:
+                if item_format is not None:
+                    self.pos += count * struct.calcsize(item_format)
+                else:
+                    for _ in range(count):
+                        self.skip(item_type)
+                return f"<array of {count}>"
+            return [self.value(item_type) for _ in range(count)]
+        if value_type not in _VALUE_FORMATS:
+            raise GGUFError(f"Unknown metadata value type {value_type}")
+        return self.unpack(_VALUE_FORMATS[value_type])
+
+
+def read_gguf(path: str) -> GGUFInfo:
+    """
+    Read GGUF metadata and the tensor table without touching tensor data
+
+    The file is memory-mapped, so only the header pages are read from disk.
+
+    Raises:
+        GGUFError: If the file is not GGUF (e.g. legacy GGML) or is truncated
+    """
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size < 24:
+            raise GGUFError(f"{path} is too small to be a GGUF model")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            if mapped[:4] != GGUF_MAGIC:
+                raise GGUFError(
+                    f"{path} is not a GGUF file (magic {bytes(mapped[:4])!r}); "
+                    f"legacy GGML models must be converted"
+                )
+            reader = _Reader(mapped)
+            reader.pos = 4
+            try:
+                version = reader.unpack("<I")
+                # Version 1 used 32-bit counts
+                count_format = "<I" if version == 1 else "<Q"
+                tensor_count = reader.unpack(count_format)
+                kv_count = reader.unpack(count_format)
+
+                metadata = {}
+                for _ in range(kv_count):
+                    key = reader.string()
+                    metadata[key] = reader.value(reader.unpack("<I"))
+
+                tensors = []
+                for _ in range(tensor_count):
+                    name = reader.string()
+                    n_dims = reader.unpack("<I")
+                    shape = tuple(reader.unpack("<Q") for _ in range(n_dims))
+                    tensors.append(TensorInfo(name, shape, reader.unpack("<I"), reader.unpack("<Q")))
+            except struct.error:
+                raise GGUFError(f"Truncated GGUF header in {path}")
+
+    return GGUFInfo(path=path, version=version, metadata=metadata, tensors=tensors)
+
+
+def available_memory_mb() -> Optional[float]:
+    """MemAvailable from /proc/meminfo (None where unavailable)"""
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) / 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def preflight(
+    model_path: str,
+    context_size: int,
+    available_mb: Optional[float] = None,
+    kv_type: int = 1,
+    allowed_types: Optional[List[str]] = None,
+    check_memory: bool = True
+) -> GGUFInfo:
+    """
+    Fast-fail checks before loading a model
+
+    Args:
+        model_path: GGUF model file
+        context_size: Context window that will be requested
+        available_mb: RAM the model may use (default: MemAvailable)
+        kv_type: GGML type of the K/V cache
+        allowed_types: Acceptable weight quantizations (e.g. ["Q4_K", "Q6_K"]);
+            F32/F16 tensors (norms, biases) are always allowed
+        check_memory: Check the weights + KV estimate against available_mb
+
+    Returns:
+        GGUFInfo of the model
+
+    Raises:
+        FileNotFoundError: If the model file does not exist
+        GGUFError: If the file is not a GGUF model
+        PreflightError: If the quantization, trained context or memory is unsuitable
+    """
+    if not os.path.exists(model_path):
+        raise FileNotFoundError(f"Model file not found: {model_path}")
+
+    info = read_gguf(model_path)
+    problems = []
+
+    if allowed_types is not None:
+        allowed = set(allowed_types) | {"F32", "F16"}
+        unexpected = sorted(set(info.quant_types) - allowed)
+        if unexpected:
+            problems.append(
+                f"quantization {', '.join(unexpected)} is not one of {', '.join(allowed_types)}"
+            )
+
+    if info.context_length and context_size > info.context_length:
+        problems.append(
+            f"context_size {context_size} exceeds the trained context of {info.context_length}"
+        )
+
+    if check_memory:
+        if available_mb is None:
+            available_mb = available_memory_mb()
+        estimate = info.estimate_memory(context_size, kv_type)
+        if available_mb is not None and estimate.total_mb > available_mb:
+            problems.append(
+                f"needs ~{estimate.total_mb:.0f} MB ({estimate.weights_mb:.0f} MB weights + "
+                f"{estimate.kv_mb:.0f} MB KV cache) but only {available_mb:.0f} MB is available"
+            )
+
+    if problems:
+        raise PreflightError(f"{os.path.basename(model_path)}: " + "; ".join(problems))
+    return info
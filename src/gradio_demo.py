@@ -12,6 +12,7 @@ import sys
 sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
 
 from assistant import VehicleAssistant
+from gguf import preflight
 
 
 # Global assistant instance
@@ -34,9 +35,12 @@ def initialize_assistant():
         return None, "⚠️ Model not found! Please run: python scripts/download_model.py"
     
     try:
+        # Fast-fail on wrong format, too small a trained context or too little RAM
+        preflight(model_path, context_size=2048)
+        
         assistant = VehicleAssistant(
             model_path=model_path,
-            context_size=4096,
+            context_size=2048,
             verbose=True
         )
         
@@ -0,0 +1,161 @@
+"""
+TinyLLM-Auto: Intent Fast Path
+Precompiled matcher for high-frequency commands answered without the LLM
+"""
+
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, Optional, Tuple
+
+RESET = "reset"
+REPEAT = "repeat"
+MILEAGE = "mileage"
+DTC_LOOKUP = "dtc_lookup"
+
+# Common OBD-II codes answered from the table; anything else goes to the LLM
+DTC_DESCRIPTIONS = {
+    "P0101": "Mass air flow sensor circuit range/performance problem",
+    "P0128": "Coolant temperature below thermostat regulating temperature",
+    "P0171": "System too lean (Bank 1)",
+    "P0172": "System too rich (Bank 1)",
+    "P0174": "System too lean (Bank 2)",
+    "P0300": "Random/multiple cylinder misfire detected",
+    "P0301": "Cylinder 1 misfire detected",
+    "P0302": "Cylinder 2 misfire detected",
+    "P0303": "Cylinder 3 misfire detected",
+    "P0304": "Cylinder 4 misfire detected",
+    "P0401": "Exhaust gas recirculation flow insufficient",
+    "P0420": "Catalyst system efficiency below threshold (Bank 1)",
+    "P0430": "Catalyst system efficiency below threshold (Bank 2)",
+    "P0440": "Evaporative emission system malfunction",
+    "P0442": "Evaporative emission system small leak detected",
+    "P0455": "Evaporative emission system large leak detected",
+    "P0456": "Evaporative emission system very small leak detected",
+    "P0500": "Vehicle speed sensor malfunction",
+    "P0506": "Idle control system RPM lower than expected",
+    "P0507": "Idle control system RPM higher than expected",
+}
+
+# Longer utterances are real questions, not commands
+MAX_COMMAND_WORDS = 10
+
+_POLITE = r"(?:(?:hey|ok|okay|please|can you|could you|would you)\s+)*"
+
+# Whole-utterance patterns, so "reset the tire pressure light" is not a reset
+_PATTERNS = {
+    RESET: re.compile(
+        _POLITE + r"(?:reset|clear|start over|new conversation)"
+        r"(?:\s+(?:the\s+|this\s+|our\s+)?(?:conversation|chat|history))?(?:\s+please)?"
+    ),
+    REPEAT: re.compile(
+        _POLITE + r"(?:repeat(?:\s+(?:that|it|the answer))?|say\s+(?:that|it)\s+again"
+        r"|what did you (?:just )?say|come again)(?:\s+please)?"
+    ),
+    MILEAGE: re.compile(
+        _POLITE + r"(?:(?:what(?:'s|\s+is)\s+)?(?:my|the)\s+(?:current\s+)?"
+        r"(?:mileage|odometer(?:\s+reading)?)"
+        r"|how many miles (?:are|is|does) (?:on )?(?:my|the) (?:car|vehicle|truck)(?: have)?"
+        r"|how many miles (?:have i|has (?:my|the) (?:car|vehicle|truck)) (?:driven|done))"
+    ),
+    DTC_LOOKUP: re.compile(
+        _POLITE + r"(?:what(?:'s|\s+is|\s+does)\s+)?(?:the\s+)?(?:code\s+)?"
+        r"(?P<code>[pbcu][0-3][0-9a-f]{3})(?:\s+code)?(?:\s+mean)?"
+    ),
+}
+
+# Keyword index: an intent's pattern only runs if one of its trigger words is present
+_TRIGGERS = {
+    RESET: frozenset({"reset", "clear", "start", "new"}),
+    REPEAT: frozenset({"repeat", "again", "say", "come"}),
+    MILEAGE: frozenset({"mileage", "odometer", "miles"}),
+}
+_DTC_WORD = re.compile(r"\b[pbcu][0-3][0-9a-f]{3}\b")
+_PUNCTUATION = re.compile(r"[?.!,]+")
+
+
+@dataclass
+class IntentMatch:
+    """A recognized command"""
+    intent: str
+    slots: Dict[str, str] = field(default_factory=dict)
+
+
+def _normalize(text: str) -> str:
+    return " ".join(_PUNCTUATION.sub(" ", text.lower()).split())
+
+
+class IntentMatcher:
+    """
+    Deterministic matcher for commands that do not need the LLM.
+    A keyword index picks candidate intents, then precompiled full-match
+    patterns confirm them; unmatched traffic costs a few microseconds.
+    """
+
+    def __init__(self, dtc_descriptions: Optional[Dict[str, str]] = None):
+        """
+        Initialize the matcher
+
+        Args:
+            dtc_descriptions: Code -> description table for DTC lookups
+        """
+        self.dtc_descriptions = DTC_DESCRIPTIONS if dtc_descriptions is None else dtc_descriptions
+        self._index: Dict[str, Tuple[str, ...]] = {}
+        for intent, words in _TRIGGERS.items():
+            for word in words:
+                self._index[word] = self._index.get(word, ()) + (intent,)
+
+        self.total = 0
+        self.matched: Counter = Counter()
+
+    def _candidates(self, words) -> FrozenSet[str]:
+        candidates = set()
+        for word in words:
+            candidates.update(self._index.get(word, ()))
+            if _DTC_WORD.fullmatch(word):
+                candidates.add(DTC_LOOKUP)
+        return frozenset(candidates)
+
+    def match(self, text: str) -> Optional[IntentMatch]:
+        """
+        Recognize a command
+
+        Returns:
+            IntentMatch, or None if the utterance should go to the LLM
+        """
+        normalized = _normalize(text)
+        words = normalized.split()
+        if not words or len(words) > MAX_COMMAND_WORDS:
+            return None
+
+        for intent in sorted(self._candidates(words)):
+            found = _PATTERNS[intent].fullmatch(normalized)
+            if found is None:
+                continue
+            slots = {}
+            if intent == DTC_LOOKUP:
+                code = found.group("code").upper()
+                if code not in self.dtc_descriptions:
+                    continue
+                slots["code"] = code
+            return IntentMatch(intent, slots)
+        return None
+
+    def record(self, intent: Optional[str]):
+        """Count an utterance as handled by intent (None = went to the LLM)"""
+        self.total += 1
+        if intent is not None:
+            self.matched[intent] += 1
+
+    @property
+    def absorbed_fraction(self) -> float:
+        """Share of utterances handled without the LLM"""
+        return sum(self.matched.values()) / self.total if self.total else 0.0
+
+    def report(self) -> Dict:
+        return {
+            'utterances': self.total,
+            'absorbed': sum(self.matched.values()),
+            'absorbed_fraction': self.absorbed_fraction,
+            'by_intent': dict(self.matched),
+        }
@@ -0,0 +1,263 @@
+"""
+TinyLLM-Auto: Maintenance Schedule Engine
+Deterministic service intervals answered without the LLM
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+
+@dataclass(frozen=True)
+class MaintenanceRule:
+    """One service item and its interval"""
+    item: str
+    interval_miles: int
+    interval_months: int
+
+
+@dataclass
+class DueItem:
+    """Service status of one item for a vehicle"""
+    item: str
+    next_due_miles: int
+    miles_remaining: int
+    interval_miles: int
+    interval_months: int
+
+    @property
+    def status(self) -> str:
+        if self.miles_remaining < 0:
+            return "overdue"
+        return "upcoming" if self.miles_remaining <= UPCOMING_WINDOW_MILES else "ok"
+
+
+UPCOMING_WINDOW_MILES = 1500
+
+DEFAULT_RULES = (
+    MaintenanceRule("oil change", 7500, 12),
+    MaintenanceRule("tire rotation", 7500, 6),
+    MaintenanceRule("cabin air filter", 15000, 12),
+    MaintenanceRule("engine air filter", 30000, 36),
+    MaintenanceRule("brake fluid", 30000, 36),
+    MaintenanceRule("spark plugs", 100000, 120),
+    MaintenanceRule("coolant", 100000, 120),
+    MaintenanceRule("transmission fluid", 60000, 72),
+)
+
+# Manufacturer/platform overrides: (make, model or None, min model year) -> {item: (miles, months)}
+PLATFORM_OVERRIDES = {
+    ("toyota", None, 2018): {"oil change": (10000, 12), "tire rotation": (5000, 6)},
+    ("toyota", None, 0): {"oil change": (5000, 6), "tire rotation": (5000, 6)},
+    ("honda", None, 0): {"oil change": (7500, 12), "spark plugs": (105000, 120)},
+    ("ford", "f-150", 2015): {"oil change": (7500, 12), "spark plugs": (60000, 72)},
+    ("tesla", None, 0): {
+        "oil change": (0, 0),
+        "spark plugs": (0, 0),
+        "transmission fluid": (0, 0),
+        "tire rotation": (6250, 12),
+        "brake fluid": (50000, 48),
+    },
+}
+
+# Keywords that identify each item in a question
+ITEM_KEYWORDS = {
+    "oil change": ("oil",),
+    "tire rotation": ("rotate", "rotation"),
+    "cabin air filter": ("cabin filter", "cabin air"),
+    "engine air filter": ("air filter", "engine filter"),
+    "brake fluid": ("brake fluid",),
+    "spark plugs": ("spark plug",),
+    "coolant": ("coolant", "antifreeze"),
+    "transmission fluid": ("transmission fluid", "trans fluid", "atf"),
+}
+
+_SCHEDULE_QUESTION = re.compile(
+    r"\b(when|how often|how many miles|due|schedule|interval|overdue)\b",
+    re.IGNORECASE
+)
+# Symptoms turn a schedule-looking question into a diagnostic one
+_SYMPTOM_WORDS = re.compile(
+    r"\b(light|leak\w*|smell\w*|nois\w*|pressure|burn\w*|warning|smok\w*|low)\b",
+    re.IGNORECASE
+)
+_MAINTENANCE_TOPIC = re.compile(
+    r"\b(maintenance|service|servic\w+|oil|filter|rotat\w+|fluid|spark plugs?|coolant|tune.?up)\b",
+    re.IGNORECASE
+)
+
+
+class MaintenanceEngine:
+    """
+    Rule-table maintenance schedule with a precomputed interval index per platform.
+    Answers "when should I change my oil?"-style questions directly.
+    """
+
+    def __init__(self, rules=DEFAULT_RULES, overrides=None):
+        """
+        Initialize the engine
+
+        Args:
+            rules: Default MaintenanceRule table
+            overrides: Platform overrides (see PLATFORM_OVERRIDES)
+        """
+        self.rules = tuple(rules)
+        self.overrides = PLATFORM_OVERRIDES if overrides is None else overrides
+
+        # Most specific first: model-specific, then newest model-year threshold
+        self._override_keys = sorted(
+            self.overrides,
+            key=lambda key: (key[1] is not None, key[2]),
+            reverse=True
+        )
+        self._index: Dict[Tuple[str, str, int], Tuple[MaintenanceRule, ...]] = {}
+        self._keyword_patterns = {
+            item: re.compile(r"\b(" + "|".join(map(re.escape, words)) + r")", re.IGNORECASE)
+            for item, words in ITEM_KEYWORDS.items()
+        }
+
+    def schedule(self, make: str, model: str, year: int) -> Tuple[MaintenanceRule, ...]:
+        """
+        Interval table for a platform (computed once, then served from the index)
+
+        Returns:
+            Rules that apply to the platform, with zero-interval items removed
+        """
+        key = (make.lower(), model.lower(), year)
+        rules = self._index.get(key)
+        if rules is None:
+            rules = self._build_schedule(*key)
+            self._index[key] = rules
+        return rules
+
+    def _build_schedule(self, make: str, model: str, year: int) -> Tuple[MaintenanceRule, ...]:
+        intervals = {rule.item: (rule.interval_miles, rule.interval_months) for rule in self.rules}
+
+        # Apply the most specific matching override per item
+        applied = set()
+        for o_make, o_model, min_year in self._override_keys:
+            if o_make != make or (o_model is not None and o_model != model) or year < min_year:
+                continue
+            for item, interval in self.overrides[(o_make, o_model, min_year)].items():
+                if item not in applied:
+                    intervals[item] = interval
+                    applied.add(item)
+
+        return tuple(
+            MaintenanceRule(item, miles, months)
+            for item, (miles, months) in intervals.items()
+            if miles > 0
+        )
+
+    def due_items(
+        self,
+        context,
+        last_service: Optional[Dict[str, int]] = None
+    ) -> List[DueItem]:
+        """
+        Compute next-due mileage for every item, soonest first
+
+        Args:
+            context: VehicleContext (make, model, year, mileage)
+            last_service: Mileage each item was last done; items without a
+                record are assumed to have been done on schedule
+
+        Returns:
+            DueItems sorted by miles remaining (overdue items first)
+        """
+        mileage = context.mileage
+        last_service = last_service or {}
+        items = []
+        for rule in self.schedule(context.make, context.model, context.year):
+            last = last_service.get(rule.item)
+            if last is None:
+                last = mileage - mileage % rule.interval_miles
+            next_due = last + rule.interval_miles
+            items.append(DueItem(
+                rule.item, next_due, next_due - mileage, rule.interval_miles, rule.interval_months
+            ))
+        items.sort(key=lambda due: due.miles_remaining)
+        return items
+
+    def is_maintenance_question(self, question: str) -> bool:
+        return bool(_MAINTENANCE_TOPIC.search(question))
+
+    def is_schedule_question(self, question: str) -> bool:
+        """Timing question about service, whose answer depends on the mileage"""
+        return (
+            self.is_maintenance_question(question)
+            and bool(_SCHEDULE_QUESTION.search(question))
+            and not _SYMPTOM_WORDS.search(question)
+        )
+
+    def _items_in_question(self, question: str) -> List[str]:
+        return [item for item, pattern in self._keyword_patterns.items() if pattern.search(question)]
+
+    def answer(
+        self,
+        question: str,
+        context,
+        last_service: Optional[Dict[str, int]] = None
+    ) -> Optional[str]:
+        """
+        Answer a schedule question directly when confident
+
+        Confident means the question asks about timing ("when", "how often",
+        "due", ...) of exactly one known service item and mentions no symptoms.
+
+        Args:
+            question: User's question
+            context: VehicleContext (make, model, year, mileage)
+            last_service: Mileage each item was last done; without a record
+                the answer says it assumes on-schedule service
+
+        Returns:
+            Answer text, or None if the LLM should handle the question
+        """
+        if context is None or not _SCHEDULE_QUESTION.search(question):
+            return None
+        if _SYMPTOM_WORDS.search(question):
+            return None
+
+        items = self._items_in_question(question)
+        # "cabin air filter" also contains "air filter"; prefer the specific item
+        if set(items) == {"cabin air filter", "engine air filter"}:
+            items = ["cabin air filter"]
+        if len(items) != 1:
+            return None
+
+        due = next((d for d in self.due_items(context, last_service) if d.item == items[0]), None)
+        vehicle = f"{context.year} {context.make} {context.model}"
+        if due is None:
+            return f"Your {vehicle} does not need scheduled {items[0]} service."
+
+        if due.miles_remaining < 0:
+            timing = f"is overdue by {-due.miles_remaining:,} miles"
+        else:
+            timing = f"is due at {due.next_due_miles:,} miles (in {due.miles_remaining:,} miles)"
+        answer = (
+            f"Your {vehicle}'s next {due.item} {timing}. "
+            f"Recommended interval: every {due.interval_miles:,} miles "
+            f"or {due.interval_months} months, whichever comes first."
+        )
+        if due.item not in (last_service or {}):
+            answer += " This assumes it was last done on schedule."
+        return answer
+
+    def summary(
+        self,
+        context,
+        last_service: Optional[Dict[str, int]] = None,
+        limit: int = 3
+    ) -> str:
+        """Compact due-items summary for the LLM prompt"""
+        items = [d for d in self.due_items(context, last_service) if d.status != "ok"][:limit]
+        if not items:
+            items = self.due_items(context, last_service)[:1]
+        parts = [
+            f"{d.item} {d.status} at {d.next_due_miles:,} mi ({d.miles_remaining:+,} mi)"
+            if d.status == "overdue" else
+            f"{d.item} at {d.next_due_miles:,} mi (in {d.miles_remaining:,} mi)"
+            for d in items
+        ]
+        return "Maintenance due: " + "; ".join(parts)
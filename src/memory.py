@@ -0,0 +1,390 @@
+"""
+TinyLLM-Auto: Memory Governor
+Keeps the LLM, Whisper and TTS within a RAM budget on small devices
+"""
+
+import ctypes
+import gc
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+MB = 1024 * 1024
+
+# GGML tensor types accepted by llama.cpp for type_k / type_v
+GGML_TYPE_F16 = 1
+GGML_TYPE_Q8_0 = 8
+GGML_TYPE_Q4_0 = 2
+
+_KV_TYPE_BYTES = {
+    GGML_TYPE_F16: 2.0,
+    GGML_TYPE_Q8_0: 34 / 32,
+    GGML_TYPE_Q4_0: 18 / 32,
+}
+
+# Phi-2: 32 layers x 2560 embedding, K and V
+PHI2_KV_ELEMENTS_PER_TOKEN = 2 * 32 * 2560
+
+MIN_CONTEXT_SIZE = 512
+
+# Approximate resident size of the optional voice components
+WHISPER_ESTIMATES_MB = {"tiny": 150, "base": 300, "small": 900, "medium": 2600, "large": 4800}
+TTS_ESTIMATE_MB = 450
+
+
+def current_rss_bytes() -> int:
+    """Resident set size of this process (0 if it cannot be read)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def _return_freed_memory():
+    """Collect garbage and hand freed heap pages back to the OS (glibc only)"""
+    gc.collect()
+    try:
+        ctypes.CDLL("libc.so.6").malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
+
+
+def estimate_llm_mb(
+    model_path: str,
+    context_size: int,
+    kv_elements_per_token: int = PHI2_KV_ELEMENTS_PER_TOKEN
+) -> float:
+    """Rough weights + f16 KV cache size of a GGUF model"""
+    weights = os.path.getsize(model_path) if os.path.exists(model_path) else 0
+    kv = context_size * kv_elements_per_token * _KV_TYPE_BYTES[GGML_TYPE_F16]
+    return (weights + kv) / MB
+
+
+@dataclass
+class LLMLoadPlan:
+    """Load-time settings chosen to fit the memory budget"""
+    model_path: str
+    n_ctx: int
+    type_k: int
+    type_v: int
+    use_mmap: bool
+    use_mlock: bool
+    estimated_mb: float
+
+    def llama_kwargs(self) -> Dict:
+        """Keyword arguments for llama_cpp.Llama"""
+        kwargs = {
+            'n_ctx': self.n_ctx,
+            'use_mmap': self.use_mmap,
+            'use_mlock': self.use_mlock,
+        }
+        if self.type_k != GGML_TYPE_F16 or self.type_v != GGML_TYPE_F16:
+            # llama.cpp needs flash attention for a quantized V cache
+            kwargs.update(type_k=self.type_k, type_v=self.type_v, flash_attn=True)
+        return kwargs
+
+
+class _Component:
+    """Bookkeeping for one unloadable component"""
+
+    def __init__(self, name, loader, unloader, estimate_mb, pinned):
+        self.name = name
+        self.loader = loader
+        self.unloader = unloader
+        self.estimate_mb = estimate_mb
+        self.pinned = pinned
+        self.loaded = False
+        self.measured_mb = 0.0
+        self.last_used = 0.0
+        self.loads = 0
+        self.unloads = 0
+        self.last_load_s = 0.0
+
+    @property
+    def resident_mb(self) -> float:
+        if not self.loaded:
+            return 0.0
+        # The RSS change during load undercounts mmap'd weights, which are
+        # only paged in as they are first read
+        return max(self.measured_mb, self.estimate_mb)
+
+
+class MemoryGovernor:
+    """
+    Memory-budget governor for the assistant's components.
+    Plans LLM load settings and unloads idle components in LRU order.
+    Safe to call from several threads (voice, summarizer, scheduler).
+    """
+
+    def __init__(
+        self,
+        budget_mb: float,
+        reserve_mb: float = 300,
+        idle_timeout_s: Optional[float] = None,
+        verbose: bool = False
+    ):
+        """
+        Initialize the governor
+
+        Args:
+            budget_mb: Total RAM the assistant may use
+            reserve_mb: Headroom kept for Python, buffers and the OS page cache
+            idle_timeout_s: Unload components unused for this long (None = only on pressure)
+            verbose: Enable detailed logging
+        """
+        self.budget_mb = budget_mb
+        self.reserve_mb = reserve_mb
+        self.idle_timeout_s = idle_timeout_s
+        self.verbose = verbose
+        self._components: Dict[str, _Component] = {}
+        # Reentrant: loaders may plan (plan_llm) while acquire() holds it
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def available_mb(self) -> float:
+        return self.budget_mb - self.reserve_mb
+
+    def register(
+        self,
+        name: str,
+        loader: Callable[[], None],
+        unloader: Callable[[], None],
+        estimate_mb: float,
+        pinned: bool = False
+    ):
+        """
+        Register a component the governor may load and unload
+
+        Args:
+            name: Component name (e.g. "llm", "whisper", "tts")
+            loader: Loads the component
+            unloader: Drops all references to the component
+            estimate_mb: Expected resident size (the measured size counts if larger)
+            pinned: Never unload this component
+        """
+        with self._lock:
+            self._components[name] = _Component(name, loader, unloader, estimate_mb, pinned)
+
+    def plan_llm(
+        self,
+        model_paths: List[str],
+        context_size: int,
+        kv_elements_per_token: int = PHI2_KV_ELEMENTS_PER_TOKEN,
+        exclude: Optional[str] = None,
+        resident_mb: float = 0.0
+    ) -> LLMLoadPlan:
+        """
+        Choose model variant, context size, KV cache type and mmap/mlock
+
+        Variants are tried in order (largest/best first). For each, the full
+        context with an f16 cache is preferred, then a q8_0 cache, then a
+        smaller context, down to MIN_CONTEXT_SIZE.
+
+        Args:
+            model_paths: Candidate GGUF files, preferred first
+            context_size: Requested context window
+            kv_elements_per_token: K+V elements cached per token (all layers)
+            exclude: Component being planned; its memory does not count against
+                the budget and the plan becomes its estimate
+            resident_mb: Memory that stays in use while this model loads
+                (e.g. the model it replaces during a hot reload)
+
+        Returns:
+            LLMLoadPlan for the first variant that fits
+
+        Raises:
+            MemoryError: If no variant fits even at the minimum context
+        """
+        with self._lock:
+            # Unpinned components can be evicted to make room, pinned ones cannot
+            others = sum(
+                c.resident_mb for c in self._components.values()
+                if c.name != exclude and c.pinned
+            )
+            available = self.available_mb - others - resident_mb
+
+            for path in model_paths:
+                if not os.path.exists(path):
+                    continue
+                weights_mb = os.path.getsize(path) / MB
+
+                n_ctx = context_size
+                while n_ctx >= MIN_CONTEXT_SIZE:
+                    for kv_type in (GGML_TYPE_F16, GGML_TYPE_Q8_0):
+                        kv_mb = n_ctx * kv_elements_per_token * _KV_TYPE_BYTES[kv_type] / MB
+                        total = weights_mb + kv_mb
+                        if total <= available:
+                            plan = LLMLoadPlan(
+                                model_path=path,
+                                n_ctx=n_ctx,
+                                type_k=kv_type,
+                                type_v=kv_type,
+                                # mmap keeps weights in the page cache, so a reload
+                                # after unloading is fast
+                                use_mmap=True,
+                                # Only pin pages when there is comfortable headroom
+                                use_mlock=total <= 0.6 * available,
+                                estimated_mb=total,
+                            )
+                            if exclude in self._components:
+                                self._components[exclude].estimate_mb = total
+                            if self.verbose:
+                                print(f"LLM plan: {os.path.basename(path)}, n_ctx={n_ctx}, "
+                                      f"kv_type={kv_type}, ~{total:.0f} MB")
+                            return plan
+                    n_ctx //= 2
+
+            raise MemoryError(
+                f"No model variant fits in {available:.0f} MB "
+                f"(budget {self.budget_mb:.0f} MB, reserve {self.reserve_mb:.0f} MB)"
+            )
+
+    def acquire(self, name: str):
+        """
+        Make sure a component is loaded, unloading LRU idle ones if needed
+
+        Args:
+            name: Registered component name
+        """
+        with self._lock:
+            component = self._components[name]
+
+            if self.idle_timeout_s is not None:
+                self.unload_idle(self.idle_timeout_s, keep=name)
+
+            if not component.loaded:
+                self._make_room(component)
+
+                rss_before = current_rss_bytes()
+                start_time = time.time()
+                component.loader()
+                component.last_load_s = time.time() - start_time
+                delta = (current_rss_bytes() - rss_before) / MB
+                if delta > 0:
+                    component.measured_mb = delta
+                component.loaded = True
+                component.loads += 1
+
+                if self.verbose:
+                    print(f"Loaded {name} in {component.last_load_s:.2f}s "
+                          f"(~{component.resident_mb:.0f} MB)")
+
+            component.last_used = time.time()
+
+    def _make_room(self, incoming: _Component):
+        """Unload least recently used components until incoming fits"""
+        needed = max(incoming.measured_mb, incoming.estimate_mb)
+        candidates = sorted(
+            (c for c in self._components.values()
+             if c.loaded and not c.pinned and c is not incoming),
+            key=lambda c: c.last_used
+        )
+        for component in candidates:
+            if self.resident_mb + needed <= self.available_mb:
+                break
+            self.unload(component.name)
+
+    def unload(self, name: str):
+        """Unload a component and return its memory to the OS"""
+        with self._lock:
+            component = self._components[name]
+            if not component.loaded:
+                return
+            component.unloader()
+            component.loaded = False
+            component.unloads += 1
+            _return_freed_memory()
+
+            if self.verbose:
+                print(f"Unloaded {name}")
+
+    def unload_idle(self, idle_s: float, keep: Optional[str] = None):
+        """
+        Unload every unpinned component unused for at least idle_s seconds
+
+        Args:
+            idle_s: Idle threshold in seconds
+            keep: Component to leave loaded regardless
+        """
+        with self._lock:
+            now = time.time()
+            for component in list(self._components.values()):
+                if (
+                    component.loaded
+                    and not component.pinned
+                    and component.name != keep
+                    and now - component.last_used >= idle_s
+                ):
+                    self.unload(component.name)
+
+    def start(self, interval_s: Optional[float] = None):
+        """
+        Unload idle components in a background thread, so they are freed
+        even when nothing calls acquire()
+
+        Args:
+            interval_s: Seconds between sweeps (default: a quarter of idle_timeout_s)
+        """
+        if self.idle_timeout_s is None:
+            raise RuntimeError("start() requires idle_timeout_s to be set")
+        if self._thread is not None:
+            return
+        if interval_s is None:
+            interval_s = max(self.idle_timeout_s / 4, 0.01)
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, args=(interval_s,), name="memory-governor", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background thread"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self, interval_s: float):
+        while not self._stop.wait(interval_s):
+            self.unload_idle(self.idle_timeout_s)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    @property
+    def resident_mb(self) -> float:
+        with self._lock:
+            return sum(c.resident_mb for c in self._components.values())
+
+    def memory_report(self) -> Dict:
+        """Budget, process RSS and per-component residency"""
+        with self._lock:
+            now = time.time()
+            return {
+                'budget_mb': self.budget_mb,
+                'reserve_mb': self.reserve_mb,
+                'process_rss_mb': current_rss_bytes() / MB,
+                'components_mb': self.resident_mb,
+                'components': {
+                    c.name: {
+                        'loaded': c.loaded,
+                        'pinned': c.pinned,
+                        'rss_mb': c.resident_mb,
+                        'estimate_mb': c.estimate_mb,
+                        'idle_s': now - c.last_used if c.last_used else None,
+                        'loads': c.loads,
+                        'unloads': c.unloads,
+                        'last_load_s': c.last_load_s,
+                    }
+                    for c in self._components.values()
+                },
+            }
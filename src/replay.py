@@ -0,0 +1,205 @@
+"""
+TinyLLM-Auto: Record/Replay for LLM Calls
+Captures backend calls to a trace file and replays them without the model
+"""
+
+import gzip
+import hashlib
+import json
+import time
+from collections import defaultdict, deque
+from typing import Any, Dict, List, Optional
+
+try:
+    from .backends import BaseBackend
+except ImportError:  # src/ on sys.path (tests, demo.py)
+    from backends import BaseBackend
+
+TRACE_FORMAT = "tinyllm-trace"
+TRACE_VERSION = 2
+
+
+def call_key(prompt: str, params: Dict) -> str:
+    """Stable identifier for a call: prompt plus the sampling params that affect output"""
+    keyed = {
+        'prompt': prompt,
+        'max_tokens': params.get('max_tokens'),
+        'temperature': params.get('temperature'),
+        'stop': params.get('stop'),
+        'grammar': params.get('grammar'),
+    }
+    return hashlib.sha1(json.dumps(keyed, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class RecordingBackend(BaseBackend):
+    """
+    Wraps another backend and appends every streamed call to a trace file.
+    Records prompt hash, sampling params, output tokens and per-token timings.
+    """
+
+    name = "recording"
+
+    def __init__(self, backend, trace_path: str, include_prompts: bool = False):
+        """
+        Initialize the recorder
+
+        Args:
+            backend: Backend to record
+            trace_path: Gzipped JSONL trace file (appended to)
+            include_prompts: Store full prompt text (larger traces, easier debugging)
+        """
+        super().__init__()
+        self.backend = backend
+        self.trace_path = trace_path
+        self.include_prompts = include_prompts
+
+        with gzip.open(trace_path, "at", encoding="utf-8") as f:
+            f.write(json.dumps({'format': TRACE_FORMAT, 'version': TRACE_VERSION}) + "\n")
+
+    def _load(self):
+        self.backend.load()
+
+    def _close(self):
+        self.backend.close()
+
+    def tokenize(self, text: str) -> List[int]:
+        return self.backend.tokenize(text)
+
+    def prefill(self, prompt: str) -> int:
+        return self.backend.prefill(prompt)
+
+    def save_state(self) -> Any:
+        return self.backend.save_state()
+
+    def load_state(self, state: Any) -> None:
+        self.backend.load_state(state)
+
+    def set_compute(self, n_threads: Optional[int] = None, n_batch: Optional[int] = None) -> None:
+        self.backend.set_compute(n_threads, n_batch)
+
+    def load_adapter(self, path: str) -> Any:
+        return self.backend.load_adapter(path)
+
+    def set_adapter(self, adapter: Any, scale: float = 1.0) -> None:
+        self.backend.set_adapter(adapter, scale)
+
+    def free_adapter(self, adapter: Any) -> None:
+        self.backend.free_adapter(adapter)
+
+    def _write(self, record: Dict):
+        with gzip.open(self.trace_path, "at", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+
+    def _stream_tokens(self, prompt, max_tokens, temperature, stop, grammar):
+        params = {'max_tokens': max_tokens, 'temperature': temperature, 'stop': stop, 'grammar': grammar}
+        start_time = time.perf_counter()
+        tokens: List[str] = []
+        token_times: List[float] = []
+        finish_reason = "aborted"
+        try:
+            for piece in self.backend.stream(prompt, max_tokens, temperature, stop, grammar):
+                tokens.append(piece)
+                token_times.append(round(time.perf_counter() - start_time, 6))
+                yield piece
+            finish_reason = "length" if len(tokens) >= max_tokens else "stop"
+        finally:
+            record = {
+                'key': call_key(prompt, params),
+                'prompt_chars': len(prompt),
+                'params': params,
+                'tokens': tokens,
+                'token_times': token_times,
+                'finish_reason': finish_reason,
+            }
+            if self.include_prompts:
+                record['prompt'] = prompt
+            self._write(record)
+
+
+def load_trace(trace_path: str) -> List[Dict]:
+    """Read call records from a trace file"""
+    records = []
+    with gzip.open(trace_path, "rt", encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            if record.get('format') == TRACE_FORMAT:
+                if record['version'] > TRACE_VERSION:
+                    raise ValueError(f"Unsupported trace version {record['version']}")
+                continue
+            records.append(record)
+    return records
+
+
+class ReplayBackend(BaseBackend):
+    """
+    Backend that reproduces recorded calls without a model.
+    Calls are matched by prompt and sampling params; with realtime=True the
+    original time-to-first-token and inter-token gaps are reproduced.
+    """
+
+    name = "replay"
+
+    def __init__(self, trace_path: str, realtime: bool = False, strict: bool = True):
+        """
+        Initialize the replayer
+
+        Args:
+            trace_path: Trace file written by RecordingBackend
+            realtime: Reproduce original timings instead of running at full speed
+            strict: Raise on calls that are not in the trace; otherwise
+                fall back to the next unused record in recorded order
+        """
+        super().__init__()
+        self.realtime = realtime
+        self.strict = strict
+        self.records = load_trace(trace_path)
+        self._by_key = defaultdict(deque)
+        for record in self.records:
+            self._by_key[record['key']].append(record)
+        self._sequential = deque(self.records)
+        self.misses = 0
+        self._state: Optional[str] = None
+
+    def _next_record(self, prompt: str, params: Dict) -> Dict:
+        matches = self._by_key.get(call_key(prompt, params))
+        if matches:
+            record = matches[0]
+            # Keep the last match so repeated identical calls can replay it again
+            if len(matches) > 1:
+                matches.popleft()
+            return record
+
+        self.misses += 1
+        if self.strict or not self._sequential:
+            raise KeyError(
+                f"Call not found in trace (prompt {len(prompt)} chars, "
+                f"max_tokens={params.get('max_tokens')}); re-record the trace"
+            )
+        return self._sequential.popleft()
+
+    def tokenize(self, text: str) -> List[int]:
+        """Rough whitespace tokenization so callers can count prompt tokens"""
+        return list(range(len(text.split())))
+
+    def prefill(self, prompt: str) -> int:
+        self._state = prompt
+        return len(self.tokenize(prompt))
+
+    def save_state(self) -> Any:
+        return self._state
+
+    def load_state(self, state: Any) -> None:
+        self._state = state
+
+    def _stream_tokens(self, prompt, max_tokens, temperature, stop, grammar):
+        params = {'max_tokens': max_tokens, 'temperature': temperature, 'stop': stop, 'grammar': grammar}
+        record = self._next_record(prompt, params)
+        self._state = prompt
+
+        start_time = time.perf_counter()
+        for text, at in zip(record['tokens'], record['token_times']):
+            if self.realtime:
+                delay = at - (time.perf_counter() - start_time)
+                if delay > 0:
+                    time.sleep(delay)
+            yield text
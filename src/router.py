@@ -0,0 +1,255 @@
+"""
+TinyLLM-Auto: Query Router
+Dispatches questions between a small fast model and the full model
+"""
+
+import re
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional
+
+try:
+    from .assistant import VehicleAssistant
+    from .structured import find_dtc
+except ImportError:  # src/ on sys.path (tests, demo.py)
+    from assistant import VehicleAssistant
+    from structured import find_dtc
+
+
+SMALL = "small"
+LARGE = "large"
+
+# Driving hazards: the full model, and first in line (see scheduler.classify)
+_SAFETY_PATTERN = re.compile(
+    r"\b(brakes?|smoke|smoking|fire|burning|airbags?|overheat\w*|stall\w*|"
+    r"flashing|oil pressure|blowout|flat tire|fuel leak|leaking fuel|losing power|"
+    r"safe to drive|pull over)\b",
+    re.IGNORECASE
+)
+
+# Symptoms and diagnostics need the full model
+_DIAGNOSTIC_PATTERN = re.compile(
+    r"\b(check engine|warning lights?|light (is|came) on|noise|"
+    r"grind\w*|squeal\w*|leak\w*|smell\w*|"
+    r"overheat\w*|vibrat\w*|stall\w*|misfire\w*|won'?t start|diagnos\w*|"
+    r"why|broken|fail\w*|smoke|shak\w*)\b",
+    re.IGNORECASE
+)
+
+# Feature how-tos are well within reach of a sub-1B model
+_HOWTO_PATTERN = re.compile(
+    r"\b(how (do|can) i|turn (on|off)|pair|connect|set( up)?|adjust|enable|"
+    r"disable|where is|what button|activate|open|close)\b",
+    re.IGNORECASE
+)
+
+# Phrases that show the small model is out of its depth
+_UNCERTAIN_PATTERN = re.compile(
+    r"(i'?m not sure|i don'?t know|i am not sure|cannot answer|can'?t answer|unclear)",
+    re.IGNORECASE
+)
+
+MAX_SIMPLE_WORDS = 15
+
+
+@dataclass
+class RouteDecision:
+    """Result of classifying a question"""
+    route: str
+    intent: str
+    reason: str
+
+
+class RouteStats:
+    """Latency and escalation counters for one route"""
+
+    def __init__(self, window: int = 1000):
+        self.requests = 0
+        self.escalations = 0
+        self.total_latency = 0.0
+        self._latencies = deque(maxlen=window)
+
+    def record(self, latency: float):
+        self.requests += 1
+        self.total_latency += latency
+        self._latencies.append(latency)
+
+    def _percentile(self, q: float) -> float:
+        if not self._latencies:
+            return 0.0
+        ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def report(self) -> Dict[str, float]:
+        return {
+            'requests': self.requests,
+            'mean_latency_s': self.total_latency / self.requests if self.requests else 0.0,
+            'p50_latency_s': self._percentile(0.50),
+            'p95_latency_s': self._percentile(0.95),
+            'escalations': self.escalations,
+            'escalation_rate': self.escalations / self.requests if self.requests else 0.0,
+        }
+
+
+def classify_query(question: str) -> RouteDecision:
+    """
+    Cheap rules/keyword classification of query complexity and intent
+
+    Args:
+        question: User's question
+
+    Returns:
+        RouteDecision with route SMALL or LARGE and intent "safety",
+        "diagnostic", "feature" or "general"
+    """
+    if _SAFETY_PATTERN.search(question):
+        return RouteDecision(LARGE, "safety", "safety keywords")
+
+    if find_dtc(question):
+        return RouteDecision(LARGE, "diagnostic", "diagnostic code")
+
+    if _DIAGNOSTIC_PATTERN.search(question):
+        return RouteDecision(LARGE, "diagnostic", "symptom keywords")
+
+    words = len(question.split())
+    if _HOWTO_PATTERN.search(question) and words <= MAX_SIMPLE_WORDS:
+        return RouteDecision(SMALL, "feature", "how-to keywords")
+
+    if words > MAX_SIMPLE_WORDS:
+        return RouteDecision(LARGE, "general", "long question")
+
+    return RouteDecision(SMALL, "general", "short question")
+
+
+class QueryRouter:
+    """
+    Routing layer in front of two VehicleAssistant instances.
+    Simple questions go to a sub-1B model, hard diagnostics go to Phi-2.
+    """
+
+    def __init__(
+        self,
+        small_model_path: str,
+        large_model_path: str,
+        small_context_size: int = 2048,
+        large_context_size: int = 2048,
+        n_threads: Optional[int] = None,
+        classifier: Optional[Callable[[str], Optional[str]]] = None,
+        escalate_uncertain: bool = True,
+        verbose: bool = False
+    ):
+        """
+        Initialize the router
+
+        Args:
+            small_model_path: Path to the small (sub-1B) GGUF model
+            large_model_path: Path to the full GGUF model (e.g. Phi-2)
+            small_context_size: Context window for the small model
+            large_context_size: Context window for the large model
+            n_threads: Number of CPU threads per model (None = auto-detect)
+            classifier: Optional small classifier, called for questions the
+                rules send to the small model; returns SMALL, LARGE or None
+            escalate_uncertain: Re-ask the large model when the small
+                model's answer is empty or hedged
+            verbose: Enable detailed logging
+        """
+        self.classifier = classifier
+        self.escalate_uncertain = escalate_uncertain
+        self.verbose = verbose
+
+        # Each assistant owns its own Llama instance and therefore its own KV cache
+        self.assistants = {
+            SMALL: VehicleAssistant(
+                model_path=small_model_path,
+                context_size=small_context_size,
+                n_threads=n_threads,
+                verbose=verbose
+            ),
+            LARGE: VehicleAssistant(
+                model_path=large_model_path,
+                context_size=large_context_size,
+                n_threads=n_threads,
+                verbose=verbose
+            ),
+        }
+        self._share_history()
+
+        self.stats = {SMALL: RouteStats(), LARGE: RouteStats()}
+
+    def _share_history(self, source: str = LARGE):
+        """Point both assistants at one history so follow-ups work across routes"""
+        other = SMALL if source == LARGE else LARGE
+        self.assistants[other].conversation_history = self.assistants[source].conversation_history
+
+    def classify(self, question: str) -> RouteDecision:
+        """Classify a question, consulting the optional classifier model"""
+        decision = classify_query(question)
+
+        if decision.route == SMALL and self.classifier is not None:
+            route = self.classifier(question)
+            if route in (SMALL, LARGE) and route != decision.route:
+                return RouteDecision(route, decision.intent, "classifier")
+
+        return decision
+
+    def set_vehicle_context(self, make: str, model: str, year: int, mileage: int, vin: Optional[str] = None):
+        """Set the vehicle context on both models"""
+        for assistant in self.assistants.values():
+            assistant.set_vehicle_context(make, model, year, mileage, vin)
+
+    def _needs_escalation(self, response: str) -> bool:
+        return not response.strip() or bool(_UNCERTAIN_PATTERN.search(response))
+
+    def ask(self, question: str, **kwargs):
+        """
+        Route a question to the appropriate model
+
+        Args:
+            question: User's question
+            **kwargs: Passed through to VehicleAssistant.ask
+
+        Returns:
+            Assistant's response
+        """
+        decision = self.classify(question)
+
+        if self.verbose:
+            print(f"Route: {decision.route} ({decision.intent}, {decision.reason})")
+
+        start_time = time.time()
+        response = self.assistants[decision.route].ask(question, **kwargs)
+        self.stats[decision.route].record(time.time() - start_time)
+        # A "reset" command gives the routed assistant a new history list
+        self._share_history(source=decision.route)
+
+        if (
+            decision.route == SMALL
+            and self.escalate_uncertain
+            and isinstance(response, str)
+            and self._needs_escalation(response)
+        ):
+            self.stats[SMALL].escalations += 1
+
+            if self.verbose:
+                print("Small model answer was uncertain, escalating")
+
+            # Drop the small model's turn so history only holds the final answer
+            history = self.assistants[SMALL].conversation_history
+            if history and history[-1]['user'] == question:
+                history.pop()
+
+            start_time = time.time()
+            response = self.assistants[LARGE].ask(question, **kwargs)
+            self.stats[LARGE].record(time.time() - start_time)
+
+        return response
+
+    def reset_conversation(self):
+        """Clear the shared conversation history"""
+        self.assistants[LARGE].reset_conversation()
+        self._share_history()
+
+    def route_report(self) -> Dict[str, Dict[str, float]]:
+        """Per-route request counts, latencies and escalation rates"""
+        return {route: stats.report() for route, stats in self.stats.items()}
@@ -0,0 +1,468 @@
+"""
+TinyLLM-Auto: Request Scheduler
+Priority queue in front of a VehicleAssistant with token-boundary preemption
+"""
+
+import itertools
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Dict, List, Optional
+
+try:
+    from .assistant import STOP_SEQUENCES, VehicleContext
+    from .cancellation import Answer, CancellationToken, trim_to_sentence
+    from .router import classify_query
+except ImportError:  # src/ on sys.path (tests, demo.py)
+    from assistant import STOP_SEQUENCES, VehicleContext
+    from cancellation import Answer, CancellationToken, trim_to_sentence
+    from router import classify_query
+
+
+class Priority(IntEnum):
+    """Request classes, most urgent first"""
+    SAFETY = 0
+    DIAGNOSTIC = 1
+    GENERAL = 2
+
+
+_INTENT_PRIORITY = {"safety": Priority.SAFETY, "diagnostic": Priority.DIAGNOSTIC}
+
+
+def classify(question: str) -> Priority:
+    """
+    Pick a priority class from the question text (router.classify_query intent)
+
+    Args:
+        question: User's question
+
+    Returns:
+        SAFETY for urgent driving hazards, DIAGNOSTIC for codes, warning
+        lights and symptoms, GENERAL otherwise
+    """
+    return _INTENT_PRIORITY.get(classify_query(question).intent, Priority.GENERAL)
+
+
+@dataclass
+class Session:
+    """Conversation state of one caller (driver display, phone app, ...)"""
+    session_id: str
+    vehicle_context: Optional[VehicleContext] = None
+    adapter: Optional[str] = None
+    conversation_history: List[Dict[str, str]] = field(default_factory=list)
+    conversation_summary: str = ""
+    summarized_turns: int = 0
+    last_served: int = 0
+
+
+class ScheduledRequest:
+    """A queued question; result() blocks until it is answered"""
+
+    def __init__(
+        self,
+        question: str,
+        session_id: str,
+        priority: Priority,
+        max_tokens: int,
+        temperature: float,
+        cancel_token: Optional[CancellationToken] = None
+    ):
+        self.question = question
+        self.session_id = session_id
+        self.priority = priority
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+        # Deadline counts from submission, so time spent queued is included
+        self.cancel_token = cancel_token or CancellationToken()
+
+        # Generation state kept across preemptions
+        self.prompt: Optional[str] = None
+        self.pieces: List[str] = []
+        self.preemptions = 0
+        self.ttft_s: Optional[float] = None
+
+        self.submitted_at = time.perf_counter()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._future: Future = Future()
+
+    def done(self) -> bool:
+        return self._future.done()
+
+    def cancel(self):
+        """Stop the request, queued or running, at the next token boundary"""
+        self.cancel_token.cancel()
+
+    def result(self, timeout: Optional[float] = None) -> Answer:
+        """Wait for the answer (raises TimeoutError, or the error that failed the request)"""
+        return self._future.result(timeout)
+
+    @property
+    def wait_s(self) -> float:
+        """Time spent queued before the first token of work"""
+        return (self.started_at or time.perf_counter()) - self.submitted_at
+
+    @property
+    def latency_s(self) -> float:
+        return (self.finished_at or time.perf_counter()) - self.submitted_at
+
+
+class RequestScheduler:
+    """
+    Thread-safe priority scheduler in front of one VehicleAssistant.
+
+    One worker thread owns the model. Queued requests are served by
+    priority class; within a class, the session served least recently goes
+    first so one chatty caller cannot starve the others. A running
+    generation checks for more urgent work after every decoded token and,
+    if there is some, is suspended with its partial answer and requeued;
+    it later resumes by prompting with prompt + partial answer.
+    """
+
+    def __init__(self, assistant, verbose: bool = False):
+        """
+        Initialize the scheduler
+
+        Args:
+            assistant: VehicleAssistant to run requests on. Route all
+                requests through the scheduler: each session's history is
+                swapped into the assistant only while its request runs.
+            verbose: Print scheduling decisions
+        """
+        self.assistant = assistant
+        self.verbose = verbose
+
+        self._sessions: Dict[str, Session] = {}
+        self._queues: Dict[Priority, Dict[str, deque]] = {priority: {} for priority in Priority}
+        self._depth = [0] * len(Priority)
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._served = itertools.count(1)
+        self.running: Optional[ScheduledRequest] = None
+
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.preemptions = 0
+        self.max_depth = [0] * len(Priority)
+        self._wait_total = [0.0] * len(Priority)
+        self._latency_total = [0.0] * len(Priority)
+        self._completed_by = [0] * len(Priority)
+
+    def __enter__(self) -> "RequestScheduler":
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def start(self):
+        """Start the worker thread"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="request-scheduler", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop the worker after the running request; queued requests fail"""
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+        with self._cond:
+            pending = [request for queues in self._queues.values() for queue in queues.values() for request in queue]
+            for queues in self._queues.values():
+                queues.clear()
+            self._depth = [0] * len(Priority)
+        for request in pending:
+            request._future.set_exception(RuntimeError("Request scheduler stopped"))
+
+    def open_session(
+        self,
+        session_id: str,
+        vehicle_context: Optional[VehicleContext] = None,
+        adapter: Optional[str] = None
+    ) -> Session:
+        """
+        Create (or return) a session
+
+        Args:
+            session_id: Caller identifier
+            vehicle_context: Vehicle for this session (None = the assistant's)
+            adapter: LoRA adapter for this session (None = the assistant's
+                choice; see VehicleAssistant.enable_adapters)
+        """
+        with self._cond:
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = Session(session_id, vehicle_context, adapter)
+                self._sessions[session_id] = session
+            else:
+                if vehicle_context is not None:
+                    session.vehicle_context = vehicle_context
+                if adapter is not None:
+                    session.adapter = adapter
+            return session
+
+    def submit(
+        self,
+        question: str,
+        session_id: str = "default",
+        priority: Optional[Priority] = None,
+        max_tokens: int = 256,
+        temperature: float = 0.7,
+        timeout_s: Optional[float] = None,
+        cancel_token: Optional[CancellationToken] = None
+    ) -> ScheduledRequest:
+        """
+        Queue a question
+
+        Args:
+            question: User's question
+            session_id: Session whose history the question belongs to
+            priority: Priority class (None = classify the question)
+            max_tokens: Maximum tokens to generate
+            temperature: Sampling temperature
+            timeout_s: Time budget from submission, queueing included;
+                generation stops at the first token boundary past it
+            cancel_token: Token whose cancel() stops the request
+
+        Returns:
+            ScheduledRequest; call result() for the answer (an Answer,
+            flagged partial when it was cut short)
+        """
+        if priority is None:
+            priority = classify(question)
+        budget = CancellationToken(timeout_s=timeout_s, parent=cancel_token)
+        request = ScheduledRequest(question, session_id, Priority(priority), max_tokens, temperature, budget)
+        self.open_session(session_id)
+        with self._cond:
+            self._enqueue(request)
+            self.submitted += 1
+            self._cond.notify()
+
+        if self.verbose:
+            print(f"Queued {request.priority.name} request from {session_id}: {question}")
+        return request
+
+    def ask(self, question: str, session_id: str = "default", timeout: Optional[float] = None, **kwargs) -> Answer:
+        """Submit a question and wait for the answer (timeout bounds the wait, timeout_s the request)"""
+        return self.submit(question, session_id, **kwargs).result(timeout)
+
+    def _enqueue(self, request: ScheduledRequest, front: bool = False):
+        queue = self._queues[request.priority].setdefault(request.session_id, deque())
+        if front:
+            queue.appendleft(request)
+        else:
+            queue.append(request)
+        self._depth[request.priority] += 1
+        self.max_depth[request.priority] = max(self.max_depth[request.priority], self._depth[request.priority])
+
+    def _next_request(self) -> Optional[ScheduledRequest]:
+        """Most urgent request, least recently served session first (caller holds the lock)"""
+        for priority in Priority:
+            queues = self._queues[priority]
+            if not queues:
+                continue
+            session_id = min(queues, key=lambda sid: self._sessions[sid].last_served)
+            queue = queues[session_id]
+            request = queue.popleft()
+            if not queue:
+                del queues[session_id]
+            self._depth[priority] -= 1
+            self._sessions[session_id].last_served = next(self._served)
+            return request
+        return None
+
+    def _should_preempt(self, priority: Priority) -> bool:
+        with self._cond:
+            return any(self._depth[:priority])
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._stop.is_set() and not any(self._depth):
+                    self._cond.wait()
+                if self._stop.is_set():
+                    return
+                request = self._next_request()
+                self.running = request
+            try:
+                self._serve(request)
+            finally:
+                self.running = None
+
+    @contextmanager
+    def _bound(self, session: Session):
+        """Swap a session's conversation state into the assistant"""
+        assistant = self.assistant
+        saved = (
+            assistant.vehicle_context,
+            assistant.adapter,
+            assistant.conversation_history,
+            assistant.conversation_summary,
+            assistant._summarized_turns,
+        )
+        # Sessions without their own vehicle or adapter use the assistant's
+        assistant.vehicle_context = session.vehicle_context or saved[0]
+        assistant.adapter = session.adapter or saved[1]
+        assistant.conversation_history = session.conversation_history
+        assistant.conversation_summary = session.conversation_summary
+        assistant._summarized_turns = session.summarized_turns
+        try:
+            yield
+        finally:
+            # reset_conversation() replaces the list, so read everything back
+            session.conversation_history = assistant.conversation_history
+            session.conversation_summary = assistant.conversation_summary
+            session.summarized_turns = assistant._summarized_turns
+            (
+                assistant.vehicle_context,
+                assistant.adapter,
+                assistant.conversation_history,
+                assistant.conversation_summary,
+                assistant._summarized_turns,
+            ) = saved
+
+    def _serve(self, request: ScheduledRequest):
+        """Run a request until it finishes or is preempted"""
+        if request.started_at is None:
+            request.started_at = time.perf_counter()
+        assistant = self.assistant
+        try:
+            with assistant._llm_lock, self._bound(self._sessions[request.session_id]):
+                with assistant.tracer.trace(
+                    "scheduled_request",
+                    priority=request.priority.name,
+                    session=request.session_id,
+                    resumed=request.preemptions
+                ):
+                    response = self._respond(request)
+        except Exception as e:
+            with self._cond:
+                self.failed += 1
+            request.finished_at = time.perf_counter()
+            request._future.set_exception(e)
+            return
+
+        if response is None:
+            request.preemptions += 1
+            with self._cond:
+                self.preemptions += 1
+                self._enqueue(request, front=True)
+            if self.verbose:
+                print(
+                    f"Preempted {request.priority.name} request from {request.session_id} "
+                    f"after {len(request.pieces)} tokens"
+                )
+            return
+
+        request.finished_at = time.perf_counter()
+        with self._cond:
+            self.completed += 1
+            self._completed_by[request.priority] += 1
+            self._wait_total[request.priority] += request.wait_s
+            self._latency_total[request.priority] += request.latency_s
+        request._future.set_result(response)
+
+    def _respond(self, request: ScheduledRequest) -> Optional[Answer]:
+        """Answer, or None if more urgent work preempted the generation"""
+        assistant = self.assistant
+        question = request.question
+        budget = request.cancel_token
+
+        if request.prompt is None:
+            response = assistant.answer_command(question)
+            if response is None:
+                response = assistant.answer_offline(question)
+            if response is None and assistant.cached_only:
+                response = assistant._answer_llm(question)
+            if response is not None:
+                return response if isinstance(response, Answer) else Answer(response)
+
+        with assistant._request_scope():
+            with assistant.tracer.span("load_model"):
+                assistant._load_llm()
+            assistant._use_adapter()
+            if request.prompt is None:
+                with assistant.tracer.span("build_prompt"):
+                    request.prompt = assistant._build_prompt(question)
+
+            # A resumed request continues from its partial answer
+            max_tokens = assistant._token_budget(request.max_tokens)
+            stop_reason = budget.stop_reason()
+            # A resumed request that already used its budget (e.g. after the
+            # cap was lowered) is finished; max_tokens=0 would mean unlimited
+            if stop_reason is None and len(request.pieces) < max_tokens:
+                partial = "".join(request.pieces)
+                stream = assistant._llm.stream(
+                    request.prompt + partial,
+                    max_tokens - len(request.pieces),
+                    request.temperature,
+                    stop=STOP_SEQUENCES
+                )
+                traced = assistant.tracer.traced_stream(stream)
+                try:
+                    with assistant.tracer.span("generate", max_tokens=max_tokens):
+                        for piece in traced:
+                            request.pieces.append(piece)
+                            if request.ttft_s is None:
+                                request.ttft_s = time.monotonic() - budget.started_at
+                            stop_reason = budget.stop_reason()
+                            if stop_reason is not None:
+                                break
+                            if len(request.pieces) < max_tokens and self._should_preempt(request.priority):
+                                return None
+                finally:
+                    traced.close()
+                    stream.close()
+            assistant._record_latency(budget, request.ttft_s, stop_reason)
+
+        text = "".join(request.pieces)
+        # Stop sequences can straddle a preemption point
+        for sequence in STOP_SEQUENCES:
+            text = text.split(sequence, 1)[0]
+        text = text.strip()
+        if stop_reason is None:
+            answer = Answer(text, completion_tokens=len(request.pieces))
+        else:
+            answer = Answer(
+                trim_to_sentence(text), partial=True, stop_reason=stop_reason,
+                completion_tokens=len(request.pieces)
+            )
+        # Answers cut to nothing are not a turn
+        if answer or not answer.partial:
+            assistant._record_turn(question, answer, answer.partial)
+        return answer
+
+    def metrics(self) -> Dict:
+        """Queue depths, throughput and per-class wait/latency"""
+        with self._cond:
+            by_class = {}
+            for priority in Priority:
+                completed = self._completed_by[priority]
+                by_class[priority.name.lower()] = {
+                    'queue_depth': self._depth[priority],
+                    'max_queue_depth': self.max_depth[priority],
+                    'completed': completed,
+                    'mean_wait_s': self._wait_total[priority] / completed if completed else 0.0,
+                    'mean_latency_s': self._latency_total[priority] / completed if completed else 0.0,
+                }
+            return {
+                'queue_depth': sum(self._depth),
+                'submitted': self.submitted,
+                'completed': self.completed,
+                'failed': self.failed,
+                'preemptions': self.preemptions,
+                'running': self.running.priority.name.lower() if self.running else None,
+                'sessions': len(self._sessions),
+                'by_class': by_class,
+            }
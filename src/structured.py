@@ -0,0 +1,172 @@
+"""
+TinyLLM-Auto: Structured Diagnostic Answers
+Grammar-constrained output for diagnostic trouble code (DTC) questions
+"""
+
+import json
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+
+# OBD-II trouble code: system letter, generic/manufacturer digit, 3 hex digits
+DTC_PATTERN = re.compile(r"\b([PBCU][0-3][0-9A-F]{3})\b", re.IGNORECASE)
+
+SEVERITY_LEVELS = ("low", "moderate", "high", "critical")
+
+# Per-field character caps for structured answers, enforced by the grammar
+# (roughly 40/16/48 tokens of English text). The token budget of a request
+# is bounded separately (see structured_max_tokens).
+DEFAULT_FIELD_CHAR_CAPS = {
+    "meaning": 160,
+    "cause": 64,
+    "next_steps": 192,
+}
+MAX_CAUSES = 3
+MIN_CHARS_PER_TOKEN = 1
+
+# Characters of JSON keys, quotes, punctuation, the longest enum/boolean
+# values and the optional whitespace the grammar allows
+_STRUCTURE_CHAR_OVERHEAD = 128
+
+
+def find_dtc(text: str) -> Optional[str]:
+    """
+    Find the first diagnostic trouble code mentioned in a question
+
+    Args:
+        text: User's question
+
+    Returns:
+        Upper-cased code (e.g. "P0420") or None if no code is present
+    """
+    match = DTC_PATTERN.search(text)
+    return match.group(1).upper() if match else None
+
+
+def build_dtc_grammar(field_char_caps: Optional[Dict[str, int]] = None) -> str:
+    """
+    Build a GBNF grammar for a structured DTC answer
+
+    The grammar fixes the key order, bounds every free-text field and ends
+    at the closing brace, so llama.cpp can only emit EOS once the object
+    is complete.
+
+    Args:
+        field_char_caps: Character caps per free-text field (see DEFAULT_FIELD_CHAR_CAPS)
+
+    Returns:
+        Grammar source in llama.cpp GBNF format
+    """
+    caps = dict(DEFAULT_FIELD_CHAR_CAPS)
+    if field_char_caps:
+        caps.update(field_char_caps)
+
+    severity = " | ".join(f'"\\"{level}\\""' for level in SEVERITY_LEVELS)
+
+    return "\n".join([
+        'root ::= "{" ws "\\"meaning\\":" ws meaning "," ws '
+        '"\\"causes\\":" ws causes "," ws '
+        '"\\"severity\\":" ws severity "," ws '
+        '"\\"safe_to_drive\\":" ws boolean "," ws '
+        '"\\"next_steps\\":" ws next-steps ws "}"',
+        f'meaning ::= "\\"" char{{1,{caps["meaning"]}}} "\\""',
+        f'cause ::= "\\"" char{{1,{caps["cause"]}}} "\\""',
+        f'causes ::= "[" ws cause ("," ws cause){{0,{MAX_CAUSES - 1}}} ws "]"',
+        f"severity ::= {severity}",
+        'boolean ::= "true" | "false"',
+        f'next-steps ::= "\\"" char{{1,{caps["next_steps"]}}} "\\""',
+        'char ::= [^"\\\\\\x7F\\x00-\\x1F]',
+        "ws ::= [ \\n]{0,2}",
+    ]) + "\n"
+
+
+def structured_max_chars(field_char_caps: Optional[Dict[str, int]] = None) -> int:
+    """Longest structured answer the grammar allows, in characters"""
+    caps = dict(DEFAULT_FIELD_CHAR_CAPS)
+    if field_char_caps:
+        caps.update(field_char_caps)
+    field_chars = caps["meaning"] + caps["cause"] * MAX_CAUSES + caps["next_steps"]
+    return field_chars + _STRUCTURE_CHAR_OVERHEAD
+
+
+def structured_max_tokens(
+    max_tokens: Optional[int] = None,
+    field_char_caps: Optional[Dict[str, int]] = None
+) -> int:
+    """
+    Token budget for a structured answer
+
+    Args:
+        max_tokens: Caller's token budget (None = unbounded)
+        field_char_caps: Character caps per free-text field
+
+    Returns:
+        Tokens needed to close the longest answer at worst-case tokenization,
+        capped at max_tokens. An answer that tokenizes poorly may then not
+        close, and the caller falls back to free text.
+    """
+    worst_case = -(-structured_max_chars(field_char_caps) // MIN_CHARS_PER_TOKEN)
+    return worst_case if max_tokens is None else min(worst_case, max_tokens)
+
+
+@dataclass
+class DTCAnswer:
+    """Typed answer for a diagnostic trouble code question"""
+    code: str
+    meaning: str
+    causes: List[str] = field(default_factory=list)
+    severity: str = "moderate"
+    safe_to_drive: bool = True
+    next_steps: str = ""
+
+    @classmethod
+    def from_json(cls, code: str, text: str) -> "DTCAnswer":
+        """
+        Parse grammar-constrained model output
+
+        Args:
+            code: The diagnostic code the question was about
+            text: JSON object generated by the model
+
+        Returns:
+            Parsed DTCAnswer
+
+        Raises:
+            ValueError: If the output is not a complete structured answer
+        """
+        try:
+            data = json.loads(text)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Structured answer for {code} is not valid JSON: {e}")
+
+        missing = [
+            key for key in ("meaning", "causes", "severity", "safe_to_drive", "next_steps")
+            if key not in data
+        ]
+        if missing:
+            raise ValueError(f"Structured answer for {code} is missing: {', '.join(missing)}")
+
+        return cls(
+            code=code,
+            meaning=data["meaning"].strip(),
+            causes=[cause.strip() for cause in data["causes"]],
+            severity=data["severity"],
+            safe_to_drive=bool(data["safe_to_drive"]),
+            next_steps=data["next_steps"].strip(),
+        )
+
+    def to_text(self) -> str:
+        """Render the answer as plain text (for history, display and TTS)"""
+        causes = ", ".join(self.causes) if self.causes else "unknown"
+        safe = "Yes" if self.safe_to_drive else "No"
+        return (
+            f"{self.code}: {self.meaning}\n"
+            f"Likely causes: {causes}\n"
+            f"Severity: {self.severity}\n"
+            f"Safe to drive: {safe}\n"
+            f"Next steps: {self.next_steps}"
+        )
+
+    def __str__(self) -> str:
+        return self.to_text()
@@ -0,0 +1,182 @@
+"""
+TinyLLM-Auto: Background History Summarizer
+Folds aged-out conversation turns into a bounded running summary
+"""
+
+import os
+import threading
+import time
+from typing import Dict, List
+
+
+SUMMARY_INSTRUCTIONS = (
+    "Update the running summary of a conversation between a driver and their "
+    "vehicle assistant. Keep vehicle problems, diagnostic codes, advice given "
+    "and decisions made. Use at most {max_words} words."
+)
+
+
+class HistorySummarizer:
+    """
+    Idle-time summarizer for a VehicleAssistant.
+    Runs the loaded model at low priority between user queries and is
+    preempted at the next token boundary as soon as a real request arrives.
+    """
+
+    def __init__(
+        self,
+        assistant,
+        idle_delay_s: float = 2.0,
+        max_summary_words: int = 80,
+        poll_interval_s: float = 0.25
+    ):
+        """
+        Initialize the summarizer
+
+        Args:
+            assistant: VehicleAssistant whose history is summarized
+            idle_delay_s: Quiet time after a request before summarizing
+            max_summary_words: Bound on the running summary length
+            poll_interval_s: How often the background thread checks for work
+        """
+        self.assistant = assistant
+        self.idle_delay_s = idle_delay_s
+        self.max_summary_words = max_summary_words
+        self.poll_interval_s = poll_interval_s
+
+        self._preempt = threading.Event()
+        self._stop = threading.Event()
+        # Guards _active_requests and _last_activity (request threads + this one)
+        self._lock = threading.Lock()
+        self._active_requests = 0
+        self._last_activity = time.time()
+        self._thread = None
+
+        self.runs = 0
+        self.preemptions = 0
+
+    def start(self):
+        """Start the background thread"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="history-summarizer", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop the background thread (preempting any running summary)"""
+        self._stop.set()
+        self._preempt.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def request_started(self):
+        """Called by ask(): preempt summarization and hold it off"""
+        with self._lock:
+            self._active_requests += 1
+        self._preempt.set()
+
+    def request_finished(self):
+        """Called by ask() when the response is complete"""
+        with self._lock:
+            self._active_requests -= 1
+            self._last_activity = time.time()
+
+    def _is_idle(self) -> bool:
+        with self._lock:
+            return (
+                self._active_requests == 0
+                and time.time() - self._last_activity >= self.idle_delay_s
+            )
+
+    def _busy(self) -> bool:
+        with self._lock:
+            return self._active_requests > 0
+
+    def _run(self):
+        # Linux threads are schedulable tasks, so this lowers only this thread,
+        # which runs its share of each decode. llama.cpp's worker threads keep
+        # the priority they were created with; preemption at the next token
+        # boundary, not niceness, is what keeps requests responsive.
+        try:
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 19)
+        except (AttributeError, OSError):
+            pass
+
+        while not self._stop.is_set():
+            if self._is_idle() and self.pending_turns():
+                self.run_once()
+            self._stop.wait(self.poll_interval_s)
+
+    def pending_turns(self) -> List[Dict[str, str]]:
+        """Turns that have aged out of the prompt window but are not yet summarized"""
+        assistant = self.assistant
+        aged_out = len(assistant.conversation_history) - assistant.history_window
+        if aged_out <= assistant._summarized_turns:
+            return []
+        return assistant.conversation_history[assistant._summarized_turns:aged_out]
+
+    def _summary_prompt(self, turns: List[Dict[str, str]]) -> str:
+        parts = [SUMMARY_INSTRUCTIONS.format(max_words=self.max_summary_words)]
+        if self.assistant.conversation_summary:
+            parts.append(f"Current summary: {self.assistant.conversation_summary}")
+        parts.append("New turns:")
+        for turn in turns:
+            parts.append(f"Driver: {turn['user']}\nAssistant: {turn['assistant']}")
+        parts.append("Updated summary:")
+        return "\n\n".join(parts)
+
+    def _bound(self, text: str) -> str:
+        words = text.split()
+        return " ".join(words[:self.max_summary_words])
+
+    def run_once(self) -> bool:
+        """
+        Fold pending aged-out turns into the summary
+
+        Returns:
+            True if the summary was updated, False if there was nothing to do,
+            the model is busy, or a request preempted the run
+        """
+        assistant = self.assistant
+        turns = self.pending_turns()
+        if not turns or assistant._llm is None:
+            return False
+
+        # Never wait for the model: a request holding it has priority
+        if not assistant._llm_lock.acquire(blocking=False):
+            return False
+        try:
+            self._preempt.clear()
+            if self._busy() or self._stop.is_set():
+                return False
+
+            end = assistant._summarized_turns + len(turns)
+            history = assistant.conversation_history
+            chunks = []
+            stream = assistant._llm.stream(
+                self._summary_prompt(turns),
+                assistant._token_budget(int(self.max_summary_words * 1.5)),
+                0.2,
+                stop=["\n\n", "Driver:"]
+            )
+            try:
+                for piece in stream:
+                    if self._preempt.is_set():
+                        if not self._stop.is_set():
+                            self.preemptions += 1
+                        return False
+                    chunks.append(piece)
+            finally:
+                stream.close()
+
+            # History was reset while summarizing
+            if assistant.conversation_history is not history:
+                return False
+
+            assistant.conversation_summary = self._bound("".join(chunks).strip())
+            assistant._summarized_turns = end
+            self.runs += 1
+            return True
+        finally:
+            assistant._llm_lock.release()
@@ -0,0 +1,521 @@
+"""
+TinyLLM-Auto: Vehicle Telemetry
+OBD-II over CAN ingestion into ring buffers and a live VehicleContext
+"""
+
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, List, Optional, Protocol, Set, Tuple
+
+import numpy as np
+
+try:
+    from .intents import DTC_DESCRIPTIONS
+except ImportError:  # src/ on sys.path (tests, demo.py)
+    from intents import DTC_DESCRIPTIONS
+
+
+KM_TO_MILES = 0.621371
+
+# OBD-II response CAN IDs (ECU physical addresses 0x7E8-0x7EF)
+OBD_RESPONSE_IDS = range(0x7E8, 0x7F0)
+OBD_REQUEST_ID = 0x7DF
+
+MODE_CURRENT_DATA = 0x41
+MODE_STORED_DTCS = 0x43
+MODE_CLEAR_DTCS = 0x44
+MODE_PENDING_DTCS = 0x47
+
+
+@dataclass(frozen=True)
+class Frame:
+    """One CAN frame"""
+    timestamp: float
+    can_id: int
+    data: bytes
+
+
+@dataclass(frozen=True)
+class PID:
+    """Mode 01 parameter: name, payload size and decoder of the data bytes"""
+    name: str
+    size: int
+    decode: Callable[[bytes], float]
+
+
+PIDS: Dict[int, PID] = {
+    0x05: PID("coolant_temp_c", 1, lambda d: d[0] - 40),
+    0x06: PID("short_fuel_trim_pct", 1, lambda d: d[0] / 1.28 - 100),
+    0x07: PID("long_fuel_trim_pct", 1, lambda d: d[0] / 1.28 - 100),
+    0x0C: PID("rpm", 2, lambda d: (256 * d[0] + d[1]) / 4),
+    0x0D: PID("speed_kph", 1, lambda d: d[0]),
+    0x0F: PID("intake_temp_c", 1, lambda d: d[0] - 40),
+    0x11: PID("throttle_pct", 1, lambda d: d[0] * 100 / 255),
+    0x2F: PID("fuel_level_pct", 1, lambda d: d[0] * 100 / 255),
+    0x42: PID("battery_v", 2, lambda d: (256 * d[0] + d[1]) / 1000),
+    0x5C: PID("oil_temp_c", 1, lambda d: d[0] - 40),
+    0xA6: PID("odometer_km", 4, lambda d: int.from_bytes(d[:4], "big") / 10),
+}
+
+# Values that appear in the prompt, with the step they are rounded to.
+# A new sample only invalidates the prompt if its rounded value changes.
+PROMPT_PIDS = {
+    "coolant_temp_c": ("Coolant Temperature", 5.0, "°C"),
+    "battery_v": ("Battery Voltage", 0.2, "V"),
+    "fuel_level_pct": ("Fuel Level", 5.0, "%"),
+    "oil_temp_c": ("Oil Temperature", 5.0, "°C"),
+}
+
+_CANDUMP_LINE = re.compile(r"\((?P<ts>[\d.]+)\)\s+\S+\s+(?P<id>[0-9A-Fa-f]+)#(?P<data>[0-9A-Fa-f]*)")
+
+
+def decode_dtc(a: int, b: int) -> str:
+    """Two DTC bytes -> code such as "P0420" """
+    return f"{'PCBU'[a >> 6]}{(a >> 4) & 0x3}{a & 0xF:X}{b:02X}"
+
+
+def encode_dtc(code: str) -> bytes:
+    """Code such as "P0420" -> two DTC bytes (for simulators and tests)"""
+    value = ("PCBU".index(code[0]) << 14) | (int(code[1]) << 12) | int(code[2:], 16)
+    return value.to_bytes(2, "big")
+
+
+class RingBuffer:
+    """Fixed-size (timestamp, value) history backed by two NumPy arrays"""
+
+    def __init__(self, capacity: int = 1024):
+        self.capacity = capacity
+        self._times = np.zeros(capacity, dtype=np.float64)
+        self._values = np.zeros(capacity, dtype=np.float32)
+        self._next = 0
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def append(self, timestamp: float, value: float):
+        self._times[self._next] = timestamp
+        self._values[self._next] = value
+        self._next = (self._next + 1) % self.capacity
+        self._count = min(self._count + 1, self.capacity)
+
+    @property
+    def latest(self) -> Optional[float]:
+        return float(self._values[self._next - 1]) if self._count else None
+
+    def _ordered(self, array: np.ndarray) -> np.ndarray:
+        if self._count < self.capacity:
+            return array[:self._count].copy()
+        return np.concatenate((array[self._next:], array[:self._next]))
+
+    def times(self) -> np.ndarray:
+        """Timestamps, oldest first"""
+        return self._ordered(self._times)
+
+    def values(self) -> np.ndarray:
+        """Values, oldest first"""
+        return self._ordered(self._values)
+
+
+class FrameSource(Protocol):
+    """Anything that yields CAN frames"""
+
+    def frames(self) -> Iterator[Frame]:
+        ...
+
+    def close(self) -> None:
+        ...
+
+
+def parse_candump_line(line: str) -> Optional[Frame]:
+    """Parse a `candump -l` log line: "(1700000000.123) can0 7E8#04410C1AF8" """
+    match = _CANDUMP_LINE.match(line.strip())
+    if match is None:
+        return None
+    return Frame(float(match.group("ts")), int(match.group("id"), 16), bytes.fromhex(match.group("data")))
+
+
+class LogReplaySource:
+    """
+    Simulated vehicle: replays a `candump -l` log file.
+    With realtime=True the original frame spacing is reproduced (scaled by speed).
+    """
+
+    def __init__(self, path: str, realtime: bool = False, speed: float = 1.0, loop: bool = False):
+        """
+        Initialize the source
+
+        Args:
+            path: candump log file
+            realtime: Sleep between frames like the recorded bus
+            speed: Playback speed multiplier when realtime
+            loop: Restart from the beginning at the end of the log
+        """
+        self.path = path
+        self.realtime = realtime
+        self.speed = speed
+        self.loop = loop
+        self._closed = threading.Event()
+
+    def frames(self) -> Iterator[Frame]:
+        while not self._closed.is_set():
+            previous = None
+            with open(self.path) as f:
+                for line in f:
+                    frame = parse_candump_line(line)
+                    if frame is None:
+                        continue
+                    if self.realtime and previous is not None:
+                        delay = (frame.timestamp - previous) / self.speed
+                        if delay > 0 and self._closed.wait(delay):
+                            return
+                    if self._closed.is_set():
+                        return
+                    previous = frame.timestamp
+                    yield frame
+            if not self.loop:
+                return
+
+    def close(self):
+        self._closed.set()
+
+
+class SocketCANSource:
+    """
+    Live CAN bus via python-can (SocketCAN on Linux).
+    OBD-II is request/response, so the source polls the given PIDs at
+    poll_interval_s and asks for stored DTCs every dtc_interval_s.
+    """
+
+    def __init__(
+        self,
+        channel: str = "can0",
+        poll_pids: Optional[List[int]] = None,
+        poll_interval_s: float = 1.0,
+        dtc_interval_s: float = 30.0,
+        interface: str = "socketcan"
+    ):
+        """
+        Initialize the source
+
+        Args:
+            channel: CAN interface name
+            poll_pids: Mode 01 PIDs to request (default: all decoded PIDs)
+            poll_interval_s: Time between PID polling rounds
+            dtc_interval_s: Time between stored-DTC requests
+            interface: python-can interface type
+        """
+        try:
+            import can
+        except ImportError:
+            raise ImportError(
+                "python-can is required for live CAN telemetry. Install with: "
+                "pip install python-can"
+            )
+        self._can = can
+        self.bus = can.interface.Bus(channel=channel, interface=interface)
+        self.poll_pids = list(PIDS) if poll_pids is None else poll_pids
+        self.poll_interval_s = poll_interval_s
+        self.dtc_interval_s = dtc_interval_s
+        self._closed = threading.Event()
+
+    def _request(self, payload: bytes):
+        data = bytes([len(payload)]) + payload
+        self.bus.send(self._can.Message(
+            arbitration_id=OBD_REQUEST_ID,
+            data=data.ljust(8, b"\x00"),
+            is_extended_id=False
+        ))
+
+    def frames(self) -> Iterator[Frame]:
+        next_poll = next_dtc = 0.0
+        while not self._closed.is_set():
+            now = time.monotonic()
+            if now >= next_poll:
+                for pid in self.poll_pids:
+                    self._request(bytes([0x01, pid]))
+                next_poll = now + self.poll_interval_s
+            if now >= next_dtc:
+                self._request(bytes([0x03]))
+                next_dtc = now + self.dtc_interval_s
+
+            message = self.bus.recv(timeout=0.1)
+            if message is not None:
+                yield Frame(message.timestamp, message.arbitration_id, bytes(message.data))
+
+    def close(self):
+        self._closed.set()
+        self.bus.shutdown()
+
+
+class LiveVehicleContext:
+    """
+    VehicleContext whose mileage, trouble codes and key sensor values
+    follow the vehicle's telemetry.
+
+    Drop-in for VehicleContext (assistant.vehicle_context = live). The
+    prompt block is cached and rebuilt only when a prompt-relevant fact
+    changes: mileage at mileage_resolution, the DTC sets, or a PROMPT_PIDS
+    value at its rounding step. Speed, RPM and sensor noise do not
+    invalidate it.
+    """
+
+    def __init__(
+        self,
+        make: str,
+        model: str,
+        year: int,
+        mileage: int,
+        vin: Optional[str] = None,
+        mileage_resolution: int = 100
+    ):
+        """
+        Initialize the context
+
+        Args:
+            make: Vehicle manufacturer
+            model: Vehicle model
+            year: Model year
+            mileage: Mileage until the odometer is first read
+            vin: Vehicle Identification Number (optional)
+            mileage_resolution: Miles the odometer must move before the prompt changes
+        """
+        self.make = make
+        self.model = model
+        self.year = year
+        self.vin = vin
+        self.mileage_resolution = mileage_resolution
+
+        self._lock = threading.Lock()
+        self._mileage = float(mileage)
+        self.values: Dict[str, float] = {}
+        self._dtcs: Dict[int, Set[str]] = {}
+        self._pending: Dict[int, Set[str]] = {}
+
+        self._prompt: Optional[str] = None
+        self._prompt_key: Optional[Tuple] = None
+        self.updates = 0
+        self.prompt_builds = 0
+
+    @classmethod
+    def from_context(cls, context, **kwargs) -> "LiveVehicleContext":
+        """Start from a static VehicleContext"""
+        return cls(context.make, context.model, context.year, context.mileage, context.vin, **kwargs)
+
+    @property
+    def mileage(self) -> int:
+        return int(round(self._mileage))
+
+    @property
+    def active_dtcs(self) -> List[str]:
+        with self._lock:
+            return sorted(set().union(*self._dtcs.values()))
+
+    @property
+    def pending_dtcs(self) -> List[str]:
+        with self._lock:
+            return sorted(set().union(*self._pending.values()))
+
+    def update_value(self, name: str, value: float):
+        with self._lock:
+            self.updates += 1
+            self.values[name] = value
+            if name == "odometer_km":
+                self._mileage = value * KM_TO_MILES
+
+    def set_dtcs(self, ecu: int, codes: Set[str], pending: bool = False):
+        """Replace one ECU's stored (or pending) code report"""
+        with self._lock:
+            self.updates += 1
+            (self._pending if pending else self._dtcs)[ecu] = set(codes)
+
+    def clear_dtcs(self):
+        with self._lock:
+            self.updates += 1
+            self._dtcs.clear()
+            self._pending.clear()
+
+    def _facts(self) -> Tuple:
+        """Everything the prompt shows, rounded as it is shown (caller holds the lock)"""
+        values = tuple(
+            (name, round(self.values[name] / step) * step)
+            for name, (_, step, _) in PROMPT_PIDS.items()
+            if name in self.values
+        )
+        return (
+            int(round(self._mileage / self.mileage_resolution)),
+            frozenset().union(*self._dtcs.values()),
+            frozenset().union(*self._pending.values()),
+            values,
+        )
+
+    def to_prompt(self) -> str:
+        """Vehicle block of the prompt (cached until a shown fact changes)"""
+        with self._lock:
+            key = self._facts()
+            if key == self._prompt_key:
+                return self._prompt
+
+            mileage_bucket, dtcs, pending, values = key
+            lines = [
+                "Vehicle Information:",
+                f"- Make: {self.make}",
+                f"- Model: {self.model}",
+                f"- Year: {self.year}",
+                f"- Current Mileage: {mileage_bucket * self.mileage_resolution:,} miles",
+            ]
+            if dtcs:
+                lines.append(f"- Active Trouble Codes: {self._describe(dtcs)}")
+            if pending:
+                lines.append(f"- Pending Trouble Codes: {self._describe(pending)}")
+            for name, value in values:
+                label, step, unit = PROMPT_PIDS[name]
+                decimals = 1 if step < 1 else 0
+                lines.append(f"- {label}: {value:.{decimals}f}{'' if unit == '%' else ' '}{unit}")
+
+            self._prompt = "\n".join(lines) + "\n"
+            self._prompt_key = key
+            self.prompt_builds += 1
+            return self._prompt
+
+    @staticmethod
+    def _describe(codes) -> str:
+        return ", ".join(
+            f"{code} ({DTC_DESCRIPTIONS[code]})" if code in DTC_DESCRIPTIONS else code
+            for code in sorted(codes)
+        )
+
+    def to_dict(self) -> Dict:
+        """Static fields with the current mileage (loads back as a VehicleContext)"""
+        return {
+            'make': self.make,
+            'model': self.model,
+            'year': self.year,
+            'mileage': self.mileage,
+            'vin': self.vin,
+        }
+
+
+class TelemetryIngestor:
+    """
+    Decodes OBD-II responses from a frame source into per-PID ring
+    buffers and a LiveVehicleContext.
+
+    Single-frame responses are decoded (Mode 01 PIDs, Mode 03/07 DTC
+    reports with up to two codes, Mode 04 clears); ISO-TP multi-frame
+    responses are counted as unsupported.
+    """
+
+    def __init__(
+        self,
+        source: FrameSource,
+        context: LiveVehicleContext,
+        capacity: int = 1024,
+        analyzer=None
+    ):
+        """
+        Initialize the ingestor
+
+        Args:
+            source: Frame source (SocketCANSource, LogReplaySource, ...)
+            context: Live context to update
+            capacity: Samples kept per PID
+            analyzer: Optional analytics.TelemetryAnalyzer fed every decoded value
+        """
+        self.source = source
+        self.context = context
+        self.capacity = capacity
+        self.analyzer = analyzer
+        self.buffers: Dict[str, RingBuffer] = {}
+        self._thread: Optional[threading.Thread] = None
+        self.error: Optional[Exception] = None
+
+        self.frames = 0
+        self.decoded = 0
+        self.ignored = 0
+        self.unsupported = 0
+
+    def buffer(self, name: str) -> RingBuffer:
+        """Ring buffer of a PID by name (created empty if never seen)"""
+        if name not in self.buffers:
+            self.buffers[name] = RingBuffer(self.capacity)
+        return self.buffers[name]
+
+    def process(self, frame: Frame):
+        """Decode one frame into the buffers and the live context"""
+        self.frames += 1
+        data = frame.data
+        if frame.can_id not in OBD_RESPONSE_IDS or len(data) < 2:
+            self.ignored += 1
+            return
+        if data[0] >> 4 != 0:
+            # ISO-TP first/consecutive frame: long responses are not reassembled
+            self.unsupported += 1
+            return
+
+        length = data[0] & 0x0F
+        payload = data[1:1 + length]
+        if not payload:
+            # Malformed single frame (PCI length 0), e.g. an all-zero frame
+            self.ignored += 1
+            return
+        mode = payload[0]
+        if mode == MODE_CURRENT_DATA and len(payload) >= 2:
+            pid = PIDS.get(payload[1])
+            if pid is None or len(payload) < 2 + pid.size:
+                self.unsupported += 1
+                return
+            value = pid.decode(payload[2:2 + pid.size])
+            self.buffer(pid.name).append(frame.timestamp, value)
+            self.context.update_value(pid.name, value)
+            if self.analyzer is not None:
+                self.analyzer.update(pid.name, frame.timestamp, value)
+        elif mode in (MODE_STORED_DTCS, MODE_PENDING_DTCS) and len(payload) >= 2:
+            count = payload[1]
+            pairs = payload[2:2 + 2 * count]
+            codes = {decode_dtc(pairs[i], pairs[i + 1]) for i in range(0, len(pairs) - 1, 2)}
+            self.context.set_dtcs(frame.can_id, codes, pending=mode == MODE_PENDING_DTCS)
+        elif mode == MODE_CLEAR_DTCS:
+            self.context.clear_dtcs()
+        else:
+            self.unsupported += 1
+            return
+        self.decoded += 1
+
+    def run(self, max_frames: Optional[int] = None):
+        """Ingest frames until the source ends (or max_frames)"""
+        for frame in self.source.frames():
+            self.process(frame)
+            if max_frames is not None and self.frames >= max_frames:
+                break
+
+    def _run_safely(self):
+        try:
+            self.run()
+        except Exception as e:
+            self.error = e
+
+    def start(self):
+        """Ingest in a background thread"""
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run_safely, name="telemetry-ingest", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Close the source and wait for the ingest thread"""
+        self.source.close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def report(self) -> Dict:
+        return {
+            'frames': self.frames,
+            'decoded': self.decoded,
+            'ignored': self.ignored,
+            'unsupported': self.unsupported,
+            'signals': sorted(self.buffers),
+            'prompt_builds': self.context.prompt_builds,
+        }
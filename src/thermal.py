@@ -0,0 +1,371 @@
+"""
+TinyLLM-Auto: Thermal Governor
+Thermal- and load-aware throttling of threads, batch sizes and output length
+"""
+
+import glob
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+@dataclass
+class ThermalReading:
+    """One sensor sample"""
+    temp_c: Optional[float]           # Hottest thermal zone (None if no zones)
+    freq_mhz: Optional[float]         # Mean current CPU frequency
+    max_freq_mhz: Optional[float]     # Mean maximum CPU frequency
+    freq_ratio: float = 1.0           # freq_mhz / max_freq_mhz (1.0 if unknown)
+
+
+class SysfsThermalSensor:
+    """
+    CPU temperature and frequency from Linux sysfs
+
+    Reads /sys/class/thermal/thermal_zone*/temp (millidegrees C) and
+    /sys/devices/system/cpu/cpu*/cpufreq/{scaling_cur_freq,cpuinfo_max_freq}
+    (kHz). A different root points it at a fake sysfs tree for tests.
+    """
+
+    def __init__(self, root: str = "/"):
+        """
+        Initialize the sensor
+
+        Args:
+            root: Filesystem root containing sys/ (default: the real one)
+        """
+        self.root = root
+
+    def _glob(self, pattern: str) -> List[str]:
+        return sorted(glob.glob(os.path.join(self.root, pattern)))
+
+    @staticmethod
+    def _read_number(path: str) -> Optional[float]:
+        try:
+            with open(path) as f:
+                return float(f.read().strip())
+        except (OSError, ValueError):
+            return None
+
+    def read(self) -> ThermalReading:
+        """
+        Sample temperature and frequency
+
+        Returns:
+            ThermalReading (fields are None where sysfs has no data)
+        """
+        temps = [
+            value / 1000.0
+            for value in map(self._read_number, self._glob("sys/class/thermal/thermal_zone*/temp"))
+            if value is not None
+        ]
+
+        current, maximum = [], []
+        for cpufreq in self._glob("sys/devices/system/cpu/cpu[0-9]*/cpufreq"):
+            cur = self._read_number(os.path.join(cpufreq, "scaling_cur_freq"))
+            top = self._read_number(os.path.join(cpufreq, "cpuinfo_max_freq"))
+            if cur is not None and top:
+                current.append(cur / 1000.0)
+                maximum.append(top / 1000.0)
+
+        freq_mhz = sum(current) / len(current) if current else None
+        max_freq_mhz = sum(maximum) / len(maximum) if maximum else None
+        return ThermalReading(
+            temp_c=max(temps) if temps else None,
+            freq_mhz=freq_mhz,
+            max_freq_mhz=max_freq_mhz,
+            freq_ratio=freq_mhz / max_freq_mhz if current else 1.0,
+        )
+
+
+@dataclass
+class ThrottleProfile:
+    """Runtime limits for one thermal level"""
+    name: str
+    enter_c: float                    # Smoothed temperature that selects this level
+    thread_fraction: float            # Share of CPU cores used for inference
+    n_batch: int                      # llama.cpp prompt batch size
+    max_tokens: int                   # Cap on generated tokens per answer
+    stt_batch_size: int               # Whisper segments per decode call
+    concurrent_voice: bool            # Overlap audio preprocessing with Whisper
+
+
+# Levels from coolest to hottest; thresholds suit a passively cooled
+# Raspberry Pi / Jetson class board (firmware throttling starts near 80-85°C)
+DEFAULT_PROFILES: Tuple[ThrottleProfile, ...] = (
+    ThrottleProfile("normal", 0.0, 1.0, 512, 256, 8, True),
+    ThrottleProfile("warm", 65.0, 0.75, 256, 192, 4, True),
+    ThrottleProfile("hot", 75.0, 0.5, 128, 128, 2, False),
+    ThrottleProfile("critical", 80.0, 0.25, 64, 64, 1, False),
+)
+
+
+class ThermalGovernor:
+    """
+    Steps inference limits down as the device heats up, and back up as it
+    cools, without oscillating.
+
+    Each update() smooths the temperature (EWMA) and picks the hottest
+    profile whose enter_c it has reached, one level higher if the CPU is
+    already frequency-throttled. Escalation is immediate; de-escalation
+    goes one level at a time, and only after the smoothed temperature has
+    stayed hysteresis_c below the current level's threshold (and the clock
+    is back up) for cooldown_s. Profiles are applied to the assistant
+    (threads, n_batch, max_tokens) and the voice interface (Whisper batch
+    size, concurrent preprocessing) only when the level changes, so a
+    device that stays cool keeps its configured settings.
+    """
+
+    def __init__(
+        self,
+        assistant=None,
+        voice=None,
+        sensor: Optional[SysfsThermalSensor] = None,
+        profiles: Tuple[ThrottleProfile, ...] = DEFAULT_PROFILES,
+        cores: Optional[int] = None,
+        smoothing: float = 0.3,
+        hysteresis_c: float = 5.0,
+        cooldown_s: float = 30.0,
+        throttled_freq_ratio: float = 0.85,
+        interval_s: float = 2.0,
+        clock: Callable[[], float] = time.monotonic,
+        verbose: bool = False
+    ):
+        """
+        Initialize the governor
+
+        Args:
+            assistant: VehicleAssistant to throttle (default: voice's assistant)
+            voice: VoiceAssistant to throttle
+            sensor: Temperature/frequency source (default: SysfsThermalSensor())
+            profiles: Levels sorted by enter_c, coolest first
+            cores: CPU cores threads are scaled from when the assistant has
+                no n_threads configured (default: os.cpu_count())
+            smoothing: EWMA weight of the newest temperature sample
+            hysteresis_c: Degrees below a level's threshold needed to leave it
+            cooldown_s: Seconds the device must stay cool before stepping down
+            throttled_freq_ratio: Frequency ratio below which the CPU counts as
+                throttled (raises the level by one)
+            interval_s: Sampling period of the background thread
+            clock: Monotonic time source (injectable for tests)
+            verbose: Print level changes
+        """
+        if not profiles or any(a.enter_c > b.enter_c for a, b in zip(profiles, profiles[1:])):
+            raise ValueError("profiles must be non-empty and sorted by enter_c")
+        self.assistant = assistant
+        self.voice = voice
+        self.sensor = sensor or SysfsThermalSensor()
+        self.profiles = tuple(profiles)
+        self.cores = cores or os.cpu_count() or 1
+        self.smoothing = smoothing
+        self.hysteresis_c = hysteresis_c
+        self.cooldown_s = cooldown_s
+        self.throttled_freq_ratio = throttled_freq_ratio
+        self.interval_s = interval_s
+        self.clock = clock
+        self.verbose = verbose
+
+        self.level = 0
+        self.reading: Optional[ThermalReading] = None
+        self.smoothed_c: Optional[float] = None
+        # Limits in effect; empty until the first level change
+        self.decisions: Dict = {}
+        self._baseline: Optional[Dict] = None
+        self._cool_since: Optional[float] = None
+        self._level_since = clock()
+        self._time_in_level = [0.0] * len(self.profiles)
+
+        self.readings = 0
+        self.sensor_errors = 0
+        self.changes = 0
+        self.escalations = 0
+        self.deescalations = 0
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def profile(self) -> ThrottleProfile:
+        """Profile of the current level"""
+        return self.profiles[self.level]
+
+    def _target_level(self, temp_c: float, freq_ratio: float) -> int:
+        level = 0
+        for i, profile in enumerate(self.profiles):
+            if temp_c >= profile.enter_c:
+                level = i
+        if freq_ratio < self.throttled_freq_ratio:
+            level = min(level + 1, len(self.profiles) - 1)
+        return level
+
+    def update(self) -> ThrottleProfile:
+        """
+        Take one sample and change level if needed
+
+        Returns:
+            The profile in effect after this sample
+        """
+        with self._lock:
+            now = self.clock()
+            try:
+                reading = self.sensor.read()
+            except OSError:
+                self.sensor_errors += 1
+                return self.profile
+            self.readings += 1
+            self.reading = reading
+            if reading.temp_c is None:
+                # No thermal zones: only frequency throttling can be seen
+                self.sensor_errors += 1
+                temp_c = self.smoothed_c if self.smoothed_c is not None else self.profiles[0].enter_c
+            else:
+                temp_c = reading.temp_c
+
+            if self.smoothed_c is None:
+                self.smoothed_c = temp_c
+            else:
+                self.smoothed_c += self.smoothing * (temp_c - self.smoothed_c)
+
+            target = self._target_level(self.smoothed_c, reading.freq_ratio)
+            if target > self.level:
+                self._cool_since = None
+                self._set_level(target, now)
+            elif target < self.level:
+                threshold = self.profile.enter_c - self.hysteresis_c
+                cool = self.smoothed_c < threshold and reading.freq_ratio >= self.throttled_freq_ratio
+                if not cool:
+                    self._cool_since = None
+                elif self._cool_since is None:
+                    self._cool_since = now
+                elif now - self._cool_since >= self.cooldown_s:
+                    # Restart the cooldown for the next step down
+                    self._cool_since = now
+                    self._set_level(self.level - 1, now)
+            else:
+                self._cool_since = None
+            return self.profile
+
+    def _set_level(self, level: int, now: float):
+        self._time_in_level[self.level] += now - self._level_since
+        self._level_since = now
+        if level > self.level:
+            self.escalations += 1
+        else:
+            self.deescalations += 1
+        self.changes += 1
+        if self.verbose:
+            print(f"Thermal level {self.profile.name} -> {self.profiles[level].name} "
+                  f"({self.smoothed_c:.1f}°C)")
+        self.level = level
+        self.apply(self.profile)
+
+    def _assistant(self):
+        if self.assistant is None and self.voice is not None:
+            return self.voice._vehicle_assistant
+        return self.assistant
+
+    def _capture_baseline(self):
+        """Settings configured before the first throttle, restored at level 0"""
+        assistant = self._assistant()
+        baseline = {
+            'n_threads': self.cores,
+            'n_batch': self.profiles[0].n_batch,
+            'max_tokens': None,
+            'stt_batch_size': None,
+            'concurrent_voice': True,
+        }
+        if assistant is not None:
+            baseline['n_threads'] = assistant.n_threads or self.cores
+            baseline['n_batch'] = assistant.n_batch or self.profiles[0].n_batch
+            baseline['max_tokens'] = assistant.max_tokens_limit
+        if self.voice is not None:
+            baseline['stt_batch_size'] = self.voice.stt_batch_size
+            baseline['concurrent_voice'] = self.voice.concurrent_voice
+        self._baseline = baseline
+
+    def apply(self, profile: ThrottleProfile):
+        """
+        Push a profile's limits to the assistant and voice interface
+
+        Limits are scaled from (and never loosen) the settings configured
+        before the first throttle; the coolest profile restores them.
+
+        Args:
+            profile: Limits to apply
+        """
+        if self._baseline is None:
+            self._capture_baseline()
+        baseline = self._baseline
+
+        if profile is self.profiles[0]:
+            decisions = dict(baseline)
+        else:
+            decisions = {
+                'n_threads': max(1, round(baseline['n_threads'] * profile.thread_fraction)),
+                'n_batch': min(profile.n_batch, baseline['n_batch']),
+                'max_tokens': min(profile.max_tokens, baseline['max_tokens'] or profile.max_tokens),
+                'stt_batch_size': min(profile.stt_batch_size, baseline['stt_batch_size'] or profile.stt_batch_size),
+                'concurrent_voice': profile.concurrent_voice and baseline['concurrent_voice'],
+            }
+
+        assistant = self._assistant()
+        if assistant is not None:
+            assistant.set_compute(n_threads=decisions['n_threads'], n_batch=decisions['n_batch'])
+            assistant.max_tokens_limit = decisions['max_tokens']
+        if self.voice is not None:
+            self.voice.stt_batch_size = decisions['stt_batch_size']
+            self.voice.concurrent_voice = decisions['concurrent_voice']
+        self.decisions = decisions
+
+    def start(self):
+        """Sample in a background thread every interval_s"""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="thermal-governor", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background thread"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        self.update()
+        while not self._stop.wait(self.interval_s):
+            self.update()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def metrics(self) -> Dict:
+        """Current level, sensor values, level-change counters and applied limits"""
+        with self._lock:
+            reading = self.reading
+            time_in_level = list(self._time_in_level)
+            time_in_level[self.level] += self.clock() - self._level_since
+            return {
+                'level': self.profile.name,
+                'temp_c': reading.temp_c if reading else None,
+                'smoothed_c': self.smoothed_c,
+                'freq_mhz': reading.freq_mhz if reading else None,
+                'freq_ratio': reading.freq_ratio if reading else None,
+                'changes': self.changes,
+                'escalations': self.escalations,
+                'deescalations': self.deescalations,
+                'time_in_level_s': {
+                    profile.name: seconds for profile, seconds in zip(self.profiles, time_in_level)
+                },
+                'readings': self.readings,
+                'sensor_errors': self.sensor_errors,
+                **self.decisions,
+            }
@@ -0,0 +1,224 @@
+"""
+TinyLLM-Auto: Request Tracing
+Sampled span timelines exportable to Chrome/Perfetto trace JSON
+"""
+
+import itertools
+import json
+import os
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Iterable, Iterator, List, Optional
+
+_NO_SPAN = nullcontext()
+
+
+def _now_us() -> float:
+    return time.perf_counter() * 1e6
+
+
+class Trace:
+    """Timeline of one sampled request"""
+
+    def __init__(self, trace_id: int, name: str, args: Optional[Dict] = None):
+        self.trace_id = trace_id
+        self.name = name
+        self.args = args or {}
+        self.events: List[Dict] = []
+        self.start_us = _now_us()
+        self.duration_us = 0.0
+
+    def add_span(self, name: str, start_us: float, end_us: float, args: Optional[Dict] = None):
+        event = {
+            'name': name,
+            'ph': 'X',
+            'ts': start_us,
+            'dur': end_us - start_us,
+            'tid': threading.get_ident(),
+        }
+        if args:
+            event['args'] = args
+        self.events.append(event)
+
+    def add_instant(self, name: str, args: Optional[Dict] = None):
+        event = {'name': name, 'ph': 'i', 's': 't', 'ts': _now_us(), 'tid': threading.get_ident()}
+        if args:
+            event['args'] = args
+        self.events.append(event)
+
+    def spans(self, name: str) -> List[Dict]:
+        return [e for e in self.events if e['name'] == name and e['ph'] == 'X']
+
+    def to_chrome_events(self) -> List[Dict]:
+        """Trace events with this trace as its own process track"""
+        metadata = {
+            'name': 'process_name',
+            'ph': 'M',
+            'pid': self.trace_id,
+            'args': {'name': f"{self.name} #{self.trace_id}"},
+        }
+        return [metadata] + [dict(event, pid=self.trace_id) for event in self.events]
+
+
+class Tracer:
+    """
+    Span tracer with per-request sampling.
+    Unsampled requests cost one thread-local lookup per span, so tracing
+    can stay enabled in production at a low sample rate.
+    """
+
+    def __init__(
+        self,
+        sample_rate: float = 1.0,
+        max_traces: int = 100,
+        seed: Optional[int] = None,
+        record_text: bool = False
+    ):
+        """
+        Initialize the tracer
+
+        Args:
+            sample_rate: Fraction of requests traced (0.0 disables tracing)
+            max_traces: Finished traces kept in memory (oldest dropped first)
+            seed: Seed for the sampling decision (reproducible tests)
+            record_text: Also record each token's text (exported traces then
+                contain the generated answers); by default only counts and timings
+        """
+        self.sample_rate = sample_rate
+        self.record_text = record_text
+        self.traces: deque = deque(maxlen=max_traces)
+        self._random = random.Random(seed)
+        self._ids = itertools.count(1)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.sampled = 0
+
+    @property
+    def current(self) -> Optional[Trace]:
+        """Trace active on this thread, if the request was sampled"""
+        return getattr(self._local, 'trace', None)
+
+    @contextmanager
+    def _root(self, name: str, args: Dict):
+        with self._lock:
+            self.requests += 1
+            sampled = self.sample_rate > 0 and self._random.random() < self.sample_rate
+            if sampled:
+                self.sampled += 1
+        if not sampled:
+            # Mark the thread so nested trace() calls do not sample again
+            self._local.unsampled = True
+            try:
+                yield None
+            finally:
+                self._local.unsampled = False
+            return
+
+        trace = Trace(next(self._ids), name, args)
+        self._local.trace = trace
+        try:
+            with self.span(name, **args):
+                yield trace
+        finally:
+            trace.duration_us = _now_us() - trace.start_us
+            self._local.trace = None
+            self.traces.append(trace)
+
+    def trace(self, name: str, **args):
+        """
+        Start a request trace (or a child span if one is already active)
+
+        Usage:
+            with tracer.trace("ask", question_chars=42):
+                ...
+        """
+        if self.current is not None:
+            return self.span(name, **args)
+        if getattr(self._local, 'unsampled', False):
+            return _NO_SPAN
+        return self._root(name, args)
+
+    def span(self, name: str, **args):
+        """Time a block as a span of the active trace (no-op when unsampled)"""
+        trace = self.current
+        if trace is None:
+            return _NO_SPAN
+        return self._span(trace, name, args)
+
+    @contextmanager
+    def _span(self, trace: Trace, name: str, args: Dict):
+        start_us = _now_us()
+        try:
+            yield
+        finally:
+            trace.add_span(name, start_us, _now_us(), args)
+
+    def event(self, name: str, **args):
+        """Record an instant event (e.g. one decoded token)"""
+        trace = self.current
+        if trace is not None:
+            trace.add_instant(name, args)
+
+    def traced_stream(self, pieces: Iterable[str]) -> Iterator[str]:
+        """
+        Pass a token stream through, recording prefill, decode and per-token events
+
+        Prefill is the time until the first token arrives; decode runs from
+        the first token to the end of the stream.
+        """
+        trace = self.current
+        if trace is None:
+            yield from pieces
+            return
+
+        start_us = _now_us()
+        first_us = None
+        count = 0
+        try:
+            for piece in pieces:
+                if first_us is None:
+                    first_us = _now_us()
+                    trace.add_span("prefill", start_us, first_us)
+                count += 1
+                args = {'index': count, 'chars': len(piece)}
+                if self.record_text:
+                    args['text'] = piece
+                trace.add_instant("token", args)
+                yield piece
+        finally:
+            if first_us is not None:
+                trace.add_span("decode", first_us, _now_us(), {'tokens': count})
+
+    def export_chrome(self, path: str, traces: Optional[Iterable[Trace]] = None) -> int:
+        """
+        Write traces as Chrome trace JSON (chrome://tracing, ui.perfetto.dev)
+
+        Args:
+            path: Output .json file
+            traces: Traces to export (default: all kept traces)
+
+        Returns:
+            Number of traces written
+        """
+        traces = list(self.traces if traces is None else traces)
+        events = [event for trace in traces for event in trace.to_chrome_events()]
+        payload = {
+            'traceEvents': events,
+            'displayTimeUnit': 'ms',
+            'otherData': {'pid': os.getpid(), 'sample_rate': self.sample_rate},
+        }
+        with open(path, 'w') as f:
+            json.dump(payload, f)
+        return len(traces)
+
+    def report(self) -> Dict:
+        return {
+            'requests': self.requests,
+            'sampled': self.sampled,
+            'kept': len(self.traces),
+            'sample_rate': self.sample_rate,
+        }
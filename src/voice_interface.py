@@ -7,8 +7,58 @@ import os
 import time
 import wave
 import tempfile
-from typing import Optional, Callable
-import numpy as np
+from concurrent.futures import ALL_COMPLETED, FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Iterable, Iterator, List, Optional
+
+try:
+    from .cancellation import CancellationToken
+    from .tracing import Tracer
+except ImportError:  # src/ on sys.path (tests, demo.py)
+    from cancellation import CancellationToken
+    from tracing import Tracer
+
+# Whisper decodes fixed 30 s windows of 16 kHz audio
+WHISPER_SEGMENT_SAMPLES = 30 * 16000
+
+
+@dataclass
+class TranscriptionResult:
+    """One file from transcribe_many()"""
+    index: int
+    path: str
+    text: str
+    audio_s: float = 0.0
+    speech_s: float = 0.0
+    segments: int = 0
+    stt_s: float = 0.0
+    error: Optional[str] = None
+
+
+@dataclass
+class TranscriptionReport:
+    """Throughput summary of a transcribe_many() run"""
+    files: int = 0
+    silent: int = 0
+    failed: int = 0
+    segments: int = 0
+    batches: int = 0
+    audio_s: float = 0.0
+    speech_s: float = 0.0
+    decode_s: float = 0.0
+    elapsed_s: float = 0.0
+
+    @property
+    def real_time_factor(self) -> float:
+        """Wall time per second of recorded audio (below 1 is faster than real time)"""
+        return self.elapsed_s / self.audio_s if self.audio_s else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.files} files ({self.silent} silent, {self.failed} failed), "
+            f"{self.audio_s:.1f}s audio in {self.elapsed_s:.1f}s: "
+            f"RTF {self.real_time_factor:.3f}, {self.segments} segments in {self.batches} batches"
+        )
 
 
 class VoiceAssistant:
@@ -21,7 +71,15 @@ class VoiceAssistant:
         llm_path: str,
         stt_model: str = "tiny",
         tts_model: str = "tts_models/en/ljspeech/tacotron2-DDC",
-        verbose: bool = False
+        verbose: bool = False,
+        memory_budget_mb: Optional[float] = None,
+        idle_timeout_s: Optional[float] = None,
+        preprocess_audio: bool = True,
+        noise_gate_db: Optional[float] = None,
+        tracer: Optional[Tracer] = None,
+        answer_pack: Optional[str] = None,
+        cached_only: bool = False,
+        llm_timeout_s: Optional[float] = None
     ):
         """
         Initialize the voice assistant
@@ -31,9 +89,25 @@ class VoiceAssistant:
             stt_model: Whisper model size (tiny, base, small, medium, large)
             tts_model: Coqui TTS model name
             verbose: Enable detailed logging
+            memory_budget_mb: RAM budget; when set, a MemoryGovernor picks LLM
+                load settings and unloads idle components in LRU order
+            idle_timeout_s: Unload components unused for this many seconds
+            preprocess_audio: Trim silence, normalize and resample input
+                with NumPy before Whisper (shorter audio, faster STT)
+            noise_gate_db: Gate cabin noise below this level (None = off)
+            tracer: Tracer for per-turn timelines, shared with the LLM
+                assistant (None = tracing off)
+            answer_pack: Precomputed answer pack file served before the LLM
+            cached_only: Never load the LLM; answer only from commands,
+                the maintenance schedule and the answer pack
+            llm_timeout_s: Time budget for the spoken answer; generation
+                stops at the last full sentence when it runs out
         """
         self.verbose = verbose
         self.llm_path = llm_path
+        self.answer_pack = answer_pack
+        self.cached_only = cached_only
+        self.llm_timeout_s = llm_timeout_s
         
         # Initialize components (lazy loading)
         self._whisper_model = None
@@ -43,9 +117,98 @@ class VoiceAssistant:
         self.stt_model_name = stt_model
         self.tts_model_name = tts_model
         
+        self.tracer = tracer if tracer is not None else Tracer(sample_rate=0.0)
+        self.preprocess_audio = preprocess_audio
+        self.noise_gate_db = noise_gate_db
+        self._preprocessor = None
+        self._last_output_audio: Optional[str] = None
+        self.transcription_report: Optional[TranscriptionReport] = None
+        # Batch transcription limits (lowered by a thermal.ThermalGovernor on hot devices)
+        self.stt_batch_size = 8
+        self.stt_workers = 4
+        self.concurrent_voice = True
+        self.stt_stats = {
+            'queries': 0,
+            'audio_s': 0.0,
+            'trimmed_s': 0.0,
+            'stt_s': 0.0,
+            'estimated_saved_s': 0.0,
+        }
+        
+        self.memory_governor = None
+        if memory_budget_mb is not None:
+            self._init_memory_governor(memory_budget_mb, idle_timeout_s)
+        
         if self.verbose:
             print("VoiceAssistant initialized")
     
+    def _init_memory_governor(self, budget_mb: float, idle_timeout_s: Optional[float]):
+        """Register Whisper, TTS and the LLM with a memory governor"""
+        try:
+            from .memory import (
+                MemoryGovernor, TTS_ESTIMATE_MB, WHISPER_ESTIMATES_MB, estimate_llm_mb
+            )
+        except ImportError:  # src/ on sys.path (tests, demo.py)
+            from memory import (
+                MemoryGovernor, TTS_ESTIMATE_MB, WHISPER_ESTIMATES_MB, estimate_llm_mb
+            )
+        
+        self.memory_governor = MemoryGovernor(
+            budget_mb,
+            idle_timeout_s=idle_timeout_s,
+            verbose=self.verbose
+        )
+        self.memory_governor.register(
+            "whisper",
+            self._load_whisper,
+            self._unload_whisper,
+            WHISPER_ESTIMATES_MB.get(self.stt_model_name.split(".")[0], 300)
+        )
+        self.memory_governor.register(
+            "tts", self._load_tts, self._unload_tts, TTS_ESTIMATE_MB
+        )
+        self.memory_governor.register(
+            "llm",
+            self._load_llm_weights,
+            self._unload_llm_weights,
+            estimate_llm_mb(self.llm_path, 2048)
+        )
+        if idle_timeout_s is not None:
+            # Free idle components even while nothing new is requested
+            self.memory_governor.start()
+    
+    def _use(self, component: str):
+        """Load a component, through the memory governor when one is configured"""
+        if self.memory_governor is not None:
+            self.memory_governor.acquire(component)
+        elif component == "whisper":
+            self._load_whisper()
+        elif component == "tts":
+            self._load_tts()
+        else:
+            self._load_llm_weights()
+    
+    def _unload_whisper(self):
+        self._whisper_model = None
+    
+    def _unload_tts(self):
+        self._tts_model = None
+    
+    def _load_llm_weights(self):
+        self._load_llm()
+        self._vehicle_assistant._load_llm()
+    
+    def _unload_llm_weights(self):
+        # Keeps conversation history and vehicle context
+        if self._vehicle_assistant is not None:
+            self._vehicle_assistant.unload()
+    
+    def memory_report(self) -> dict:
+        """Per-component memory usage (requires memory_budget_mb)"""
+        if self.memory_governor is None:
+            raise RuntimeError("memory_report() requires memory_budget_mb to be set")
+        return self.memory_governor.memory_report()
+    
     def _load_whisper(self):
         """Lazy load Whisper STT model"""
         if self._whisper_model is None:
@@ -93,13 +256,31 @@ class VoiceAssistant:
     def _load_llm(self):
         """Lazy load the vehicle assistant (LLM)"""
         if self._vehicle_assistant is None:
-            from .assistant import VehicleAssistant
+            try:
+                from .assistant import VehicleAssistant
+            except ImportError:  # src/ on sys.path (tests, demo.py)
+                from assistant import VehicleAssistant
             
             self._vehicle_assistant = VehicleAssistant(
                 model_path=self.llm_path,
-                verbose=self.verbose
+                verbose=self.verbose,
+                memory_governor=self.memory_governor,
+                tracer=self.tracer,
+                answer_pack=self.answer_pack,
+                cached_only=self.cached_only
             )
     
+    def _get_preprocessor(self):
+        """Lazy create the NumPy preprocessor (keeps numpy off the import path)"""
+        if self._preprocessor is None:
+            try:
+                from .audio import AudioPreprocessor
+            except ImportError:  # src/ on sys.path (tests, demo.py)
+                from audio import AudioPreprocessor
+            
+            self._preprocessor = AudioPreprocessor(noise_gate_db=self.noise_gate_db)
+        return self._preprocessor
+    
     def transcribe_audio(self, audio_path: str) -> str:
         """
         Convert speech to text using Whisper
@@ -110,22 +291,229 @@ class VoiceAssistant:
         Returns:
             Transcribed text
         """
-        self._load_whisper()
+        stats = self.stt_stats
+        stats['queries'] += 1
+        
+        audio = audio_path
+        trimmed_s = 0.0
+        if self.preprocess_audio:
+            with self.tracer.span("preprocess"):
+                cleaned = self._get_preprocessor().process_file(audio_path)
+            stats['audio_s'] += cleaned.original_s
+            stats['trimmed_s'] += cleaned.trimmed_s
+            trimmed_s = cleaned.trimmed_s
+            if cleaned.is_silent:
+                # Nothing but silence: skip Whisper entirely
+                if self.verbose:
+                    print(f"No speech detected in {cleaned.original_s:.1f}s of audio")
+                return ""
+            audio = cleaned.audio
+        
+        with self.tracer.span("load_whisper"):
+            self._use("whisper")
         
         if self.verbose:
             print(f"Transcribing audio: {audio_path}")
-            start_time = time.time()
+        start_time = time.time()
         
-        result = self._whisper_model.transcribe(audio_path)
+        with self.tracer.span("whisper"):
+            result = self._whisper_model.transcribe(audio)
         transcription = result["text"].strip()
         
+        transcription_time = time.time() - start_time
+        stats['stt_s'] += transcription_time
+        if self.preprocess_audio and len(audio):
+            # Whisper's cost scales with the audio it processes
+            stt_per_audio_s = transcription_time / (len(audio) / cleaned.sample_rate)
+            stats['estimated_saved_s'] += trimmed_s * stt_per_audio_s
+        
         if self.verbose:
-            transcription_time = time.time() - start_time
             print(f"Transcription: '{transcription}'")
             print(f"STT time: {transcription_time:.2f}s")
+            if self.preprocess_audio:
+                print(f"Trimmed {trimmed_s:.2f}s of silence "
+                      f"(~{trimmed_s * stt_per_audio_s:.2f}s STT saved)")
         
         return transcription
     
+    def _import_whisper(self):
+        try:
+            import whisper
+        except ImportError:
+            raise ImportError(
+                "whisper is required. Install with: "
+                "pip install openai-whisper"
+            )
+        return whisper
+    
+    def _prepare_for_batch(self, audio_path: str, whisper):
+        """Load, clean and split a file into padded log-mel segments (runs in the pool)"""
+        try:
+            from .audio import TARGET_SAMPLE_RATE, PreprocessResult, load_wav, resample, to_mono
+        except ImportError:  # src/ on sys.path (tests, demo.py)
+            from audio import TARGET_SAMPLE_RATE, PreprocessResult, load_wav, resample, to_mono
+        
+        if self.preprocess_audio:
+            cleaned = self._get_preprocessor().process_file(audio_path)
+        else:
+            audio, sample_rate = load_wav(audio_path)
+            audio = to_mono(audio)
+            cleaned = PreprocessResult(
+                audio=resample(audio, sample_rate),
+                sample_rate=TARGET_SAMPLE_RATE,
+                original_s=len(audio) / sample_rate,
+                trimmed_s=0.0
+            )
+        
+        dims = getattr(self._whisper_model, "dims", None)
+        mel_kwargs = {'n_mels': dims.n_mels} if hasattr(dims, "n_mels") else {}
+        mels = [
+            whisper.log_mel_spectrogram(
+                whisper.pad_or_trim(cleaned.audio[start:start + WHISPER_SEGMENT_SAMPLES]),
+                **mel_kwargs
+            )
+            for start in range(0, len(cleaned.audio), WHISPER_SEGMENT_SAMPLES)
+        ]
+        return cleaned, mels
+    
+    def _decode_batch(self, whisper, options, mels: list) -> List[str]:
+        """Run Whisper once over a batch of mel segments"""
+        import torch
+        
+        mel = torch.stack(mels)
+        device = getattr(self._whisper_model, "device", None)
+        if device is not None:
+            mel = mel.to(device)
+        return [result.text.strip() for result in whisper.decode(self._whisper_model, mel, options)]
+    
+    def transcribe_many(
+        self,
+        audio_paths: Iterable[str],
+        batch_size: Optional[int] = None,
+        workers: Optional[int] = None,
+        language: Optional[str] = "en"
+    ) -> Iterator[TranscriptionResult]:
+        """
+        Transcribe many recorded files, yielding results as they complete
+        
+        Files are decoded, cleaned and turned into log-mel segments in a
+        thread pool while Whisper decodes full batches of padded 30 s
+        segments in one forward pass. Results arrive in completion order
+        (use .index to restore input order). Throughput, including the
+        real-time factor, is kept in self.transcription_report. With
+        self.concurrent_voice off, preprocessing and Whisper take turns
+        instead of overlapping (less heat, lower peak CPU).
+        
+        Args:
+            audio_paths: Audio files (WAV, or any format soundfile reads)
+            batch_size: Segments decoded per Whisper call (None = self.stt_batch_size)
+            workers: Threads for loading and preprocessing (None = self.stt_workers)
+            language: Spoken language (None = detect per segment)
+            
+        Yields:
+            TranscriptionResult per file (text is "" for silent files;
+            error is set for files that could not be read)
+        """
+        batch_size = batch_size or self.stt_batch_size
+        workers = workers or self.stt_workers
+        concurrent = self.concurrent_voice
+        with self.tracer.span("load_whisper"):
+            self._use("whisper")
+        whisper = self._import_whisper()
+        options = whisper.DecodingOptions(language=language, fp16=False, without_timestamps=True)
+        
+        report = self.transcription_report = TranscriptionReport()
+        start_time = time.time()
+        paths = enumerate(audio_paths)
+        in_flight = {}
+        # Files waiting for their segments: index -> (result, texts by segment)
+        pending = {}
+        batch = []
+        exhausted = False
+        
+        def decode(segments):
+            decode_start = time.time()
+            texts = self._decode_batch(whisper, options, [mel for _, _, mel in segments])
+            decode_s = time.time() - decode_start
+            report.batches += 1
+            report.decode_s += decode_s
+            self.stt_stats['stt_s'] += decode_s
+            
+            finished = []
+            for (index, position, _), text in zip(segments, texts):
+                result, texts_by_segment = pending[index]
+                texts_by_segment[position] = text
+                result.stt_s += decode_s / len(segments)
+                if all(t is not None for t in texts_by_segment):
+                    result.text = " ".join(t for t in texts_by_segment if t)
+                    finished.append(pending.pop(index)[0])
+            return finished
+        
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            def submit_more():
+                nonlocal exhausted
+                # Bounded read-ahead keeps memory flat for thousands of files
+                while len(in_flight) < workers + batch_size:
+                    try:
+                        index, path = next(paths)
+                    except StopIteration:
+                        exhausted = True
+                        return
+                    in_flight[pool.submit(self._prepare_for_batch, path, whisper)] = (index, path)
+            
+            submit_more()
+            while in_flight or batch:
+                if in_flight:
+                    # Sequential mode collects the whole read-ahead before decoding
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED if concurrent else ALL_COMPLETED)
+                else:
+                    done = ()
+                
+                for future in done:
+                    index, path = in_flight.pop(future)
+                    report.files += 1
+                    self.stt_stats['queries'] += 1
+                    try:
+                        cleaned, mels = future.result()
+                    except Exception as e:
+                        report.failed += 1
+                        yield TranscriptionResult(index, path, "", error=str(e))
+                        continue
+                    
+                    report.audio_s += cleaned.original_s
+                    report.speech_s += cleaned.duration_s
+                    report.segments += len(mels)
+                    self.stt_stats['audio_s'] += cleaned.original_s
+                    self.stt_stats['trimmed_s'] += cleaned.trimmed_s
+                    result = TranscriptionResult(
+                        index, path, "",
+                        audio_s=cleaned.original_s,
+                        speech_s=cleaned.duration_s,
+                        segments=len(mels)
+                    )
+                    if not mels:
+                        # Nothing but silence: no Whisper work at all
+                        report.silent += 1
+                        yield result
+                        continue
+                    pending[index] = (result, [None] * len(mels))
+                    batch.extend((index, position, mel) for position, mel in enumerate(mels))
+                
+                if concurrent:
+                    submit_more()
+                # Decode full batches; flush a partial one once no more input is coming
+                while len(batch) >= batch_size or (batch and not in_flight and exhausted):
+                    segments, batch = batch[:batch_size], batch[batch_size:]
+                    for result in decode(segments):
+                        report.elapsed_s = time.time() - start_time
+                        yield result
+                if not concurrent:
+                    submit_more()
+        
+        report.elapsed_s = time.time() - start_time
+        if self.verbose:
+            print(f"Batch transcription: {report}")
+    
     def synthesize_speech(self, text: str, output_path: Optional[str] = None) -> str:
         """
         Convert text to speech using Coqui TTS
@@ -137,7 +525,8 @@ class VoiceAssistant:
         Returns:
             Path to generated audio file
         """
-        self._load_tts()
+        with self.tracer.span("load_tts"):
+            self._use("tts")
         
         if output_path is None:
             # Create temporary file
@@ -154,10 +543,11 @@ class VoiceAssistant:
             start_time = time.time()
         
         # Generate speech
-        self._tts_model.tts_to_file(
-            text=text,
-            file_path=output_path
-        )
+        with self.tracer.span("tts", chars=len(text)):
+            self._tts_model.tts_to_file(
+                text=text,
+                file_path=output_path
+            )
         
         if self.verbose:
             synthesis_time = time.time() - start_time
@@ -181,6 +571,14 @@ class VoiceAssistant:
         Returns:
             Tuple of (transcribed_text, llm_response, output_audio_path)
         """
+        with self.tracer.trace("voice_query"):
+            return self._run_voice_query(audio_input_path, audio_output_path)
+    
+    def _run_voice_query(
+        self,
+        audio_input_path: str,
+        audio_output_path: Optional[str]
+    ) -> tuple[str, str, str]:
         if self.verbose:
             print("\n" + "="*60)
             print("Processing voice query...")
@@ -188,14 +586,34 @@ class VoiceAssistant:
             total_start_time = time.time()
         
         # Step 1: Speech to Text
-        transcribed_text = self.transcribe_audio(audio_input_path)
+        with self.tracer.span("stt"):
+            transcribed_text = self.transcribe_audio(audio_input_path)
         
-        # Step 2: LLM Processing
+        # Step 2: Commands are handled without the LLM, then LLM Processing
         self._load_llm()
-        llm_response = self._vehicle_assistant.ask(transcribed_text)
+        assistant = self._vehicle_assistant
+        with self.tracer.span("command_match"):
+            llm_response = assistant.answer_command(transcribed_text)
+        if llm_response is None:
+            # Schedule and answer-pack hits do not need the model loaded
+            llm_response = assistant.answer_offline(transcribed_text)
+        if llm_response is None:
+            with self.tracer.span("llm"):
+                if not assistant.cached_only:
+                    self._use("llm")
+                llm_response = assistant._answer_llm(
+                    transcribed_text,
+                    cancel_token=CancellationToken(timeout_s=self.llm_timeout_s)
+                )
+        elif self._is_repeat(transcribed_text):
+            # Replay the previous audio instead of synthesizing it again
+            if self.verbose:
+                print(f"Replaying previous response audio: {self._last_output_audio}")
+            return transcribed_text, llm_response, self._last_output_audio
         
         # Step 3: Text to Speech
         output_audio = self.synthesize_speech(llm_response, audio_output_path)
+        self._last_output_audio = output_audio
         
         if self.verbose:
             total_time = time.time() - total_start_time
@@ -204,6 +622,22 @@ class VoiceAssistant:
         
         return transcribed_text, llm_response, output_audio
     
+    def _is_repeat(self, text: str) -> bool:
+        """True for a "repeat that" command with previous audio still on disk"""
+        try:
+            from .intents import REPEAT
+        except ImportError:  # src/ on sys.path (tests, demo.py)
+            from intents import REPEAT
+        
+        intents = self._vehicle_assistant.intents
+        match = intents.match(text) if intents is not None else None
+        return (
+            match is not None
+            and match.intent == REPEAT
+            and self._last_output_audio is not None
+            and os.path.exists(self._last_output_audio)
+        )
+    
     def set_vehicle_context(self, make: str, model: str, year: int, mileage: int):
         """Set vehicle context for the LLM"""
         self._load_llm()
@@ -306,33 +740,41 @@ class VoiceAssistant:
         print("Press Ctrl+C to exit")
         print("="*60 + "\n")
         
+        # Latest response audio is kept so "repeat that" can replay it
+        previous_output = None
+        
         try:
             while True:
                 print("\n🎤 Listening... (speak for 5 seconds)")
                 
-                # Record user input
-                audio_input = self.record_audio(duration=5)
-                
-                # Process the query
-                try:
-                    user_text, assistant_text, audio_output = self.process_voice_query(
-                        audio_input
-                    )
-                    
-                    print(f"\n👤 You said: {user_text}")
-                    print(f"🤖 Assistant: {assistant_text}")
-                    
-                    # Play the response
-                    print("🔊 Playing response...")
-                    self.play_audio(audio_output)
-                    
-                    # Clean up temp files
-                    os.remove(audio_input)
-                    os.remove(audio_output)
+                with self.tracer.trace("voice_turn"):
+                    # Record user input
+                    with self.tracer.span("record"):
+                        audio_input = self.record_audio(duration=5)
                     
-                except Exception as e:
-                    print(f"❌ Error processing query: {e}")
-                    continue
+                    # Process the query
+                    try:
+                        user_text, assistant_text, audio_output = self.process_voice_query(
+                            audio_input
+                        )
+                        
+                        print(f"\n👤 You said: {user_text}")
+                        print(f"🤖 Assistant: {assistant_text}")
+                        
+                        # Play the response
+                        print("🔊 Playing response...")
+                        with self.tracer.span("playback"):
+                            self.play_audio(audio_output)
+                        
+                        # Clean up temp files
+                        os.remove(audio_input)
+                        if previous_output and previous_output != audio_output:
+                            os.remove(previous_output)
+                        previous_output = audio_output
+                        
+                    except Exception as e:
+                        print(f"❌ Error processing query: {e}")
+                        continue
                 
                 print("\n" + "-"*60)
                 
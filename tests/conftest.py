@@ -0,0 +1,30 @@
+"""
+Shared fixtures for the unit tests
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from assistant import VehicleAssistant
+from backends import StubBackend
+
+
+@pytest.fixture
+def stub_assistant():
+    """
+    Factory for a VehicleAssistant on a StubBackend
+
+    make(responder, token_delay_s=0.0, model_path="test_model.gguf",
+    **assistant_kwargs) returns (assistant, backend).
+    """
+    def make(responder=None, token_delay_s=0.0, model_path="test_model.gguf", **assistant_kwargs):
+        backend = StubBackend(responder=responder, token_delay_s=token_delay_s)
+        assistant = VehicleAssistant(model_path=model_path, backend=backend, **assistant_kwargs)
+        return assistant, backend
+
+    return make
@@ -0,0 +1,198 @@
+"""
+Unit tests for LoRA adapter management
+"""
+
+import sys
+import types
+from pathlib import Path
+
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from adapters import BASE_ADAPTER, AdapterManager
+from assistant import VehicleAssistant, VehicleContext
+from backends import LlamaCppBackend, StubBackend
+from scheduler import RequestScheduler
+
+ADAPTERS = {
+    "Toyota": "adapters/toyota.gguf",
+    "Honda": "adapters/honda.gguf",
+    "Ford": "adapters/ford.gguf",
+}
+
+
+class TestAdapterManager:
+    """Test resolution, LRU caching and switch metrics"""
+
+    def test_resolve(self):
+        manager = AdapterManager(ADAPTERS)
+        camry = VehicleContext("Toyota", "Camry", 2022, 15000)
+        tesla = VehicleContext("Tesla", "Model 3", 2022, 15000)
+
+        assert manager.resolve(None, camry) == "toyota"
+        assert manager.resolve(None, tesla) == BASE_ADAPTER
+        assert manager.resolve("HONDA", camry) == "honda"
+        assert manager.resolve(BASE_ADAPTER, camry) == BASE_ADAPTER
+        with pytest.raises(ValueError, match="Unknown adapter"):
+            manager.resolve("bmw")
+
+    def test_base_name_is_reserved(self):
+        with pytest.raises(ValueError):
+            AdapterManager({"base": "x.gguf"})
+
+    def test_lru_eviction(self):
+        backend = StubBackend()
+        manager = AdapterManager(ADAPTERS, max_loaded=2)
+
+        for name in ["toyota", "honda", "toyota", "ford", "honda"]:
+            manager.activate(backend, name)
+
+        assert backend.adapter_loads == [
+            "adapters/toyota.gguf", "adapters/honda.gguf", "adapters/ford.gguf", "adapters/honda.gguf"
+        ]
+        assert backend.adapters_freed == ["adapters/honda.gguf", "adapters/toyota.gguf"]
+        metrics = manager.metrics()
+        assert metrics['loaded'] == ["ford", "honda"]
+        assert metrics['switches'] == 5
+        assert metrics['cache_hits'] == 1
+        assert metrics['evictions'] == 2
+        assert 0 <= metrics['mean_switch_s'] <= metrics['max_switch_s']
+
+    def test_same_adapter_is_not_reapplied(self):
+        backend = StubBackend()
+        manager = AdapterManager(ADAPTERS)
+
+        manager.activate(backend, "toyota")
+        assert manager.activate(backend, "toyota") == 0.0
+        assert manager.metrics()['switches'] == 1
+
+    def test_new_backend_drops_old_handles(self):
+        old, new = StubBackend(), StubBackend()
+        old.load()
+        manager = AdapterManager(ADAPTERS)
+        manager.activate(old, "toyota")
+
+        manager.activate(new, "toyota")
+
+        assert old.adapters_freed == ["adapters/toyota.gguf"] and old.adapter is None
+        assert new.adapter_loads == ["adapters/toyota.gguf"]
+
+
+class TestAssistantAdapters:
+    """Test per-request and per-session adapter switching"""
+
+    def test_adapter_follows_vehicle_make(self, stub_assistant):
+        assistant, backend = stub_assistant(" Use 0W-20 oil.")
+        assistant.enable_adapters(ADAPTERS)
+        assistant.set_vehicle_context("Honda", "Civic", 2020, 40000)
+
+        assistant.ask("What oil should I use?")
+        assistant.set_vehicle_context("Tesla", "Model 3", 2022, 10000)
+        assistant.ask("What oil should I use?")
+
+        assert [call['adapter'] for call in backend.calls] == ["adapters/honda.gguf", None]
+
+    def test_per_request_and_session_adapter(self, stub_assistant):
+        assistant, backend = stub_assistant(" Use 0W-20 oil.")
+        assistant.enable_adapters(ADAPTERS)
+        assistant.set_vehicle_context("Honda", "Civic", 2020, 40000)
+        assistant.adapter = "ford"
+
+        assistant.ask("What oil should I use?")
+        assistant.ask("What oil should I use?", adapter="toyota")
+        list(assistant.ask("What oil should I use?", stream=True))
+
+        assert [call['adapter'] for call in backend.calls] == [
+            "adapters/ford.gguf", "adapters/toyota.gguf", "adapters/ford.gguf"
+        ]
+        assert backend.adapter_loads == ["adapters/ford.gguf", "adapters/toyota.gguf"]
+
+    def test_answer_once_uses_given_vehicle(self, stub_assistant):
+        assistant, backend = stub_assistant(" Use 0W-20 oil.")
+        assistant.enable_adapters(ADAPTERS)
+
+        assistant.answer_once("What oil should I use?", vehicle_context=VehicleContext("Ford", "F-150", 2021, 30000))
+
+        assert backend.calls[0]['adapter'] == "adapters/ford.gguf"
+
+    def test_unload_frees_adapters(self, stub_assistant):
+        assistant, backend = stub_assistant(" Use 0W-20 oil.")
+        assistant.enable_adapters(ADAPTERS)
+        assistant.ask("What oil should I use?", adapter="toyota")
+
+        assistant.unload()
+
+        assert backend.adapters_freed == ["adapters/toyota.gguf"]
+        assert assistant.adapters.metrics()['loaded'] == []
+
+    def test_scheduler_sessions_switch_adapters(self, stub_assistant):
+        assistant, backend = stub_assistant(" Use 0W-20 oil.")
+        assistant.enable_adapters(ADAPTERS)
+
+        with RequestScheduler(assistant) as scheduler:
+            scheduler.open_session("civic", VehicleContext("Honda", "Civic", 2020, 40000))
+            scheduler.open_session("fleet", adapter="ford")
+            scheduler.ask("What oil should I use?", session_id="civic", timeout=5)
+            scheduler.ask("What oil should I use?", session_id="fleet", timeout=5)
+
+        assert [call['adapter'] for call in backend.calls] == ["adapters/honda.gguf", "adapters/ford.gguf"]
+        assert assistant.adapter is None
+
+    def test_without_adapters_nothing_switches(self):
+        backend = StubBackend()
+        assistant = VehicleAssistant(model_path="phi-2-base.gguf", backend=backend)
+
+        assistant.ask("What oil should I use?")
+
+        assert backend.adapter_loads == [] and backend.calls[0]['adapter'] is None
+
+
+class TestLlamaCppLoraApi:
+    """Test the llama.cpp LoRA API fallbacks with a fake module"""
+
+    def _backend(self, monkeypatch, names):
+        calls = []
+        module = types.ModuleType("llama_cpp")
+        init, set_, clear, free = names
+        setattr(module, init, lambda model, path: calls.append(("init", path)) or "handle")
+        setattr(module, set_, lambda ctx, adapter, scale: calls.append(("set", adapter, scale)) or 0)
+        setattr(module, clear, lambda ctx: calls.append(("clear",)))
+        setattr(module, free, lambda adapter: calls.append(("free", adapter)))
+        monkeypatch.setitem(sys.modules, "llama_cpp", module)
+
+        backend = LlamaCppBackend("phi-2-base.gguf")
+        backend.llm = types.SimpleNamespace(
+            _model=types.SimpleNamespace(model="model"),
+            _ctx=types.SimpleNamespace(ctx="ctx"),
+            reset=lambda: calls.append(("reset",)),
+        )
+        backend._loaded = True
+        return backend, calls
+
+    @pytest.mark.parametrize("names", [
+        ("llama_adapter_lora_init", "llama_set_adapter_lora", "llama_clear_adapter_lora", "llama_adapter_lora_free"),
+        ("llama_lora_adapter_init", "llama_lora_adapter_set", "llama_lora_adapter_clear", "llama_lora_adapter_free"),
+    ])
+    def test_api_generations(self, monkeypatch, names):
+        backend, calls = self._backend(monkeypatch, names)
+
+        handle = backend.load_adapter("adapters/toyota.gguf")
+        backend.set_adapter(handle, 0.8)
+        backend.set_adapter(None)
+        backend.free_adapter(handle)
+
+        assert calls == [
+            ("init", b"adapters/toyota.gguf"),
+            ("clear",), ("set", "handle", 0.8), ("reset",),
+            ("clear",), ("reset",),
+            ("free", "handle"),
+        ]
+
+    def test_missing_api(self, monkeypatch):
+        monkeypatch.setitem(sys.modules, "llama_cpp", types.ModuleType("llama_cpp"))
+        backend = LlamaCppBackend("phi-2-base.gguf")
+
+        with pytest.raises(NotImplementedError, match="pip install"):
+            backend.free_adapter("handle")
@@ -0,0 +1,174 @@
+"""
+Unit tests for predictive-maintenance analytics
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from analytics import (
+    RollingWindow,
+    TelemetryAnalyzer,
+    analyze_fleet,
+    flagged_rows,
+    rolling_mean_std,
+    rolling_slope,
+)
+from assistant import VehicleAssistant
+from backends import StubBackend
+from telemetry import Frame, LiveVehicleContext, TelemetryIngestor
+
+
+def _feed(analyzer, name, values, start=1700000000.0, step=1.0):
+    for i, value in enumerate(values):
+        analyzer.update(name, start + i * step, float(value))
+
+
+class TestRollingWindow:
+    """Test incremental window statistics against NumPy"""
+
+    def test_matches_numpy_after_wraparound(self):
+        rng = np.random.default_rng(0)
+        times = 1700000000.0 + np.arange(1000) * 0.5
+        values = 13.8 + rng.normal(0, 0.1, 1000) + np.arange(1000) * 1e-3
+        window = RollingWindow(size=50)
+        for t, v in zip(times, values):
+            window.append(t, v)
+
+        last_t, last_v = times[-50:], values[-50:]
+        assert window.count == 50
+        assert window.last == pytest.approx(values[-1])
+        assert window.mean == pytest.approx(last_v.mean())
+        assert window.std == pytest.approx(last_v.std(), rel=1e-6)
+        expected_slope = np.polyfit(last_t - last_t[0], last_v, 1)[0] * 3600
+        assert window.slope_per_hour == pytest.approx(expected_slope, rel=1e-6)
+
+    def test_partial_window(self):
+        window = RollingWindow(size=10)
+        window.append(0.0, 1.0)
+        window.append(1.0, 3.0)
+
+        assert window.mean == 2.0
+        assert window.std == 1.0
+        assert window.slope_per_hour == pytest.approx(7200.0)
+
+
+class TestTelemetryAnalyzer:
+    """Test findings and the prompt summary"""
+
+    def test_healthy_vehicle_has_no_findings(self):
+        rng = np.random.default_rng(1)
+        analyzer = TelemetryAnalyzer()
+        _feed(analyzer, "battery_v", 14.0 + rng.normal(0, 0.02, 200))
+        _feed(analyzer, "coolant_temp_c", 90 + rng.normal(0, 0.5, 200))
+
+        assert analyzer.findings() == []
+        assert analyzer.summary() == ""
+
+    def test_out_of_range(self):
+        analyzer = TelemetryAnalyzer()
+        _feed(analyzer, "coolant_temp_c", [115] * 30)
+
+        assert analyzer.summary() == "Telemetry findings: coolant temperature high at 115 °C (limit 110 °C)"
+
+    def test_falling_battery_voltage_is_a_trend(self):
+        analyzer = TelemetryAnalyzer(window=60)
+        # 13.0 V falling 0.5 V/h, sampled once a minute
+        _feed(analyzer, "battery_v", 13.0 - np.arange(60) * 0.5 / 60, step=60)
+
+        [finding] = analyzer.findings()
+        assert finding.kind == "trend"
+        assert "battery voltage trending down 0.50 V/h" in finding.message
+        assert analyzer.stats("battery_v").slope_per_hour == pytest.approx(-0.5)
+
+    def test_spike_is_an_anomaly(self):
+        rng = np.random.default_rng(2)
+        analyzer = TelemetryAnalyzer()
+        _feed(analyzer, "short_fuel_trim_pct", rng.normal(0, 2, 100).tolist() + [12])
+
+        [finding] = analyzer.findings()
+        assert finding.kind == "anomaly"
+        assert analyzer.stats("short_fuel_trim_pct").anomaly > 4
+
+    def test_findings_are_ordered_by_severity(self):
+        analyzer = TelemetryAnalyzer(window=60)
+        _feed(analyzer, "battery_v", 13.0 - np.arange(60) * 0.5 / 60, step=60)
+        _feed(analyzer, "long_fuel_trim_pct", [14] * 30)
+
+        assert [f.kind for f in analyzer.findings()] == ["out_of_range", "trend"]
+        assert analyzer.summary(limit=1).startswith("Telemetry findings: long-term fuel trim high at 14%")
+
+    def test_ignores_unknown_signals(self):
+        analyzer = TelemetryAnalyzer()
+        analyzer.update("rpm", 0.0, 800)
+
+        assert analyzer.stats("rpm") is None
+
+    def test_fed_by_ingestor_into_prompt(self):
+        analyzer = TelemetryAnalyzer()
+        context = LiveVehicleContext("Toyota", "Camry", 2022, 15000)
+        ingestor = TelemetryIngestor(source=None, context=context, analyzer=analyzer)
+        for i in range(30):
+            ingestor.process(Frame(float(i), 0x7E8, bytes([0x03, 0x41, 0x05, 155])))
+
+        assistant = VehicleAssistant(model_path="test_model.gguf", backend=StubBackend())
+        assistant.vehicle_context = context
+        assistant.analytics = analyzer
+        prompt = assistant._build_prompt("Why is the temperature gauge high?")
+
+        assert "Telemetry findings: coolant temperature high at 115 °C" in prompt
+
+
+class TestFleetAnalytics:
+    """Test vectorized batch analytics"""
+
+    def test_rolling_mean_std_matches_windows(self):
+        values = np.random.default_rng(3).normal(50, 5, (4, 30))
+
+        mean, std = rolling_mean_std(values, 10)
+
+        assert mean.shape == (4, 21)
+        assert np.allclose(mean[:, 5], values[:, 5:15].mean(axis=1))
+        assert np.allclose(std[:, -1], values[:, -10:].std(axis=1))
+
+    def test_rolling_slope(self):
+        times = np.arange(20) * 60.0
+        values = np.stack((np.full(20, 14.0), 14.0 - times / 3600))
+
+        slope = rolling_slope(times, values, 10)
+
+        assert np.allclose(slope[:, -1], [0.0, -1.0])
+
+    def test_batch_matches_incremental(self):
+        rng = np.random.default_rng(4)
+        times = np.arange(300) * 10.0
+        values = 13.5 + rng.normal(0, 0.05, (3, 300)) - np.outer([0, 0.2, 1.0], times / 3600)
+
+        results = analyze_fleet({'battery_v': values}, times, window=120)['battery_v']
+
+        for row in range(3):
+            analyzer = TelemetryAnalyzer(window=120)
+            _feed(analyzer, "battery_v", values[row], start=0.0, step=10.0)
+            stats = analyzer.stats("battery_v")
+            assert results['mean'][row] == pytest.approx(stats.mean)
+            assert results['std'][row] == pytest.approx(stats.std, rel=1e-6)
+            assert results['slope_per_hour'][row] == pytest.approx(stats.slope_per_hour, rel=1e-6)
+            kinds = {f.kind for f in analyzer.findings()}
+            assert results['trend'][row] == ("trend" in kinds)
+
+    def test_flagged_rows(self):
+        rng = np.random.default_rng(5)
+        coolant = 90 + rng.normal(0, 0.5, (1000, 200))
+        coolant[17] += 25
+        coolant[400, -1] = 130
+
+        results = analyze_fleet({'coolant_temp_c': coolant}, np.arange(200.0), window=60)
+
+        assert results['coolant_temp_c']['out_of_range'].nonzero()[0].tolist() == [17]
+        assert flagged_rows(results).tolist() == [17, 400]
+        assert flagged_rows({}).tolist() == []
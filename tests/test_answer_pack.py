@@ -0,0 +1,215 @@
+"""
+Unit tests for offline answer packs
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from answer_pack import (
+    AnswerPack,
+    build_answer_pack,
+    default_catalog,
+    normalize_question,
+    read_catalog,
+    write_answer_pack,
+)
+from assistant import CACHE_MISS_RESPONSE, VehicleAssistant, VehicleContext
+from backends import StubBackend
+
+CAMRY = VehicleContext("Toyota", "Camry", 2023, 15000)
+
+
+def _pack(tmp_path, answers, vehicle=CAMRY):
+    path = str(tmp_path / "camry.tlap")
+    write_answer_pack(path, answers, vehicle=vehicle)
+    return path
+
+
+class TestAnswerPackFormat:
+    """Test writing and reading packs"""
+
+    def test_round_trip(self, tmp_path):
+        answers = {f"How do I use feature {i}?": f"Press button {i}." for i in range(200)}
+        pack = AnswerPack(_pack(tmp_path, answers))
+
+        assert len(pack) == 200
+        for question, answer in answers.items():
+            assert pack.lookup(question) == answer
+        assert pack.vehicle == {'make': "Toyota", 'model': "Camry", 'year': 2023}
+
+    def test_matching_ignores_case_and_punctuation(self, tmp_path):
+        pack = AnswerPack(_pack(tmp_path, {"How do I pair my phone?": "Open Bluetooth settings."}))
+
+        assert pack.lookup("how do i pair my phone") == "Open Bluetooth settings."
+        assert pack.lookup("How do I pair my watch?") is None
+        assert pack.report()['hits'] == 1 and pack.report()['misses'] == 1
+
+    def test_unicode_answers_survive_compression(self, tmp_path):
+        pack = AnswerPack(_pack(tmp_path, {"What is the tire pressure?": "35 psi — 2.4 bar"}))
+
+        assert pack.lookup("What is the tire pressure?") == "35 psi — 2.4 bar"
+
+    def test_compression_shrinks_repetitive_answers(self, tmp_path):
+        answer = "Pull over safely and check the engine oil level before driving further. " * 5
+        report = write_answer_pack(str(tmp_path / "p.tlap"), {f"question {i}": answer for i in range(50)})
+
+        assert report.compression_ratio > 2
+
+    def test_empty_pack(self, tmp_path):
+        pack = AnswerPack(_pack(tmp_path, {}))
+
+        assert len(pack) == 0
+        assert pack.lookup("anything") is None
+
+    def test_rejects_other_files(self, tmp_path):
+        path = tmp_path / "not_a_pack.bin"
+        path.write_bytes(b"GGUF" + bytes(60))
+
+        with pytest.raises(ValueError):
+            AnswerPack(str(path))
+
+    def test_vehicle_matching(self, tmp_path):
+        pack = AnswerPack(_pack(tmp_path, {"q": "a"}))
+
+        assert pack.matches(VehicleContext("toyota", "camry", 2023, 90000))
+        assert not pack.matches(VehicleContext("Toyota", "Camry", 2021, 15000))
+        assert not pack.matches(None)
+
+    def test_lookup_is_sub_millisecond(self, tmp_path):
+        catalog = default_catalog()
+        pack = AnswerPack(_pack(tmp_path, {q: "Answer text. " * 20 for q in catalog}))
+
+        start_time = time.perf_counter()
+        for question in catalog * 10:
+            assert pack.lookup(question) is not None
+        per_lookup_ms = (time.perf_counter() - start_time) / (len(catalog) * 10) * 1000
+
+        assert per_lookup_ms < 1.0
+
+    def test_normalize_question(self):
+        assert normalize_question("  What's   P0420?! ") == "what's p0420"
+
+    def test_read_catalog(self, tmp_path):
+        path = tmp_path / "catalog.txt"
+        path.write_text("# DTCs\nWhat causes P0420?\n\nHow do I pair my phone?\n")
+
+        assert read_catalog(str(path)) == ["What causes P0420?", "How do I pair my phone?"]
+
+
+class TestBuildAnswerPack:
+    """Test compiling a pack with the assistant"""
+
+    def test_build_uses_stateless_prompts(self, tmp_path):
+        backend = StubBackend()
+        assistant = VehicleAssistant(model_path="test_model.gguf", backend=backend)
+        assistant.set_vehicle_context("Toyota", "Camry", 2023, 15000)
+        questions = ["What causes P0420?", "what causes p0420", "When is my next oil change?",
+                     "How do I pair my phone?"]
+
+        report = build_answer_pack(assistant, questions, str(tmp_path / "camry.tlap"))
+
+        assert report.entries == 2
+        assert report.skipped == 2
+        assert len(backend.calls) == 2
+        assert all(call['temperature'] == 0.0 for call in backend.calls)
+        assert assistant.conversation_history == []
+        pack = AnswerPack(str(tmp_path / "camry.tlap"))
+        any_mileage = VehicleContext("Toyota", "Camry", 2023, None)
+        assert pack.lookup("What causes P0420?") == assistant.answer_once(
+            "What causes P0420?", vehicle_context=any_mileage, temperature=0.0
+        )
+
+    def test_build_prompts_leave_out_mileage(self, tmp_path):
+        backend = StubBackend()
+        assistant = VehicleAssistant(model_path="test_model.gguf", backend=backend)
+        assistant.set_vehicle_context("Toyota", "Camry", 2023, 15000)
+
+        build_answer_pack(assistant, ["How do I reset the oil life indicator?"], str(tmp_path / "camry.tlap"))
+
+        prompt = backend.calls[0]['prompt']
+        assert "Camry" in prompt
+        assert "Mileage" not in prompt and "15,000" not in prompt
+        assert "Maintenance due" not in prompt
+
+    def test_oil_feature_questions_are_built(self, tmp_path):
+        assistant = VehicleAssistant(model_path="test_model.gguf", backend=StubBackend())
+        assistant.set_vehicle_context("Toyota", "Camry", 2023, 15000)
+        questions = ["How do I reset the oil life indicator?", "What does the oil pressure warning light mean?"]
+
+        report = build_answer_pack(assistant, questions, str(tmp_path / "camry.tlap"))
+
+        assert report.entries == 2 and report.skipped == 0
+
+    def test_default_catalog_covers_dtcs_and_features(self):
+        catalog = default_catalog()
+
+        assert "What causes P0420?" in catalog
+        assert "How do I connect my phone via Bluetooth?" in catalog
+        assert len(set(catalog)) == len(catalog)
+
+
+class TestAssistantAnswerPack:
+    """Test serving answers from a pack inside ask()"""
+
+    def _assistant(self, tmp_path, **kwargs):
+        path = _pack(tmp_path, {"How do I pair my phone?": "Open Settings, then Bluetooth."})
+        assistant = VehicleAssistant(
+            model_path="test_model.gguf",
+            backend=StubBackend(responder=" Model answer."),
+            answer_pack=path,
+            **kwargs
+        )
+        assistant.set_vehicle_context("Toyota", "Camry", 2023, 15000)
+        return assistant
+
+    def test_hit_skips_model_load(self, tmp_path):
+        assistant = self._assistant(tmp_path)
+
+        assert assistant.ask("How do I pair my phone?") == "Open Settings, then Bluetooth."
+        assert assistant._llm is None
+        assert assistant.conversation_history[-1]['assistant'] == "Open Settings, then Bluetooth."
+
+    def test_streamed_hit(self, tmp_path):
+        assistant = self._assistant(tmp_path)
+
+        assert list(assistant.ask("how do i pair my phone", stream=True)) == ["Open Settings, then Bluetooth."]
+
+    def test_miss_goes_to_llm(self, tmp_path):
+        assistant = self._assistant(tmp_path)
+
+        assert assistant.ask("Why is my check engine light on?") == "Model answer."
+
+    def test_other_vehicle_is_not_served(self, tmp_path):
+        assistant = self._assistant(tmp_path)
+        assistant.set_vehicle_context("Honda", "Civic", 2020, 40000)
+
+        assert assistant.ask("How do I pair my phone?") == "Model answer."
+
+    def test_cached_only_never_loads_model(self, tmp_path):
+        assistant = self._assistant(tmp_path, cached_only=True)
+
+        assert assistant.ask("How do I pair my phone?") == "Open Settings, then Bluetooth."
+        assert assistant.ask("Why is my check engine light on?") == CACHE_MISS_RESPONSE
+        assert assistant._llm is None
+
+    def test_voice_query_served_from_pack(self, tmp_path):
+        from src.voice_interface import VoiceAssistant
+
+        path = _pack(tmp_path, {"How do I pair my phone?": "Open Settings, then Bluetooth."})
+        voice = VoiceAssistant(llm_path="test_model.gguf", preprocess_audio=False,
+                               answer_pack=path, cached_only=True)
+        voice.transcribe_audio = lambda audio_path: "How do I pair my phone?"
+        voice.synthesize_speech = lambda text, output_path=None: "response.wav"
+        voice._use = lambda component: pytest.fail(f"{component} should not be loaded")
+        voice._load_llm()
+        voice._vehicle_assistant.set_vehicle_context("Toyota", "Camry", 2023, 15000)
+
+        _, response, _ = voice.process_voice_query("in.wav")
+
+        assert response == "Open Settings, then Bluetooth."
@@ -0,0 +1,273 @@
+"""
+Unit tests for audio preprocessing before Whisper
+"""
+
+import sys
+import wave
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from audio import (
+    AudioPreprocessor,
+    load_wav,
+    noise_gate,
+    remove_dc,
+    resample,
+    trim_silence,
+)
+
+
+def _tone(seconds, sample_rate=16000, freq=220.0, amplitude=0.5):
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    return (amplitude * np.sin(2 * np.pi * freq * t)).astype(np.float32)
+
+
+def _utterance(sample_rate=16000, lead_s=1.0, speech_s=1.0, trail_s=2.0):
+    silence = np.zeros
+    return np.concatenate([
+        silence(int(lead_s * sample_rate), dtype=np.float32),
+        _tone(speech_s, sample_rate),
+        silence(int(trail_s * sample_rate), dtype=np.float32),
+    ])
+
+
+def _write_wav(path, audio, sample_rate, channels=1):
+    pcm = (np.clip(audio, -1, 1) * 32767).astype(np.int16)
+    with wave.open(str(path), 'wb') as wf:
+        wf.setnchannels(channels)
+        wf.setsampwidth(2)
+        wf.setframerate(sample_rate)
+        wf.writeframes(pcm.tobytes())
+    return str(path)
+
+
+class TestPrimitives:
+    """Test the vectorized building blocks"""
+
+    def test_remove_dc(self):
+        audio = _tone(0.5) + 0.2
+
+        assert abs(float(remove_dc(audio).mean())) < 1e-4
+
+    def test_trim_keeps_speech_with_padding(self):
+        audio = _utterance()
+
+        trimmed, removed = trim_silence(audio, 16000, pad_ms=100)
+
+        assert len(trimmed) == pytest.approx(1.2 * 16000, abs=16000 * 0.02)
+        assert removed == len(audio) - len(trimmed)
+
+    def test_all_silence_trims_to_empty(self):
+        trimmed, removed = trim_silence(np.zeros(16000, dtype=np.float32), 16000)
+
+        assert len(trimmed) == 0
+        assert removed == 16000
+
+    def test_resample_length_and_pitch(self):
+        audio = _tone(1.0, sample_rate=44100, freq=440.0)
+
+        out = resample(audio, 44100, 16000)
+
+        assert out.dtype == np.float32
+        assert len(out) == 16000
+        spectrum = np.abs(np.fft.rfft(out))
+        assert np.argmax(spectrum) == pytest.approx(440, abs=2)
+
+    def test_noise_gate_silences_quiet_frames(self):
+        audio = np.concatenate([_tone(0.5), _tone(0.5, amplitude=0.001)])
+
+        gated, silenced = noise_gate(audio, 16000, threshold_db=-40)
+
+        assert silenced == pytest.approx(8000, abs=320)
+        assert not gated[-4000:].any()
+        assert gated[:4000].any()
+
+
+class TestAudioPreprocessor:
+    """Test the full preprocessing pipeline"""
+
+    def test_stereo_44k_file_becomes_16k_mono(self, tmp_path):
+        mono = _utterance(sample_rate=44100)
+        stereo = np.repeat(mono, 2)
+        path = _write_wav(tmp_path / "query.wav", stereo, 44100, channels=2)
+
+        result = AudioPreprocessor().process_file(path)
+
+        assert result.sample_rate == 16000
+        assert result.audio.ndim == 1
+        assert result.original_s == pytest.approx(4.0, abs=0.01)
+        assert result.trimmed_s == pytest.approx(2.7, abs=0.05)
+        assert result.duration_s == pytest.approx(1.3, abs=0.05)
+        assert np.abs(result.audio).max() == pytest.approx(0.95, abs=0.01)
+
+    def test_load_wav_scales_to_unit_range(self, tmp_path):
+        path = _write_wav(tmp_path / "tone.wav", _tone(0.1), 16000)
+
+        audio, sample_rate = load_wav(path)
+
+        assert sample_rate == 16000
+        assert np.abs(audio).max() == pytest.approx(0.5, abs=0.01)
+
+    def test_noise_only_recording_is_silent(self):
+        noise = np.random.default_rng(0).normal(0, 0.001, 32000).astype(np.float32)
+
+        assert AudioPreprocessor().process(noise, 16000).is_silent
+
+
+class _FakeWhisper:
+    """Whisper stand-in that records what it was asked to transcribe"""
+
+    def __init__(self):
+        self.inputs = []
+
+    def transcribe(self, audio, **kwargs):
+        self.inputs.append(audio)
+        return {"text": " What does P0420 mean? "}
+
+
+class TestTranscribeAudio:
+    """Test VoiceAssistant.transcribe_audio with preprocessing"""
+
+    def _assistant(self):
+        from src.voice_interface import VoiceAssistant
+
+        assistant = VoiceAssistant(llm_path="test_model.gguf")
+        assistant._whisper_model = _FakeWhisper()
+        return assistant
+
+    def test_whisper_receives_trimmed_array(self, tmp_path):
+        assistant = self._assistant()
+        path = _write_wav(tmp_path / "query.wav", _utterance(), 16000)
+
+        text = assistant.transcribe_audio(path)
+
+        audio = assistant._whisper_model.inputs[0]
+        assert text == "What does P0420 mean?"
+        assert isinstance(audio, np.ndarray) and audio.dtype == np.float32
+        assert len(audio) < 1.5 * 16000
+        assert assistant.stt_stats['trimmed_s'] == pytest.approx(2.7, abs=0.05)
+        assert assistant.stt_stats['estimated_saved_s'] > 0
+
+    def test_silence_skips_whisper(self, tmp_path):
+        assistant = self._assistant()
+        path = _write_wav(tmp_path / "silence.wav", np.zeros(16000, dtype=np.float32), 16000)
+
+        assert assistant.transcribe_audio(path) == ""
+        assert assistant._whisper_model.inputs == []
+
+    def test_preprocessing_can_be_disabled(self, tmp_path):
+        assistant = self._assistant()
+        assistant.preprocess_audio = False
+        path = _write_wav(tmp_path / "query.wav", _utterance(), 16000)
+
+        assistant.transcribe_audio(path)
+
+        assert assistant._whisper_model.inputs == [path]
+
+
+def _fake_whisper_modules(model):
+    """Stand-ins for the whisper and torch modules used by transcribe_many"""
+    import types
+
+    def pad_or_trim(audio, length=30 * 16000):
+        return np.pad(audio, (0, max(0, length - len(audio))))[:length]
+
+    def decode(decode_model, mel, options):
+        decode_model.batches.append(len(mel))
+        # "Transcribe" each segment as its amount of speech
+        return [
+            types.SimpleNamespace(text=f" {np.count_nonzero(np.abs(m) > 1e-3) / 16000:.1f}s ")
+            for m in mel
+        ]
+
+    whisper = types.ModuleType("whisper")
+    whisper.pad_or_trim = pad_or_trim
+    whisper.log_mel_spectrogram = lambda audio, **kwargs: audio
+    whisper.DecodingOptions = types.SimpleNamespace
+    whisper.decode = decode
+    torch = types.ModuleType("torch")
+    torch.stack = np.stack
+    return whisper, torch
+
+
+class _FakeBatchModel:
+    def __init__(self):
+        self.batches = []
+
+
+class TestTranscribeMany:
+    """Test batched bulk transcription"""
+
+    def _assistant(self, monkeypatch):
+        from src.voice_interface import VoiceAssistant
+
+        assistant = VoiceAssistant(llm_path="test_model.gguf")
+        assistant._whisper_model = model = _FakeBatchModel()
+        whisper, torch = _fake_whisper_modules(model)
+        monkeypatch.setitem(sys.modules, "whisper", whisper)
+        monkeypatch.setitem(sys.modules, "torch", torch)
+        return assistant, model
+
+    def test_batches_and_streams_results(self, tmp_path, monkeypatch):
+        assistant, model = self._assistant(monkeypatch)
+        paths = [
+            _write_wav(tmp_path / f"query{i}.wav", _utterance(speech_s=speech_s), 16000)
+            for i, speech_s in enumerate([1.0, 2.0, 1.5, 0.5, 3.0])
+        ]
+
+        results = list(assistant.transcribe_many(paths, batch_size=2, workers=3))
+
+        assert sorted(r.index for r in results) == [0, 1, 2, 3, 4]
+        by_index = {r.index: r for r in results}
+        assert [by_index[i].text for i in range(5)] == ["1.0s", "2.0s", "1.5s", "0.5s", "3.0s"]
+        assert all(r.path == paths[r.index] for r in results)
+        assert sum(model.batches) == 5 and max(model.batches) == 2
+        report = assistant.transcription_report
+        assert report.files == 5 and report.batches == 3
+        assert report.audio_s == pytest.approx(5 * 3.0 + 8.0, abs=0.01)
+        assert 0 < report.real_time_factor < 1
+
+    def test_sequential_mode(self, tmp_path, monkeypatch):
+        assistant, model = self._assistant(monkeypatch)
+        assistant.concurrent_voice = False
+        assistant.stt_batch_size = 2
+        paths = [
+            _write_wav(tmp_path / f"query{i}.wav", _utterance(speech_s=speech_s), 16000)
+            for i, speech_s in enumerate([1.0, 2.0, 1.5, 0.5, 3.0])
+        ]
+
+        results = list(assistant.transcribe_many(paths, workers=1))
+
+        assert sorted(r.text for r in results) == ["0.5s", "1.0s", "1.5s", "2.0s", "3.0s"]
+        assert model.batches == [2, 2, 1]
+
+    def test_silent_and_unreadable_files(self, tmp_path, monkeypatch):
+        assistant, model = self._assistant(monkeypatch)
+        speech = _write_wav(tmp_path / "speech.wav", _utterance(), 16000)
+        silent = _write_wav(tmp_path / "silent.wav", np.zeros(16000, dtype=np.float32), 16000)
+        broken = tmp_path / "broken.wav"
+        broken.write_bytes(b"RIFF0000WAVEjunk")
+
+        results = {r.path: r for r in assistant.transcribe_many([speech, silent, str(broken)])}
+
+        assert results[speech].text == "1.0s"
+        assert results[silent].text == "" and results[silent].segments == 0
+        assert results[str(broken)].error is not None
+        assert model.batches == [1]
+        assert assistant.transcription_report.silent == 1
+        assert assistant.transcription_report.failed == 1
+
+    def test_long_recording_is_split_into_segments(self, tmp_path, monkeypatch):
+        assistant, model = self._assistant(monkeypatch)
+        path = _write_wav(tmp_path / "long.wav", _utterance(speech_s=40.0, lead_s=0.0, trail_s=0.0), 16000)
+
+        result, = assistant.transcribe_many([path])
+
+        assert result.segments == 2
+        assert [float(t[:-1]) for t in result.text.split()] == pytest.approx([30.0, 10.0], abs=0.2)
@@ -0,0 +1,175 @@
+"""
+Unit tests for the pluggable inference backends
+"""
+
+import sys
+import types
+from pathlib import Path
+from unittest.mock import Mock, patch
+
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from assistant import VehicleAssistant
+from backends import (
+    LlamaCppBackend,
+    OnnxGenAIBackend,
+    StubBackend,
+    create_backend,
+    truncate_at_stop,
+)
+
+
+def _fake_llama_cpp():
+    """Stand-in for llama_cpp: Llama streams two chunks, grammars are recorded"""
+    module = types.ModuleType("llama_cpp")
+
+    def llama(**kwargs):
+        llm = Mock()
+        llm.kwargs = kwargs
+        llm.tokenize = lambda data: list(range(len(data.split())))
+        llm.side_effect = lambda prompt, **params: iter([
+            {'choices': [{'text': " Check"}]},
+            {'choices': [{'text': " the fuse."}]},
+        ])
+        return llm
+
+    module.Llama = Mock(side_effect=llama)
+    module.LlamaGrammar = Mock()
+    module.LlamaGrammar.from_string = Mock(side_effect=lambda src, verbose=False: ("grammar", src))
+    return module
+
+
+class TestTruncateAtStop:
+    """Test stop-sequence handling for engines without native support"""
+
+    def test_stops_before_sequence(self):
+        pieces = [" Hello", " there", "\nUser", ":", " more"]
+
+        assert "".join(truncate_at_stop(iter(pieces), ["\nUser:"])) == " Hello there"
+
+    def test_token_boundaries_are_preserved(self):
+        pieces = [" one", " two", " three"]
+
+        assert list(truncate_at_stop(iter(pieces), ["User:"])) == pieces
+
+    def test_held_back_prefix_is_released(self):
+        pieces = [" a", " Use", "ful"]
+
+        assert list(truncate_at_stop(iter(pieces), [" User:"])) == pieces
+
+
+class TestStubBackend:
+    """Test the deterministic stub"""
+
+    def test_output_is_deterministic_per_prompt(self):
+        backend = StubBackend()
+
+        first = backend.complete("What does P0420 mean?", 64, 0.7).text
+
+        assert first == StubBackend().complete("What does P0420 mean?", 64, 0.7).text
+        assert first != backend.complete("Another prompt", 64, 0.7).text
+
+    def test_max_tokens_limits_output(self):
+        completion = StubBackend(responder="one two three four").complete("x", 2, 0.7)
+
+        assert completion.text == "one two"
+        assert completion.finish_reason == "length"
+
+    def test_state_round_trip(self):
+        backend = StubBackend()
+        backend.prefill("cached prompt")
+        state = backend.save_state()
+        backend.prefill("other prompt")
+
+        backend.load_state(state)
+
+        assert backend.save_state() == ["cached prompt"]
+
+    def test_metrics(self):
+        backend = StubBackend(responder="a b c")
+        backend.complete("prompt words", 8, 0.7)
+
+        metrics = backend.metrics()
+
+        assert metrics['requests'] == 1
+        assert metrics['prompt_tokens'] == 2
+        assert metrics['completion_tokens'] == 3
+
+
+class TestLlamaCppBackend:
+    """Test the llama.cpp adapter against a stand-in module"""
+
+    def test_streams_text_and_passes_options(self):
+        fake = _fake_llama_cpp()
+        backend = LlamaCppBackend("model.gguf", n_ctx=1024, use_mmap=True)
+
+        with patch.dict(sys.modules, {"llama_cpp": fake}):
+            pieces = list(backend.stream("Hi", 16, 0.7, stop=["User:"]))
+
+        assert pieces == [" Check", " the fuse."]
+        assert backend.llm.kwargs['n_ctx'] == 1024
+        assert backend.llm.kwargs['use_mmap'] is True
+        assert backend.llm.call_args.kwargs['stream'] is True
+
+    def test_grammar_is_compiled_once(self):
+        fake = _fake_llama_cpp()
+        backend = LlamaCppBackend("model.gguf")
+
+        with patch.dict(sys.modules, {"llama_cpp": fake}):
+            backend.complete("a", 16, 0.7, grammar="root ::= \"x\"")
+            backend.complete("b", 16, 0.7, grammar="root ::= \"x\"")
+
+        assert fake.LlamaGrammar.from_string.call_count == 1
+        assert backend.llm.call_args.kwargs['grammar'] == ("grammar", "root ::= \"x\"")
+
+
+class TestCreateBackend:
+    """Test backend selection"""
+
+    def test_known_names(self):
+        assert isinstance(create_backend("llama_cpp", "m.gguf", n_ctx=512), LlamaCppBackend)
+        assert isinstance(create_backend("onnx", "phi-2-onnx/"), OnnxGenAIBackend)
+        assert isinstance(create_backend("stub", "unused", n_ctx=512), StubBackend)
+
+    def test_unknown_name(self):
+        with pytest.raises(ValueError):
+            create_backend("tensorrt", "m.gguf")
+
+
+class TestAssistantWithBackend:
+    """Test VehicleAssistant on top of the stub backend"""
+
+    def test_backend_by_name(self):
+        assistant = VehicleAssistant(model_path="unused.gguf", backend="stub")
+
+        response = assistant.ask("How do I pair my phone?")
+
+        assert response.startswith("Stub response")
+        assert assistant.backend_metrics()['requests'] == 1
+
+    def test_streamed_ask_records_history_when_done(self):
+        assistant = VehicleAssistant(
+            model_path="unused.gguf",
+            backend=StubBackend(responder=" Hold the pairing button.")
+        )
+
+        stream = assistant.ask("How do I pair my phone?", stream=True)
+        first = next(stream)
+
+        assert first == "Hold"
+        assert assistant.conversation_history == []
+        assert first + "".join(stream) == "Hold the pairing button."
+        assert assistant.conversation_history[-1]['assistant'] == "Hold the pairing button."
+
+    def test_unload_closes_backend(self):
+        backend = StubBackend()
+        assistant = VehicleAssistant(model_path="unused.gguf", backend=backend)
+        assistant.ask("Hi")
+
+        assistant.unload()
+
+        assert assistant._llm is None
+        assert not backend.loaded
@@ -0,0 +1,124 @@
+"""
+Unit tests for batch jobs (model mocked, inline worker)
+"""
+
+import json
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from batch import ask_many, completed_ids, run_batch_job
+
+CAMRY = {"make": "Toyota", "model": "Camry", "year": 2019, "mileage": 60000}
+
+
+def _describe_prompt(prompt):
+    return f" answer {len(prompt)} chars"
+
+
+def _write_jsonl(path, records):
+    with open(path, "w") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+
+
+class TestAskMany:
+    """Test the inline ask_many path"""
+
+    def test_prompts_are_stateless(self, stub_assistant):
+        assistant, _ = stub_assistant(_describe_prompt)
+        records = [
+            {"id": 1, "question": "What does the TPMS light mean?", "vehicle": CAMRY},
+            {"id": 2, "question": "What does the TPMS light mean?", "vehicle": CAMRY},
+        ]
+
+        results = list(ask_many(records, assistant=assistant))
+
+        assert results[0]["answer"] == results[1]["answer"]
+        assert assistant.conversation_history == []
+        prompt = assistant._llm.calls[-1]['prompt']
+        assert "Camry" in prompt
+        assert "Previous conversation" not in prompt
+
+    def test_schedule_questions_skip_the_model(self, stub_assistant):
+        assistant, _ = stub_assistant(_describe_prompt)
+        records = [{"id": 1, "question": "When is my next oil change?", "vehicle": CAMRY}]
+
+        results = list(ask_many(records, assistant=assistant))
+
+        assert "oil change" in results[0]["answer"]
+        assert results[0]["completion_tokens"] == 0
+        assert assistant._llm.calls == []
+
+    def test_records_use_the_vehicle_adapter(self, stub_assistant):
+        assistant, _ = stub_assistant(_describe_prompt)
+        assistant.enable_adapters({"toyota": "adapters/toyota.gguf"})
+
+        list(ask_many([{"id": 1, "question": "What does the TPMS light mean?", "vehicle": CAMRY}], assistant=assistant))
+
+        assert assistant._llm.calls[-1]['adapter'] == "adapters/toyota.gguf"
+
+    def test_errors_are_reported_per_record(self, stub_assistant):
+        def fail(prompt):
+            raise RuntimeError("decode failed")
+
+        assistant, _ = stub_assistant(fail)
+
+        results = list(ask_many([{"id": "a", "question": "Hi"}], assistant=assistant))
+
+        assert results[0]["error"] == "decode failed"
+
+
+class TestRunBatchJob:
+    """Test JSONL streaming, checkpoint/resume and reporting"""
+
+    def test_writes_results_and_reports_throughput(self, stub_assistant, tmp_path):
+        input_path = tmp_path / "in.jsonl"
+        output_path = tmp_path / "out.jsonl"
+        _write_jsonl(input_path, [{"question": f"Q{i}", "vehicle": CAMRY} for i in range(3)])
+
+        assistant, _ = stub_assistant(_describe_prompt)
+        report = run_batch_job(str(input_path), str(output_path), assistant=assistant)
+
+        lines = output_path.read_text().splitlines()
+        assert len(lines) == 3
+        assert report.records == 3
+        assert report.completion_tokens == 9
+        assert report.records_per_s > 0
+
+    def test_resume_skips_completed_records(self, stub_assistant, tmp_path):
+        input_path = tmp_path / "in.jsonl"
+        output_path = tmp_path / "out.jsonl"
+        _write_jsonl(input_path, [{"id": i, "question": f"Q{i}"} for i in range(4)])
+        # Interrupted run: two results and a partial line
+        output_path.write_text(
+            json.dumps({"id": 0, "answer": "a", "completion_tokens": 1}) + "\n"
+            + json.dumps({"id": 1, "answer": "b", "completion_tokens": 1}) + "\n"
+            + '{"id": 2, "ans'
+        )
+
+        assistant, _ = stub_assistant(_describe_prompt)
+        report = run_batch_job(str(input_path), str(output_path), assistant=assistant)
+
+        assert report.skipped == 2
+        assert report.records == 2
+        assert len(assistant._llm.calls) == 2
+        assert completed_ids(str(output_path)) == {0, 1, 2, 3}
+
+    def test_resume_retries_failures_without_duplicates(self, stub_assistant, tmp_path):
+        input_path = tmp_path / "in.jsonl"
+        output_path = tmp_path / "out.jsonl"
+        _write_jsonl(input_path, [{"id": i, "question": f"Q{i}"} for i in range(3)])
+        output_path.write_text(
+            json.dumps({"id": 0, "answer": "a", "completion_tokens": 1}) + "\n"
+            + json.dumps({"id": 1, "error": "decode failed", "completion_tokens": 0}) + "\n"
+        )
+
+        assistant, _ = stub_assistant(_describe_prompt)
+        report = run_batch_job(str(input_path), str(output_path), assistant=assistant)
+
+        ids = [json.loads(line)["id"] for line in output_path.read_text().splitlines()]
+        assert sorted(ids) == [0, 1, 2]
+        assert report.skipped == 1 and report.records == 2
@@ -0,0 +1,148 @@
+"""
+Unit tests for deadlines, cancellation and partial answers
+"""
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from cancellation import CANCELLED, COMPLETE, DEADLINE, Answer, CancellationToken, trim_to_sentence
+
+LONG_ANSWER = (
+    " The catalytic converter is not storing enough oxygen. Check for exhaust leaks first."
+    " Then test the downstream oxygen sensor. Replacing the converter is the last resort"
+    " and usually costs several hundred dollars including labor at most shops."
+)
+
+
+class TestTrimToSentence:
+    """Test sentence-boundary trimming of partial answers"""
+
+    @pytest.mark.parametrize("text,expected", [
+        ("Check the cap. Then the hose", "Check the cap."),
+        ("Is it safe? Yes! But drive", "Is it safe? Yes!"),
+        ('He said "stop." Then it', 'He said "stop."'),
+        ("Steps:\n1. Check the cap\n2", "Steps:\n1. Check the cap\n2"),
+        ("Open the hood. Steps:\n1. Check", "Open the hood."),
+        ("No sentence end yet ", "No sentence end yet"),
+        ("Costs about $5.50 to fix", "Costs about $5.50 to fix"),
+    ])
+    def test_trim(self, text, expected):
+        assert trim_to_sentence(text) == expected
+
+
+class TestCancellationToken:
+    """Test stop reasons"""
+
+    def test_deadline(self):
+        token = CancellationToken(timeout_s=0.01)
+
+        assert token.stop_reason() is None
+        time.sleep(0.02)
+        assert token.stop_reason() == DEADLINE
+
+    def test_cancel_wins_over_deadline(self):
+        token = CancellationToken(timeout_s=0.0)
+        token.cancel()
+
+        assert token.stop_reason() == CANCELLED
+
+    def test_parent_propagates(self):
+        parent = CancellationToken()
+        child = CancellationToken(timeout_s=60, parent=parent)
+
+        parent.cancel()
+
+        assert child.stop_reason() == CANCELLED
+        assert child.has_deadline and child.remaining_s() > 50
+
+    def test_answer_is_a_string(self):
+        answer = Answer("Pull over.", partial=True, stop_reason=DEADLINE)
+
+        assert answer == "Pull over."
+        assert answer.upper() == "PULL OVER."
+        assert answer.partial and answer.stop_reason == DEADLINE
+
+
+class TestAskDeadlines:
+    """Test ask() with timeouts and cancellation"""
+
+    def test_complete_answer_is_not_partial(self, stub_assistant):
+        assistant, _ = stub_assistant(LONG_ANSWER)
+
+        answer = assistant.ask("What does P0420 diagnostic code mean?", timeout_s=5)
+
+        assert answer == LONG_ANSWER.strip()
+        assert not answer.partial and answer.stop_reason == COMPLETE
+        assert 'partial' not in assistant.conversation_history[-1]
+
+    def test_timeout_returns_sentence_trimmed_partial(self, stub_assistant):
+        assistant, backend = stub_assistant(LONG_ANSWER, token_delay_s=0.01)
+
+        start_time = time.perf_counter()
+        answer = assistant.ask("What does P0420 diagnostic code mean?", timeout_s=0.25)
+        elapsed = time.perf_counter() - start_time
+
+        assert answer.partial and answer.stop_reason == DEADLINE
+        assert elapsed < 0.25 + 0.1
+        assert LONG_ANSWER.strip().startswith(answer) and answer.endswith(".")
+        assert assistant.conversation_history[-1] == {
+            'user': "What does P0420 diagnostic code mean?",
+            'assistant': answer,
+            'partial': True,
+        }
+        assert backend.metrics()['completion_tokens'] < len(LONG_ANSWER.split())
+
+    def test_cancel_from_another_thread(self, stub_assistant):
+        assistant, _ = stub_assistant(LONG_ANSWER, token_delay_s=0.01)
+        token = CancellationToken()
+        threading.Timer(0.05, token.cancel).start()
+
+        answer = assistant.ask("What does P0420 diagnostic code mean?", cancel_token=token)
+
+        assert answer.partial and answer.stop_reason == CANCELLED
+        assert assistant.latency_report()['cancelled'] == 1
+
+    def test_expired_deadline_skips_generation(self, stub_assistant):
+        assistant, backend = stub_assistant(LONG_ANSWER, token_delay_s=0.01)
+
+        answer = assistant.ask("What does P0420 diagnostic code mean?", timeout_s=0)
+
+        assert answer == "" and answer.partial
+        assert backend.calls == []
+        assert assistant.conversation_history == []
+
+    def test_streamed_answer_stops_at_deadline(self, stub_assistant):
+        assistant, _ = stub_assistant(LONG_ANSWER, token_delay_s=0.01)
+
+        pieces = list(assistant.ask("What does P0420 diagnostic code mean?", stream=True, timeout_s=0.1))
+
+        assert 0 < len(pieces) < len(LONG_ANSWER.split())
+        turn = assistant.conversation_history[-1]
+        assert turn['partial'] and turn['assistant'] == "".join(pieces).strip()
+
+    def test_latency_report(self, stub_assistant):
+        assistant, _ = stub_assistant(LONG_ANSWER, token_delay_s=0.002)
+        assistant.ask("What does P0420 diagnostic code mean?")
+        assistant.ask("Why is my engine making a ticking noise?", timeout_s=0.02)
+
+        report = assistant.latency_report()
+
+        assert report['requests'] == 2
+        assert report['deadline_requests'] == 1
+        assert report['deadline_misses'] == 1
+        assert report['deadline_miss_rate'] == 1.0
+        assert 0 < report['mean_ttft_s'] <= report['max_ttft_s']
+
+    def test_commands_are_answers(self, stub_assistant):
+        assistant, _ = stub_assistant(LONG_ANSWER, token_delay_s=0.01)
+
+        answer = assistant.ask("Reset")
+
+        assert isinstance(answer, Answer) and not answer.partial
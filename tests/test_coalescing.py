@@ -0,0 +1,198 @@
+"""
+Unit tests for single-flight request coalescing
+"""
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from assistant import CACHE_MISS_RESPONSE, VehicleContext
+from cancellation import DEADLINE, CancellationToken
+from coalescing import RequestCoalescer
+
+RECALL_ANSWER = (
+    " The recall replaces the fuel pump. Book a dealer visit soon."
+    " The repair is free and takes about two hours."
+)
+
+
+@pytest.fixture
+def make_coalescer(stub_assistant):
+    """make(token_delay_s, responder) -> (coalescer, assistant, backend)"""
+    def make(token_delay_s=0.005, responder=RECALL_ANSWER):
+        assistant, backend = stub_assistant(responder, token_delay_s=token_delay_s)
+        assistant.set_vehicle_context("Toyota", "Camry", 2022, 15000)
+        return RequestCoalescer(assistant), assistant, backend
+
+    return make
+
+
+def _ask_concurrently(coalescer, questions, **kwargs):
+    results = [None] * len(questions)
+    barrier = threading.Barrier(len(questions))
+
+    def caller(i):
+        barrier.wait()
+        results[i] = coalescer.ask(questions[i], **kwargs)
+
+    threads = [threading.Thread(target=caller, args=(i,)) for i in range(len(questions))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+class TestRequestCoalescer:
+    """Test single-flight sharing, detaching and counters"""
+
+    def test_identical_requests_share_one_generation(self, make_coalescer):
+        coalescer, _, backend = make_coalescer()
+
+        answers = _ask_concurrently(coalescer, ["Is my car affected by the fuel pump recall?"] * 8)
+
+        assert answers == [RECALL_ANSWER.strip()] * 8
+        assert len(backend.calls) == 1
+        metrics = coalescer.metrics()
+        assert metrics['requests'] == 8
+        assert metrics['flights'] == 1
+        assert metrics['coalesced'] == 7
+        assert metrics['dedup_rate'] == pytest.approx(7 / 8)
+        assert metrics['tokens_delivered'] == 8 * metrics['tokens_generated']
+        assert metrics['tokens_saved'] == 7 * metrics['tokens_generated']
+        assert metrics['in_flight'] == 0
+
+    def test_late_subscriber_gets_whole_stream(self, make_coalescer):
+        coalescer, _, backend = make_coalescer()
+        first = coalescer.ask("Is my car affected by the fuel pump recall?", stream=True)
+        first_pieces = [next(first) for _ in range(3)]
+
+        second = list(coalescer.ask("Is my car affected by the fuel pump recall?", stream=True))
+        first_pieces += list(first)
+
+        assert "".join(second) == "".join(first_pieces) == RECALL_ANSWER.strip()
+        assert len(backend.calls) == 1
+
+    def test_unread_stream_does_not_subscribe(self, make_coalescer):
+        coalescer, _, backend = make_coalescer()
+        coalescer.ask("Is my car affected by the fuel pump recall?", stream=True)
+
+        answer = coalescer.ask("Is my car affected by the fuel pump recall?", timeout_s=5)
+
+        assert answer == RECALL_ANSWER.strip()
+        metrics = coalescer.metrics()
+        assert metrics['flights'] == 1 and metrics['coalesced'] == 0
+        assert len(backend.calls) == 1
+
+    def test_closed_stream_detaches(self, make_coalescer):
+        coalescer, _, backend = make_coalescer(token_delay_s=0.01)
+        pieces = coalescer.ask("Is my car affected by the fuel pump recall?", stream=True)
+        next(pieces)
+
+        pieces.close()
+        time.sleep(0.05)
+
+        metrics = coalescer.metrics()
+        assert metrics['detached'] == 1 and metrics['in_flight'] == 0
+        assert metrics['tokens_generated'] < len(RECALL_ANSWER.split())
+
+    def test_different_requests_do_not_share(self, make_coalescer):
+        coalescer, _, backend = make_coalescer(token_delay_s=0.0)
+        civic = VehicleContext("Honda", "Civic", 2020, 40000)
+
+        coalescer.ask("Is my car affected by the fuel pump recall?")
+        coalescer.ask("Is my car affected by the fuel pump recall?", vehicle_context=civic)
+        coalescer.ask("Is my car affected by the fuel pump recall?", max_tokens=32)
+
+        assert len(backend.calls) == 3
+        assert "Civic" in backend.calls[1]['prompt']
+        assert coalescer.metrics()['coalesced'] == 0
+
+    def test_finished_generation_is_not_reused(self, make_coalescer):
+        coalescer, _, backend = make_coalescer(token_delay_s=0.0)
+
+        coalescer.ask("Is my car affected by the fuel pump recall?")
+        coalescer.ask("Is my car affected by the fuel pump recall?")
+
+        assert len(backend.calls) == 2
+
+    def test_history_is_not_used_or_recorded(self, make_coalescer):
+        coalescer, assistant, backend = make_coalescer(token_delay_s=0.0)
+        assistant.conversation_history.append({'user': "Hi", 'assistant': "Hello."})
+
+        coalescer.ask("Is my car affected by the fuel pump recall?")
+
+        assert "Previous conversation" not in backend.calls[0]['prompt']
+        assert len(assistant.conversation_history) == 1
+
+    def test_timeout_detaches_without_stopping_others(self, make_coalescer):
+        coalescer, _, backend = make_coalescer(token_delay_s=0.01)
+        patient = coalescer.ask("Is my car affected by the fuel pump recall?", stream=True)
+        next(patient)
+
+        hurried = coalescer.ask("Is my car affected by the fuel pump recall?", timeout_s=0.05)
+        rest = list(patient)
+
+        assert hurried.partial and hurried.stop_reason == DEADLINE
+        assert RECALL_ANSWER.strip().startswith(hurried)
+        assert "".join(rest).endswith("two hours.")
+        assert coalescer.metrics()['detached'] == 1
+        assert len(backend.calls) == 1
+
+    def test_generation_stops_when_everyone_leaves(self, make_coalescer):
+        coalescer, _, backend = make_coalescer(token_delay_s=0.01)
+        token = CancellationToken()
+        threading.Timer(0.05, token.cancel).start()
+
+        answer = coalescer.ask("Is my car affected by the fuel pump recall?", cancel_token=token)
+        time.sleep(0.05)
+
+        assert answer.partial
+        metrics = coalescer.metrics()
+        assert metrics['in_flight'] == 0
+        assert metrics['tokens_generated'] < len(RECALL_ANSWER.split())
+
+    def test_errors_reach_every_subscriber(self, make_coalescer):
+        def fail(prompt):
+            time.sleep(0.05)
+            raise RuntimeError("model crashed")
+
+        coalescer, _, _ = make_coalescer(responder=fail)
+        errors = []
+
+        def caller():
+            try:
+                coalescer.ask("Is my car affected by the fuel pump recall?")
+            except RuntimeError as e:
+                errors.append(str(e))
+
+        threads = [threading.Thread(target=caller) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert errors == ["model crashed"] * 3
+
+    def test_commands_go_to_the_assistant(self, make_coalescer):
+        coalescer, assistant, backend = make_coalescer()
+        assistant.conversation_history.append({'user': "Hi", 'assistant': "Hello."})
+
+        assert coalescer.ask("Reset") == "Conversation cleared."
+        assert assistant.conversation_history == []
+        assert coalescer.metrics()['requests'] == 0
+        assert coalescer.metrics()['commands'] == 1
+
+    def test_cached_only_never_generates(self, make_coalescer):
+        coalescer, assistant, backend = make_coalescer()
+        assistant.cached_only = True
+
+        assert coalescer.ask("Is my car affected by the fuel pump recall?") == CACHE_MISS_RESPONSE
+        assert backend.calls == []
+        assert coalescer.metrics()['offline'] == 1
@@ -0,0 +1,223 @@
+"""
+Unit tests for the model downloader against a local HTTP server
+"""
+
+import hashlib
+import os
+import re
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("requests")
+pytest.importorskip("tqdm")
+
+# Add scripts to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "scripts"))
+
+from download_model import download_file
+
+
+PAYLOAD = os.urandom(3 * 1024 * 1024 + 123)
+PAYLOAD_SHA256 = hashlib.sha256(PAYLOAD).hexdigest()
+
+
+class _ModelHandler(BaseHTTPRequestHandler):
+    """Serves PAYLOAD with optional Range support and a simulated dropped connection"""
+
+    server_version = "ModelServer/1.0"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _headers(self, status, start, end):
+        self.send_response(status)
+        self.send_header("Content-Length", str(end - start + 1))
+        if self.server.ranges:
+            self.send_header("Accept-Ranges", "bytes")
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(PAYLOAD)}")
+        self.end_headers()
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(PAYLOAD)))
+        if self.server.ranges:
+            self.send_header("Accept-Ranges", "bytes")
+        if self.server.etag:
+            self.send_header("X-Linked-Etag", f'"{self.server.etag}"')
+        self.end_headers()
+
+    def do_GET(self):
+        start, end, status = 0, len(PAYLOAD) - 1, 200
+        match = re.match(r"bytes=(\d+)-(\d*)", self.headers.get("Range", ""))
+        if match and self.server.ranges:
+            start = int(match.group(1))
+            end = int(match.group(2)) if match.group(2) else end
+            status = 206
+        self.server.requests.append(self.headers.get("Range"))
+
+        self._headers(status, start, end)
+        body = PAYLOAD[start:end + 1]
+        if self.server.drop_after is not None:
+            # Simulate a dropped connection once
+            body = body[:self.server.drop_after]
+            self.server.drop_after = None
+            self.wfile.write(body)
+            self.close_connection = True
+            return
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _ModelHandler)
+    httpd.ranges = True
+    httpd.drop_after = None
+    httpd.etag = None
+    httpd.requests = []
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _url(server):
+    return f"http://127.0.0.1:{server.server_address[1]}/phi-2.gguf"
+
+
+class TestDownloadFile:
+    """Test sequential download, resume and verification"""
+
+    def test_downloads_and_verifies(self, server, tmp_path):
+        destination = str(tmp_path / "models" / "phi-2.gguf")
+
+        digest = download_file(_url(server), destination, sha256=PAYLOAD_SHA256, show_progress=False)
+
+        assert digest == PAYLOAD_SHA256
+        assert Path(destination).read_bytes() == PAYLOAD
+        assert not os.path.exists(destination + ".part")
+
+    def test_interrupted_download_is_not_final(self, server, tmp_path):
+        destination = str(tmp_path / "phi-2.gguf")
+        server.drop_after = 1024 * 1024
+
+        with pytest.raises(Exception):
+            download_file(_url(server), destination, chunk_size=64 * 1024, show_progress=False)
+
+        assert not os.path.exists(destination)
+        assert os.path.getsize(destination + ".part") == 1024 * 1024
+
+    def test_resumes_with_range_request(self, server, tmp_path):
+        destination = str(tmp_path / "phi-2.gguf")
+        Path(destination + ".part").write_bytes(PAYLOAD[:1000])
+
+        digest = download_file(_url(server), destination, sha256=PAYLOAD_SHA256, show_progress=False)
+
+        assert digest == PAYLOAD_SHA256
+        assert server.requests == ["bytes=1000-"]
+
+    def test_restarts_when_server_ignores_ranges(self, server, tmp_path):
+        server.ranges = False
+        destination = str(tmp_path / "phi-2.gguf")
+        Path(destination + ".part").write_bytes(b"x" * 1000)
+
+        digest = download_file(_url(server), destination, sha256=PAYLOAD_SHA256, show_progress=False)
+
+        assert digest == PAYLOAD_SHA256
+
+    def test_checksum_mismatch_discards_download(self, server, tmp_path):
+        destination = str(tmp_path / "phi-2.gguf")
+
+        with pytest.raises(ValueError):
+            download_file(_url(server), destination, sha256="0" * 64, show_progress=False)
+
+        assert not os.path.exists(destination)
+        assert not os.path.exists(destination + ".part")
+
+    def test_verifies_against_published_sha256(self, server, tmp_path):
+        destination = str(tmp_path / "phi-2.gguf")
+        server.etag = PAYLOAD_SHA256
+
+        assert download_file(_url(server), destination, show_progress=False) == PAYLOAD_SHA256
+
+        server.etag = "0" * 64
+        with pytest.raises(ValueError, match="SHA-256 mismatch"):
+            download_file(_url(server), str(tmp_path / "other.gguf"), show_progress=False)
+
+    def test_corrupt_existing_file_is_replaced(self, server, tmp_path):
+        destination = tmp_path / "phi-2.gguf"
+        destination.write_bytes(b"truncated")
+
+        download_file(_url(server), str(destination), sha256=PAYLOAD_SHA256, show_progress=False)
+
+        assert destination.read_bytes() == PAYLOAD
+
+
+class TestSegmentedDownload:
+    """Test parallel ranged segments"""
+
+    def test_parallel_segments(self, server, tmp_path):
+        destination = str(tmp_path / "phi-2.gguf")
+
+        digest = download_file(
+            _url(server), destination, sha256=PAYLOAD_SHA256, segments=4,
+            chunk_size=256 * 1024, show_progress=False
+        )
+
+        assert digest == PAYLOAD_SHA256
+        assert len(server.requests) == 4
+        assert not os.path.exists(destination + ".part.segments")
+
+    def test_segments_resume_after_interruption(self, server, tmp_path):
+        destination = str(tmp_path / "phi-2.gguf")
+        server.drop_after = 300 * 1024
+
+        with pytest.raises(Exception):
+            download_file(
+                _url(server), destination, segments=2,
+                chunk_size=64 * 1024, show_progress=False
+            )
+        server.requests.clear()
+
+        digest = download_file(
+            _url(server), destination, sha256=PAYLOAD_SHA256, segments=2,
+            chunk_size=64 * 1024, show_progress=False
+        )
+
+        assert digest == PAYLOAD_SHA256
+        # Only the interrupted segment is fetched again, from where it stopped
+        assert len(server.requests) == 1
+        assert int(re.match(r"bytes=(\d+)-", server.requests[0]).group(1)) > 0
+
+    def test_unfinished_segments_are_not_taken_as_complete(self, server, tmp_path):
+        destination = str(tmp_path / "phi-2.gguf")
+        server.drop_after = 300 * 1024
+        with pytest.raises(Exception):
+            download_file(
+                _url(server), destination, segments=2,
+                chunk_size=64 * 1024, show_progress=False
+            )
+        # Preallocated to full size, so only the sidecar says it is unfinished
+        assert os.path.getsize(destination + ".part") == len(PAYLOAD)
+        server.requests.clear()
+
+        download_file(_url(server), destination, segments=1, show_progress=False)
+
+        assert Path(destination).read_bytes() == PAYLOAD
+        assert len(server.requests) == 1
+
+    def test_unfinished_segments_restart_without_ranges(self, server, tmp_path):
+        destination = str(tmp_path / "phi-2.gguf")
+        Path(destination + ".part").write_bytes(b"\0" * len(PAYLOAD))
+        Path(destination + ".part.segments").write_text("{}")
+        server.ranges = False
+
+        download_file(_url(server), destination, show_progress=False)
+
+        assert Path(destination).read_bytes() == PAYLOAD
+        assert not os.path.exists(destination + ".part.segments")
@@ -0,0 +1,124 @@
+"""
+Unit tests for the columnar fleet registry
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from assistant import SlottedVehicleContext, VehicleContext
+from fleet import FleetRegistry
+
+
+def _fleet():
+    fleet = FleetRegistry(capacity=2)
+    fleet.add("Toyota", "Camry", 2018, 90000)
+    fleet.add("Toyota", "Camry", 2020, 65000, vin="4T1B11HK5KU000001")
+    fleet.add("Toyota", "Camry", 2021, 30000)
+    fleet.add("Honda", "Civic", 2022, 70000)
+    return fleet
+
+
+class TestSlottedVehicleContext:
+    """Test the __slots__ variant of VehicleContext"""
+
+    def test_has_no_instance_dict(self):
+        context = SlottedVehicleContext("Ford", "F-150", 2023, 10000)
+        assert not hasattr(context, "__dict__")
+
+    def test_matches_dataclass(self):
+        slotted = SlottedVehicleContext("Ford", "F-150", 2023, 10000)
+        regular = VehicleContext("Ford", "F-150", 2023, 10000)
+
+        assert slotted == regular
+        assert slotted.to_prompt() == regular.to_prompt()
+        assert slotted.to_dict() == regular.to_dict()
+
+
+class TestFleetRegistry:
+    """Test adding, filtering and materializing vehicles"""
+
+    def test_strings_are_interned(self):
+        fleet = _fleet()
+
+        assert len(fleet) == 4
+        assert fleet.makes.values == ["Toyota", "Honda"]
+        assert fleet.models.values == ["Camry", "Civic"]
+
+    def test_vectorized_select(self):
+        view = _fleet().select(model="Camry", min_year=2019, min_mileage=60000)
+
+        assert len(view) == 1
+        assert view[0].vin == "4T1B11HK5KU000001"
+        assert list(view.mileage) == [65000]
+
+    def test_unknown_make_selects_nothing(self):
+        assert len(_fleet().select(make="Tesla")) == 0
+
+    def test_prompts_on_demand(self):
+        prompts = list(_fleet().select(make="Honda").to_prompts())
+
+        assert len(prompts) == 1
+        assert "Civic" in prompts[0]
+        assert "70,000" in prompts[0]
+
+    def test_update_mileage(self):
+        fleet = _fleet()
+        camrys = fleet.select(model="Camry")
+
+        fleet.update_mileage(camrys.rows, camrys.mileage + 1000)
+
+        assert fleet.context(0).mileage == 91000
+
+
+class TestFleetPersistence:
+    """Test the binary columnar format"""
+
+    def test_round_trip(self, tmp_path):
+        path = str(tmp_path / "fleet.bin")
+        _fleet().save(path)
+
+        loaded = FleetRegistry.load(path)
+
+        assert len(loaded) == 4
+        assert loaded.context(1).vin == "4T1B11HK5KU000001"
+        assert loaded.context(3).to_dict() == _fleet().context(3).to_dict()
+        assert len(loaded.select(make="Toyota", max_mileage=70000)) == 2
+
+    def test_loaded_columns_are_memory_mapped(self, tmp_path):
+        path = str(tmp_path / "fleet.bin")
+        _fleet().save(path)
+
+        loaded = FleetRegistry.load(path)
+
+        assert not loaded.year.flags.writeable
+
+    def test_loaded_registry_can_grow(self, tmp_path):
+        path = str(tmp_path / "fleet.bin")
+        _fleet().save(path)
+
+        loaded = FleetRegistry.load(path)
+        loaded.add("Tesla", "Model 3", 2024, 5000)
+
+        assert len(loaded) == 5
+        assert loaded.context(4).make == "Tesla"
+        assert loaded.context(0).make == "Toyota"
+
+    def test_empty_registry_round_trip(self, tmp_path):
+        path = str(tmp_path / "fleet.bin")
+        FleetRegistry().save(path)
+
+        assert len(FleetRegistry.load(path)) == 0
+
+    def test_rejects_other_files(self, tmp_path):
+        path = tmp_path / "other.bin"
+        path.write_bytes(b"not a fleet")
+
+        with pytest.raises(ValueError):
+            FleetRegistry.load(str(path))
@@ -0,0 +1,175 @@
+"""
+Unit tests for the GGUF header reader and preflight checks
+"""
+
+import struct
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from assistant import VehicleAssistant
+import gguf
+from gguf import MB, GGUFError, PreflightError, preflight, read_gguf
+
+
+def _string(text):
+    data = text.encode("utf-8")
+    return struct.pack("<Q", len(data)) + data
+
+
+def _value(value):
+    if isinstance(value, str):
+        return struct.pack("<I", 8) + _string(value)
+    if isinstance(value, list):
+        return struct.pack("<IIQ", 9, 8, len(value)) + b"".join(_string(v) for v in value)
+    return struct.pack("<II", 4, value)
+
+
+def _write_gguf(path, metadata, tensors):
+    """Write a header-only GGUF file; tensors are (name, shape, ggml_type)"""
+    data = b"GGUF" + struct.pack("<IQQ", 3, len(tensors), len(metadata))
+    for key, value in metadata.items():
+        data += _string(key) + _value(value)
+    for name, shape, ggml_type in tensors:
+        data += _string(name) + struct.pack("<I", len(shape))
+        data += b"".join(struct.pack("<Q", dim) for dim in shape)
+        data += struct.pack("<IQ", ggml_type, 0)
+    Path(path).write_bytes(data)
+    return str(path)
+
+
+PHI2_METADATA = {
+    "general.architecture": "phi2",
+    "phi2.context_length": 2048,
+    "phi2.block_count": 32,
+    "phi2.embedding_length": 2560,
+    "phi2.attention.head_count": 32,
+    "tokenizer.ggml.tokens": [f"tok{i}" for i in range(200)],
+}
+
+PHI2_TENSORS = [
+    ("token_embd.weight", (2560, 51200), 12),   # Q4_K
+    ("blk.0.attn_qkv.weight", (2560, 7680), 14),  # Q6_K
+    ("blk.0.attn_norm.weight", (2560,), 0),     # F32
+]
+
+
+@pytest.fixture
+def phi2(tmp_path):
+    return _write_gguf(tmp_path / "phi-2.gguf", PHI2_METADATA, PHI2_TENSORS)
+
+
+class TestReadGGUF:
+    """Test header parsing"""
+
+    def test_reads_architecture_and_context(self, phi2):
+        info = read_gguf(phi2)
+
+        assert info.version == 3
+        assert info.architecture == "phi2"
+        assert info.context_length == 2048
+        assert info.metadata["tokenizer.ggml.tokens"] == "<array of 200>"
+
+    def test_long_string_array_is_not_decoded(self, phi2, monkeypatch):
+        decoded = []
+        original = gguf._Reader.string
+
+        def string(reader):
+            value = original(reader)
+            decoded.append(value)
+            return value
+
+        monkeypatch.setattr(gguf._Reader, "string", string)
+        read_gguf(phi2)
+
+        assert "tokenizer.ggml.tokens" in decoded
+        assert "tok0" not in decoded and "tok199" not in decoded
+
+    def test_tensor_sizes_and_quant_types(self, phi2):
+        info = read_gguf(phi2)
+
+        assert info.quant_types == {"Q4_K": 1, "Q6_K": 1, "F32": 1}
+        assert info.tensors[0].nbytes == 2560 * 51200 // 256 * 144
+        assert info.tensors[2].nbytes == 2560 * 4
+
+    def test_kv_estimate_matches_phi2(self, phi2):
+        info = read_gguf(phi2)
+
+        assert info.kv_elements_per_token == 2 * 32 * 2560
+        estimate = info.estimate_memory(2048)
+        assert estimate.kv_mb == pytest.approx(2048 * 2 * 32 * 2560 * 2 / MB)
+        assert estimate.total_mb == pytest.approx(estimate.weights_mb + estimate.kv_mb)
+
+    def test_grouped_query_attention_shrinks_kv(self, tmp_path):
+        metadata = dict(PHI2_METADATA, **{"phi2.attention.head_count_kv": 8})
+        info = read_gguf(_write_gguf(tmp_path / "gqa.gguf", metadata, PHI2_TENSORS))
+
+        assert info.kv_elements_per_token == 2 * 32 * 2560 // 4
+
+    def test_legacy_ggml_is_rejected(self, tmp_path):
+        path = tmp_path / "old.bin"
+        path.write_bytes(b"lmgg" + b"\0" * 64)
+
+        with pytest.raises(GGUFError):
+            read_gguf(str(path))
+
+    def test_truncated_header_is_rejected(self, phi2):
+        data = Path(phi2).read_bytes()
+        Path(phi2).write_bytes(data[:60])
+
+        with pytest.raises(GGUFError):
+            read_gguf(phi2)
+
+
+class TestPreflight:
+    """Test fast-fail checks"""
+
+    def test_passes_when_model_fits(self, phi2):
+        assert preflight(phi2, 2048, available_mb=4096).architecture == "phi2"
+
+    def test_context_beyond_training_fails(self, phi2):
+        with pytest.raises(PreflightError, match="trained context"):
+            preflight(phi2, 4096, available_mb=4096)
+
+    def test_insufficient_memory_fails(self, phi2):
+        with pytest.raises(PreflightError, match="MB is available"):
+            preflight(phi2, 2048, available_mb=100)
+
+    def test_unexpected_quantization_fails(self, phi2):
+        with pytest.raises(PreflightError, match="Q6_K"):
+            preflight(phi2, 2048, available_mb=4096, allowed_types=["Q4_K"])
+
+    def test_missing_file(self, tmp_path):
+        with pytest.raises(FileNotFoundError):
+            preflight(str(tmp_path / "missing.gguf"), 2048)
+
+
+class TestAssistantPreflight:
+    """Test that VehicleAssistant checks the model before loading it"""
+
+    def test_load_fails_fast_on_bad_context(self, phi2):
+        assistant = VehicleAssistant(model_path=phi2, context_size=4096)
+
+        with pytest.raises(PreflightError):
+            assistant._load_llm()
+
+        assert assistant._llm is None
+
+    def test_defaults_fit_bundled_phi2(self, phi2):
+        assistant = VehicleAssistant(model_path=phi2)
+
+        backend = assistant._create_backend()
+
+        assert assistant.model_info.context_length == 2048
+        assert backend.n_ctx == 2048
+
+    def test_other_backends_skip_preflight(self, phi2):
+        assistant = VehicleAssistant(model_path=phi2, context_size=4096, backend="stub")
+
+        assistant._load_llm()
+
+        assert assistant.model_info is None
@@ -0,0 +1,177 @@
+"""
+Unit tests for the deterministic intent fast path
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from assistant import VehicleAssistant, VehicleContext
+from backends import StubBackend
+from intents import DTC_LOOKUP, MILEAGE, REPEAT, RESET, IntentMatcher
+
+
+class TestIntentMatcher:
+    """Test command recognition"""
+
+    @pytest.mark.parametrize("text,intent", [
+        ("Reset", RESET),
+        ("please clear the conversation", RESET),
+        ("Start over.", RESET),
+        ("Repeat that", REPEAT),
+        ("Can you say that again?", REPEAT),
+        ("What's my mileage?", MILEAGE),
+        ("how many miles are on my car", MILEAGE),
+        ("What does P0171 mean?", DTC_LOOKUP),
+        ("p0420", DTC_LOOKUP),
+    ])
+    def test_commands(self, text, intent):
+        assert IntentMatcher().match(text).intent == intent
+
+    @pytest.mark.parametrize("text", [
+        "How do I reset the tire pressure light?",
+        "What does P0171 mean and why is my idle rough?",
+        "What does P1234 mean?",
+        "Why is my check engine light on?",
+        "",
+    ])
+    def test_questions_go_to_llm(self, text):
+        assert IntentMatcher().match(text) is None
+
+    def test_dtc_slot_is_uppercased(self):
+        assert IntentMatcher().match("what is code p0171").slots == {"code": "P0171"}
+
+    def test_absorbed_fraction(self):
+        matcher = IntentMatcher()
+        matcher.record(RESET)
+        matcher.record(None)
+        matcher.record(None)
+        matcher.record(MILEAGE)
+
+        report = matcher.report()
+
+        assert report["absorbed_fraction"] == 0.5
+        assert report["by_intent"] == {RESET: 1, MILEAGE: 1}
+
+    def test_matching_is_fast(self):
+        matcher = IntentMatcher()
+        utterances = ["What's my mileage?", "Why is my check engine light on?"] * 500
+
+        start_time = time.perf_counter()
+        for text in utterances:
+            matcher.match(text)
+        per_call_us = (time.perf_counter() - start_time) / len(utterances) * 1e6
+
+        assert per_call_us < 100
+
+
+class TestAssistantCommands:
+    """Test commands handled inside ask() without the model"""
+
+    def _assistant(self):
+        assistant = VehicleAssistant(
+            model_path="test_model.gguf",
+            backend=StubBackend(responder=" Model answer.")
+        )
+        assistant.set_vehicle_context("Toyota", "Camry", 2023, 15000)
+        return assistant
+
+    def test_mileage_from_context(self):
+        assistant = self._assistant()
+
+        assert assistant.ask("What's my mileage?") == "Your 2023 Toyota Camry has 15,000 miles."
+        assert assistant._llm is None
+
+    def test_repeat_returns_last_answer(self):
+        assistant = self._assistant()
+        assistant.ask("Why is my check engine light on?")
+
+        assert assistant.ask("Repeat that") == "Model answer."
+        assert len(assistant._llm.calls) == 1
+        assert len(assistant.conversation_history) == 1
+
+    def test_reset_clears_history(self):
+        assistant = self._assistant()
+        assistant.ask("Why is my check engine light on?")
+
+        assistant.ask("Start over")
+
+        assert assistant.conversation_history == []
+
+    def test_known_code_is_looked_up(self):
+        assistant = self._assistant()
+
+        response = assistant.ask("What does P0171 mean?")
+
+        assert response.startswith("P0171: System too lean")
+        assert assistant._llm is None
+        assert assistant.conversation_history[-1]['assistant'] == response
+
+    def test_structured_requests_skip_lookup(self):
+        assistant = self._assistant()
+
+        assert assistant.answer_command("What does P0171 mean?", structured=True) is None
+
+    def test_mileage_without_context_goes_to_llm(self):
+        assistant = VehicleAssistant(model_path="test_model.gguf", backend=StubBackend(responder=" Unknown."))
+
+        assert assistant.ask("What's my mileage?") == "Unknown."
+        assert assistant.intents.report()["absorbed"] == 0
+
+    def test_unknown_mileage_goes_to_llm(self):
+        assistant = self._assistant()
+        assistant.vehicle_context = VehicleContext("Toyota", "Camry", 2020, None)
+
+        assert assistant.ask("What is my mileage?") == "Model answer."
+
+    def test_traffic_share_is_reported(self):
+        assistant = self._assistant()
+        assistant.ask("What's my mileage?")
+        assistant.ask("Why is my check engine light on?")
+
+        assert assistant.intents.absorbed_fraction == 0.5
+
+
+class TestVoiceCommands:
+    """Test the fast path in process_voice_query"""
+
+    def _voice(self, transcripts):
+        from src.voice_interface import VoiceAssistant
+
+        voice = VoiceAssistant(llm_path="test_model.gguf", preprocess_audio=False)
+        voice.transcribe_audio = lambda path: transcripts.pop(0)
+        voice.synthesized = []
+
+        def synthesize(text, output_path=None):
+            voice.synthesized.append(text)
+            return f"response_{len(voice.synthesized)}.wav"
+
+        voice.synthesize_speech = synthesize
+        voice._load_llm()
+        voice._vehicle_assistant._llm = StubBackend(responder=" Check the gas cap.")
+        return voice
+
+    def test_repeat_replays_previous_audio(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        voice = self._voice(["Why is my check engine light on?", "Repeat that"])
+
+        _, first, first_audio = voice.process_voice_query("in1.wav")
+        Path(first_audio).write_bytes(b"RIFF")
+        _, again, again_audio = voice.process_voice_query("in2.wav")
+
+        assert again == first == "Check the gas cap."
+        assert again_audio == first_audio
+        assert voice.synthesized == ["Check the gas cap."]
+
+    def test_commands_do_not_load_the_llm(self):
+        voice = self._voice(["Reset"])
+        voice._use = lambda component: pytest.fail(f"{component} should not be loaded")
+
+        _, response, _ = voice.process_voice_query("in.wav")
+
+        assert response == "Conversation cleared."
@@ -0,0 +1,132 @@
+"""
+Unit tests for the maintenance schedule engine
+"""
+
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from assistant import VehicleAssistant, VehicleContext
+from backends import StubBackend
+from maintenance import MaintenanceEngine
+
+CAMRY = VehicleContext("Toyota", "Camry", 2023, 15000)
+
+
+class TestSchedule:
+    """Test platform interval tables"""
+
+    def test_platform_override_applies(self):
+        engine = MaintenanceEngine()
+        intervals = {rule.item: rule.interval_miles for rule in engine.schedule("Toyota", "Camry", 2023)}
+
+        assert intervals["oil change"] == 10000
+        assert intervals["cabin air filter"] == 15000
+
+    def test_model_year_threshold(self):
+        engine = MaintenanceEngine()
+        intervals = {rule.item: rule.interval_miles for rule in engine.schedule("Toyota", "Camry", 2012)}
+
+        assert intervals["oil change"] == 5000
+
+    def test_zero_interval_items_are_dropped(self):
+        items = {rule.item for rule in MaintenanceEngine().schedule("Tesla", "Model 3", 2023)}
+
+        assert "oil change" not in items
+        assert "tire rotation" in items
+
+    def test_schedule_is_indexed(self):
+        engine = MaintenanceEngine()
+        assert engine.schedule("Toyota", "Camry", 2023) is engine.schedule("toyota", "camry", 2023)
+
+
+class TestDueItems:
+    """Test overdue and upcoming computation"""
+
+    def test_on_schedule_assumption(self):
+        due = {d.item: d for d in MaintenanceEngine().due_items(CAMRY)}
+
+        assert due["oil change"].next_due_miles == 20000
+        assert due["oil change"].status == "ok"
+
+    def test_overdue_from_service_record(self):
+        items = MaintenanceEngine().due_items(CAMRY, last_service={"oil change": 2000})
+
+        assert items[0].item == "oil change"
+        assert items[0].status == "overdue"
+        assert items[0].miles_remaining == -3000
+
+
+class TestAnswer:
+    """Test direct answers and fallbacks"""
+
+    def test_oil_change_question(self):
+        answer = MaintenanceEngine().answer("When should I change my oil?", CAMRY)
+
+        assert "20,000 miles" in answer
+        assert "10,000 miles" in answer
+        assert "assumes it was last done on schedule" in answer
+
+    def test_service_record_is_used(self):
+        answer = MaintenanceEngine().answer("When should I change my oil?", CAMRY, {"oil change": 2000})
+
+        assert "overdue by 3,000 miles" in answer
+        assert "assumes" not in answer
+
+    def test_next_alone_is_not_a_schedule_question(self):
+        assert MaintenanceEngine().answer("What's the next step after changing the oil?", CAMRY) is None
+
+    def test_symptom_question_goes_to_llm(self):
+        assert MaintenanceEngine().answer("Why is my oil light on when I start?", CAMRY) is None
+
+    def test_multiple_items_go_to_llm(self):
+        assert MaintenanceEngine().answer("When do I need oil and coolant?", CAMRY) is None
+
+    def test_no_context_goes_to_llm(self):
+        assert MaintenanceEngine().answer("When should I change my oil?", None) is None
+
+
+class TestAssistantIntegration:
+    """Test that ask() uses the engine before the LLM"""
+
+    def _assistant(self):
+        assistant = VehicleAssistant(model_path="test_model.gguf", verbose=False)
+        assistant.set_vehicle_context("Toyota", "Camry", 2023, 15000)
+        return assistant
+
+    def test_ask_answers_without_loading_model(self):
+        assistant = self._assistant()
+
+        response = assistant.ask("How often should I change my oil?")
+
+        assert "oil change" in response
+        assert assistant._llm is None
+        assert assistant.conversation_history[-1]['assistant'] == response
+
+    def test_service_history_reaches_answers(self):
+        assistant = VehicleAssistant(model_path="test_model.gguf", verbose=False)
+        assistant.set_vehicle_context("Toyota", "Camry", 2023, 15000, service_history={"oil change": 2000})
+
+        assert "overdue" in assistant.ask("When should I change my oil?")
+        assert "oil change overdue" in assistant._build_prompt("What service does my car need soon?")
+
+    def test_maintenance_summary_added_to_prompt(self):
+        assistant = self._assistant()
+
+        prompt = assistant._build_prompt("What service does my car need soon?")
+
+        assert "Maintenance due:" in prompt
+
+    def test_unrelated_prompt_has_no_summary(self):
+        prompt = self._assistant()._build_prompt("How do I pair my phone?")
+
+        assert "Maintenance due:" not in prompt
+
+    def test_engine_can_be_disabled(self):
+        assistant = self._assistant()
+        assistant.maintenance = None
+        assistant._llm = StubBackend(responder=" Every 10k miles.")
+
+        assert assistant.ask("How often should I change my oil?") == "Every 10k miles."
@@ -0,0 +1,245 @@
+"""
+Unit tests for the memory governor
+"""
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import memory
+from memory import (
+    GGML_TYPE_F16,
+    GGML_TYPE_Q8_0,
+    MB,
+    MemoryGovernor,
+)
+
+
+def _model_file(tmp_path, name, size_mb):
+    """Create a sparse file standing in for a GGUF model"""
+    path = tmp_path / name
+    with open(path, "wb") as f:
+        f.truncate(int(size_mb * MB))
+    return str(path)
+
+
+class _Tracker:
+    """Loader/unloader pair that records calls"""
+
+    def __init__(self, log, name):
+        self.log = log
+        self.name = name
+
+    def load(self):
+        self.log.append(("load", self.name))
+
+    def unload(self):
+        self.log.append(("unload", self.name))
+
+
+class TestPlanLLM:
+    """Test load-time planning"""
+
+    def test_full_context_f16_when_it_fits(self, tmp_path):
+        path = _model_file(tmp_path, "phi-2.gguf", 1600)
+        plan = MemoryGovernor(budget_mb=8000).plan_llm([path], 4096)
+
+        assert plan.n_ctx == 4096
+        assert plan.type_k == GGML_TYPE_F16
+        assert plan.use_mmap is True
+        assert "type_k" not in plan.llama_kwargs()
+
+    def test_quantized_kv_before_shrinking_context(self, tmp_path):
+        path = _model_file(tmp_path, "phi-2.gguf", 1600)
+        # f16 KV at 4096 is 1280 MB, q8_0 is 680 MB
+        plan = MemoryGovernor(budget_mb=2700, reserve_mb=300).plan_llm([path], 4096)
+
+        assert plan.n_ctx == 4096
+        assert plan.type_k == GGML_TYPE_Q8_0
+        assert plan.use_mlock is False
+        assert plan.llama_kwargs()["flash_attn"] is True
+
+    def test_falls_back_to_smaller_variant(self, tmp_path):
+        large = _model_file(tmp_path, "phi-2.Q5.gguf", 3000)
+        small = _model_file(tmp_path, "phi-2.Q3.gguf", 1200)
+        plan = MemoryGovernor(budget_mb=2000, reserve_mb=300).plan_llm([large, small], 2048)
+
+        assert plan.model_path == small
+
+    def test_raises_when_nothing_fits(self, tmp_path):
+        path = _model_file(tmp_path, "phi-2.gguf", 1600)
+        with pytest.raises(MemoryError):
+            MemoryGovernor(budget_mb=1000).plan_llm([path], 4096)
+
+
+class TestComponentUnloading:
+    """Test LRU and idle unloading"""
+
+    @pytest.fixture(autouse=True)
+    def _steady_rss(self, monkeypatch):
+        # Allocations by other threads would otherwise inflate the measured sizes
+        monkeypatch.setattr(memory, "current_rss_bytes", lambda: 0)
+
+    def _governor(self, log, budget_mb, **kwargs):
+        governor = MemoryGovernor(budget_mb=budget_mb, reserve_mb=0, **kwargs)
+        for name, size in (("whisper", 150), ("llm", 1800), ("tts", 450)):
+            tracker = _Tracker(log, name)
+            governor.register(name, tracker.load, tracker.unload, size)
+        return governor
+
+    def test_lru_component_is_unloaded_under_pressure(self):
+        log = []
+        governor = self._governor(log, budget_mb=2300)
+
+        governor.acquire("whisper")
+        governor.acquire("llm")
+        governor.acquire("tts")
+
+        assert ("unload", "whisper") in log
+        assert ("unload", "llm") not in log
+
+    def test_pinned_component_is_never_unloaded(self):
+        log = []
+        governor = self._governor(log, budget_mb=2300)
+        governor._components["whisper"].pinned = True
+
+        governor.acquire("whisper")
+        governor.acquire("llm")
+        governor.acquire("tts")
+
+        assert ("unload", "whisper") not in log
+
+    def test_unload_idle(self):
+        log = []
+        governor = self._governor(log, budget_mb=10000)
+        governor.acquire("whisper")
+        governor.acquire("tts")
+
+        governor.unload_idle(0, keep="tts")
+
+        assert ("unload", "whisper") in log
+        assert ("unload", "tts") not in log
+
+    def test_background_unloads_idle_components(self):
+        log = []
+        governor = self._governor(log, budget_mb=10000, idle_timeout_s=0.02)
+        governor.acquire("whisper")
+
+        with governor:
+            deadline = time.time() + 5
+            while ("unload", "whisper") not in log and time.time() < deadline:
+                time.sleep(0.01)
+
+        assert ("unload", "whisper") in log
+
+    def test_mmap_load_counts_at_least_the_estimate(self, monkeypatch):
+        log = []
+        governor = self._governor(log, budget_mb=2300)
+        # mmap'd weights are not yet resident when the loader returns
+        rss = iter([0, 50 * MB])
+        monkeypatch.setattr(memory, "current_rss_bytes", lambda: next(rss))
+
+        governor.acquire("llm")
+
+        assert governor.resident_mb == 1800
+
+    def test_plan_becomes_llm_estimate(self, tmp_path):
+        log = []
+        governor = self._governor(log, budget_mb=10000)
+        path = _model_file(tmp_path, "phi-2.gguf", 1600)
+
+        plan = governor.plan_llm([path], 2048, exclude="llm")
+
+        assert governor._components["llm"].estimate_mb == plan.estimated_mb
+
+    def test_concurrent_acquire_loads_once(self):
+        log = []
+        governor = self._governor(log, budget_mb=10000)
+        loads = []
+
+        def slow_load():
+            loads.append(1)
+            time.sleep(0.05)
+
+        governor._components["tts"].loader = slow_load
+        threads = [threading.Thread(target=governor.acquire, args=("tts",)) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(loads) == 1
+
+    def test_plan_waits_for_an_in_progress_load(self, tmp_path):
+        log = []
+        governor = self._governor(log, budget_mb=10000)
+        path = _model_file(tmp_path, "phi-2.gguf", 1600)
+        loading = threading.Event()
+
+        def slow_load():
+            loading.set()
+            time.sleep(0.05)
+            log.append(("load", "tts"))
+
+        governor._components["tts"].loader = slow_load
+        thread = threading.Thread(target=governor.acquire, args=("tts",))
+        thread.start()
+        loading.wait(5)
+        governor.plan_llm([path], 2048, exclude="llm")
+        log.append(("plan", "llm"))
+        thread.join()
+
+        assert log == [("load", "tts"), ("plan", "llm")]
+
+    def test_plan_from_inside_a_loader(self, tmp_path):
+        log = []
+        governor = self._governor(log, budget_mb=10000)
+        path = _model_file(tmp_path, "phi-2.gguf", 1600)
+        plans = []
+        # The assistant plans its load from the governor's own loader call
+        governor._components["llm"].loader = lambda: plans.append(
+            governor.plan_llm([path], 2048, exclude="llm")
+        )
+
+        governor.acquire("llm")
+
+        assert governor._components["llm"].estimate_mb == plans[0].estimated_mb
+
+    def test_memory_report(self):
+        log = []
+        governor = self._governor(log, budget_mb=10000)
+        governor.acquire("whisper")
+        governor.unload("whisper")
+        governor.acquire("whisper")
+
+        report = governor.memory_report()
+
+        assert report["budget_mb"] == 10000
+        assert set(report["components"]) == {"whisper", "llm", "tts"}
+        assert report["components"]["whisper"]["loads"] == 2
+        assert report["components"]["whisper"]["unloads"] == 1
+        assert report["components"]["llm"]["loaded"] is False
+
+
+class TestVoiceAssistantIntegration:
+    """Test that VoiceAssistant wires its components into the governor"""
+
+    def test_voice_components_registered(self):
+        from src.voice_interface import VoiceAssistant
+
+        voice = VoiceAssistant(llm_path="missing.gguf", memory_budget_mb=4000)
+        report = voice.memory_report()
+
+        assert set(report["components"]) == {"whisper", "tts", "llm"}
+
+    def test_memory_report_requires_budget(self):
+        from src.voice_interface import VoiceAssistant
+
+        with pytest.raises(RuntimeError):
+            VoiceAssistant(llm_path="missing.gguf").memory_report()
@@ -0,0 +1,179 @@
+"""
+Unit tests for zero-downtime model reloads
+"""
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from assistant import VehicleAssistant
+from backends import StubBackend
+
+OLD_ANSWER = " Old model answer."
+
+
+class SlowLoadingBackend(StubBackend):
+    """Stub whose load takes a while, like a cold GGUF load"""
+
+    def __init__(self, load_s=0.2, fail=False, **kwargs):
+        super().__init__(**kwargs)
+        self.load_s = load_s
+        self.fail = fail
+
+    def _load(self):
+        time.sleep(self.load_s)
+        if self.fail:
+            raise RuntimeError("corrupt model file")
+
+
+class TestReloadModel:
+    """Test background load, swap, drain and rollback"""
+
+    def test_swaps_and_frees_old_model(self, stub_assistant):
+        assistant, old = stub_assistant(OLD_ANSWER)
+        assert assistant.ask("What oil should I use?") == "Old model answer."
+
+        new = StubBackend(responder=" New model answer.")
+        report = assistant.reload_model(new).result(timeout=5)
+
+        assert assistant.ask("What oil should I use?") == "New model answer."
+        assert not old.loaded
+        assert assistant.backend is new
+        assert report['total_s'] >= report['load_s'] >= 0
+
+    def test_old_model_serves_while_new_one_loads(self, stub_assistant):
+        assistant, _ = stub_assistant(OLD_ANSWER)
+        assistant.ask("What oil should I use?")
+
+        future = assistant.reload_model(SlowLoadingBackend(load_s=0.3, responder=" New model answer."))
+        start_time = time.perf_counter()
+        answer = assistant.ask("What oil should I use?")
+        elapsed = time.perf_counter() - start_time
+
+        assert answer == "Old model answer." and elapsed < 0.2
+        future.result(timeout=5)
+        assert assistant.ask("What oil should I use?") == "New model answer."
+
+    def test_in_flight_generation_finishes_on_old_model(self, stub_assistant):
+        assistant, _ = stub_assistant(OLD_ANSWER, token_delay_s=0.02)
+        stream = assistant.ask("What oil should I use?", stream=True)
+        first = next(stream)
+
+        future = assistant.reload_model(StubBackend(responder=" New model answer."))
+        time.sleep(0.05)
+        assert not future.done()
+        rest = list(stream)
+
+        report = future.result(timeout=5)
+        assert first + "".join(rest) == "Old model answer."
+        assert report['swap_wait_s'] > 0
+        assert assistant.ask("What oil should I use?") == "New model answer."
+
+    def test_failed_smoke_test_rolls_back(self, stub_assistant):
+        assistant, old = stub_assistant(OLD_ANSWER)
+        new = StubBackend(responder="   ")
+
+        with pytest.raises(RuntimeError, match="Smoke test failed"):
+            assistant.reload_model(new).result(timeout=5)
+
+        assert assistant.ask("What oil should I use?") == "Old model answer."
+        assert not new.loaded and assistant.backend is old
+
+    def test_failed_load_rolls_back(self, stub_assistant):
+        assistant, _ = stub_assistant(OLD_ANSWER)
+        assistant.ask("What oil should I use?")
+
+        with pytest.raises(RuntimeError, match="corrupt"):
+            assistant.reload_model(SlowLoadingBackend(load_s=0.0, fail=True)).result(timeout=5)
+
+        assert assistant.ask("What oil should I use?") == "Old model answer."
+
+    def test_smoke_test_uses_new_model_only(self, stub_assistant):
+        assistant, old = stub_assistant(OLD_ANSWER)
+        assistant.ask("What oil should I use?")
+        new = StubBackend(responder=" New model answer.")
+
+        assistant.reload_model(new).result(timeout=5)
+
+        assert "check engine light" in new.calls[0]['prompt']
+        assert len(old.calls) == 1
+
+    def test_reload_by_path(self):
+        assistant = VehicleAssistant(model_path="phi-2-q4.gguf", backend="stub")
+        assistant.ask("What oil should I use?")
+
+        assistant.reload_model("phi-2-q5.gguf").result(timeout=5)
+
+        assert assistant.model_path == "phi-2-q5.gguf"
+        assert assistant.ask("What oil should I use?")
+
+    def test_path_needs_named_backend(self, stub_assistant):
+        assistant, _ = stub_assistant(OLD_ANSWER)
+
+        with pytest.raises(ValueError):
+            assistant.reload_model("phi-2-q5.gguf")
+
+    def test_reloads_are_serialized(self, stub_assistant):
+        assistant, _ = stub_assistant(OLD_ANSWER)
+        first = assistant.reload_model(SlowLoadingBackend(load_s=0.1, responder=" First."))
+        second = assistant.reload_model(SlowLoadingBackend(load_s=0.1, responder=" Second."))
+
+        first.result(timeout=5)
+        second.result(timeout=5)
+
+        assert assistant.ask("What oil should I use?") == "Second."
+
+    def test_adapters_are_released_on_swap(self, stub_assistant):
+        assistant, old = stub_assistant(OLD_ANSWER)
+        assistant.enable_adapters({"toyota": "adapters/toyota.gguf"})
+        assistant.ask("What oil should I use?", adapter="toyota")
+        new = StubBackend(responder=" New model answer.")
+
+        assistant.reload_model(new).result(timeout=5)
+        assistant.ask("What oil should I use?", adapter="toyota")
+
+        assert old.adapters_freed == ["adapters/toyota.gguf"]
+        assert new.adapter_loads == ["adapters/toyota.gguf"]
+        assert new.calls[-1]['adapter'] == "adapters/toyota.gguf"
+
+    def test_reload_plans_around_the_resident_model(self, tmp_path):
+        from memory import LLMLoadPlan, MemoryGovernor
+
+        path = tmp_path / "phi-2-q5.gguf"
+        with open(path, "wb") as f:
+            f.truncate(1200 * 1024 * 1024)
+        assistant = VehicleAssistant(
+            model_path="phi-2-q4.gguf",
+            preflight=False,
+            memory_governor=MemoryGovernor(budget_mb=3000, reserve_mb=0)
+        )
+        old = StubBackend(responder=" Old model answer.")
+        old.load()
+        assistant._llm = old
+        assistant.load_plan = LLMLoadPlan("phi-2-q4.gguf", 2048, 1, 1, True, False, estimated_mb=1800)
+
+        with pytest.raises(MemoryError):
+            assistant.reload_model(str(path)).result(timeout=5)
+
+        assert assistant._llm is old and assistant.load_plan.estimated_mb == 1800
+
+    def test_unload_waits_for_generation(self, stub_assistant):
+        assistant, old = stub_assistant(OLD_ANSWER, token_delay_s=0.02)
+        stream = assistant.ask("What oil should I use?", stream=True)
+        first = next(stream)
+        unloader = threading.Thread(target=assistant.unload)
+        unloader.start()
+        time.sleep(0.05)
+
+        assert old.loaded
+        rest = list(stream)
+        unloader.join(timeout=5)
+
+        assert first + "".join(rest) == "Old model answer."
+        assert not old.loaded
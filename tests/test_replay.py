@@ -0,0 +1,126 @@
+"""
+Unit tests for LLM call record/replay
+Replayed traces let ask() run in CI without a GGUF model
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from assistant import VehicleAssistant
+from backends import StubBackend
+from replay import RecordingBackend, ReplayBackend, load_trace
+
+
+ANSWER = "P0420 means catalyst efficiency."
+
+
+def _record(trace_path, question="Why is my check engine light flashing?"):
+    """Record one ask() through a stub backend with a per-token delay"""
+    assistant = VehicleAssistant(
+        model_path="test_model.gguf",
+        backend=StubBackend(responder=ANSWER, token_delay_s=0.01),
+        record_trace=trace_path
+    )
+    return assistant.ask(question)
+
+
+class TestRecording:
+    """Test trace capture"""
+
+    def test_records_tokens_and_timings(self, tmp_path):
+        trace = str(tmp_path / "calls.trace.gz")
+        response = _record(trace)
+
+        records = load_trace(trace)
+
+        assert response == ANSWER
+        assert len(records) == 1
+        assert records[0]['tokens'] == ["P0420", " means", " catalyst", " efficiency."]
+        assert records[0]['token_times'] == sorted(records[0]['token_times'])
+        assert records[0]['params']['max_tokens'] == 256
+        assert 'prompt' not in records[0]
+
+    def test_streamed_call_is_recorded(self, tmp_path):
+        trace = str(tmp_path / "calls.trace.gz")
+        backend = RecordingBackend(StubBackend(responder=ANSWER), trace, include_prompts=True)
+
+        text = "".join(backend.stream("Hi", 8, 0.7))
+
+        record = load_trace(trace)[0]
+        assert text == ANSWER
+        assert record['prompt'] == "Hi"
+        assert record['finish_reason'] == "stop"
+
+    def test_abandoned_stream_is_recorded_as_aborted(self, tmp_path):
+        trace = str(tmp_path / "calls.trace.gz")
+        backend = RecordingBackend(StubBackend(responder=ANSWER), trace)
+
+        stream = backend.stream("Hi", 8, 0.7)
+        next(stream)
+        stream.close()
+
+        record = load_trace(trace)[0]
+        assert record['tokens'] == ["P0420"]
+        assert record['finish_reason'] == "aborted"
+
+
+class TestReplay:
+    """Test model-free replay"""
+
+    def test_ask_replays_without_model(self, tmp_path):
+        trace = str(tmp_path / "calls.trace.gz")
+        recorded = _record(trace)
+
+        assistant = VehicleAssistant(model_path="missing.gguf", replay_trace=trace)
+
+        assert assistant.ask("Why is my check engine light flashing?") == recorded
+        assert isinstance(assistant._llm, ReplayBackend)
+
+    def test_unknown_call_raises_in_strict_mode(self, tmp_path):
+        trace = str(tmp_path / "calls.trace.gz")
+        _record(trace)
+
+        assistant = VehicleAssistant(model_path="missing.gguf", replay_trace=trace)
+
+        with pytest.raises(KeyError):
+            assistant.ask("Something never recorded")
+
+    def test_lenient_mode_falls_back_to_recorded_order(self, tmp_path):
+        trace = str(tmp_path / "calls.trace.gz")
+        _record(trace)
+
+        replay = ReplayBackend(trace, strict=False)
+        completion = replay.complete("Different prompt", 256, 0.7)
+
+        assert completion.text == ANSWER
+        assert replay.misses == 1
+
+    def test_realtime_reproduces_timing(self, tmp_path):
+        trace = str(tmp_path / "calls.trace.gz")
+        _record(trace)
+        recorded_s = load_trace(trace)[0]['token_times'][-1]
+
+        replay = ReplayBackend(trace, realtime=True, strict=False)
+        start_time = time.perf_counter()
+        pieces = list(replay.stream("x", 256, 0.7))
+        elapsed = time.perf_counter() - start_time
+
+        assert len(pieces) == 4
+        assert elapsed >= recorded_s * 0.9
+
+    def test_full_speed_is_faster_than_recording(self, tmp_path):
+        trace = str(tmp_path / "calls.trace.gz")
+        _record(trace)
+        recorded_s = load_trace(trace)[0]['token_times'][-1]
+
+        replay = ReplayBackend(trace, strict=False)
+        start_time = time.perf_counter()
+        list(replay.stream("x", 256, 0.7))
+
+        assert time.perf_counter() - start_time < recorded_s
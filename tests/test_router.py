@@ -0,0 +1,85 @@
+"""
+Unit tests for the query router
+"""
+
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from backends import StubBackend
+from router import LARGE, SMALL, QueryRouter, classify_query
+
+
+def _router(small_text="Press the cruise button.", **kwargs):
+    router = QueryRouter("small.gguf", "phi-2.gguf", **kwargs)
+    router.assistants[SMALL]._llm = StubBackend(responder=" " + small_text)
+    router.assistants[LARGE]._llm = StubBackend(responder=" Detailed answer.")
+    return router
+
+
+class TestClassifyQuery:
+    """Test the rules/keyword classifier"""
+
+    def test_feature_howto_goes_small(self):
+        decision = classify_query("How do I turn on cruise control?")
+        assert decision.route == SMALL
+        assert decision.intent == "feature"
+
+    def test_dtc_goes_large(self):
+        assert classify_query("What does P0420 mean?").route == LARGE
+
+    def test_symptom_goes_large(self):
+        assert classify_query("There is a grinding noise when I brake").route == LARGE
+
+    def test_long_question_goes_large(self):
+        question = " ".join(["word"] * 30)
+        assert classify_query(question).route == LARGE
+
+
+class TestQueryRouter:
+    """Test dispatch, escalation and reporting with mocked models"""
+
+    def test_models_have_separate_instances(self):
+        router = QueryRouter("small.gguf", "phi-2.gguf", n_threads=2)
+
+        assert router.assistants[SMALL].model_path == "small.gguf"
+        assert router.assistants[LARGE].model_path == "phi-2.gguf"
+        assert router.assistants[SMALL].n_threads == 2
+
+    def test_simple_query_uses_small_model(self):
+        router = _router()
+
+        response = router.ask("How do I turn on cruise control?")
+
+        assert response == "Press the cruise button."
+        assert router.assistants[LARGE]._llm.calls == []
+
+    def test_uncertain_answer_escalates(self):
+        router = _router(small_text="I'm not sure about that.")
+
+        response = router.ask("How do I turn on cruise control?")
+
+        assert response == "Detailed answer."
+        assert len(router.assistants[LARGE].conversation_history) == 1
+        report = router.route_report()
+        assert report[SMALL]['escalations'] == 1
+        assert report[SMALL]['escalation_rate'] == 1.0
+        assert report[LARGE]['requests'] == 1
+
+    def test_classifier_can_override(self):
+        router = _router(classifier=lambda question: LARGE)
+
+        router.ask("How do I turn on cruise control?")
+
+        assert router.assistants[SMALL]._llm.calls == []
+
+    def test_history_is_shared_across_resets(self):
+        router = _router()
+        router.ask("How do I turn on cruise control?")
+        router.reset_conversation()
+        router.ask("How do I pair my phone?")
+
+        assert router.assistants[SMALL].conversation_history is router.assistants[LARGE].conversation_history
+        assert len(router.assistants[LARGE].conversation_history) == 1
@@ -0,0 +1,241 @@
+"""
+Unit tests for the priority request scheduler
+"""
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from assistant import VehicleContext
+from cancellation import CANCELLED, DEADLINE, CancellationToken
+from router import classify_query
+from scheduler import Priority, RequestScheduler, classify
+
+LONG_ANSWER = " " + " ".join(f"step{i}" for i in range(40)) + "."
+
+
+def _respond(prompt):
+    question = prompt.rsplit("User:", 1)[1]
+    if "brake" in question:
+        return " Pull over safely."
+    if "oil" in question:
+        return " Use 0W-20 oil."
+    return LONG_ANSWER
+
+
+def _wait_for(condition, timeout_s=5.0):
+    deadline = time.time() + timeout_s
+    while not condition():
+        assert time.time() < deadline, "condition not reached"
+        time.sleep(0.001)
+
+
+class TestClassify:
+    """Test priority classification"""
+
+    @pytest.mark.parametrize("question,priority", [
+        ("My brake light is on", Priority.SAFETY),
+        ("There's smoke coming from the hood", Priority.SAFETY),
+        ("Is it safe to drive with P0420?", Priority.SAFETY),
+        ("What does P0171 mean?", Priority.DIAGNOSTIC),
+        ("Why is my check engine light on?", Priority.DIAGNOSTIC),
+        ("How do I connect my phone via Bluetooth?", Priority.GENERAL),
+        ("Explain my maintenance schedule", Priority.GENERAL),
+    ])
+    def test_classify(self, question, priority):
+        assert classify(question) == priority
+
+    @pytest.mark.parametrize("question", [
+        "There is a grinding noise when I brake",
+        "My warning lights came on",
+        "How do I turn on cruise control?",
+    ])
+    def test_agrees_with_router(self, question):
+        intent = classify_query(question).intent
+        expected = {"safety": Priority.SAFETY, "diagnostic": Priority.DIAGNOSTIC}.get(intent, Priority.GENERAL)
+
+        assert classify(question) == expected
+
+
+class TestRequestScheduler:
+    """Test ordering, preemption, sessions and metrics"""
+
+    def test_answers_questions(self, stub_assistant):
+        assistant, _ = stub_assistant(_respond)
+
+        with RequestScheduler(assistant) as scheduler:
+            answer = scheduler.ask("What oil should I use?", timeout=5)
+
+        assert answer == "Use 0W-20 oil."
+        assert scheduler.metrics()['completed'] == 1
+
+    def test_priority_order(self, stub_assistant):
+        assistant, backend = stub_assistant(_respond)
+        scheduler = RequestScheduler(assistant)
+        general = scheduler.submit("Explain the infotainment menus")
+        diagnostic = scheduler.submit("Why is my check engine light on?")
+        safety = scheduler.submit("My brake light is on")
+
+        with scheduler:
+            for request in (general, diagnostic, safety):
+                request.result(timeout=5)
+
+        questions = [call['prompt'].rsplit("User:", 1)[1] for call in backend.calls]
+        assert "brake" in questions[0]
+        assert "check engine" in questions[1]
+        assert "infotainment" in questions[2]
+
+    def test_safety_preempts_general_at_token_boundary(self, stub_assistant):
+        assistant, backend = stub_assistant(_respond, token_delay_s=0.005)
+
+        with RequestScheduler(assistant) as scheduler:
+            general = scheduler.submit("Explain the infotainment menus")
+            _wait_for(lambda: len(general.pieces) >= 5)
+            safety = scheduler.submit("My brake light is on")
+
+            assert safety.result(timeout=5) == "Pull over safely."
+            assert not general.done()
+            answer = general.result(timeout=5)
+
+        prompt = backend.calls[0]['prompt']
+        resumed_prompt = backend.calls[2]['prompt']
+        assert resumed_prompt.startswith(prompt)
+        partial = resumed_prompt[len(prompt):]
+        assert len(partial.split()) >= 5 and LONG_ANSWER.startswith(partial)
+        assert general.preemptions == 1
+        assert answer.startswith("step0 step1 step2 step3 step4")
+        assert len(general.pieces) <= general.max_tokens
+        assert scheduler.metrics()['preemptions'] == 1
+
+    def test_deadline_stops_generation(self, stub_assistant):
+        assistant, _ = stub_assistant(_respond, token_delay_s=0.01)
+
+        with RequestScheduler(assistant) as scheduler:
+            answer = scheduler.ask("Explain the infotainment menus", timeout=5, timeout_s=0.1)
+
+        assert answer.partial and answer.stop_reason == DEADLINE
+        assert LONG_ANSWER.strip().startswith(answer)
+        assert assistant.latency_report()['deadline_misses'] == 1
+
+    def test_cancel_while_queued_skips_generation(self, stub_assistant):
+        assistant, backend = stub_assistant(_respond)
+        scheduler = RequestScheduler(assistant)
+        token = CancellationToken()
+        request = scheduler.submit("Explain the infotainment menus", cancel_token=token)
+        token.cancel()
+
+        with scheduler:
+            answer = request.result(timeout=5)
+
+        assert answer == "" and answer.stop_reason == CANCELLED
+        assert backend.calls == []
+        assert assistant.conversation_history == []
+
+    def test_resumed_request_respects_max_tokens(self, stub_assistant):
+        assistant, backend = stub_assistant(_respond, token_delay_s=0.005)
+
+        with RequestScheduler(assistant) as scheduler:
+            general = scheduler.submit("Explain the infotainment menus", max_tokens=20)
+            _wait_for(lambda: len(general.pieces) >= 5)
+            scheduler.submit("My brake light is on")
+            general.result(timeout=5)
+
+        assert len(general.pieces) == 20
+        partial = backend.calls[2]['prompt'][len(backend.calls[0]['prompt']):]
+        assert backend.calls[2]['max_tokens'] == 20 - len(partial.split())
+
+    def test_exhausted_budget_is_not_resumed(self, stub_assistant):
+        assistant, backend = stub_assistant(_respond, token_delay_s=0.005)
+
+        with RequestScheduler(assistant) as scheduler:
+            general = scheduler.submit("Explain the infotainment menus")
+            _wait_for(lambda: len(general.pieces) >= 5)
+            # Thermal throttling lowers the cap below what was generated
+            assistant.max_tokens_limit = 3
+            scheduler.submit("My brake light is on").result(timeout=5)
+            answer = general.result(timeout=5)
+
+        assert len(backend.calls) == 2
+        assert answer.startswith("step0 step1 step2 step3 step4")
+
+    def test_sessions_share_fairly(self, stub_assistant):
+        assistant, backend = stub_assistant(_respond)
+        scheduler = RequestScheduler(assistant)
+        chatty = [scheduler.submit(f"Explain feature {i}", session_id="phone") for i in range(3)]
+        other = scheduler.submit("Explain the seat heaters", session_id="display")
+
+        with scheduler:
+            other.result(timeout=5)
+            for request in chatty:
+                request.result(timeout=5)
+
+        questions = [call['prompt'].rsplit("User:", 1)[1] for call in backend.calls]
+        assert "seat heaters" in questions[1]
+
+    def test_sessions_have_separate_history(self, stub_assistant):
+        assistant, _ = stub_assistant(_respond)
+
+        with RequestScheduler(assistant) as scheduler:
+            scheduler.open_session("civic", VehicleContext("Honda", "Civic", 2020, 40000))
+            scheduler.ask("What oil should I use?", session_id="phone", timeout=5)
+            scheduler.ask("My brake light is on", session_id="civic", timeout=5)
+            scheduler.ask("Reset", session_id="phone", timeout=5)
+
+        sessions = scheduler._sessions
+        assert sessions["phone"].conversation_history == []
+        assert [turn['user'] for turn in sessions["civic"].conversation_history] == ["My brake light is on"]
+        assert assistant.conversation_history == []
+        assert assistant.vehicle_context is None
+
+    def test_concurrent_callers(self, stub_assistant):
+        assistant, _ = stub_assistant(_respond)
+        results = []
+
+        with RequestScheduler(assistant) as scheduler:
+            def caller(i):
+                results.append(scheduler.ask("What oil should I use?", session_id=f"s{i}", timeout=5))
+
+            threads = [threading.Thread(target=caller, args=(i,)) for i in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        assert results == ["Use 0W-20 oil."] * 8
+        assert all(len(s.conversation_history) == 1 for s in scheduler._sessions.values())
+
+    def test_queue_depth_metrics(self, stub_assistant):
+        assistant, _ = stub_assistant(_respond)
+        scheduler = RequestScheduler(assistant)
+        for i in range(3):
+            scheduler.submit(f"Explain feature {i}")
+        scheduler.submit("My brake light is on")
+
+        metrics = scheduler.metrics()
+        assert metrics['queue_depth'] == 4
+        assert metrics['by_class']['general']['queue_depth'] == 3
+        assert metrics['by_class']['safety']['max_queue_depth'] == 1
+
+        with scheduler:
+            _wait_for(lambda: scheduler.metrics()['completed'] == 4)
+
+        metrics = scheduler.metrics()
+        assert metrics['queue_depth'] == 0
+        assert metrics['by_class']['general']['completed'] == 3
+        assert metrics['by_class']['safety']['mean_wait_s'] >= 0
+
+    def test_stop_fails_queued_requests(self, stub_assistant):
+        assistant, _ = stub_assistant(_respond)
+        scheduler = RequestScheduler(assistant)
+        request = scheduler.submit("Explain the infotainment menus")
+
+        scheduler.stop()
+
+        with pytest.raises(RuntimeError):
+            request.result(timeout=1)
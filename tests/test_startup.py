@@ -0,0 +1,104 @@
+"""
+Startup budget tests
+Cold import of the text assistant and CLI --help must stay cheap
+"""
+
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+SRC = ROOT / "src"
+
+# Cumulative import budget in microseconds, generous enough for CI runners
+IMPORT_BUDGET_US = 250_000
+
+HEAVY_MODULES = ("numpy", "llama_cpp", "whisper", "TTS", "sounddevice", "gradio")
+
+
+def _importtime(args, cwd):
+    """Run python -X importtime and return {module: cumulative_us}"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime"] + args,
+        cwd=str(cwd),
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    timings = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        timings[name.strip()] = int(cumulative)
+    return timings
+
+
+class TestImportBudget:
+    """Test cold import cost of the package"""
+
+    def test_package_import_skips_heavy_modules(self):
+        timings = _importtime(["-c", "import src"], ROOT)
+
+        loaded = [name for name in timings if name.split(".")[0] in HEAVY_MODULES]
+        assert loaded == []
+        assert "src.voice_interface" not in timings
+
+    def test_package_import_within_budget(self):
+        timings = _importtime(["-c", "import src"], ROOT)
+        assert timings["src"] < IMPORT_BUDGET_US
+
+    def test_text_assistant_import_within_budget(self):
+        timings = _importtime(["-c", "import assistant"], SRC)
+        assert timings["assistant"] < IMPORT_BUDGET_US
+
+    def test_lazy_voice_attribute_resolves(self):
+        result = subprocess.run(
+            [sys.executable, "-c", "import src; print(src.VoiceAssistant.__name__)"],
+            cwd=str(ROOT),
+            capture_output=True,
+            text=True
+        )
+        assert result.stdout.strip() == "VoiceAssistant"
+
+    def test_voice_module_imports_from_src(self):
+        result = subprocess.run(
+            [sys.executable, "-c", "import voice_interface; print(voice_interface.VoiceAssistant.__name__)"],
+            cwd=str(SRC),
+            capture_output=True,
+            text=True
+        )
+        assert result.stdout.strip() == "VoiceAssistant", result.stderr
+
+
+class TestCliHelp:
+    """Test that the console entry point answers --help without loading the assistant"""
+
+    def test_help_does_not_import_assistant(self):
+        timings = _importtime([str(SRC / "demo.py"), "--help"], ROOT)
+
+        assert "assistant" not in timings
+        assert not any(name.split(".")[0] in HEAVY_MODULES for name in timings)
+
+
+class TestPackaging:
+    """Test that the src/ modules install as one package"""
+
+    def test_build_has_no_top_level_modules(self, tmp_path):
+        subprocess.run(
+            [sys.executable, str(ROOT / "setup.py"), "-q", "build", "--build-base", str(tmp_path)],
+            cwd=str(ROOT),
+            capture_output=True,
+            check=True
+        )
+        lib = tmp_path / "lib"
+
+        assert sorted(path.name for path in lib.iterdir()) == ["tinyllm_auto"]
+        result = subprocess.run(
+            [sys.executable, "-c", "from tinyllm_auto import VehicleAssistant; import tinyllm_auto.demo"],
+            cwd=str(tmp_path),
+            env={"PYTHONPATH": str(lib)},
+            capture_output=True,
+            text=True
+        )
+        assert result.returncode == 0, result.stderr
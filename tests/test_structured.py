@@ -0,0 +1,151 @@
+"""
+Unit tests for grammar-constrained DTC answers
+"""
+
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from backends import StubBackend
+from structured import (
+    DTCAnswer,
+    build_dtc_grammar,
+    find_dtc,
+    structured_max_chars,
+    structured_max_tokens,
+)
+
+
+SAMPLE_JSON = json.dumps({
+    "meaning": "Catalyst system efficiency below threshold",
+    "causes": ["Failing catalytic converter", "Faulty O2 sensor"],
+    "severity": "moderate",
+    "safe_to_drive": True,
+    "next_steps": "Have the converter and downstream O2 sensor inspected",
+})
+
+
+class TestFindDTC:
+    """Test diagnostic code detection"""
+
+    def test_finds_code(self):
+        assert find_dtc("What does P0420 mean?") == "P0420"
+
+    def test_lowercase_code_is_normalized(self):
+        assert find_dtc("my scanner says p0171") == "P0171"
+
+    def test_no_code(self):
+        assert find_dtc("How do I pair my phone?") is None
+
+
+class TestGrammar:
+    """Test the GBNF grammar source"""
+
+    def test_grammar_has_all_fields_in_order(self):
+        grammar = build_dtc_grammar()
+        keys = ["meaning", "causes", "severity", "safe_to_drive", "next_steps"]
+        positions = [grammar.index(f'\\"{key}\\"') for key in keys]
+        assert positions == sorted(positions)
+
+    def test_field_caps_are_applied(self):
+        grammar = build_dtc_grammar({"meaning": 40})
+        assert "char{1,40}" in grammar
+
+    def test_max_tokens_tracks_caps(self):
+        assert structured_max_tokens(field_char_caps={"meaning": 400}) > structured_max_tokens()
+
+    def test_max_tokens_covers_one_char_per_token(self):
+        assert structured_max_tokens() >= structured_max_chars() > len(SAMPLE_JSON)
+
+    def test_max_tokens_is_bounded_by_caller(self):
+        assert structured_max_tokens(256) == 256
+        assert structured_max_tokens(10 ** 6) == structured_max_tokens()
+
+
+class TestDTCAnswer:
+    """Test parsing and rendering of structured answers"""
+
+    def test_from_json(self):
+        answer = DTCAnswer.from_json("P0420", SAMPLE_JSON)
+
+        assert answer.code == "P0420"
+        assert answer.severity == "moderate"
+        assert answer.safe_to_drive is True
+        assert len(answer.causes) == 2
+
+    def test_from_json_rejects_truncated_output(self):
+        with pytest.raises(ValueError):
+            DTCAnswer.from_json("P0420", SAMPLE_JSON[:40])
+
+    def test_to_text_contains_fields(self):
+        text = DTCAnswer.from_json("P0420", SAMPLE_JSON).to_text()
+
+        assert text.startswith("P0420:")
+        assert "Safe to drive: Yes" in text
+        assert "Faulty O2 sensor" in text
+
+
+class TestStructuredAsk:
+    """Test VehicleAssistant.ask(structured=True) with a stub backend"""
+
+    def _assistant(self, responder=SAMPLE_JSON):
+        from assistant import VehicleAssistant
+
+        return VehicleAssistant(
+            model_path="test_model.gguf",
+            verbose=False,
+            backend=StubBackend(responder=responder)
+        )
+
+    def test_structured_ask_returns_typed_answer(self):
+        assistant = self._assistant()
+
+        answer = assistant.ask("What does P0420 mean?", structured=True)
+
+        assert isinstance(answer, DTCAnswer)
+        call = assistant._llm.calls[-1]
+        assert call["max_tokens"] == structured_max_tokens(256) == 256
+        assert call["grammar"] == build_dtc_grammar()
+        assert assistant.conversation_history[-1]['assistant'] == answer.to_text()
+
+    def test_token_limit_caps_structured_budget(self):
+        assistant = self._assistant()
+        assistant.max_tokens_limit = 32
+
+        assistant.ask("What does P0420 mean?", structured=True)
+
+        assert [call["max_tokens"] for call in assistant._llm.calls] == [32]
+
+    def test_non_dtc_question_uses_free_text(self):
+        assistant = self._assistant(responder=" Hold the pairing button.")
+
+        response = assistant.ask("How do I pair my phone?", structured=True)
+
+        assert response == "Hold the pairing button."
+        assert assistant._llm.calls[-1]["grammar"] is None
+
+    def test_unclosed_json_falls_back_to_free_text(self):
+        outputs = iter([SAMPLE_JSON[:40], " The catalytic converter is not working well."])
+        assistant = self._assistant(responder=lambda prompt: next(outputs))
+
+        answer = assistant.ask("What does P0420 mean?", structured=True)
+
+        assert answer == "The catalytic converter is not working well."
+        assert [call["grammar"] is None for call in assistant._llm.calls] == [False, True]
+
+    def test_cancelled_request_skips_prefill(self):
+        from cancellation import CANCELLED, CancellationToken
+
+        assistant = self._assistant()
+        token = CancellationToken()
+        token.cancel()
+
+        answer = assistant.ask("What does P0420 mean?", structured=True, cancel_token=token)
+
+        assert answer.partial and answer.stop_reason == CANCELLED
+        assert assistant._llm.calls == []
@@ -0,0 +1,166 @@
+"""
+Unit tests for background history summarization
+"""
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from assistant import VehicleAssistant
+from backends import StubBackend
+
+
+class _FakeBackend(StubBackend):
+    """Stub that streams the summary word by word and answers other prompts"""
+
+    def __init__(self, summary="Driver asked about P0420 and was told to inspect the converter.",
+                 token_delay=0.0):
+        super().__init__(responder=self._respond, token_delay_s=token_delay)
+        self.summary = summary
+        self.summary_calls = 0
+        self.summary_started = threading.Event()
+
+    def _respond(self, prompt):
+        if prompt.endswith("Updated summary:"):
+            self.summary_calls += 1
+            self.summary_started.set()
+            return self.summary
+        return " Answer."
+
+
+def _assistant_with_history(turns=8, **fake_kwargs):
+    assistant = VehicleAssistant(
+        model_path="test_model.gguf",
+        verbose=False,
+        backend=_FakeBackend(**fake_kwargs)
+    )
+    assistant._load_llm()
+    for i in range(turns):
+        assistant.conversation_history.append({'user': f'Question {i}', 'assistant': f'Answer {i}'})
+    return assistant
+
+
+class TestRunOnce:
+    """Test folding aged-out turns synchronously"""
+
+    def test_folds_only_aged_out_turns(self):
+        assistant = _assistant_with_history(turns=8)
+        assistant.enable_history_summarization(idle_delay_s=3600)
+
+        assert len(assistant.summarizer.pending_turns()) == 3
+        assert assistant.summarizer.run_once() is True
+        assert assistant._summarized_turns == 3
+        assert assistant.summarizer.pending_turns() == []
+        assert "P0420" in assistant.conversation_summary
+        assistant.disable_history_summarization()
+
+    def test_token_limit_caps_summary(self):
+        assistant = _assistant_with_history(turns=8)
+        assistant.enable_history_summarization(idle_delay_s=3600)
+        assistant.max_tokens_limit = 32
+
+        assistant.summarizer.run_once()
+        assistant.disable_history_summarization()
+
+        assert assistant._llm.calls[-1]['max_tokens'] == 32
+
+    def test_summary_is_bounded(self):
+        assistant = _assistant_with_history(summary="word " * 500)
+        assistant.enable_history_summarization(idle_delay_s=3600, max_summary_words=20)
+
+        assistant.summarizer.run_once()
+
+        assert len(assistant.conversation_summary.split()) == 20
+        assistant.disable_history_summarization()
+
+    def test_summary_replaces_old_turns_in_prompt(self):
+        assistant = _assistant_with_history(turns=8)
+        assistant.conversation_summary = "Earlier: brake noise discussed."
+
+        prompt = assistant._build_prompt("New question")
+
+        assert "Summary of earlier conversation: Earlier: brake noise discussed." in prompt
+        assert "Question 2" not in prompt
+        assert "Question 3" in prompt
+        assert prompt.count("User:") == 6
+
+    def test_stateless_prompt_omits_summary(self):
+        assistant = _assistant_with_history()
+        assistant.conversation_summary = "Earlier: brake noise discussed."
+
+        assert "Summary" not in assistant._build_prompt("Q", history=[])
+
+    def test_skips_when_model_is_busy(self):
+        assistant = _assistant_with_history()
+        assistant.enable_history_summarization(idle_delay_s=3600)
+
+        with assistant._llm_lock:
+            result = []
+            worker = threading.Thread(target=lambda: result.append(assistant.summarizer.run_once()))
+            worker.start()
+            worker.join()
+
+        assert result == [False]
+        assistant.disable_history_summarization()
+
+    def test_reset_clears_summary(self):
+        assistant = _assistant_with_history()
+        assistant.conversation_summary = "Something"
+        assistant._summarized_turns = 3
+
+        assistant.reset_conversation()
+
+        assert assistant.conversation_summary == ""
+        assert assistant._summarized_turns == 0
+
+
+class TestBackgroundThread:
+    """Test idle-time scheduling and preemption"""
+
+    def test_summarizes_when_idle(self):
+        assistant = _assistant_with_history()
+        assistant.enable_history_summarization(idle_delay_s=0.0)
+
+        deadline = time.time() + 5
+        while not assistant.conversation_summary and time.time() < deadline:
+            time.sleep(0.01)
+        assistant.disable_history_summarization()
+
+        assert assistant.conversation_summary
+
+    def test_request_preempts_summarization(self):
+        assistant = _assistant_with_history(token_delay=0.05)
+        assistant.enable_history_summarization(idle_delay_s=0.0)
+
+        summarizer = assistant.summarizer
+
+        assert assistant._llm.summary_started.wait(5)
+        response = assistant.ask("How do I pair my phone?")
+        assistant.disable_history_summarization()
+
+        assert response == "Answer."
+        assert summarizer.preemptions == 1
+
+    def test_concurrent_requests_are_counted(self):
+        assistant = _assistant_with_history()
+        assistant.enable_history_summarization(idle_delay_s=3600)
+        summarizer = assistant.summarizer
+        assistant.disable_history_summarization()
+
+        def caller():
+            for _ in range(2000):
+                summarizer.request_started()
+                summarizer.request_finished()
+
+        threads = [threading.Thread(target=caller) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert summarizer._active_requests == 0
+        assert not summarizer._busy()
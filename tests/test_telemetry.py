@@ -0,0 +1,228 @@
+"""
+Unit tests for OBD-II telemetry ingestion and the live vehicle context
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from assistant import VehicleAssistant, VehicleContext
+from backends import StubBackend
+from telemetry import (
+    Frame,
+    LiveVehicleContext,
+    LogReplaySource,
+    RingBuffer,
+    TelemetryIngestor,
+    decode_dtc,
+    encode_dtc,
+    parse_candump_line,
+)
+
+
+def _pid(ts, pid, *data, ecu=0x7E8):
+    payload = bytes([0x41, pid, *data])
+    return Frame(ts, ecu, bytes([len(payload)]) + payload)
+
+
+def _dtcs(ts, *codes, mode=0x43, ecu=0x7E8):
+    payload = bytes([mode, len(codes)]) + b"".join(encode_dtc(code) for code in codes)
+    return Frame(ts, ecu, bytes([len(payload)]) + payload)
+
+
+def _ingestor():
+    context = LiveVehicleContext("Toyota", "Camry", 2022, 15000)
+    return TelemetryIngestor(source=None, context=context, capacity=4), context
+
+
+class TestDecoding:
+    """Test DTC and candump decoding"""
+
+    @pytest.mark.parametrize("code", ["P0420", "P0171", "C0035", "B1A2F", "U0100"])
+    def test_dtc_round_trip(self, code):
+        a, b = encode_dtc(code)
+        assert decode_dtc(a, b) == code
+
+    def test_parse_candump_line(self):
+        frame = parse_candump_line("(1700000000.250000) can0 7E8#04410C1AF8")
+
+        assert frame == Frame(1700000000.25, 0x7E8, bytes.fromhex("04410C1AF8"))
+        assert parse_candump_line("not a frame") is None
+
+
+class TestRingBuffer:
+    """Test fixed-size history"""
+
+    def test_wraps_in_order(self):
+        buffer = RingBuffer(capacity=3)
+        for i in range(5):
+            buffer.append(float(i), i * 10)
+
+        assert len(buffer) == 3
+        assert buffer.times().tolist() == [2.0, 3.0, 4.0]
+        assert buffer.values().tolist() == [20, 30, 40]
+        assert buffer.latest == 40
+
+    def test_empty(self):
+        buffer = RingBuffer(capacity=3)
+
+        assert buffer.latest is None
+        assert buffer.values().tolist() == []
+
+
+class TestTelemetryIngestor:
+    """Test frame decoding into buffers and the live context"""
+
+    def test_decodes_pids(self):
+        ingestor, context = _ingestor()
+        ingestor.process(_pid(0.0, 0x0C, 0x1A, 0xF8))
+        ingestor.process(_pid(0.0, 0x05, 130))
+        ingestor.process(_pid(0.0, 0x42, 0x36, 0xB0))
+        ingestor.process(_pid(0.0, 0x06, 128))
+
+        assert context.values['rpm'] == 1726
+        assert context.values['coolant_temp_c'] == 90
+        assert context.values['battery_v'] == pytest.approx(14.0)
+        assert context.values['short_fuel_trim_pct'] == pytest.approx(0.0)
+        assert ingestor.buffer('rpm').latest == 1726
+        assert ingestor.decoded == 4
+
+    def test_odometer_sets_mileage(self):
+        ingestor, context = _ingestor()
+        ingestor.process(_pid(0.0, 0xA6, *(402336).to_bytes(4, "big")))
+
+        assert context.mileage == 25000
+        assert "25,000 miles" in context.to_prompt()
+
+    def test_ignores_other_frames(self):
+        ingestor, _ = _ingestor()
+        ingestor.process(Frame(0.0, 0x123, bytes(8)))
+        ingestor.process(Frame(0.0, 0x7E8, bytes.fromhex("1014490201314731")))
+        ingestor.process(_pid(0.0, 0x99, 1))
+
+        assert ingestor.report()['ignored'] == 1
+        assert ingestor.report()['unsupported'] == 2
+        assert ingestor.decoded == 0
+
+    def test_empty_payload_is_ignored(self):
+        ingestor, _ = _ingestor()
+        ingestor.process(Frame(0.0, 0x7E8, bytes(8)))
+        ingestor.process(_pid(0.0, 0x05, 130))
+
+        assert ingestor.ignored == 1
+        assert ingestor.decoded == 1
+
+    def test_dtcs_per_ecu_and_clear(self):
+        ingestor, context = _ingestor()
+        ingestor.process(_dtcs(0.0, "P0420", "P0171"))
+        ingestor.process(_dtcs(0.0, "U0100", ecu=0x7E9))
+        ingestor.process(_dtcs(0.0, "P0300", mode=0x47))
+
+        assert context.active_dtcs == ["P0171", "P0420", "U0100"]
+        assert context.pending_dtcs == ["P0300"]
+        prompt = context.to_prompt()
+        assert "P0420 (Catalyst system efficiency below threshold (Bank 1))" in prompt
+        assert "Pending Trouble Codes: P0300" in prompt
+
+        ingestor.process(_dtcs(1.0, "P0171"))
+        assert context.active_dtcs == ["P0171", "U0100"]
+
+        ingestor.process(Frame(2.0, 0x7E8, bytes([0x01, 0x44])))
+        assert context.active_dtcs == [] and context.pending_dtcs == []
+        assert "Trouble Codes" not in context.to_prompt()
+
+
+class TestLiveVehicleContext:
+    """Test prompt caching"""
+
+    def test_prompt_matches_static_context(self):
+        static = VehicleContext("Toyota", "Camry", 2022, 15000)
+        live = LiveVehicleContext.from_context(static)
+
+        assert live.to_prompt() == static.to_prompt()
+        assert VehicleContext(**live.to_dict()) == static
+
+    def test_irrelevant_updates_keep_cached_prompt(self):
+        ingestor, context = _ingestor()
+        ingestor.process(_pid(0.0, 0x05, 130))
+        prompt = context.to_prompt()
+
+        for i in range(50):
+            ingestor.process(_pid(i, 0x0C, i, 0))
+            ingestor.process(_pid(i, 0x0D, i))
+            ingestor.process(_pid(i, 0x05, 130 + i % 2))
+            assert context.to_prompt() is prompt
+
+        assert context.prompt_builds == 1
+        assert context.updates == 151
+
+    def test_relevant_update_rebuilds_prompt(self):
+        ingestor, context = _ingestor()
+        ingestor.process(_pid(0.0, 0x42, 0x30, 0xD4))
+        assert "Battery Voltage: 12.4 V" in context.to_prompt()
+
+        ingestor.process(_pid(1.0, 0x42, 0x2E, 0xE0))
+
+        assert "Battery Voltage: 12.0 V" in context.to_prompt()
+        assert context.prompt_builds == 2
+
+    def test_mileage_resolution(self):
+        context = LiveVehicleContext("Toyota", "Camry", 2022, 15000, mileage_resolution=100)
+        context.to_prompt()
+
+        context.update_value("odometer_km", 15040 / 0.621371)
+        context.to_prompt()
+        context.update_value("odometer_km", 15160 / 0.621371)
+
+        assert "15,200 miles" in context.to_prompt()
+        assert context.prompt_builds == 2
+
+
+class TestLogReplay:
+    """Test the log replay simulator end to end"""
+
+    def test_replay_into_assistant_prompt(self, tmp_path):
+        log = tmp_path / "drive.log"
+        log.write_text(
+            "(1700000000.000000) can0 7E8#04410C1AF8\n"
+            "(1700000000.050000) can0 7E8#0000000000000000\n"
+            "(1700000000.100000) can0 7E8#034105A0\n"
+            "(1700000000.200000) can0 7E8#06430201710420\n"
+            "garbage line\n"
+            "(1700000000.300000) can0 7E8#0641A6000623A0\n"
+        )
+        context = LiveVehicleContext("Toyota", "Camry", 2022, 15000)
+        ingestor = TelemetryIngestor(LogReplaySource(str(log)), context)
+
+        ingestor.start()
+        ingestor._thread.join(timeout=5)
+        ingestor.stop()
+
+        assert ingestor.error is None
+        assert ingestor.report()['frames'] == 5
+        assert context.active_dtcs == ["P0171", "P0420"]
+
+        assistant = VehicleAssistant(model_path="test_model.gguf", backend=StubBackend())
+        assistant.vehicle_context = context
+        prompt = assistant._build_prompt("Is it safe to drive?")
+        assert "Active Trouble Codes: P0171" in prompt
+        assert "Coolant Temperature: 120 °C" in prompt
+        assert "25,000 miles" in prompt
+
+    def test_realtime_replay_can_be_stopped(self, tmp_path):
+        log = tmp_path / "slow.log"
+        log.write_text(
+            "(0.000000) can0 7E8#034105A0\n"
+            "(100.000000) can0 7E8#034105A0\n"
+        )
+        context = LiveVehicleContext("Toyota", "Camry", 2022, 15000)
+        ingestor = TelemetryIngestor(LogReplaySource(str(log), realtime=True), context)
+
+        ingestor.start()
+        ingestor.stop()
+
+        assert ingestor.frames <= 1
@@ -0,0 +1,243 @@
+"""
+Unit tests for the thermal governor
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from assistant import VehicleAssistant
+from backends import StubBackend
+from thermal import SysfsThermalSensor, ThermalGovernor
+
+
+class FakeSysfs:
+    """Writable sysfs tree with thermal zones and cpufreq files"""
+
+    def __init__(self, root: Path, zones=1, cpus=4, max_khz=2400000):
+        self.root = root
+        self.zones = [root / f"sys/class/thermal/thermal_zone{i}" for i in range(zones)]
+        self.cpus = [root / f"sys/devices/system/cpu/cpu{i}/cpufreq" for i in range(cpus)]
+        for path in self.zones + self.cpus:
+            path.mkdir(parents=True)
+        for cpu in self.cpus:
+            (cpu / "cpuinfo_max_freq").write_text(f"{max_khz}\n")
+        self.max_khz = max_khz
+        self.set(temp_c=45.0)
+
+    def set(self, temp_c=None, freq_ratio=1.0, zone=None):
+        if temp_c is not None:
+            for i, path in enumerate(self.zones):
+                if zone is None or zone == i:
+                    (path / "temp").write_text(f"{int(temp_c * 1000)}\n")
+        for cpu in self.cpus:
+            (cpu / "scaling_cur_freq").write_text(f"{int(self.max_khz * freq_ratio)}\n")
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _governor(tmp_path, **kwargs):
+    sysfs = FakeSysfs(tmp_path)
+    clock = FakeClock()
+    backend = StubBackend(responder=" " + " ".join(["word"] * 300))
+    assistant = VehicleAssistant(model_path="test_model.gguf", backend=backend)
+    options = dict(assistant=assistant, sensor=SysfsThermalSensor(str(tmp_path)), cores=4,
+                   smoothing=1.0, cooldown_s=30.0, clock=clock)
+    options.update(kwargs)
+    return ThermalGovernor(**options), sysfs, clock, assistant, backend
+
+
+class TestSysfsThermalSensor:
+    """Test reading temperature and frequency from a fake sysfs"""
+
+    def test_read(self, tmp_path):
+        sysfs = FakeSysfs(tmp_path, zones=2)
+        sysfs.set(temp_c=52.5, zone=0)
+        sysfs.set(temp_c=61.0, zone=1, freq_ratio=0.5)
+
+        reading = SysfsThermalSensor(str(tmp_path)).read()
+
+        assert reading.temp_c == pytest.approx(61.0)
+        assert reading.freq_mhz == pytest.approx(1200.0)
+        assert reading.max_freq_mhz == pytest.approx(2400.0)
+        assert reading.freq_ratio == pytest.approx(0.5)
+
+    def test_missing_files(self, tmp_path):
+        reading = SysfsThermalSensor(str(tmp_path)).read()
+
+        assert reading.temp_c is None and reading.freq_mhz is None
+        assert reading.freq_ratio == 1.0
+
+
+class TestThermalGovernor:
+    """Test escalation, hysteresis, cooldown and applied limits"""
+
+    def test_escalation_is_immediate(self, tmp_path):
+        governor, sysfs, _, _, _ = _governor(tmp_path)
+        assert governor.update().name == "normal"
+
+        sysfs.set(temp_c=82.0)
+
+        assert governor.update().name == "critical"
+        assert governor.escalations == 1
+
+    def test_hysteresis_and_cooldown_prevent_oscillation(self, tmp_path):
+        governor, sysfs, clock, _, _ = _governor(tmp_path)
+        sysfs.set(temp_c=76.0)
+        governor.update()
+
+        # Hovering just under the threshold does not step down
+        for temp_c in [74.0, 76.0, 73.0, 75.5, 72.0]:
+            sysfs.set(temp_c=temp_c)
+            clock.now += 10.0
+            assert governor.update().name == "hot"
+
+        # Cool enough, but not for long enough
+        sysfs.set(temp_c=55.0)
+        clock.now += 10.0
+        governor.update()
+        clock.now += 20.0
+        assert governor.update().name == "hot"
+
+        clock.now += 10.0
+        assert governor.update().name == "warm"
+        # One level per cooldown
+        clock.now += 1.0
+        assert governor.update().name == "warm"
+        clock.now += 30.0
+        assert governor.update().name == "normal"
+        assert governor.changes == 3
+
+    def test_smoothing_ignores_spikes(self, tmp_path):
+        governor, sysfs, _, _, _ = _governor(tmp_path, smoothing=0.2)
+        governor.update()
+
+        sysfs.set(temp_c=90.0)
+
+        assert governor.update().name == "normal"
+        assert governor.smoothed_c == pytest.approx(54.0)
+
+    def test_frequency_throttling_raises_level(self, tmp_path):
+        governor, sysfs, _, _, _ = _governor(tmp_path)
+        sysfs.set(temp_c=66.0, freq_ratio=0.6)
+
+        assert governor.update().name == "hot"
+
+    def test_applies_limits_to_assistant(self, tmp_path):
+        governor, sysfs, _, assistant, backend = _governor(tmp_path)
+        assistant.ask("What oil should I use?")
+        sysfs.set(temp_c=77.0)
+
+        governor.update()
+        assistant.ask("What oil should I use?", max_tokens=256)
+
+        assert backend.n_threads == 2 and backend.n_batch == 128
+        assert assistant.n_threads == 2
+        assert backend.calls[-1]['max_tokens'] == 128
+
+    def test_cool_device_keeps_configured_settings(self, tmp_path):
+        governor, sysfs, clock, assistant, backend = _governor(tmp_path, cooldown_s=0.0)
+        assistant.n_threads = 3
+        assistant.ask("What oil should I use?")
+
+        governor.update()
+        assert backend.n_threads is None and assistant.max_tokens_limit is None
+
+        sysfs.set(temp_c=77.0)
+        governor.update()
+        assert backend.n_threads == 2
+
+        sysfs.set(temp_c=40.0)
+        for _ in range(4):
+            clock.now += 1.0
+            governor.update()
+        assert governor.profile.name == "normal"
+        assert backend.n_threads == 3 and assistant.n_threads == 3
+        assert assistant.max_tokens_limit is None
+
+    @pytest.mark.parametrize("path", ["scheduler", "coalescer", "batch"])
+    def test_cap_applies_to_every_generation_path(self, tmp_path, path):
+        from batch import ask_many
+        from coalescing import RequestCoalescer
+        from scheduler import RequestScheduler
+
+        governor, sysfs, _, assistant, backend = _governor(tmp_path)
+        sysfs.set(temp_c=77.0)
+        governor.update()
+
+        if path == "scheduler":
+            with RequestScheduler(assistant) as scheduler:
+                scheduler.ask("What oil should I use?", max_tokens=256, timeout=5)
+        elif path == "coalescer":
+            RequestCoalescer(assistant).ask("What oil should I use?", max_tokens=256)
+        else:
+            list(ask_many([{'id': 1, 'question': "What oil should I use?"}], assistant=assistant, max_tokens=256))
+
+        assert backend.calls[-1]['max_tokens'] == 128
+
+    def test_limits_survive_model_load(self, tmp_path):
+        governor, sysfs, _, assistant, backend = _governor(tmp_path)
+        sysfs.set(temp_c=81.0)
+
+        governor.update()
+        assistant.ask("What oil should I use?")
+
+        assert backend.n_batch == 64
+        assert backend.calls[-1]['max_tokens'] == 64
+
+    def test_applies_limits_to_voice(self, tmp_path):
+        from src.voice_interface import VoiceAssistant
+
+        voice = VoiceAssistant(llm_path="test_model.gguf")
+        voice._vehicle_assistant = VehicleAssistant(model_path="test_model.gguf", backend=StubBackend())
+        governor, sysfs, _, _, _ = _governor(tmp_path, assistant=None, voice=voice)
+        sysfs.set(temp_c=76.0)
+
+        governor.update()
+
+        assert voice.stt_batch_size == 2 and voice.concurrent_voice is False
+        assert voice._vehicle_assistant.max_tokens_limit == 128
+
+    def test_metrics(self, tmp_path):
+        governor, sysfs, clock, _, _ = _governor(tmp_path)
+        governor.update()
+        clock.now += 5.0
+        sysfs.set(temp_c=70.0, freq_ratio=0.9)
+        governor.update()
+        clock.now += 3.0
+
+        metrics = governor.metrics()
+
+        assert metrics['level'] == "warm"
+        assert metrics['temp_c'] == pytest.approx(70.0)
+        assert metrics['freq_mhz'] == pytest.approx(2160.0)
+        assert metrics['changes'] == metrics['escalations'] == 1
+        assert metrics['time_in_level_s'] == {"normal": 5.0, "warm": 3.0, "hot": 0.0, "critical": 0.0}
+        assert metrics['readings'] == 2
+        assert metrics['n_threads'] == 3 and metrics['n_batch'] == 256
+        assert metrics['max_tokens'] == 192 and metrics['stt_batch_size'] == 4
+
+    def test_background_thread(self, tmp_path):
+        governor, sysfs, _, _, _ = _governor(tmp_path, interval_s=0.01, clock=FakeClock())
+        sysfs.set(temp_c=85.0)
+
+        with governor:
+            pass
+
+        assert governor.readings >= 1 and governor.profile.name == "critical"
+
+    def test_profiles_must_be_sorted(self):
+        from thermal import DEFAULT_PROFILES
+
+        with pytest.raises(ValueError):
+            ThermalGovernor(profiles=tuple(reversed(DEFAULT_PROFILES)))
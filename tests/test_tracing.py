@@ -0,0 +1,161 @@
+"""
+Unit tests for request tracing and Chrome trace export
+"""
+
+import json
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from backends import StubBackend
+from tracing import Tracer
+
+GAS_CAP_ANSWER = " Check the gas cap first."
+
+
+class TestTracer:
+    """Test spans, nesting and sampling"""
+
+    def test_nested_trace_becomes_span(self):
+        tracer = Tracer()
+
+        with tracer.trace("voice_query"):
+            with tracer.span("stt"):
+                pass
+            with tracer.trace("ask"):
+                tracer.event("token", index=1)
+
+        trace = tracer.traces[0]
+        assert len(tracer.traces) == 1
+        assert {e['name'] for e in trace.events} == {"voice_query", "stt", "ask", "token"}
+        outer = trace.spans("voice_query")[0]
+        inner = trace.spans("stt")[0]
+        assert outer['ts'] <= inner['ts'] and inner['ts'] + inner['dur'] <= outer['ts'] + outer['dur']
+
+    def test_unsampled_requests_record_nothing(self):
+        tracer = Tracer(sample_rate=0.0)
+
+        with tracer.trace("ask"):
+            with tracer.span("generate"):
+                tracer.event("token")
+
+        assert len(tracer.traces) == 0
+        assert tracer.report()['requests'] == 1
+
+    def test_sample_rate(self):
+        tracer = Tracer(sample_rate=0.25, seed=7)
+
+        for _ in range(400):
+            with tracer.trace("ask"):
+                pass
+
+        assert 60 < tracer.sampled < 140
+
+    def test_kept_traces_are_bounded(self):
+        tracer = Tracer(max_traces=3)
+
+        for _ in range(10):
+            with tracer.trace("ask"):
+                pass
+
+        assert [t.trace_id for t in tracer.traces] == [8, 9, 10]
+
+
+class TestAssistantTracing:
+    """Test the spans recorded by VehicleAssistant.ask"""
+
+    def test_ask_records_prefill_decode_and_tokens(self, stub_assistant):
+        tracer = Tracer()
+        assistant, _ = stub_assistant(GAS_CAP_ANSWER, tracer=tracer)
+
+        assistant.ask("Why is my check engine light on?")
+
+        trace = tracer.traces[0]
+        names = [e['name'] for e in trace.events]
+        for name in ("ask", "command_match", "wait_for_model", "build_prompt",
+                     "generate", "prefill", "decode"):
+            assert name in names
+        assert names.count("token") == 5
+        assert trace.spans("decode")[0]['args']['tokens'] == 5
+
+    def test_token_text_is_opt_in(self, stub_assistant):
+        tracer = Tracer()
+        assistant, _ = stub_assistant(GAS_CAP_ANSWER, tracer=tracer)
+        assistant.ask("Why is my check engine light on?")
+        verbose_tracer = Tracer(record_text=True)
+        assistant.tracer = verbose_tracer
+        assistant.ask("Why is my check engine light on?")
+
+        tokens = [e for e in tracer.traces[0].events if e['name'] == "token"]
+        assert all('text' not in e['args'] for e in tokens)
+        assert sum(e['args']['chars'] for e in tokens) == len(GAS_CAP_ANSWER)
+        texts = [e['args']['text'] for e in verbose_tracer.traces[0].events if e['name'] == "token"]
+        assert "".join(texts).strip() == GAS_CAP_ANSWER.strip()
+
+    def test_streamed_ask_is_traced(self, stub_assistant):
+        tracer = Tracer()
+        assistant, _ = stub_assistant(GAS_CAP_ANSWER, tracer=tracer)
+
+        "".join(assistant.ask("Why is my check engine light on?", stream=True))
+
+        names = [e['name'] for t in tracer.traces for e in t.events]
+        assert "ask_stream" in names
+        assert names.count("token") == 5
+
+    def test_disabled_by_default(self, stub_assistant):
+        assistant, _ = stub_assistant(GAS_CAP_ANSWER, tracer=None)
+
+        assistant.ask("Why is my check engine light on?")
+
+        assert len(assistant.tracer.traces) == 0
+
+
+class TestVoiceTracing:
+    """Test the spans recorded by VoiceAssistant.process_voice_query"""
+
+    def test_voice_query_covers_stt_llm_and_tts(self):
+        from src.voice_interface import VoiceAssistant
+
+        tracer = Tracer()
+        voice = VoiceAssistant(llm_path="test_model.gguf", preprocess_audio=False, tracer=tracer)
+        voice.transcribe_audio = lambda path: "Why is my check engine light on?"
+
+        def synthesize(text, output_path=None):
+            with tracer.span("tts", chars=len(text)):
+                return "response.wav"
+
+        voice.synthesize_speech = synthesize
+        voice._load_llm()
+        voice._vehicle_assistant._llm = StubBackend(responder=" Check the gas cap.")
+
+        voice.process_voice_query("in.wav")
+
+        trace = tracer.traces[0]
+        assert trace.name == "voice_query"
+        names = [e['name'] for e in trace.events]
+        for name in ("stt", "command_match", "llm", "generate", "decode", "tts"):
+            assert name in names
+
+
+class TestChromeExport:
+    """Test Chrome/Perfetto JSON output"""
+
+    def test_export(self, stub_assistant, tmp_path):
+        tracer = Tracer()
+        assistant, _ = stub_assistant(GAS_CAP_ANSWER, tracer=tracer)
+        assistant.ask("Why is my check engine light on?")
+        assistant.ask("What does the TPMS light mean?")
+
+        path = tmp_path / "trace.json"
+        written = tracer.export_chrome(str(path))
+
+        data = json.loads(path.read_text())
+        assert written == 2
+        events = data['traceEvents']
+        assert {e['pid'] for e in events} == {1, 2}
+        assert all(e['ph'] in ("X", "i", "M") for e in events)
+        assert all('dur' in e for e in events if e['ph'] == "X")
+        names = [e['args']['name'] for e in events if e['ph'] == "M"]
+        assert names == ["ask #1", "ask #2"]